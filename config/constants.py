@@ -42,3 +42,153 @@ ALL_COLUMNS = [
     'internal_comment',  # 选填
     'sample_quantity'    # 选填
 ]
+
+# 支持的数据输入文件格式（Excel 之外的格式按数据块流式读取）
+SUPPORTED_INPUT_EXTENSIONS = ['.xlsx', '.xls', '.csv', '.jsonl', '.parquet']
+
+# Excel预校验：下拉框字段的已知可选值（需与PIM系统下拉框保持一致）
+# 列表为空表示该字段只做格式校验（数字代码），不做取值范围校验
+DROPDOWN_VALUES = {
+    'decision_region': ['Asia', 'Europe'],
+    'reason': [],
+    'project_type': []
+}
+
+# 断点日志：每个件号按顺序完成的步骤（用于崩溃后续跑）
+CHECKPOINT_DIR = 'checkpoints'
+CHECKPOINT_STEP_RESOLVED = 'resolved'            # 产品搜索成功
+CHECKPOINT_STEP_PEDA_CREATED = 'peda_created'    # PEDA 已创建（记录 peda_url）
+CHECKPOINT_STEP_FORM_FILLED = 'form_filled'      # 表单已填写并保存
+CHECKPOINT_STEP_FILE_UPLOADED = 'file_uploaded'  # 单个文件已上传（每个文件一条）
+CHECKPOINT_STEP_SAVED = 'saved'                  # 上传后 PEDA 已保存
+CHECKPOINT_STEP_VALIDATED = 'validated'          # Validate PEDA 已执行
+CHECKPOINT_STEP_PDF_EXPORTED = 'pdf_exported'    # Cover Sheet PDF 已导出
+CHECKPOINT_STEP_COMPLETED = 'completed'          # 件号全部处理完成
+
+# 失败重试：暂时性失败会被放到批次末尾重试（指数退避），永久性失败不重试
+RETRY_MAX_ATTEMPTS = 2             # 每个件号最多重试次数（不含首次处理）
+RETRY_BASE_DELAY_SECONDS = 15      # 第一次重试前的最短等待时间
+RETRY_MAX_DELAY_SECONDS = 120      # 退避等待时间上限
+
+# 失败原因代码（由 process_single_peda 写入 failure_info['reason']）
+FAILURE_EMPTY_PART_NUMBER = 'empty_part_number'
+FAILURE_DOCUMENT_STRUCTURE = 'document_structure'
+FAILURE_PRODUCT_NOT_FOUND = 'product_not_found'
+FAILURE_NEVER_APPROVED = 'never_approved'
+FAILURE_SEARCH_NO_SUGGESTIONS = 'search_no_suggestions'
+FAILURE_CREATE_PEDA = 'create_peda'                          # 点击 Create new PEDA 之前失败
+FAILURE_CREATE_PEDA_UNCONFIRMED = 'create_peda_unconfirmed'  # 已点击创建但未确认PEDA页面（PEDA可能已创建）
+FAILURE_RESUME_OPEN = 'resume_open_failed'
+FAILURE_FORM_FILL = 'form_fill'
+FAILURE_UPLOAD = 'upload_failed'
+FAILURE_SAVE_VALIDATE = 'save_validate_failed'
+FAILURE_PAGE_UNAVAILABLE = 'page_unavailable'
+FAILURE_EXCEPTION = 'exception'
+
+# 永久性失败的特征（失败原因代码或异常信息中包含任一关键字即不重试）
+PERMANENT_FAILURE_PATTERNS = [
+    'Never Approved',
+    'did not find some options',   # 下拉框中不存在该取值
+    'Product Not Found',
+]
+# 暂时性失败的特征（页面遮罩、Save 按钮迟迟不可用、搜索建议加载慢、网络抖动等）
+TRANSIENT_FAILURE_PATTERNS = [
+    'Timeout',
+    'timeout',
+    'waitScreenOverlay',
+    'Target closed',
+    'net::',
+]
+
+# 浏览器崩溃/断开后，每个批次最多自动恢复的次数
+BROWSER_MAX_RECOVERIES = 3
+
+# 并行处理：多个工作线程各自启动浏览器并登录，共享一个件号队列
+PARALLEL_MIN_WORKERS = 1
+PARALLEL_MAX_WORKERS = 4
+# 自适应并发（AIMD）：步骤耗时超过基线的倍数即视为服务器变慢，并发数乘以减小系数
+AIMD_DECREASE_FACTOR = 0.5
+AIMD_SLOWDOWN_RATIO = 1.5
+AIMD_WINDOW_PARTS = 3             # 每个活动线程处理多少个件号评估一次
+AIMD_LATENCY_SMOOTHING = 0.3      # 步骤耗时的指数平滑系数
+# 作为服务器延迟样本的追踪区间（只包含等待服务器响应的部分，不含固定等待和页面操作）
+AIMD_SERVER_SPANS = ('search_response', 'overlay_wait', 'save_roundtrip')
+# 点击保存、上传后先等待遮罩出现的最长时间（毫秒），避免请求发出前就判定遮罩已消失
+OVERLAY_APPEAR_TIMEOUT_MS = 1500
+AIMD_BASELINE_SAMPLES = 50        # 基线取最近多少个样本（服务器整体变慢后基线随之更新）
+AIMD_BASELINE_PERCENTILE = 10     # 基线取窗口内样本的第几百分位
+AIMD_MIN_BASELINE_SECONDS = 0.2   # 基线下限，避免几毫秒的样本把正常波动放大成“变慢”
+
+# 件号处理顺序策略
+PART_ORDER_EXCEL = 'excel'                    # 按 Excel 行顺序
+PART_ORDER_LONGEST_FIRST = 'longest_first'    # 耗时长的先做（多线程时缩短总耗时）
+PART_ORDER_SHORTEST_FIRST = 'shortest_first'  # 耗时短的先做（尽快看到结果）
+PART_ORDER_POLICIES = [PART_ORDER_EXCEL, PART_ORDER_LONGEST_FIRST, PART_ORDER_SHORTEST_FIRST]
+# 没有历史耗时时的件号耗时估算参数（秒）
+PART_COST_BASE_SECONDS = 60           # 搜索、创建、填表、保存等固定开销
+PART_COST_PER_CATEGORY_SECONDS = 10   # 每个有文件的类别（切换类别、打开上传对话框）
+PART_COST_PER_FILE_SECONDS = 12       # 每个文件（选择文件、等待遮罩）
+PART_COST_PER_MB_SECONDS = 1.0        # 每 MB 上传数据
+
+# 步骤追踪文件目录（JSONL 和 Chrome trace_event JSON）
+TRACE_DIR = "traces"
+
+# 失败件号的 Playwright trace（截图+DOM快照），只在件号失败时写入 zip
+PLAYWRIGHT_TRACE_DIR = "playwright_traces"
+PLAYWRIGHT_TRACE_MAX_FILES = 20       # 最多保留的 trace 文件数
+PLAYWRIGHT_TRACE_MAX_MB = 500         # trace 目录总大小上限
+
+# 批处理运行指标（Prometheus 文本格式）：批次结束写快照文件，配置了端口时另开本地 HTTP 端点
+METRICS_DIR = "metrics"
+METRICS_HOST = "127.0.0.1"
+METRICS_STEP_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)   # 步骤耗时直方图分桶（秒）
+
+# GUI 日志泵：后台线程的日志先进入队列，按固定间隔批量写入日志控件
+LOG_PUMP_INTERVAL_MS = 100            # 刷新间隔（毫秒）
+LOG_PUMP_MAX_BATCH = 500              # 每次最多写入的日志条数（积压时分多次写入，避免界面卡顿）
+
+# GUI 日志视图：内存中只保留最近的日志，完整历史写入 LOG_DIR 下的溢出文件
+LOG_DIR = "logs"
+LOG_VIEW_CAPACITY = 20000             # 内存中保留的最多日志条数
+LOG_SPILL_MAX_FILES = 20              # 最多保留的溢出文件数（每次启动 GUI 一个）
+LOG_FILTER_LEVELS = ['INFO', 'SUCCESS', 'WARNING', 'ERROR']   # 日志页可筛选的级别
+LOG_SEARCH_DELAY_MS = 300             # 搜索框停止输入多久后再筛选（毫秒）
+
+# 结构化日志：各模块的日志由后台线程写入 LOG_DIR 下按大小轮转的 JSONL 文件
+STRUCTURED_LOG_FILE = "peda.jsonl"
+STRUCTURED_LOG_LEVEL = "INFO"         # 默认级别，可在配置文件 logging.level / logging.modules 中按模块调整
+STRUCTURED_LOG_MAX_MB = 10            # 单个文件大小上限
+STRUCTURED_LOG_BACKUPS = 5            # 轮转保留的旧文件数
+
+# 上传记录：每个文件的上传结果立即写入 SQLite，GUI 表格分页读取，导出按批次读取
+RECORDS_DIR = "records"
+UPLOAD_RECORDS_DB = "upload_records.db"
+RECORDS_RETENTION_DAYS = 30           # 超过天数的旧记录在打开数据库时清理
+RECORDS_PAGE_SIZE = 200               # 上传记录表格每页行数
+RECORDS_EXPORT_BATCH = 1000           # 导出时每次从数据库读取的行数
+# 处理报告“件号耗时”表中单独列出的步骤（tracing 区间名），其余步骤合计为 Other_s
+REPORT_STEP_COLUMNS = ('search', 'approval_check', 'create', 'fill', 'upload', 'save', 'validate',
+                       'cover_sheet', 'pdf')
+
+# 运行历史：每个批次（配置、起止时间、结果统计）和每个件号（步骤耗时、重试、结果、上传文件数和字节数）
+# 写入本地 SQLite，用于比较等待时间或并发数调整前后的吞吐量
+RUN_HISTORY_DB = "run_history.db"     # 位于 RECORDS_DIR 下
+RUN_HISTORY_RETENTION_DAYS = 365      # 超过天数的旧批次在打开数据库时清理
+
+# GUI 启动性能分析：设置环境变量 PEDA_STARTUP_PROFILE=1 或用 --profile-startup 启动，
+# 记录导入耗时和各界面部分的构建耗时，首次绘制后把报告写入 LOG_DIR
+STARTUP_PROFILE_ENV = "PEDA_STARTUP_PROFILE"
+STARTUP_PROFILE_FLAG = "--profile-startup"
+STARTUP_TARGET_SOURCE_SECONDS = 1.5   # 源码运行：进程启动到窗口首次绘制的目标耗时
+STARTUP_TARGET_FROZEN_SECONDS = 3.0   # PyInstaller 打包运行的目标耗时（含解包和加载打包的库）
+STARTUP_PROFILE_TOP_IMPORTS = 25      # 报告中列出的最慢导入数
+
+# 常驻自动化服务（GUI）：专用线程持有 Playwright 和已登录的浏览器，填好登录信息后在后台预先登录，
+# 连续的批次复用同一个浏览器（只用于单浏览器模式，max_workers 大于1时每个批次各自启动浏览器）
+AUTOMATION_KEEPALIVE_SECONDS = 300    # 空闲时每隔多少秒回到主页面检查一次登录状态（会话过期时重新登录）
+AUTOMATION_STOP_TIMEOUT_SECONDS = 10  # 关闭窗口时等待服务线程关闭浏览器的最长时间
+
+# 生成上传文件夹：件号并行创建（文档目录常在网络共享上），进度按件号数批量汇报
+FOLDER_GEN_MAX_WORKERS = 8            # 同时创建文件夹的线程数
+FOLDER_GEN_PROGRESS_EVERY = 200       # 每处理多少个件号汇报一次进度
+FOLDER_GEN_MAX_ERROR_LINES = 20       # 结束汇总中最多列出的失败件号数
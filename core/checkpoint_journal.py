@@ -0,0 +1,213 @@
+"""
+批量处理断点日志（checkpoint journal）
+
+每完成一个件号的一个步骤，就向 JSONL 文件追加一条记录并 fsync 到磁盘，
+这样即使 GUI 进程或浏览器在中途崩溃，也能知道哪些件号已经完成、
+哪些件号停在了哪一步。续跑模式据此跳过已完成的件号，
+并让未完成的件号从最后一个安全步骤继续，避免重复创建 PEDA。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable
+
+from config.constants import (
+    CHECKPOINT_DIR, CHECKPOINT_STEP_PEDA_CREATED, CHECKPOINT_STEP_FILE_UPLOADED,
+    CHECKPOINT_STEP_SAVED, CHECKPOINT_STEP_COMPLETED
+)
+
+# 非步骤类记录（批次开始）
+EVENT_RUN_STARTED = 'run_started'
+
+
+class PartCheckpoint:
+    """
+    单个件号在日志中的进度
+
+    PIM 只在 Save 之后才保留上传的文件，所以 uploaded_files 只包含之后有 saved 记录的文件；
+    上传后还没保存的文件放在 unsaved_files 中，续跑时会重新上传。
+    """
+
+    def __init__(self, part_number: str):
+        self.part_number = part_number
+        self.steps: List[str] = []
+        self.peda_url: Optional[str] = None
+        self.uploaded_files = set()
+        self.unsaved_files = set()
+
+    @property
+    def completed(self) -> bool:
+        return CHECKPOINT_STEP_COMPLETED in self.steps
+
+    @property
+    def peda_created(self) -> bool:
+        return CHECKPOINT_STEP_PEDA_CREATED in self.steps and bool(self.peda_url)
+
+    def apply(self, record: Dict[str, Any]):
+        """把一条日志记录合并到当前进度"""
+        step = record.get('step')
+        if not step:
+            return
+        if step == CHECKPOINT_STEP_FILE_UPLOADED:
+            if record.get('file'):
+                self.unsaved_files.add(record['file'])
+            return
+        if step == CHECKPOINT_STEP_SAVED:
+            self.uploaded_files |= self.unsaved_files
+            self.unsaved_files = set()
+        if step not in self.steps:
+            self.steps.append(step)
+        if step == CHECKPOINT_STEP_PEDA_CREATED and record.get('peda_url'):
+            self.peda_url = record['peda_url']
+
+    def last_step(self) -> Optional[str]:
+        return self.steps[-1] if self.steps else None
+
+
+class CheckpointJournal:
+    """追加写入、逐条 fsync 的 JSONL 断点日志"""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 上次崩溃可能留下半行记录，先补一个换行，避免新记录与它粘在一起
+        self._needs_newline = self._ends_with_partial_line()
+
+    def _ends_with_partial_line(self) -> bool:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return False
+        with open(self.path, 'rb') as handle:
+            handle.seek(-1, os.SEEK_END)
+            return handle.read(1) != b'\n'
+
+    def _append(self, record: Dict[str, Any]):
+        record.setdefault('ts', time.time())
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._needs_newline:
+                line = '\n' + line
+                self._needs_newline = False
+            with open(self.path, 'a', encoding='utf-8') as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def start_run(self, resume: bool, total: int):
+        """记录批次开始；非续跑的批次会让之前的进度在加载时失效"""
+        self._append({'event': EVENT_RUN_STARTED, 'resume': bool(resume), 'total': total})
+
+    def record_step(self, part_number: str, step: str, **info):
+        """记录件号完成的一个步骤"""
+        record = {'part_number': part_number, 'step': step}
+        record.update({key: value for key, value in info.items() if value is not None})
+        self._append(record)
+
+    def load(self) -> Dict[str, PartCheckpoint]:
+        """
+        读取当前批次（最近一次非续跑开始之后）的件号进度
+
+        崩溃时最后一行可能只写了一半，解析失败的行会被忽略。
+        """
+        states: Dict[str, PartCheckpoint] = {}
+        if not os.path.exists(self.path):
+            return states
+
+        with open(self.path, 'r', encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                if record.get('event') == EVENT_RUN_STARTED:
+                    if not record.get('resume'):
+                        states = {}
+                    continue
+
+                part_number = record.get('part_number')
+                if not part_number:
+                    continue
+                state = states.get(part_number)
+                if state is None:
+                    state = states[part_number] = PartCheckpoint(part_number)
+                state.apply(record)
+
+        return states
+
+
+class CheckpointTracker:
+    """
+    本批次内存中的件号进度（线程安全），可选同步写入断点日志
+
+    批内重试和浏览器崩溃恢复都从这里取件号进度，因此没有断点日志时也能续做。
+    """
+
+    def __init__(self, journal: Optional[CheckpointJournal] = None,
+                 states: Optional[Dict[str, PartCheckpoint]] = None):
+        self.journal = journal
+        self.states: Dict[str, PartCheckpoint] = states or {}
+        self._lock = threading.Lock()
+
+    def get(self, part_number: str) -> Optional[PartCheckpoint]:
+        with self._lock:
+            return self.states.get(part_number)
+
+    def record(self, part_number: str, step: str, **info):
+        """记录步骤完成：先更新内存进度，再写断点日志"""
+        with self._lock:
+            state = self.states.get(part_number)
+            if state is None:
+                state = self.states[part_number] = PartCheckpoint(part_number)
+            state.apply(dict(info, step=step))
+        if self.journal is not None:
+            self.journal.record_step(part_number, step, **info)
+
+    def step_callback(self, part_number: str) -> Callable:
+        """生成传给 process_single_peda 的 step_callback(step, **info)"""
+        def callback(step: str, **info):
+            self.record(part_number, step, **info)
+
+        return callback
+
+
+def open_checkpoint_tracker(journal_path: Optional[str], resume: bool, total: int,
+                            log: Callable[..., None]) -> CheckpointTracker:
+    """
+    打开批次的断点日志：续跑时先读取上次的进度，再记录本批次开始
+
+    Args:
+        journal_path: 断点日志路径（为空时只在内存中跟踪进度）
+        resume: 是否续跑
+        total: 本批次件号总数
+        log: 日志函数 log(message, level)
+
+    Returns:
+        CheckpointTracker: 本批次的进度跟踪器
+    """
+    if not journal_path:
+        return CheckpointTracker()
+
+    journal = CheckpointJournal(journal_path)
+    states = {}
+    if resume:
+        states = journal.load()
+        finished = sum(1 for state in states.values() if state.completed)
+        log(f"🔁 续跑模式: 断点日志中已完成 {finished} 个件号，未完成 {len(states) - finished} 个")
+    journal.start_run(resume, total)
+    log(f"断点日志: {journal_path}")
+    return CheckpointTracker(journal, states)
+
+
+def default_journal_path(excel_path: str) -> str:
+    """按输入文件名生成断点日志路径（同一个 Excel 始终对应同一个日志）"""
+    stem = Path(excel_path).stem or 'batch'
+    return os.path.join(os.getcwd(), CHECKPOINT_DIR, f"{stem}.jsonl")
@@ -0,0 +1,206 @@
+"""
+自适应并发控制（AIMD）
+
+多个工作线程共用同一个 PIM 后端时，并发过高会让遮罩、保存等待对所有人都变慢。
+控制器根据等待服务器的追踪区间（AIMD_SERVER_SPANS：搜索响应、遮罩等待、保存往返）
+和最近的件号吞吐量调整活动工作线程数：
+- 区间耗时明显高于基线（服务器变慢）时按比例减少并发（乘性减）
+- 耗时正常且吞吐量没有下降时逐个增加并发（加性增）
+- 增加并发后吞吐量反而下降时退回一个
+基线是最近 AIMD_BASELINE_SAMPLES 个样本的低百分位，服务器整体变慢一段时间后
+基线随之上移，不会因为批次开始时的一次快速响应而一直判定为变慢。
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional
+
+from config.constants import (
+    PARALLEL_MIN_WORKERS, PARALLEL_MAX_WORKERS, AIMD_DECREASE_FACTOR,
+    AIMD_SLOWDOWN_RATIO, AIMD_WINDOW_PARTS, AIMD_LATENCY_SMOOTHING, AIMD_SERVER_SPANS,
+    AIMD_BASELINE_SAMPLES, AIMD_BASELINE_PERCENTILE, AIMD_MIN_BASELINE_SECONDS
+)
+from modules.structured_log import get_logger, level_value
+from modules.tracing import OUTCOME_OK
+
+logger = get_logger(__name__)
+
+
+class AdaptiveConcurrencyController:
+    """按服务器延迟和吞吐量调整活动工作线程数"""
+
+    def __init__(self, min_workers: int = PARALLEL_MIN_WORKERS,
+                 max_workers: int = PARALLEL_MAX_WORKERS,
+                 initial_workers: Optional[int] = None,
+                 decrease_factor: float = AIMD_DECREASE_FACTOR,
+                 slowdown_ratio: float = AIMD_SLOWDOWN_RATIO,
+                 window_parts: int = AIMD_WINDOW_PARTS,
+                 smoothing: float = AIMD_LATENCY_SMOOTHING,
+                 server_spans: Iterable[str] = AIMD_SERVER_SPANS,
+                 baseline_samples: int = AIMD_BASELINE_SAMPLES,
+                 baseline_percentile: float = AIMD_BASELINE_PERCENTILE,
+                 min_baseline: float = AIMD_MIN_BASELINE_SECONDS,
+                 clock: Callable[[], float] = time.monotonic,
+                 log_callback: Optional[Callable] = None):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.decrease_factor = decrease_factor
+        self.slowdown_ratio = slowdown_ratio
+        self.window_parts = max(1, window_parts)
+        self.smoothing = smoothing
+        self.server_spans = frozenset(server_spans)
+        self.baseline_samples = max(1, baseline_samples)
+        self.baseline_percentile = baseline_percentile
+        self.min_baseline = min_baseline
+        self._clock = clock
+        self._log_callback = log_callback
+
+        start = initial_workers if initial_workers is not None else self.min_workers
+        self._limit = min(self.max_workers, max(self.min_workers, start))
+        self._condition = threading.Condition()
+        self._closed = False
+        # 已退出的工作线程编号：不再占用并发名额，排在后面的线程依次递补
+        self._retired = set()
+
+        # 每个区间的平滑耗时和最近的原始样本（基线从样本窗口计算）
+        self._latency: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+
+        # 吞吐量统计窗口
+        self._window_start = clock()
+        self._window_done = 0
+        self._last_throughput: Optional[float] = None
+        self._last_change = 0  # 上一次调整方向: 1 增加, -1 减少, 0 不变
+
+    def log(self, message: str, level: str = "INFO"):
+        if self._log_callback:
+            self._log_callback(message, level)
+        else:
+            logger.log(level_value(level), message)
+
+    @property
+    def limit(self) -> int:
+        """当前允许的活动工作线程数"""
+        return self._limit
+
+    # ---------------------------------------------------------------
+    # 测量输入
+    # ---------------------------------------------------------------
+
+    def observe_span(self, span):
+        """追踪器的区间结束回调：成功结束的服务器等待区间作为延迟样本"""
+        if span.name in self.server_spans and span.outcome == OUTCOME_OK:
+            self.observe_step(span.name, span.duration)
+
+    def observe_step(self, step: str, seconds: float):
+        """记录一个服务器等待的耗时样本"""
+        if seconds <= 0:
+            return
+        with self._condition:
+            previous = self._latency.get(step)
+            self._latency[step] = seconds if previous is None else (
+                self.smoothing * seconds + (1 - self.smoothing) * previous)
+            samples = self._samples.get(step)
+            if samples is None:
+                samples = self._samples[step] = deque(maxlen=self.baseline_samples)
+            samples.append(seconds)
+
+    def baseline(self, step: str) -> Optional[float]:
+        """区间的基线耗时：最近样本窗口的低百分位（不低于 min_baseline）"""
+        with self._condition:
+            samples = sorted(self._samples.get(step) or ())
+        if not samples:
+            return None
+        rank = max(1, math.ceil(self.baseline_percentile / 100 * len(samples)))
+        return max(samples[rank - 1], self.min_baseline)
+
+    def latency_ratio(self) -> float:
+        """各区间当前平滑耗时相对基线的平均倍数（1.0 表示与最近的正常水平相当）"""
+        with self._condition:
+            steps = list(self._latency.items())
+        ratios = [latency / self.baseline(step) for step, latency in steps]
+        return sum(ratios) / len(ratios) if ratios else 1.0
+
+    def observe_part_done(self):
+        """一个件号处理结束（无论成败），每满一个窗口评估一次并发数"""
+        with self._condition:
+            self._window_done += 1
+            if self._window_done < self.window_parts * self._limit:
+                return
+            elapsed = max(self._clock() - self._window_start, 1e-6)
+            throughput = self._window_done / elapsed * 3600  # 件/小时
+            self._window_start = self._clock()
+            self._window_done = 0
+        self._adjust(throughput)
+
+    # ---------------------------------------------------------------
+    # 调整策略
+    # ---------------------------------------------------------------
+
+    def _adjust(self, throughput: float):
+        ratio = self.latency_ratio()
+        with self._condition:
+            old_limit = self._limit
+            if ratio >= self.slowdown_ratio:
+                # 服务器变慢：乘性减
+                self._limit = max(self.min_workers, int(self._limit * self.decrease_factor))
+                reason = f"服务器延迟为基线的 {ratio:.1f} 倍"
+            elif (self._last_change > 0 and self._last_throughput is not None
+                  and throughput < self._last_throughput):
+                # 上次加并发后吞吐量下降：退回
+                self._limit = max(self.min_workers, self._limit - 1)
+                reason = "增加并发后吞吐量下降"
+            else:
+                # 正常：加性增
+                self._limit = min(self.max_workers, self._limit + 1)
+                reason = "延迟正常"
+
+            self._last_change = (self._limit > old_limit) - (self._limit < old_limit)
+            self._last_throughput = throughput
+            if self._limit != old_limit:
+                self._condition.notify_all()
+
+        if self._limit != old_limit:
+            self.log(f"⚙️ 并发数 {old_limit} → {self._limit}（{reason}，吞吐量 {throughput:.1f} 件/小时）")
+
+    # ---------------------------------------------------------------
+    # 工作线程协调
+    # ---------------------------------------------------------------
+
+    def wait_for_slot(self, worker_index: int, cancel_token=None) -> bool:
+        """
+        工作线程取下一个件号前调用：编号超出当前并发数的线程在此等待
+
+        只按仍在运行的线程排位：前面的线程退出后（retire），后面的线程递补它的名额
+
+        Args:
+            worker_index: 工作线程编号（从0开始）
+            cancel_token: 取消令牌（可选）
+
+        Returns:
+            bool: 可以继续处理返回True；控制器已关闭或已取消返回False
+        """
+        with self._condition:
+            while self._rank(worker_index) >= self._limit and not self._closed:
+                if cancel_token is not None and cancel_token.cancelled:
+                    return False
+                self._condition.wait(timeout=0.5)
+            return not self._closed
+
+    def _rank(self, worker_index: int) -> int:
+        """工作线程在仍运行的线程中的排位（调用方持有锁）"""
+        return worker_index - sum(1 for index in self._retired if index < worker_index)
+
+    def retire(self, worker_index: int):
+        """工作线程退出（如浏览器启动失败）：释放它的名额，唤醒等待中的线程递补"""
+        with self._condition:
+            self._retired.add(worker_index)
+            self._condition.notify_all()
+
+    def close(self):
+        """批次结束：唤醒所有等待中的工作线程"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
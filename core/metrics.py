@@ -0,0 +1,246 @@
+"""
+批处理运行指标（Prometheus 文本格式）
+
+引擎在处理过程中累计计数器和直方图：件号成功/失败/跳过、步骤耗时、上传文件数和字节数、
+重试、重新登录、浏览器恢复、PDF 导出。步骤类指标来自 tracing 区间（注册为追踪器的
+结束回调），件号结果和重试由引擎直接记录。
+
+可选在本地端口提供 /metrics（MetricsServer），批次结束后写一份快照文件，
+运维可以实时查看吞吐量，并按 peda_last_activity_timestamp_seconds 对卡住的批次告警。
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from config.constants import METRICS_DIR, METRICS_HOST, METRICS_STEP_BUCKETS
+
+# 指标名 -> (类型, 说明)，按此顺序输出
+_METRIC_DEFINITIONS = {
+    'peda_batch_running': ('gauge', '批次是否正在运行（1/0）'),
+    'peda_batch_parts': ('gauge', '本批次件号总数'),
+    'peda_batch_start_timestamp_seconds': ('gauge', '批次开始时间（Unix 时间戳）'),
+    'peda_last_activity_timestamp_seconds': ('gauge', '最近一个步骤结束的时间，长时间不变说明批次卡住'),
+    'peda_last_part_timestamp_seconds': ('gauge', '最近一个件号处理结束的时间'),
+    'peda_worker_limit': ('gauge', '当前允许的并行浏览器数'),
+    'peda_parts_total': ('counter', '处理结束的件号数（按结果）'),
+    'peda_parts_resumed_total': ('counter', '上次运行已完成、本次跳过的件号数（同时计入 success）'),
+    'peda_retries_total': ('counter', '安排自动重试的次数（按失败原因）'),
+    'peda_step_duration_seconds': ('histogram', '步骤耗时（秒）'),
+    'peda_step_failures_total': ('counter', '失败、出错或被取消的步骤数'),
+    'peda_files_uploaded_total': ('counter', '上传的文件数（按结果）'),
+    'peda_upload_bytes_total': ('counter', '成功上传的字节数'),
+    'peda_logins_total': ('counter', '登录次数（initial 为每个浏览器会话的首次登录，relogin 为会话失效后的重新登录）'),
+    'peda_browser_recoveries_total': ('counter', '浏览器崩溃或断开后的恢复次数'),
+    'peda_pdf_exports_total': ('counter', 'Cover Sheet PDF 导出次数（按结果）'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    escaped = []
+    for key, value in items:
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class BatchMetrics:
+    """
+    一个批次的运行指标（线程安全）
+
+    Args:
+        step_buckets: 步骤耗时直方图的分桶上界（秒）
+    """
+
+    def __init__(self, step_buckets=METRICS_STEP_BUCKETS):
+        self.step_buckets = tuple(sorted(step_buckets))
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Labels], float] = {}
+        # (指标名, 标签) -> [各分桶计数..., 总和, 次数]
+        self._histograms: Dict[Tuple[str, Labels], list] = {}
+        self._login_threads = set()
+
+    # ------------------------------------------------------------------ 基本操作
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, _labels(**labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[(name, _labels(**labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(**labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(self.step_buckets) + [0.0, 0]
+            for index, bound in enumerate(self.step_buckets):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._values.get((name, _labels(**labels)), 0)
+
+    # ------------------------------------------------------------------ 引擎调用
+    def batch_started(self, total_parts: int):
+        now = time.time()
+        self.set('peda_batch_running', 1)
+        self.set('peda_batch_parts', total_parts)
+        self.set('peda_batch_start_timestamp_seconds', now)
+        self.set('peda_last_activity_timestamp_seconds', now)
+
+    def batch_finished(self):
+        self.set('peda_batch_running', 0)
+
+    def part_finished(self, outcome: str, resumed: bool = False):
+        """件号处理结束：outcome 为 success / failed / skipped"""
+        self.inc('peda_parts_total', outcome=outcome)
+        if resumed:
+            self.inc('peda_parts_resumed_total')
+        now = time.time()
+        self.set('peda_last_part_timestamp_seconds', now)
+        self.set('peda_last_activity_timestamp_seconds', now)
+
+    def retry_scheduled(self, reason: str):
+        self.inc('peda_retries_total', reason=reason or 'unknown')
+
+    def worker_limit(self, limit: int):
+        self.set('peda_worker_limit', limit)
+
+    def observe_span(self, span):
+        """追踪器的区间结束回调：步骤耗时、上传、登录、恢复和 PDF 导出"""
+        from modules.tracing import OUTCOME_OK
+
+        ok = span.outcome == OUTCOME_OK
+        self.observe('peda_step_duration_seconds', span.duration, step=span.name)
+        if not ok:
+            self.inc('peda_step_failures_total', step=span.name, outcome=span.outcome)
+        self.set('peda_last_activity_timestamp_seconds', time.time())
+
+        if span.name == 'upload':
+            self.inc('peda_files_uploaded_total', outcome='ok' if ok else 'failed')
+            if ok:
+                self.inc('peda_upload_bytes_total', span.attrs.get('bytes', 0))
+        elif span.name == 'login':
+            with self._lock:
+                relogin = span.thread_id in self._login_threads
+                self._login_threads.add(span.thread_id)
+            self.inc('peda_logins_total', kind='relogin' if relogin else 'initial')
+        elif span.name == 'recover':
+            self.inc('peda_browser_recoveries_total', outcome='ok' if ok else 'failed')
+        elif span.name == 'pdf':
+            self.inc('peda_pdf_exports_total', outcome='ok' if ok else 'failed')
+
+    # ------------------------------------------------------------------ 输出
+    def render(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: list(item) for key, item in self._histograms.items()}
+
+        lines = []
+        for name, (metric_type, help_text) in _METRIC_DEFINITIONS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == 'histogram':
+                for (metric, labels), histogram in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.step_buckets, histogram):
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(round(histogram[-2], 6))}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram[-1]}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path: str):
+        """写入快照文件（先写临时文件再替换，可供 node_exporter textfile 采集）"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            handle.write(self.render())
+        os.replace(temp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """
+    在后台线程中提供 /metrics 端点
+
+    Args:
+        metrics: 批次指标
+        port: 监听端口（0 表示自动分配）
+        host: 监听地址，默认只监听本机
+    """
+
+    def __init__(self, metrics: BatchMetrics, port: int, host: str = METRICS_HOST):
+        self._httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.metrics = metrics
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='peda-metrics', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> 'MetricsServer':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._httpd.shutdown()
+            self._thread.join(timeout=5)
+        self._httpd.server_close()
+
+
+def default_metrics_path(excel_path: str) -> str:
+    """按输入文件名和开始时间生成快照文件路径"""
+    stem = os.path.splitext(os.path.basename(excel_path))[0] or 'batch'
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(os.getcwd(), METRICS_DIR, f"{stem}_{timestamp}.prom")
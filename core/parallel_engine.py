@@ -0,0 +1,357 @@
+"""
+并行批量处理引擎
+
+每个工作线程各自启动 Playwright、浏览器并登录（sync API 的对象不能跨线程使用），
+所有线程共享同一个件号队列（含失败重试）和断点日志。活动线程数由
+AdaptiveConcurrencyController 根据服务器延迟和吞吐量动态调整。
+"""
+
+import os
+import threading
+from typing import List, Dict, Any, Optional, Callable
+
+from modules.browser_manager import BrowserManager
+from modules.peda_processor import process_single_peda, validate_data_row, prepare_data_row
+from modules.cancellation import OperationCancelled
+from modules import tracing
+from core.checkpoint_journal import open_checkpoint_tracker
+from core.retry_scheduler import RetryScheduler, classify_failure
+from core.concurrency_controller import AdaptiveConcurrencyController
+from core.part_ordering import order_data_rows
+from config.constants import (
+    CHECKPOINT_STEP_COMPLETED, FAILURE_PAGE_UNAVAILABLE, FAILURE_EXCEPTION, PARALLEL_MAX_WORKERS,
+    PART_ORDER_LONGEST_FIRST
+)
+from modules.structured_log import get_logger, level_value
+
+logger = get_logger(__name__)
+
+
+class _SharedQueue:
+    """多个工作线程共享的件号队列：包装 RetryScheduler 并跟踪处理中的件号数"""
+
+    def __init__(self, scheduler: RetryScheduler, cancel_token=None):
+        self.scheduler = scheduler
+        self.cancel_token = cancel_token
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def take(self):
+        """取下一个件号；队列已空且没有处理中的件号（不会再产生重试）时返回None"""
+        with self._condition:
+            while True:
+                if self.cancel_token is not None and self.cancel_token.cancelled:
+                    return None
+                entry, wait_seconds = self.scheduler.next_ready()
+                if entry is not None:
+                    self.in_flight += 1
+                    return entry
+                if self.scheduler.exhausted and self.in_flight == 0:
+                    return None
+                self._condition.wait(timeout=min(wait_seconds, 0.5) if wait_seconds else 0.5)
+
+    def done(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def requeue_now(self, index: int, item: Any, attempt: int):
+        with self._condition:
+            self.scheduler.retry_now(index, item, attempt)
+            self._condition.notify_all()
+
+    def schedule_retry(self, index: int, item: Any, attempt: int, failure: Dict[str, Any]) -> Optional[float]:
+        with self._condition:
+            delay = self.scheduler.schedule_retry(index, item, attempt, failure)
+            self._condition.notify_all()
+            return delay
+
+
+def run_batch_parallel(data_rows: List[Dict[str, Any]],
+                       document_path: str,
+                       username: str, password: str, system_language: str = 'en',
+                       progress_callback: Optional[Callable] = None,
+                       log_callback: Optional[Callable] = None,
+                       upload_record_callback: Optional[Callable] = None,
+                       login_url: Optional[str] = None,
+                       browser_path: Optional[str] = None,
+                       preferred_browser: str = "auto",
+                       browser_finder = None,
+                       headless: bool = False,
+                       journal_path: Optional[str] = None,
+                       resume: bool = False,
+                       cancel_token=None,
+                       max_workers: int = PARALLEL_MAX_WORKERS,
+                       controller: Optional[AdaptiveConcurrencyController] = None,
+                       part_order: str = PART_ORDER_LONGEST_FIRST,
+                       trace_path: Optional[str] = None,
+                       failure_trace_dir: Optional[str] = None,
+                       metrics=None,
+                       span_listener: Optional[Callable] = None) -> Dict[str, Any]:
+    """
+    多工作线程批量处理（每个线程一个浏览器会话）
+
+    Args:
+        data_rows: 数据行列表
+        document_path: 文档主目录路径
+        username: 用户名
+        password: 密码
+        system_language: 系统语言
+        progress_callback: 进度回调函数
+        log_callback: 日志回调函数（会被多个线程调用）
+        upload_record_callback: 上传记录回调函数
+        login_url: 登录网址
+        browser_path: 自定义浏览器路径（可选）
+        preferred_browser: 首选浏览器类型 ("chrome", "msedge", "auto")
+        browser_finder: 预热的浏览器查找器实例（可选）
+        headless: 是否以Headless模式运行浏览器
+        journal_path: 断点日志路径（可选）
+        resume: 续跑模式
+        cancel_token: 取消令牌（CancellationToken）
+        max_workers: 最多同时运行的工作线程数
+        controller: 自适应并发控制器（可选，默认从1个线程开始按AIMD调整到 max_workers）
+        part_order: 件号处理顺序策略（默认耗时长的先做，缩短多线程的总耗时）
+        trace_path: 步骤追踪文件路径（不含扩展名，可选），每个工作线程在追踪视图中占一行
+        failure_trace_dir: 失败件号 Playwright trace 目录（可选），只有失败的件号写入 zip
+        metrics: 运行指标（BatchMetrics，可选），处理过程中实时更新
+        span_listener: 步骤区间结束回调（可选），如记录件号耗时的 PartTimingRecorder
+
+    Returns:
+        Dict[str, Any]: 处理结果统计（与 run_batch_with_reuse 相同的键，另含 max_active_workers）
+    """
+    from playwright.sync_api import sync_playwright
+
+    def log(message: str, level: str = "INFO"):
+        """内部日志函数"""
+        if log_callback:
+            log_callback(message, level)
+        else:
+            logger.log(level_value(level), message)
+
+    total_count = len(data_rows)
+    stats = {'success': 0, 'failed': 0, 'skipped': 0, 'resumed': 0, 'finished': 0}
+    failures: Dict[str, Dict[str, Any]] = {}
+    stats_lock = threading.Lock()
+    cancelled = threading.Event()
+    max_active = [0]
+
+    if controller is None:
+        controller = AdaptiveConcurrencyController(max_workers=max_workers, log_callback=log_callback)
+    worker_count = min(controller.max_workers, max(total_count, 1))
+
+    log(f"=== 开始批量处理PEDA（并行模式，最多 {worker_count} 个浏览器）===")
+    log(f"总计: {total_count} 个件号")
+
+    data_rows = order_data_rows(data_rows, document_path, part_order, log=log)
+    tracker = open_checkpoint_tracker(journal_path, resume, total_count, log)
+    queue = _SharedQueue(RetryScheduler(data_rows), cancel_token)
+
+    def count(key: str, part_number: Optional[str] = None, failure: Optional[Dict[str, Any]] = None,
+              resumed: bool = False):
+        """更新统计并报告进度"""
+        with stats_lock:
+            stats[key] += 1
+            if key != 'resumed':
+                stats['finished'] += 1
+            if failure is not None:
+                failures[part_number] = failure
+            finished = stats['finished']
+        if metrics is not None and key != 'resumed':
+            metrics.part_finished(key, resumed=resumed)
+        if progress_callback and key != 'resumed':
+            progress_callback(finished / max(total_count, 1) * 100, f"已完成 {finished}/{total_count}")
+
+    def worker(worker_index: int):
+        prefix = f"[W{worker_index + 1}] "
+
+        def worker_log(message: str, level: str = "INFO"):
+            log(prefix + message, level)
+
+        browser_manager = None
+        attempted_count = 0
+        stop_worker = False
+        with sync_playwright() as playwright:
+            try:
+                while not stop_worker and controller.wait_for_slot(worker_index, cancel_token):
+                    entry = queue.take()
+                    if entry is None:
+                        # 全部件号已处理完：唤醒仍被限流等待的线程，让它们退出
+                        controller.close()
+                        break
+                    with stats_lock:
+                        max_active[0] = max(max_active[0], min(controller.limit, worker_count))
+                    if metrics is not None:
+                        metrics.worker_limit(min(controller.limit, worker_count))
+
+                    index, row, attempt = entry
+                    current_part = row.get('part_number', f'未知件号_{index}')
+                    attempt_label = f" (第 {attempt} 次重试)" if attempt else ""
+                    failure = {}
+
+                    try:
+                        worker_log(f"[{index+1}/{total_count}] 开始处理件号: {current_part}{attempt_label}")
+
+                        if not validate_data_row(row):
+                            worker_log(f"❌ 件号 {current_part} 数据不完整，跳过处理", "ERROR")
+                            count('skipped')
+                            continue
+
+                        processed_row = prepare_data_row(row)
+                        part_number = processed_row['part_number']
+                        checkpoint = tracker.get(part_number)
+
+                        if checkpoint is not None and checkpoint.completed:
+                            worker_log(f"⏭️ 件号 {current_part} 已在上次运行中完成，跳过")
+                            count('resumed')
+                            count('success', resumed=True)
+                            continue
+
+                        # 首次拿到件号时才启动浏览器并登录（被限流等待的线程不占用会话）
+                        if browser_manager is None:
+                            browser_manager = BrowserManager()
+                            browser_manager.set_log_callback(worker_log)
+                            browser_manager.failure_trace_dir = failure_trace_dir
+                            if not browser_manager.initialize(playwright, username, password, system_language,
+                                                              login_url=login_url, browser_path=browser_path,
+                                                              preferred_browser=preferred_browser,
+                                                              browser_finder=browser_finder,
+                                                              headless=headless):
+                                worker_log("❌ 浏览器初始化失败，该工作线程退出", "ERROR")
+                                browser_manager = None
+                                queue.requeue_now(index, row, attempt)
+                                stop_worker = True
+                                continue
+                        elif attempted_count > 0 and not browser_manager.reset_for_next_part():
+                            worker_log(f"❌ 页面状态重置失败，跳过件号 {current_part}", "ERROR")
+                            failure = {'step': 'reset', 'reason': FAILURE_PAGE_UNAVAILABLE}
+                            continue
+                        attempted_count += 1
+
+                        page = browser_manager.get_page()
+                        if not page:
+                            worker_log(f"❌ 无法获取页面对象，跳过件号 {current_part}", "ERROR")
+                            failure = {'step': 'reset', 'reason': FAILURE_PAGE_UNAVAILABLE}
+                            continue
+
+                        step_callback = tracker.step_callback(part_number)
+                        browser_manager.begin_part_trace(part_number)
+                        if process_single_peda(page, processed_row, document_path, worker_log, upload_record_callback,
+                                               step_callback=step_callback, checkpoint=checkpoint,
+                                               failure_info=failure, cancel_token=cancel_token):
+                            failure = {}
+                            tracker.record(part_number, CHECKPOINT_STEP_COMPLETED)
+                            count('success')
+                            worker_log(f"✅ [{index+1}/{total_count}] 件号 {current_part} 处理完成", "SUCCESS")
+                        else:
+                            failure.setdefault('reason', FAILURE_EXCEPTION)
+                            worker_log(f"❌ [{index+1}/{total_count}] 件号 {current_part} 处理失败", "ERROR")
+
+                    except OperationCancelled:
+                        worker_log(f"⏹️ 件号 {current_part} 处理被用户停止", "WARNING")
+                        cancelled.set()
+                        stop_worker = True
+
+                    except Exception as e:
+                        failure = {'step': 'exception', 'reason': FAILURE_EXCEPTION, 'error': str(e)}
+                        worker_log(f"❌ [{index+1}/{total_count}] 件号 {current_part} 处理异常: {str(e)}", "ERROR")
+                        try:
+                            screenshot_path = os.path.join(os.getcwd(), f"error_batch_{current_part}_{index}.png")
+                            if browser_manager is not None and browser_manager.take_screenshot(screenshot_path):
+                                worker_log(f"错误截图已保存: {screenshot_path}")
+                        except Exception:
+                            pass
+
+                    finally:
+                        if browser_manager is not None:
+                            browser_manager.end_part_trace(failed=bool(failure))
+
+                        if failure and browser_manager is not None and not browser_manager.is_healthy():
+                            worker_log(f"💥 件号 {current_part} 处理中浏览器不可用，尝试恢复后重新处理", "WARNING")
+                            if browser_manager.recover():
+                                queue.requeue_now(index, row, attempt)
+                                attempted_count = 0
+                                failure = {}
+
+                        if failure:
+                            delay = queue.schedule_retry(index, row, attempt, failure)
+                            if delay is not None:
+                                worker_log(f"🔁 件号 {current_part} 暂时性失败（{failure.get('reason')}），"
+                                           f"{delay:.0f} 秒后在批次末尾重试", "WARNING")
+                                if metrics is not None:
+                                    metrics.retry_scheduled(failure.get('reason'))
+                            else:
+                                kind = "暂时性失败，已达重试上限" if classify_failure(failure) else "永久性失败，不重试"
+                                worker_log(f"❌ 件号 {current_part} {kind}: {failure.get('reason')}", "ERROR")
+                                count('failed', current_part, dict(failure, attempts=attempt + 1))
+
+                        queue.done()
+                        controller.observe_part_done()
+            finally:
+                # 提前退出（浏览器启动失败、被停止）时把名额让给被限流等待的线程，否则它们会一直等待
+                controller.retire(worker_index)
+                if browser_manager is not None:
+                    browser_manager.cleanup()
+
+    # 并发控制器从追踪区间中取服务器延迟样本，所以并行模式始终安装追踪器
+    tracer = tracing.Tracer()
+    previous_tracer = tracing.set_tracer(tracer)
+    tracer.add_listener(controller.observe_span)
+    if span_listener is not None:
+        tracer.add_listener(span_listener)
+    if metrics is not None:
+        tracer.add_listener(metrics.observe_span)
+        metrics.batch_started(total_count)
+    threads = [threading.Thread(target=worker, args=(index,), name=f"peda-worker-{index + 1}", daemon=False)
+               for index in range(worker_count)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        controller.close()
+        tracing.set_tracer(previous_tracer)
+        if trace_path:
+            tracing.export_trace(tracer, trace_path, log)
+
+    was_cancelled = cancelled.is_set() or (cancel_token is not None and cancel_token.cancelled)
+    not_processed = total_count - stats['success'] - stats['failed'] - stats['skipped']
+    if not_processed > 0 and not was_cancelled:
+        # 所有工作线程都因浏览器初始化失败而退出，剩余件号计为失败
+        log(f"❌ 没有可用的浏览器会话，{not_processed} 个件号未能处理", "ERROR")
+        stats['failed'] += not_processed
+        if metrics is not None:
+            metrics.inc('peda_parts_total', not_processed, outcome='failed')
+    if metrics is not None:
+        metrics.batch_finished()
+
+    if progress_callback:
+        progress_callback(100 if not was_cancelled else stats['finished'] / max(total_count, 1) * 100,
+                          "批量处理完成" if not was_cancelled else "处理已停止")
+
+    result = {
+        'total': total_count,
+        'success': stats['success'],
+        'failed': stats['failed'],
+        'skipped': stats['skipped'],
+        'resumed': stats['resumed'],
+        'retried': queue.scheduler.retried_count,
+        'failures': failures,
+        'cancelled': was_cancelled,
+        'max_active_workers': max_active[0]
+    }
+
+    log(f"\n=== 批量处理完成（并行模式）===")
+    log(f"总计: {total_count} 个件号")
+    log(f"成功: {result['success']} 个")
+    if result['resumed']:
+        log(f"其中上次运行已完成: {result['resumed']} 个")
+    log(f"失败: {result['failed']} 个")
+    log(f"跳过: {result['skipped']} 个")
+    if result['retried']:
+        log(f"自动重试: {result['retried']} 次")
+    log(f"最多同时运行: {result['max_active_workers']} 个浏览器")
+    if was_cancelled:
+        log(f"⏹️ 处理被用户停止，未处理: {max(not_processed, 0)} 个（可勾选断点续跑继续）", "WARNING")
+
+    return result
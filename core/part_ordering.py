@@ -0,0 +1,180 @@
+"""
+件号处理顺序
+
+不同件号的耗时差别很大：没有文档的件号一分钟左右，六个类别共几十个文件的件号要十分钟。
+这里根据文档扫描结果（每个类别的文件数和字节数）和断点日志中的历史步骤耗时估算每个件号的耗时，
+再按所选策略重新排列队列：
+- longest_first: 耗时长的先做，多个工作线程时最后不会只剩一个大件号在跑（缩短总耗时）
+- shortest_first: 耗时短的先做，尽快看到处理结果
+- excel: 保持 Excel 行顺序
+"""
+
+import json
+import os
+from statistics import median
+from typing import Any, Callable, Dict, List, Optional
+
+from modules.document_manager import DocumentManager
+from config.constants import (
+    CHECKPOINT_DIR, CHECKPOINT_STEP_FILE_UPLOADED, CHECKPOINT_STEP_COMPLETED,
+    PART_ORDER_EXCEL, PART_ORDER_LONGEST_FIRST, PART_ORDER_POLICIES,
+    PART_COST_BASE_SECONDS, PART_COST_PER_CATEGORY_SECONDS, PART_COST_PER_FILE_SECONDS,
+    PART_COST_PER_MB_SECONDS
+)
+
+
+class PartCostModel:
+    """件号耗时估算参数（秒）"""
+
+    def __init__(self, base_seconds: float = PART_COST_BASE_SECONDS,
+                 per_category_seconds: float = PART_COST_PER_CATEGORY_SECONDS,
+                 per_file_seconds: float = PART_COST_PER_FILE_SECONDS,
+                 per_mb_seconds: float = PART_COST_PER_MB_SECONDS):
+        self.base_seconds = base_seconds
+        self.per_category_seconds = per_category_seconds
+        self.per_file_seconds = per_file_seconds
+        self.per_mb_seconds = per_mb_seconds
+
+    def estimate(self, scan: Dict[str, Dict[str, int]]) -> float:
+        """
+        估算单个件号的耗时
+
+        Args:
+            scan: {类别: {'files': 文件数, 'bytes': 字节数}}
+
+        Returns:
+            float: 估算秒数
+        """
+        cost = self.base_seconds
+        for info in scan.values():
+            if not info.get('files'):
+                continue
+            cost += self.per_category_seconds
+            cost += info['files'] * self.per_file_seconds
+            cost += info.get('bytes', 0) / (1024 * 1024) * self.per_mb_seconds
+        return cost
+
+    @classmethod
+    def from_history(cls, journal_dir: Optional[str] = None) -> 'PartCostModel':
+        """
+        用断点日志中的历史耗时校准估算参数：
+        每个文件的上传耗时取 file_uploaded 记录与同件号上一条记录的时间差的中位数，
+        固定开销取已完成件号的总耗时减去上传耗时后的中位数。
+        没有历史记录时使用默认参数。
+        """
+        model = cls()
+        journal_dir = journal_dir or os.path.join(os.getcwd(), CHECKPOINT_DIR)
+        if not os.path.isdir(journal_dir):
+            return model
+
+        upload_seconds: List[float] = []
+        overhead_seconds: List[float] = []
+        for name in os.listdir(journal_dir):
+            if name.endswith('.jsonl'):
+                _collect_step_timings(os.path.join(journal_dir, name), upload_seconds, overhead_seconds)
+
+        if upload_seconds:
+            model.per_file_seconds = median(upload_seconds)
+        if overhead_seconds:
+            model.base_seconds = median(overhead_seconds)
+        return model
+
+
+def _collect_step_timings(path: str, upload_seconds: List[float], overhead_seconds: List[float]):
+    """从一个断点日志中收集每个文件的上传耗时和每个件号的非上传耗时"""
+    first_ts: Dict[str, float] = {}
+    last_ts: Dict[str, float] = {}
+    uploads: Dict[str, float] = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('event'):
+                    # 新批次开始：上一批次中未完成的件号不参与统计
+                    first_ts, last_ts, uploads = {}, {}, {}
+                    continue
+
+                part_number = record.get('part_number')
+                ts = record.get('ts')
+                if not part_number or not isinstance(ts, (int, float)):
+                    continue
+
+                previous = last_ts.get(part_number)
+                first_ts.setdefault(part_number, ts)
+                last_ts[part_number] = ts
+                step = record.get('step')
+                if step == CHECKPOINT_STEP_FILE_UPLOADED and previous is not None:
+                    upload_seconds.append(ts - previous)
+                    uploads[part_number] = uploads.get(part_number, 0.0) + ts - previous
+                elif step == CHECKPOINT_STEP_COMPLETED:
+                    overhead = ts - first_ts[part_number] - uploads.get(part_number, 0.0)
+                    if overhead > 0:
+                        overhead_seconds.append(overhead)
+    except OSError:
+        pass
+
+
+def scan_part_documents(document_path: str, part_number: str) -> Dict[str, Dict[str, int]]:
+    """
+    扫描件号的文档目录，统计每个类别的文件数和字节数
+
+    Returns:
+        Dict: {类别: {'files': 文件数, 'bytes': 字节数}}；件号目录不存在时返回空字典
+    """
+    document_manager = DocumentManager(document_path, part_number)
+    if not document_manager.part_folder.is_dir():
+        return {}
+
+    scan = {}
+    for category, files in document_manager.scan_documents().items():
+        size = 0
+        for file_path in files:
+            try:
+                size += os.path.getsize(file_path)
+            except OSError:
+                pass
+        scan[category] = {'files': len(files), 'bytes': size}
+    return scan
+
+
+def order_data_rows(data_rows: List[Dict[str, Any]], document_path: str,
+                    policy: str = PART_ORDER_EXCEL,
+                    cost_model: Optional[PartCostModel] = None,
+                    log: Optional[Callable[..., None]] = None) -> List[Dict[str, Any]]:
+    """
+    按策略重新排列待处理的件号
+
+    Args:
+        data_rows: 数据行列表（Excel 顺序）
+        document_path: 文档主目录路径
+        policy: 排序策略（PART_ORDER_POLICIES 之一）
+        cost_model: 耗时估算参数（默认按断点日志历史校准）
+        log: 日志函数 log(message, level)
+
+    Returns:
+        List[Dict[str, Any]]: 排序后的数据行列表（估算耗时相同的件号保持原顺序）
+    """
+    if policy not in PART_ORDER_POLICIES:
+        if log:
+            log(f"未知的件号排序策略: {policy}，按 Excel 顺序处理", "WARNING")
+        return list(data_rows)
+    if policy == PART_ORDER_EXCEL or len(data_rows) < 2:
+        return list(data_rows)
+
+    cost_model = cost_model or PartCostModel.from_history()
+    costs = []
+    for row in data_rows:
+        part_number = str(row.get('part_number') or '').strip()
+        scan = scan_part_documents(document_path, part_number) if part_number and document_path else {}
+        costs.append(cost_model.estimate(scan))
+
+    order = sorted(range(len(data_rows)), key=lambda index: costs[index],
+                   reverse=(policy == PART_ORDER_LONGEST_FIRST))
+    if log:
+        label = "耗时长的优先" if policy == PART_ORDER_LONGEST_FIRST else "耗时短的优先"
+        log(f"件号排序: {label}，估算总耗时 {sum(costs) / 60:.1f} 分钟"
+            f"（单个件号 {min(costs) / 60:.1f} ~ {max(costs) / 60:.1f} 分钟）")
+    return [data_rows[index] for index in order]
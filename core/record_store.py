@@ -0,0 +1,274 @@
+"""
+上传记录存储（SQLite）
+
+每上传一个文件（成功或失败）就立即写入一行，不再在内存中累积记录列表。
+GUI 表格按页读取、只追加新增的行，导出时按批次逐行读取，
+记录数量再多，内存占用和刷新耗时也基本不变。
+
+每个件号处理结束时另写一行件号耗时（PartTimingRecorder 注册为追踪器的区间结束回调），
+报告中的件号耗时和失败原因汇总由 SQL 聚合得到。
+
+每次启动 GUI 为一个会话（session），表格和导出只包含当前会话的记录；
+超过 RECORDS_RETENTION_DAYS 天的旧记录在打开数据库时清理。
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config.constants import RECORDS_DIR, UPLOAD_RECORDS_DB, RECORDS_RETENTION_DAYS, RECORDS_EXPORT_BATCH
+from modules.structured_log import get_logger
+from modules.tracing import PartSpanListener
+
+logger = get_logger(__name__)
+
+# 导出和表格使用的标准表头（与 download_upload_record 的列一致）
+UPLOAD_RECORD_COLUMNS = ['Date', 'Part_number', 'FileName', 'Success', 'Reason']
+
+# (id, Date, Part_number, FileName, Success, Reason)
+RecordRow = Tuple[int, str, str, str, str, str]
+
+# 上传失败时 document_manager 写入的 Success 值
+FAILED_VALUES = ('失败', 'failed', 'False')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    date TEXT NOT NULL,
+    part_number TEXT,
+    file_name TEXT,
+    success TEXT,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_upload_records_session ON upload_records (session, id);
+CREATE TABLE IF NOT EXISTS part_timings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    part_number TEXT,
+    started TEXT NOT NULL,
+    duration REAL,
+    outcome TEXT,
+    failed_step TEXT,
+    reason TEXT,
+    steps TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_part_timings_session ON part_timings (session, id);
+"""
+
+_SELECT = "SELECT id, date, part_number, file_name, success, reason FROM upload_records"
+
+# (id, Part_number, Started, Duration, Outcome, Failed_step, Reason, 各步骤耗时 JSON)
+PartTimingRow = Tuple[int, str, str, float, str, str, str, str]
+_SELECT_TIMINGS = ("SELECT id, part_number, started, duration, outcome, failed_step, reason, steps "
+                   "FROM part_timings")
+
+
+class UploadRecordStore:
+    """
+    上传记录存储（线程安全：处理线程写入，GUI 主线程读取）
+
+    Args:
+        path: 数据库文件路径，默认 RECORDS_DIR/UPLOAD_RECORDS_DB；':memory:' 表示只在内存中
+        session: 会话标识，默认使用当前时间
+    """
+
+    def __init__(self, path: Optional[str] = None, session: Optional[str] = None):
+        self.path = path or default_record_store_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.session = session or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            cutoff = (datetime.now() - timedelta(days=RECORDS_RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+            self._conn.execute("DELETE FROM upload_records WHERE date < ?", (cutoff,))
+            self._conn.execute("DELETE FROM part_timings WHERE started < ?", (cutoff,))
+            self._conn.commit()
+
+    # ------------------------------------------------------------------ 写入
+    def add(self, part_number: str, file_name: str, success: str, reason: str = "") -> int:
+        """写入一条记录，返回记录ID"""
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO upload_records (session, date, part_number, file_name, success, reason) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.session, date, str(part_number), str(file_name), str(success), str(reason or "")))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def add_part_timing(self, part_number: str, started: float, duration: float, outcome: str,
+                        failed_step: str = "", reason: str = "", steps: Optional[Dict[str, float]] = None) -> int:
+        """
+        写入一个件号的一次处理耗时（重试的件号每次尝试一行）
+
+        Args:
+            part_number: 件号
+            started: 开始时间（Unix 时间戳）
+            duration: 总耗时（秒）
+            outcome: 结果（tracing 的 ok / failed / error / cancelled）
+            failed_step: 失败的步骤
+            reason: 失败原因（FAILURE_* 分类）
+            steps: 各步骤耗时合计（秒），如 {'upload': 12.3}
+        """
+        started_text = datetime.fromtimestamp(started).strftime("%Y-%m-%d %H:%M:%S")
+        steps_text = json.dumps({name: round(value, 3) for name, value in (steps or {}).items()})
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO part_timings (session, part_number, started, duration, outcome, failed_step, reason, steps) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.session, str(part_number), started_text, round(duration, 3), outcome,
+                 failed_step or "", reason or "", steps_text))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    # ------------------------------------------------------------------ 读取
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM upload_records WHERE session = ?", (self.session,)).fetchone()[0]
+
+    def page(self, offset: int, limit: int) -> List[RecordRow]:
+        """按写入顺序读取一页记录"""
+        with self._lock:
+            return self._conn.execute(
+                f"{_SELECT} WHERE session = ? ORDER BY id LIMIT ? OFFSET ?",
+                (self.session, limit, max(0, offset))).fetchall()
+
+    def since(self, after_id: int, limit: int = -1) -> List[RecordRow]:
+        """读取 ID 大于 after_id 的记录（表格增量刷新使用）"""
+        with self._lock:
+            return self._conn.execute(
+                f"{_SELECT} WHERE session = ? AND id > ? ORDER BY id LIMIT ?",
+                (self.session, after_id, limit)).fetchall()
+
+    def iter_rows(self, batch_size: int = RECORDS_EXPORT_BATCH) -> Iterator[RecordRow]:
+        """按批次遍历当前会话的全部记录（导出使用，批次之间不占用锁）"""
+        last_id = 0
+        while True:
+            rows = self.since(last_id, batch_size)
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def iter_part_timings(self, batch_size: int = RECORDS_EXPORT_BATCH) -> Iterator[PartTimingRow]:
+        """按批次遍历当前会话的件号耗时（按写入顺序）"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"{_SELECT_TIMINGS} WHERE session = ? AND id > ? ORDER BY id LIMIT ?",
+                    (self.session, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def upload_counts(self) -> Dict[str, Tuple[int, int, str, str]]:
+        """每个件号的上传文件数汇总：{件号: (文件数, 失败文件数, 首次上传时间, 最后上传时间)}"""
+        placeholders = ", ".join("?" * len(FAILED_VALUES))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT part_number, COUNT(*), SUM(success IN ({placeholders})), MIN(date), MAX(date) "
+                "FROM upload_records WHERE session = ? GROUP BY part_number",
+                (*FAILED_VALUES, self.session)).fetchall()
+        return {row[0]: (row[1], row[2] or 0, row[3], row[4]) for row in rows}
+
+    def failure_reasons(self) -> List[Tuple[str, str, str, int, str]]:
+        """
+        失败原因汇总（按次数从多到少）
+
+        Returns:
+            List[Tuple]: (来源 part / upload, 步骤, 原因, 次数, 示例件号)
+        """
+        placeholders = ", ".join("?" * len(FAILED_VALUES))
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 'part', failed_step, reason, COUNT(*) AS n, MIN(part_number) FROM part_timings "
+                "WHERE session = ? AND outcome != 'ok' GROUP BY failed_step, reason "
+                "UNION ALL "
+                "SELECT 'upload', 'upload', reason, COUNT(*) AS n, MIN(part_number) FROM upload_records "
+                f"WHERE session = ? AND success IN ({placeholders}) GROUP BY reason "
+                "ORDER BY n DESC",
+                (self.session, self.session, *FAILED_VALUES)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PartTimingRecorder(PartSpanListener):
+    """追踪器的区间结束回调：件号区间结束时把总耗时和各步骤耗时写入存储（每次尝试一行）"""
+
+    def __init__(self, store: UploadRecordStore):
+        super().__init__()
+        self.store = store
+
+    def part_finished(self, span, steps, files, size):
+        try:
+            self.store.add_part_timing(span.attrs['part_number'], span.start, span.duration, span.outcome,
+                                       failed_step=span.attrs.get('failed_step', ''),
+                                       reason=span.attrs.get('reason', ''),
+                                       steps={name: duration for name, (count, duration) in steps.items()})
+        except Exception as e:
+            logger.warning("写入件号耗时失败: %s", e)
+
+
+def export_upload_records(store: UploadRecordStore, path: str, columns=UPLOAD_RECORD_COLUMNS,
+                          sheet_name: str = 'Upload_records') -> int:
+    """
+    按批次从存储读取记录并逐行写入导出文件（.csv 或 .xlsx），不在内存中构建整张表
+
+    Args:
+        store: 上传记录存储
+        path: 导出文件路径，扩展名为 .csv 时写 CSV（UTF-8 BOM，Excel 可直接打开），否则写 xlsx
+        columns: 导出的列（UPLOAD_RECORD_COLUMNS 的子集，按给定顺序）
+        sheet_name: xlsx 工作表名称
+
+    Returns:
+        int: 导出的记录数
+    """
+    indexes = [UPLOAD_RECORD_COLUMNS.index(column) + 1 for column in columns]
+    rows = ([row[index] for index in indexes] for row in store.iter_rows())
+    count = 0
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', encoding='utf-8-sig', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+
+    # 延迟导入 openpyxl；只写模式逐行写入，不保留单元格对象
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name[:31])
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def default_record_store_path() -> str:
+    return os.path.join(os.getcwd(), RECORDS_DIR, UPLOAD_RECORDS_DB)
+
+
+def open_record_store(path: Optional[str] = None) -> UploadRecordStore:
+    """打开上传记录存储；数据库文件无法创建或打开时退回内存数据库（记录只保留到程序退出）"""
+    try:
+        return UploadRecordStore(path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("无法打开上传记录数据库，改用内存存储: %s", e)
+        return UploadRecordStore(':memory:')
@@ -0,0 +1,110 @@
+"""
+处理报告导出（流式写入）
+
+报告包含三张表，全部直接从上传记录存储读取、逐行写入，不构建 DataFrame：
+- Uploads: 每个文件一行的上传明细
+- Part_timing: 每个件号每次处理一行，总耗时、各步骤耗时、上传文件数和失败原因
+- Failure_reasons: 按步骤和原因汇总的失败次数（件号失败和单个文件上传失败分别统计）
+
+xlsx 使用 openpyxl 只写模式，每行写出后不再保留单元格对象；CSV 模式把三张表写成三个文件
+（<名称>.csv、<名称>_part_timing.csv、<名称>_failure_reasons.csv）。
+内存占用只与件号数（上传文件数汇总）有关，与记录行数无关。
+"""
+
+import csv
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+from config.constants import REPORT_STEP_COLUMNS
+from core.record_store import UploadRecordStore, UPLOAD_RECORD_COLUMNS
+
+SHEET_UPLOADS = 'Uploads'
+SHEET_PART_TIMING = 'Part_timing'
+SHEET_FAILURE_REASONS = 'Failure_reasons'
+
+PART_TIMING_COLUMNS = (['Part_number', 'Started', 'Duration_s', 'Outcome', 'Failed_step', 'Reason',
+                        'Files', 'Failed_files']
+                       + [f"{step}_s" for step in REPORT_STEP_COLUMNS] + ['Other_s'])
+FAILURE_REASON_COLUMNS = ['Source', 'Step', 'Reason', 'Count', 'Example_part']
+
+
+def _upload_rows(store: UploadRecordStore) -> Iterator[List]:
+    for row in store.iter_rows():
+        yield list(row[1:])
+
+
+def _part_timing_rows(store: UploadRecordStore) -> Iterator[List]:
+    """件号耗时行；没有耗时记录的件号（如未启用追踪）按上传记录补一行"""
+    upload_counts = store.upload_counts()
+    seen = set()
+    for _, part_number, started, duration, outcome, failed_step, reason, steps_text in store.iter_part_timings():
+        seen.add(part_number)
+        files, failed_files, _, _ = upload_counts.get(part_number, (0, 0, '', ''))
+        try:
+            steps = json.loads(steps_text or '{}')
+        except ValueError:
+            steps = {}
+        step_values = [steps.pop(step, None) for step in REPORT_STEP_COLUMNS]
+        other = round(sum(steps.values()), 3) if steps else None
+        yield ([part_number, started, duration, outcome, failed_step, reason, files, failed_files]
+               + step_values + [other])
+    for part_number, (files, failed_files, first_date, _) in upload_counts.items():
+        if part_number not in seen:
+            yield ([part_number, first_date, None, '', '', '', files, failed_files]
+                   + [None] * len(REPORT_STEP_COLUMNS) + [None])
+
+
+def _failure_reason_rows(store: UploadRecordStore) -> Iterator[List]:
+    for row in store.failure_reasons():
+        yield list(row)
+
+
+def _write_csv(path: str, columns: Sequence[str], rows: Iterable[List]) -> int:
+    count = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def export_report(store: UploadRecordStore, path: str) -> Dict[str, int]:
+    """
+    导出处理报告（.xlsx 三张工作表，或 .csv 三个文件）
+
+    Args:
+        store: 上传记录存储（当前会话）
+        path: 报告文件路径
+
+    Returns:
+        Dict[str, int]: 每张表写入的行数（不含表头）
+    """
+    sheets = [
+        (SHEET_UPLOADS, UPLOAD_RECORD_COLUMNS, _upload_rows(store)),
+        (SHEET_PART_TIMING, PART_TIMING_COLUMNS, _part_timing_rows(store)),
+        (SHEET_FAILURE_REASONS, FAILURE_REASON_COLUMNS, _failure_reason_rows(store)),
+    ]
+    counts = {}
+    if path.lower().endswith('.csv'):
+        stem = os.path.splitext(path)[0]
+        for index, (name, columns, rows) in enumerate(sheets):
+            sheet_path = path if index == 0 else f"{stem}_{name.lower()}.csv"
+            counts[name] = _write_csv(sheet_path, columns, rows)
+        return counts
+
+    # 延迟导入 openpyxl；只写模式逐行写入，不保留单元格对象
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for name, columns, rows in sheets:
+        sheet = workbook.create_sheet(title=name)
+        sheet.append(list(columns))
+        count = 0
+        for row in rows:
+            sheet.append(row)
+            count += 1
+        counts[name] = count
+    workbook.save(path)
+    return counts
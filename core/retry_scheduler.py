@@ -0,0 +1,158 @@
+"""
+批量处理失败重试调度
+
+根据失败步骤、失败原因代码和异常信息把失败分为暂时性和永久性两类：
+暂时性失败（页面遮罩超时、Save 按钮迟迟不可用、搜索建议加载慢等）放到批次末尾，
+按指数退避重试，超过重试上限后才计为失败；永久性失败（THP 未批准、产品不存在、
+下拉框取值无效等）直接计为失败，不再重试。
+"""
+
+import heapq
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from config.constants import (
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS,
+    PERMANENT_FAILURE_PATTERNS, TRANSIENT_FAILURE_PATTERNS,
+    FAILURE_EMPTY_PART_NUMBER, FAILURE_DOCUMENT_STRUCTURE, FAILURE_PRODUCT_NOT_FOUND,
+    FAILURE_NEVER_APPROVED, FAILURE_SEARCH_NO_SUGGESTIONS, FAILURE_RESUME_OPEN,
+    FAILURE_UPLOAD, FAILURE_SAVE_VALIDATE, FAILURE_PAGE_UNAVAILABLE,
+    FAILURE_CREATE_PEDA, FAILURE_CREATE_PEDA_UNCONFIRMED
+)
+
+PERMANENT_FAILURES = {
+    FAILURE_EMPTY_PART_NUMBER,
+    FAILURE_DOCUMENT_STRUCTURE,
+    FAILURE_PRODUCT_NOT_FOUND,
+    FAILURE_NEVER_APPROVED,
+    # 已点击创建：重试会再创建一个PEDA
+    FAILURE_CREATE_PEDA_UNCONFIRMED,
+}
+TRANSIENT_FAILURES = {
+    FAILURE_SEARCH_NO_SUGGESTIONS,
+    FAILURE_CREATE_PEDA,
+    FAILURE_RESUME_OPEN,
+    FAILURE_UPLOAD,
+    FAILURE_SAVE_VALIDATE,
+    FAILURE_PAGE_UNAVAILABLE,
+}
+
+
+def classify_failure(failure: Optional[Dict[str, Any]]) -> bool:
+    """
+    判断一次失败是否为暂时性失败
+
+    Args:
+        failure: 失败信息 {'step': ..., 'reason': ..., 'error': 异常信息}
+
+    Returns:
+        bool: 暂时性失败返回True（值得重试），永久性失败返回False
+    """
+    failure = failure or {}
+    reason = failure.get('reason') or ''
+    error = str(failure.get('error') or '')
+
+    if reason in PERMANENT_FAILURES:
+        return False
+    if any(pattern in error for pattern in PERMANENT_FAILURE_PATTERNS):
+        return False
+    if reason in TRANSIENT_FAILURES:
+        return True
+    if any(pattern in error for pattern in TRANSIENT_FAILURE_PATTERNS):
+        return True
+    # 无法识别的失败按暂时性处理，由重试上限保证不会无限重试
+    return True
+
+
+class RetryScheduler:
+    """
+    批次调度：先按原顺序处理全部件号，暂时性失败的件号排到末尾按退避时间重试
+
+    迭代产出 (index, item, attempt)，attempt 为 0 表示首次处理。
+    """
+
+    def __init__(self, items, max_retries: int = RETRY_MAX_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY_SECONDS,
+                 max_delay: float = RETRY_MAX_DELAY_SECONDS,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Any] = time.sleep):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._pending = deque((index, item, 0) for index, item in enumerate(items))
+        self._retries = []  # 堆: (ready_at, 序号, index, item, attempt)
+        self._sequence = 0
+        self.retried_count = 0
+
+    def __iter__(self) -> Iterator[Tuple[int, Any, int]]:
+        while self._pending or self._retries:
+            entry, wait_seconds = self.next_ready()
+            if entry is None:
+                # sleep 返回真值（如 CancellationToken.wait 被取消）时停止调度
+                if self._sleep(wait_seconds):
+                    return
+                continue
+            yield entry
+
+    def next_ready(self) -> Tuple[Optional[Tuple[int, Any, int]], float]:
+        """
+        不阻塞地取下一个可处理的件号（供多个工作线程共享调度）
+
+        Returns:
+            (entry, wait_seconds): entry 为 (index, item, attempt)；没有到期的件号时 entry 为None，
+            wait_seconds 为最早一个重试到期还需等待的秒数（没有待重试件号时为0）
+        """
+        if self._pending:
+            return self._pending.popleft(), 0.0
+        if not self._retries:
+            return None, 0.0
+
+        wait_seconds = self._retries[0][0] - self._clock()
+        if wait_seconds > 0:
+            return None, wait_seconds
+        _, _, index, item, attempt = heapq.heappop(self._retries)
+        return (index, item, attempt), 0.0
+
+    @property
+    def exhausted(self) -> bool:
+        """没有待处理和待重试的件号"""
+        return not self._pending and not self._retries
+
+    @property
+    def pending_retries(self) -> int:
+        return len(self._retries)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（指数退避，封顶 max_delay）"""
+        return min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
+
+    def retry_now(self, index: int, item: Any, attempt: int):
+        """立即重新处理被中断的件号（浏览器崩溃恢复后），不占用重试次数"""
+        self._pending.appendleft((index, item, attempt))
+
+    def schedule_retry(self, index: int, item: Any, attempt: int,
+                       failure: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """
+        登记一次失败，暂时性失败且未超过重试上限时放到批次末尾
+
+        Args:
+            index: 件号在批次中的位置
+            item: 数据行
+            attempt: 本次失败的处理序号（0 为首次）
+            failure: 失败信息
+
+        Returns:
+            Optional[float]: 已安排重试时返回退避秒数，不再重试返回None
+        """
+        if not classify_failure(failure) or attempt >= self.max_retries:
+            return None
+
+        next_attempt = attempt + 1
+        delay = self.backoff_delay(next_attempt)
+        self._sequence += 1
+        heapq.heappush(self._retries, (self._clock() + delay, self._sequence, index, item, next_attempt))
+        self.retried_count += 1
+        return delay
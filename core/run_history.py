@@ -0,0 +1,362 @@
+"""
+运行历史（SQLite）
+
+每个批次写一行：开始/结束时间、输入文件、引擎、配置（并发数、排序策略、重试和自适应并发参数等）
+和结果统计；每个件号每次尝试写一行：耗时、结果、失败步骤和原因、上传文件数和字节数，
+以及各步骤耗时（RunHistoryRecorder 注册为追踪器的区间结束回调）。
+
+与上传记录不同，运行历史跨会话保留（RUN_HISTORY_RETENTION_DAYS 天），内置查询：
+- recent_batches: 最近的批次及每小时处理件号数，便于比较配置调整前后的吞吐量
+- parts_per_hour: 按小时统计完成的件号数
+- slowest_steps: 按平均耗时排序的步骤（含 p95 和最大值）
+- failure_hotspots / failing_parts: 最常见的失败步骤和原因、反复失败的件号
+
+命令行查看:
+    python -m core.run_history --days 30
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config.constants import RECORDS_DIR, RUN_HISTORY_DB, RUN_HISTORY_RETENTION_DAYS
+from modules.structured_log import get_logger
+from modules.tracing import PartSpanListener, OUTCOME_OK, OUTCOME_FAILED, OUTCOME_ERROR
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL,
+    source TEXT,
+    engine TEXT,
+    config TEXT,
+    total INTEGER,
+    success INTEGER,
+    failed INTEGER,
+    skipped INTEGER,
+    resumed INTEGER,
+    retried INTEGER,
+    cancelled INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_batches_started ON batches (started);
+CREATE TABLE IF NOT EXISTS parts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id INTEGER NOT NULL,
+    part_number TEXT,
+    attempt INTEGER,
+    started REAL NOT NULL,
+    duration REAL,
+    outcome TEXT,
+    failed_step TEXT,
+    reason TEXT,
+    files INTEGER,
+    bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_parts_batch ON parts (batch_id);
+CREATE INDEX IF NOT EXISTS idx_parts_started ON parts (started);
+CREATE TABLE IF NOT EXISTS part_steps (
+    part_id INTEGER NOT NULL,
+    started REAL NOT NULL,
+    step TEXT NOT NULL,
+    count INTEGER,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_part_steps_step ON part_steps (step, started);
+"""
+
+# 计为失败的件号结果（cancelled 为用户停止，不计入失败）
+_FAILED_OUTCOMES = (OUTCOME_FAILED, OUTCOME_ERROR)
+
+
+class RunHistory:
+    """
+    运行历史数据库（线程安全：处理线程写入件号，批次开始和结束由调用方写入）
+
+    Args:
+        path: 数据库文件路径，默认 RECORDS_DIR/RUN_HISTORY_DB；':memory:' 表示只在内存中
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_run_history_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            cutoff = time.time() - RUN_HISTORY_RETENTION_DAYS * 86400
+            self._conn.execute("DELETE FROM part_steps WHERE started < ?", (cutoff,))
+            self._conn.execute("DELETE FROM parts WHERE started < ?", (cutoff,))
+            self._conn.execute("DELETE FROM batches WHERE started < ?", (cutoff,))
+            self._conn.commit()
+
+    # ------------------------------------------------------------------ 写入
+    def begin_batch(self, config: Optional[Dict[str, Any]] = None, source: str = "",
+                    engine: str = "", total: int = 0) -> int:
+        """
+        记录批次开始，返回批次ID
+
+        Args:
+            config: 本批次的配置（并发数、排序策略、重试参数等），以 JSON 保存
+            source: 输入文件路径
+            engine: 处理引擎（reuse / parallel）
+            total: 件号总数
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO batches (started, source, engine, config, total) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), source, engine, json.dumps(config or {}, ensure_ascii=False, default=str), total))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def finish_batch(self, batch_id: int, result: Optional[Dict[str, Any]] = None):
+        """记录批次结束和结果统计（引擎异常退出时 result 为空，只记录结束时间）"""
+        result = result if isinstance(result, dict) else {}
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batches SET finished = ?, success = ?, failed = ?, skipped = ?, resumed = ?, "
+                "retried = ?, cancelled = ? WHERE id = ?",
+                (time.time(), result.get('success'), result.get('failed'), result.get('skipped'),
+                 result.get('resumed'), result.get('retried'), int(bool(result.get('cancelled'))), batch_id))
+            self._conn.commit()
+
+    def add_part(self, batch_id: int, part_number: str, attempt: int, started: float, duration: float,
+                 outcome: str, failed_step: str = "", reason: str = "", files: int = 0, size: int = 0,
+                 steps: Optional[Dict[str, Any]] = None) -> int:
+        """
+        记录一个件号的一次处理
+
+        Args:
+            batch_id: 批次ID
+            part_number: 件号
+            attempt: 第几次尝试（0 为首次处理）
+            started: 开始时间（Unix 时间戳）
+            duration: 耗时（秒）
+            outcome: 结果（tracing 的 ok / failed / error / cancelled）
+            failed_step: 失败的步骤
+            reason: 失败原因（FAILURE_* 分类）
+            files: 成功上传的文件数
+            size: 成功上传的字节数
+            steps: {步骤名: (次数, 累计耗时秒)}
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO parts (batch_id, part_number, attempt, started, duration, outcome, failed_step, "
+                "reason, files, bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (batch_id, str(part_number), attempt, started, round(duration, 3), outcome,
+                 failed_step or "", reason or "", files, size))
+            part_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO part_steps (part_id, started, step, count, duration) VALUES (?, ?, ?, ?, ?)",
+                [(part_id, started, name, count, round(step_duration, 3))
+                 for name, (count, step_duration) in (steps or {}).items()])
+            self._conn.commit()
+            return part_id
+
+    def recorder(self, batch_id: int) -> 'RunHistoryRecorder':
+        """本批次的追踪器区间结束回调"""
+        return RunHistoryRecorder(self, batch_id)
+
+    # ------------------------------------------------------------------ 查询
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def recent_batches(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        最近的批次（新的在前）
+
+        parts_per_hour 按本次实际处理的成功件号（不含续跑跳过的件号）和批次总耗时计算。
+        """
+        rows = self._query(
+            "SELECT id, started, finished, source, engine, config, total, success, failed, skipped, resumed, "
+            "retried, cancelled FROM batches ORDER BY id DESC LIMIT ?", (limit,))
+        batches = []
+        for (batch_id, started, finished, source, engine, config, total, success, failed, skipped, resumed,
+             retried, cancelled) in rows:
+            elapsed = (finished - started) if finished else None
+            processed = (success or 0) - (resumed or 0)
+            batches.append({
+                'id': batch_id,
+                'started': _format_time(started),
+                'elapsed_seconds': round(elapsed, 1) if elapsed is not None else None,
+                'source': source,
+                'engine': engine,
+                'config': json.loads(config or '{}'),
+                'total': total, 'success': success, 'failed': failed, 'skipped': skipped,
+                'resumed': resumed, 'retried': retried, 'cancelled': bool(cancelled),
+                'parts_per_hour': round(processed * 3600 / elapsed, 1) if elapsed else None,
+            })
+        return batches
+
+    def parts_per_hour(self, days: Optional[float] = 7) -> List[Dict[str, Any]]:
+        """按件号结束时间所在的小时统计：成功件号数、失败尝试数和上传字节数（旧的在前）"""
+        rows = self._query(
+            "SELECT strftime('%Y-%m-%d %H:00', started + duration, 'unixepoch', 'localtime') AS period, "
+            "SUM(outcome = ?), SUM(outcome IN (?, ?)), SUM(bytes) FROM parts WHERE started >= ? "
+            "GROUP BY period ORDER BY period",
+            (OUTCOME_OK, *_FAILED_OUTCOMES, _cutoff(days)))
+        return [{'hour': period, 'parts': ok or 0, 'failed': failed or 0, 'bytes': size or 0}
+                for period, ok, failed, size in rows]
+
+    def slowest_steps(self, days: Optional[float] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        按每个件号的平均步骤耗时排序（一个件号内同名步骤的耗时相加，如所有文件的 upload）
+
+        Returns:
+            List[Dict]: step / parts / avg / p95 / max（秒）/ calls（步骤执行次数）
+        """
+        cutoff = _cutoff(days)
+        rows = self._query(
+            "SELECT step, COUNT(*), AVG(duration), MAX(duration), SUM(count) FROM part_steps "
+            "WHERE started >= ? GROUP BY step ORDER BY AVG(duration) DESC LIMIT ?", (cutoff, limit))
+        steps = []
+        for step, parts, average, maximum, calls in rows:
+            # 最近秩 p95：按耗时排序后直接取第 ceil(0.95n) 行，不读取全部耗时
+            offset = max(1, math.ceil(0.95 * parts)) - 1
+            p95 = self._query(
+                "SELECT duration FROM part_steps WHERE step = ? AND started >= ? "
+                "ORDER BY duration LIMIT 1 OFFSET ?", (step, cutoff, offset))
+            steps.append({'step': step, 'parts': parts, 'avg': round(average, 2),
+                          'p95': round(p95[0][0], 2) if p95 else round(maximum, 2),
+                          'max': round(maximum, 2), 'calls': calls})
+        return steps
+
+    def failure_hotspots(self, days: Optional[float] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """最常见的失败步骤和原因（按失败尝试次数排序）"""
+        rows = self._query(
+            "SELECT failed_step, reason, COUNT(*), COUNT(DISTINCT part_number), MAX(started) FROM parts "
+            "WHERE outcome IN (?, ?) AND started >= ? GROUP BY failed_step, reason "
+            "ORDER BY COUNT(*) DESC LIMIT ?",
+            (*_FAILED_OUTCOMES, _cutoff(days), limit))
+        return [{'step': step, 'reason': reason, 'failures': failures, 'parts': parts,
+                 'last_seen': _format_time(last_seen)}
+                for step, reason, failures, parts, last_seen in rows]
+
+    def failing_parts(self, days: Optional[float] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """失败次数最多的件号（跨批次），附最近一次的失败原因"""
+        rows = self._query(
+            "SELECT part_number, COUNT(*), COUNT(DISTINCT batch_id), MAX(started) FROM parts "
+            "WHERE outcome IN (?, ?) AND started >= ? GROUP BY part_number "
+            "ORDER BY COUNT(*) DESC, MAX(started) DESC LIMIT ?",
+            (*_FAILED_OUTCOMES, _cutoff(days), limit))
+        parts = []
+        for part_number, failures, batches, last_seen in rows:
+            last = self._query(
+                "SELECT failed_step, reason FROM parts WHERE part_number = ? AND started = ?",
+                (part_number, last_seen))
+            step, reason = last[0] if last else ('', '')
+            parts.append({'part_number': part_number, 'failures': failures, 'batches': batches,
+                          'last_step': step, 'last_reason': reason, 'last_seen': _format_time(last_seen)})
+        return parts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RunHistoryRecorder(PartSpanListener):
+    """追踪器的区间结束回调：件号区间结束时写入运行历史（重试的件号按尝试次数编号）"""
+
+    def __init__(self, history: RunHistory, batch_id: int):
+        super().__init__()
+        self.history = history
+        self.batch_id = batch_id
+        self._attempts: Dict[str, int] = {}
+
+    def part_finished(self, span, steps, files, size):
+        part_number = span.attrs['part_number']
+        with self._lock:
+            attempt = self._attempts.get(part_number, 0)
+            self._attempts[part_number] = attempt + 1
+        try:
+            self.history.add_part(self.batch_id, part_number, attempt, span.start, span.duration, span.outcome,
+                                  failed_step=span.attrs.get('failed_step', ''),
+                                  reason=span.attrs.get('reason', ''),
+                                  files=files, size=size, steps=steps)
+        except Exception as e:
+            logger.warning("写入运行历史失败: %s", e)
+
+
+def _cutoff(days: Optional[float]) -> float:
+    return time.time() - days * 86400 if days else 0.0
+
+
+def _format_time(timestamp: Optional[float]) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else ""
+
+
+def default_run_history_path() -> str:
+    return os.path.join(os.getcwd(), RECORDS_DIR, RUN_HISTORY_DB)
+
+
+def open_run_history(path: Optional[str] = None) -> Optional[RunHistory]:
+    """打开运行历史；数据库无法打开时返回 None（不记录运行历史，不影响处理）"""
+    try:
+        return RunHistory(path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("无法打开运行历史数据库，本次不记录: %s", e)
+        return None
+
+
+def format_history_report(history: RunHistory, days: Optional[float] = 30, limit: int = 10) -> str:
+    """把运行历史的内置查询结果格式化为便于阅读的文本"""
+    lines = ["=== 最近的批次 ==="]
+    for batch in history.recent_batches(limit):
+        config = batch['config']
+        rate = f"{batch['parts_per_hour']:.1f} 件/小时" if batch['parts_per_hour'] is not None else "未结束"
+        lines.append(
+            f"  #{batch['id']} {batch['started']}  {batch['engine'] or '-'} 并发 {config.get('max_workers', 1)}  "
+            f"成功 {batch['success'] or 0}/{batch['total'] or 0}  失败 {batch['failed'] or 0}  "
+            f"重试 {batch['retried'] or 0}  {rate}{'  (已停止)' if batch['cancelled'] else ''}")
+
+    scope = f"最近 {days:g} 天" if days else "全部"
+    lines.append(f"=== 每小时完成件号数（{scope}）===")
+    for item in history.parts_per_hour(days):
+        lines.append(f"  {item['hour']}  {item['parts']:>5} 件  失败 {item['failed']:>3}  "
+                     f"{item['bytes'] / 1024 / 1024:.1f} MB")
+
+    lines.append(f"=== 最慢的步骤（每个件号，秒，{scope}）===")
+    for item in history.slowest_steps(days, limit):
+        lines.append(f"  {item['step']:<14} 平均 {item['avg']:>7.2f}  p95 {item['p95']:>7.2f}  "
+                     f"最大 {item['max']:>7.2f}  {item['parts']} 个件号")
+
+    lines.append(f"=== 失败热点（{scope}）===")
+    for item in history.failure_hotspots(days, limit):
+        lines.append(f"  {item['step'] or '-'} / {item['reason'] or '-'}: {item['failures']} 次，"
+                     f"{item['parts']} 个件号，最近 {item['last_seen']}")
+    for item in history.failing_parts(days, limit):
+        if item['failures'] > 1:
+            lines.append(f"  件号 {item['part_number']}: 失败 {item['failures']} 次（{item['batches']} 个批次），"
+                         f"最近 {item['last_step'] or '-'} / {item['last_reason'] or '-'}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='查看运行历史：批次吞吐量、最慢的步骤和失败热点')
+    parser.add_argument('--db', default=None, help='运行历史数据库路径')
+    parser.add_argument('--days', type=float, default=30, help='统计最近多少天（0 表示全部）')
+    parser.add_argument('--limit', type=int, default=10, help='每项最多显示的行数')
+    args = parser.parse_args(argv)
+
+    history = RunHistory(args.db)
+    try:
+        print(format_history_report(history, days=args.days, limit=args.limit))
+    finally:
+        history.close()
+
+
+if __name__ == '__main__':
+    main()
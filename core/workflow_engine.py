@@ -1,4 +1,5 @@
 import os
+import time
 from playwright.sync_api import Playwright
 from typing import List, Dict, Any, Optional, Callable
 
@@ -8,6 +9,17 @@ from modules.system_handler import handle_login_popup, set_language_after_login,
 from modules.form_handler import fill_peda_form
 from modules.browser_manager import BrowserManager
 from modules.peda_processor import process_single_peda, validate_data_row, prepare_data_row
+from modules.cancellation import OperationCancelled
+from modules import tracing
+from core.checkpoint_journal import open_checkpoint_tracker
+from core.retry_scheduler import RetryScheduler, classify_failure
+from core.part_ordering import order_data_rows
+from config.constants import (
+    CHECKPOINT_STEP_COMPLETED, FAILURE_PAGE_UNAVAILABLE, FAILURE_EXCEPTION, PART_ORDER_EXCEL
+)
+from modules.structured_log import get_logger, level_value
+
+logger = get_logger(__name__)
 
 
 def run_batch_with_reuse(playwright: Playwright, data_rows: List[Dict[str, Any]], 
@@ -20,7 +32,16 @@ def run_batch_with_reuse(playwright: Playwright, data_rows: List[Dict[str, Any]]
                         browser_path: Optional[str] = None,
                         preferred_browser: str = "auto",
                         browser_finder = None,
-                        headless: bool = False) -> Dict[str, int]:
+                        headless: bool = False,
+                        journal_path: Optional[str] = None,
+                        resume: bool = False,
+                        cancel_token=None,
+                        part_order: str = PART_ORDER_EXCEL,
+                        trace_path: Optional[str] = None,
+                        failure_trace_dir: Optional[str] = None,
+                        metrics=None,
+                        span_listener: Optional[Callable] = None,
+                        browser_manager: Optional[BrowserManager] = None) -> Dict[str, Any]:
     """
     批量处理多行数据（浏览器复用版本）
     
@@ -39,93 +60,179 @@ def run_batch_with_reuse(playwright: Playwright, data_rows: List[Dict[str, Any]]
         preferred_browser: 首选浏览器类型 ("chrome", "msedge", "auto")
         browser_finder: 预热的浏览器查找器实例（可选，用于加速启动）
         headless: 是否以Headless模式运行浏览器
+        journal_path: 断点日志路径（可选），每个件号的步骤完成后追加写入并fsync
+        resume: 续跑模式：跳过日志中已完成的件号，未完成的件号从最后一个安全步骤继续
+        cancel_token: 取消令牌（CancellationToken），取消后当前步骤尽快结束，返回已完成部分的统计
+        part_order: 件号处理顺序策略（excel / longest_first / shortest_first）
+        trace_path: 步骤追踪文件路径（不含扩展名，可选），批次结束后导出 JSONL 和 Chrome trace
+        failure_trace_dir: 失败件号 Playwright trace 目录（可选），只有失败的件号写入 zip
+        metrics: 运行指标（BatchMetrics，可选），处理过程中实时更新
+        span_listener: 步骤区间结束回调（可选），如记录件号耗时的 PartTimingRecorder
+        browser_manager: 调用方持有的浏览器管理器（可选，如常驻自动化服务预先登录的浏览器）。
+            登录参数一致且浏览器可用时跳过启动和登录；批次结束后不关闭浏览器
         
     Returns:
-        Dict[str, int]: 处理结果统计
+        Dict[str, int]: 处理结果统计（续跑时跳过的已完成件号计入 resumed，
+        自动重试次数计入 retried，最终失败件号及原因见 failures）
     """
     def log(message: str, level: str = "INFO"):
         """内部日志函数"""
         if log_callback:
             log_callback(message, level)
         else:
-            print(f"[{level}] {message}")
+            logger.log(level_value(level), message)
     
     # 初始化统计
     total_count = len(data_rows)
     success_count = 0
     failed_count = 0
     skipped_count = 0
+    resumed_count = 0
+    cancelled = False
+    scheduler = None
+    failures = {}
+    
+    def batch_result(failed: int) -> Dict:
+        """处理结果统计（正常结束和异常中止返回同样的字段）"""
+        return {
+            'total': total_count,
+            'success': success_count,
+            'failed': failed,
+            'skipped': skipped_count,
+            'resumed': resumed_count,
+            'retried': scheduler.retried_count if scheduler is not None else 0,
+            'failures': failures,
+            'cancelled': cancelled
+        }
     
     log("=== 开始批量处理PEDA（浏览器复用模式）===")
     log(f"总计: {total_count} 个件号")
     
-    # 创建浏览器管理器
-    browser_manager = BrowserManager()
-    browser_manager.set_log_callback(log_callback)
+    # 按估算耗时重新排列队列
+    data_rows = order_data_rows(data_rows, document_path, part_order, log=log)
+    
+    # 断点日志：续跑时先读取上次的进度，再记录本批次开始
+    tracker = open_checkpoint_tracker(journal_path, resume, total_count, log)
+    
+    # 步骤追踪：各处理模块中的 span 记录到本批次的追踪器
+    tracer = tracing.Tracer() if trace_path or metrics is not None or span_listener is not None else None
+    previous_tracer = tracing.set_tracer(tracer)
+    if span_listener is not None:
+        tracer.add_listener(span_listener)
+    if metrics is not None:
+        tracer.add_listener(metrics.observe_span)
+        metrics.batch_started(total_count)
+        metrics.worker_limit(1)
+    
+    # 创建浏览器管理器（调用方传入时复用，批次结束后由调用方关闭）
+    owns_browser = browser_manager is None
+    if owns_browser:
+        browser_manager = BrowserManager()
+        browser_manager.set_log_callback(log_callback)
+        browser_manager.failure_trace_dir = failure_trace_dir
+    else:
+        browser_manager.attach_batch(log_callback, failure_trace_dir)
     
     try:
-        # 初始化浏览器并登录
-        log("🚀 初始化浏览器管理器...")
-        if not browser_manager.initialize(playwright, username, password, system_language, 
-                                         login_url=login_url, browser_path=browser_path, 
-                                         preferred_browser=preferred_browser,
-                                         browser_finder=browser_finder,
-                                         headless=headless):
+        # 初始化浏览器并登录（复用的浏览器已登录且参数一致时跳过）
+        if not owns_browser and browser_manager.matches(username, password, system_language, login_url,
+                                                        browser_path, preferred_browser, headless):
+            log("♻️ 使用已预先登录的浏览器，跳过启动和登录")
+        elif not browser_manager.initialize(playwright, username, password, system_language, 
+                                           login_url=login_url, browser_path=browser_path, 
+                                           preferred_browser=preferred_browser,
+                                           browser_finder=browser_finder,
+                                           headless=headless):
             log("❌ 浏览器初始化失败，终止处理", "ERROR")
-            return {
-                'total': total_count,
-                'success': 0,
-                'failed': total_count,
-                'skipped': 0
-            }
+            return batch_result(total_count)
         
         log("✅ 浏览器初始化成功，开始处理数据")
         
-        # 遍历处理每行数据
-        for index, row in enumerate(data_rows):
+        # 遍历处理每行数据：暂时性失败的件号排到批次末尾按退避时间重试
+        # 有取消令牌时，重试前的退避等待可被“停止”立即打断
+        scheduler = RetryScheduler(data_rows, sleep=cancel_token.wait if cancel_token is not None else time.sleep)
+        # 刚登录（或复用的浏览器已停在主页面）时第一个件号无需重置
+        attempted_count = 0 if browser_manager.at_home else 1
+        for index, row, attempt in scheduler:
+            if cancel_token is not None and cancel_token.cancelled:
+                cancelled = True
+                break
+            
             current_part = row.get('part_number', f'未知件号_{index}')
+            attempt_label = f" (第 {attempt} 次重试)" if attempt else ""
+            failure = {}
             
             try:
-                log(f"\n[{index+1}/{total_count}] 开始处理件号: {current_part}")
+                log(f"\n[{index+1}/{total_count}] 开始处理件号: {current_part}{attempt_label}")
                 
                 # 更新进度
                 if progress_callback:
-                    progress = (index / total_count) * 100
-                    progress_callback(progress, f"处理件号: {current_part} ({index+1}/{total_count})")
+                    progress = (index / total_count) * 100 if not attempt else 99
+                    progress_callback(progress, f"处理件号: {current_part} ({index+1}/{total_count}){attempt_label}")
                 
                 # 验证数据行
                 if not validate_data_row(row):
                     log(f"❌ 件号 {current_part} 数据不完整，跳过处理", "ERROR")
                     skipped_count += 1
+                    if metrics is not None:
+                        metrics.part_finished('skipped')
                     continue
                 
                 # 预处理数据
                 processed_row = prepare_data_row(row)
+                part_number = processed_row['part_number']
+                checkpoint = tracker.get(part_number)
                 
-                # 重置页面状态（除了第一个件号）
-                if index > 0:
-                    if not browser_manager.reset_for_next_part():
-                        log(f"❌ 页面状态重置失败，跳过件号 {current_part}", "ERROR")
-                        failed_count += 1
-                        continue
+                # 续跑：已完成的件号直接跳过
+                if checkpoint is not None and checkpoint.completed:
+                    log(f"⏭️ 件号 {current_part} 已在上次运行中完成，跳过")
+                    success_count += 1
+                    resumed_count += 1
+                    if metrics is not None:
+                        metrics.part_finished('success', resumed=True)
+                    continue
+                
+                # 重置页面状态（除了第一个处理的件号）
+                if attempted_count > 0 and not browser_manager.reset_for_next_part():
+                    log(f"❌ 页面状态重置失败，跳过件号 {current_part}", "ERROR")
+                    failure = {'step': 'reset', 'reason': FAILURE_PAGE_UNAVAILABLE}
+                    continue
+                attempted_count += 1
+                browser_manager.at_home = False
                 
                 # 获取页面对象
                 page = browser_manager.get_page()
                 if not page:
                     log(f"❌ 无法获取页面对象，跳过件号 {current_part}", "ERROR")
-                    failed_count += 1
+                    failure = {'step': 'reset', 'reason': FAILURE_PAGE_UNAVAILABLE}
                     continue
                 
+                # 步骤进度同时记入内存（供本批次重试续做）和断点日志
+                step_callback = tracker.step_callback(part_number)
+                browser_manager.begin_part_trace(part_number)
+                
                 # 处理单个PEDA（传递document_path）
-                if process_single_peda(page, processed_row, document_path, log_callback, upload_record_callback):
+                if process_single_peda(page, processed_row, document_path, log_callback, upload_record_callback,
+                                       step_callback=step_callback, checkpoint=checkpoint,
+                                       failure_info=failure, cancel_token=cancel_token):
                     success_count += 1
+                    failure = {}
+                    step_callback(CHECKPOINT_STEP_COMPLETED)
+                    if metrics is not None:
+                        metrics.part_finished('success')
                     log(f"✅ [{index+1}/{total_count}] 件号 {current_part} 处理完成", "SUCCESS")
                 else:
-                    failed_count += 1
+                    failure.setdefault('reason', FAILURE_EXCEPTION)
                     log(f"❌ [{index+1}/{total_count}] 件号 {current_part} 处理失败", "ERROR")
                 
+            except OperationCancelled:
+                # 已完成的步骤都已写入断点日志，下次可续跑
+                log(f"⏹️ 件号 {current_part} 处理被用户停止", "WARNING")
+                cancelled = True
+                break
+            
             except Exception as e:
-                failed_count += 1
+                failure = {'step': 'exception', 'reason': FAILURE_EXCEPTION, 'error': str(e)}
                 log(f"❌ [{index+1}/{total_count}] 件号 {current_part} 处理异常: {str(e)}", "ERROR")
                 
                 # 尝试截图
@@ -135,26 +242,59 @@ def run_batch_with_reuse(playwright: Playwright, data_rows: List[Dict[str, Any]]
                     log(f"错误截图已保存: {screenshot_path}")
                 except Exception:
                     pass
+            
+            finally:
+                # 失败件号保存 trace，成功件号丢弃
+                browser_manager.end_part_trace(failed=bool(failure))
+                
+                # 浏览器崩溃/断开导致的失败：恢复浏览器后立即重新处理该件号
+                if failure and not browser_manager.is_healthy():
+                    log(f"💥 件号 {current_part} 处理中浏览器不可用，尝试恢复后重新处理", "WARNING")
+                    if browser_manager.recover():
+                        scheduler.retry_now(index, row, attempt)
+                        attempted_count = 0  # 恢复后已在主页面，无需再重置
+                        failure = {}
+                
+                # 失败分类：暂时性失败安排重试，永久性失败或超过重试上限计为失败
+                if failure:
+                    delay = scheduler.schedule_retry(index, row, attempt, failure)
+                    if delay is not None:
+                        log(f"🔁 件号 {current_part} 暂时性失败（{failure.get('reason')}），"
+                            f"{delay:.0f} 秒后在批次末尾重试", "WARNING")
+                        if metrics is not None:
+                            metrics.retry_scheduled(failure.get('reason'))
+                    else:
+                        failed_count += 1
+                        if metrics is not None:
+                            metrics.part_finished('failed')
+                        kind = "暂时性失败，已达重试上限" if classify_failure(failure) else "永久性失败，不重试"
+                        failures[current_part] = dict(failure, attempts=attempt + 1)
+                        log(f"❌ 件号 {current_part} {kind}: {failure.get('reason')}", "ERROR")
         
         # 最终进度更新
         if progress_callback:
-            progress_callback(100, "批量处理完成")
+            if cancelled:
+                progress_callback((success_count + failed_count + skipped_count) / max(total_count, 1) * 100, "处理已停止")
+            else:
+                progress_callback(100, "批量处理完成")
         
         # 处理结果统计
-        result = {
-            'total': total_count,
-            'success': success_count,
-            'failed': failed_count,
-            'skipped': skipped_count
-        }
+        result = batch_result(failed_count)
         
         log(f"\n=== 批量处理完成 ===")
         log(f"总计: {total_count} 个件号")
         log(f"成功: {success_count} 个")
+        if resumed_count:
+            log(f"其中上次运行已完成: {resumed_count} 个")
         log(f"失败: {failed_count} 个")
         log(f"跳过: {skipped_count} 个")
+        if cancelled:
+            not_processed = total_count - success_count - failed_count - skipped_count
+            log(f"⏹️ 处理被用户停止，未处理: {not_processed} 个（可勾选断点续跑继续）", "WARNING")
+        if scheduler.retried_count:
+            log(f"自动重试: {scheduler.retried_count} 次")
         
-        if failed_count == 0 and skipped_count == 0:
+        if failed_count == 0 and skipped_count == 0 and not cancelled:
             log("🎉 所有件号处理成功！", "SUCCESS")
         elif success_count > 0:
             log(f"⚠️ 部分完成：{success_count}/{total_count} 个件号处理成功", "WARNING")
@@ -165,17 +305,20 @@ def run_batch_with_reuse(playwright: Playwright, data_rows: List[Dict[str, Any]]
         
     except Exception as e:
         log(f"❌ 批量处理过程中发生严重错误: {str(e)}", "ERROR")
-        return {
-            'total': total_count,
-            'success': success_count,
-            'failed': total_count - success_count - skipped_count,
-            'skipped': skipped_count
-        }
+        return batch_result(total_count - success_count - skipped_count)
         
     finally:
-        # 清理浏览器资源
-        log("🧹 正在清理浏览器资源...")
-        browser_manager.cleanup()
+        # 清理浏览器资源（复用的浏览器保留给下一批次）
+        if owns_browser:
+            log("🧹 正在清理浏览器资源...")
+            browser_manager.cleanup()
+        else:
+            browser_manager.detach_batch()
+        tracing.set_tracer(previous_tracer)
+        if tracer is not None and trace_path:
+            tracing.export_trace(tracer, trace_path, log)
+        if metrics is not None:
+            metrics.batch_finished()
 
 
 def run(playwright: Playwright, data_row=None, username=None, password=None, system_language='en', login_url=None, headless: bool = False) -> None:
@@ -0,0 +1,227 @@
+"""
+PEDA自动化处理工具 - 常驻自动化服务
+
+Playwright 同步 API 只能在创建它的线程中使用，所以由一个专用的服务线程持有 Playwright 和
+BrowserManager，所有浏览器操作（预先登录、批次处理、空闲时保持会话）都在这个线程中执行：
+- warm_up(): 填好登录信息后在后台启动浏览器、登录并切换语言，不等待结果
+- run_batch(): 把批次交给服务线程，用已登录的浏览器执行 run_batch_with_reuse，阻塞到批次结束
+- 空闲 AUTOMATION_KEEPALIVE_SECONDS 秒回到主页面检查一次登录状态，会话过期时重新登录
+- stop(): 关闭浏览器并停止 Playwright（关闭窗口时调用）
+
+登录参数变化时下一次 warm_up() 或 run_batch() 重新登录；浏览器崩溃时按 BrowserManager 的恢复机制处理。
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from config.constants import AUTOMATION_KEEPALIVE_SECONDS, AUTOMATION_STOP_TIMEOUT_SECONDS
+from modules.structured_log import get_logger, level_value
+
+logger = get_logger(__name__)
+
+# 服务状态
+STATE_STOPPED = 'stopped'
+STATE_STARTING = 'starting'
+STATE_LOGGING_IN = 'logging_in'
+STATE_READY = 'ready'
+STATE_IDLE = 'idle'          # Playwright 已启动，浏览器未登录（登录失败或尚未预热）
+STATE_BUSY = 'busy'
+STATE_FAILED = 'failed'      # Playwright 无法启动，服务不可用
+
+
+class AutomationServiceUnavailable(RuntimeError):
+    """服务线程无法启动 Playwright，批次没有执行（调用方可改为临时启动浏览器）"""
+
+
+class AutomationService:
+    """
+    常驻自动化服务（线程安全：GUI 线程和处理线程提交任务，服务线程执行）
+
+    Args:
+        log_callback: 日志回调 (message, level)，预先登录的进度显示在 GUI 日志中
+        keepalive_seconds: 空闲时检查登录状态的间隔（秒）
+    """
+
+    def __init__(self, log_callback: Optional[Callable] = None,
+                 keepalive_seconds: float = AUTOMATION_KEEPALIVE_SECONDS):
+        self.log_callback = log_callback
+        self.keepalive_seconds = keepalive_seconds
+        self.state = STATE_STOPPED
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._manager = None
+
+    def log(self, message: str, level: str = "INFO"):
+        if self.log_callback:
+            self.log_callback(message, level)
+        else:
+            logger.log(level_value(level), message)
+
+    # ------------------------------------------------------------------ 提交任务
+    def start(self):
+        """启动服务线程（已在运行时不做任何事）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.state = STATE_STARTING
+            self._thread = threading.Thread(target=self._run, name="automation-service", daemon=True)
+            self._thread.start()
+
+    def available(self) -> bool:
+        """服务线程在运行（Playwright 可用）"""
+        return self._thread is not None and self._thread.is_alive() and self.state != STATE_FAILED
+
+    def warm_up(self, username: str, password: str, system_language: str = 'en',
+                login_url: Optional[str] = None, browser_path: Optional[str] = None,
+                preferred_browser: str = "auto", browser_finder=None, headless: bool = False):
+        """
+        在后台启动浏览器并登录（不等待结果）；已用相同参数登录时不做任何事
+
+        Args:
+            与 BrowserManager.initialize 相同（playwright 由服务线程提供）
+        """
+        self.start()
+        self._jobs.put(('warm_up', dict(username=username, password=password, system_language=system_language,
+                                        login_url=login_url, browser_path=browser_path,
+                                        preferred_browser=preferred_browser, browser_finder=browser_finder,
+                                        headless=headless), None))
+
+    def run_batch(self, **batch_args) -> Dict[str, Any]:
+        """
+        在服务线程中用已登录的浏览器运行一个批次，阻塞到批次结束
+
+        Args:
+            batch_args: run_batch_with_reuse 的参数（不含 playwright 和 browser_manager）
+
+        Returns:
+            Dict[str, Any]: run_batch_with_reuse 的结果统计
+
+        Raises:
+            AutomationServiceUnavailable: Playwright 无法启动，批次没有执行
+        """
+        self.start()
+        future = Future()
+        self._jobs.put(('batch', batch_args, future))
+        # 服务线程先置 FAILED 再清空队列：放入任务前已清空时由这里清空，避免批次永远等待
+        if self.state == STATE_FAILED:
+            self._fail_pending(AutomationServiceUnavailable("自动化服务不可用"))
+        return future.result()
+
+    def stop(self, timeout: float = AUTOMATION_STOP_TIMEOUT_SECONDS):
+        """关闭浏览器并停止服务线程（等待当前任务结束，最多 timeout 秒）"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._jobs.put(None)
+        thread.join(timeout=timeout)
+        if thread.is_alive():
+            logger.warning("自动化服务线程 %.0f 秒内未结束，浏览器可能未关闭", timeout)
+
+    # ------------------------------------------------------------------ 服务线程
+    def _run(self):
+        try:
+            from playwright.sync_api import sync_playwright
+            from modules.browser_manager import BrowserManager
+            playwright = sync_playwright().start()
+        except Exception as e:
+            self.state = STATE_FAILED
+            self.log(f"⚠️ 自动化服务启动失败，开始处理时将临时启动浏览器: {e}", "WARNING")
+            self._fail_pending(AutomationServiceUnavailable(f"自动化服务启动失败: {e}"))
+            return
+
+        self._manager = BrowserManager(owns_playwright=False)
+        self._manager.set_log_callback(self.log_callback)
+        self.state = STATE_IDLE
+        try:
+            while True:
+                try:
+                    job = self._jobs.get(timeout=self.keepalive_seconds)
+                except queue.Empty:
+                    self._keep_alive()
+                    continue
+                if job is None:
+                    break
+                kind, args, future = job
+                if kind == 'warm_up':
+                    self._warm_up(playwright, args)
+                elif future.set_running_or_notify_cancel():
+                    self._run_batch(playwright, args, future)
+        except Exception as e:
+            logger.exception("自动化服务线程异常退出: %s", e)
+        finally:
+            self._manager.set_log_callback(None)
+            self._manager.cleanup()
+            try:
+                playwright.stop()
+            except Exception:
+                pass
+            self.state = STATE_STOPPED
+            self._fail_pending(RuntimeError("自动化服务已停止"))
+
+    def _warm_up(self, playwright, login: Dict[str, Any]):
+        manager = self._manager
+        params = {key: value for key, value in login.items() if key != 'browser_finder'}
+        if manager.matches(**params):
+            self.state = STATE_READY
+            return
+        self.state = STATE_LOGGING_IN
+        self.log("🔑 后台预先启动浏览器并登录，点击开始后可直接处理...")
+        if manager.initialize(playwright, **login):
+            self.state = STATE_READY
+            self.log("✅ 浏览器已预先登录，等待开始处理", "SUCCESS")
+        else:
+            self.state = STATE_IDLE
+            self.log("⚠️ 预先登录失败，开始处理时将重新登录", "WARNING")
+
+    def _run_batch(self, playwright, batch_args: Dict[str, Any], future: Future):
+        from core.workflow_engine import run_batch_with_reuse
+
+        manager = self._manager
+        self.state = STATE_BUSY
+        try:
+            future.set_result(run_batch_with_reuse(playwright=playwright, browser_manager=manager, **batch_args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            manager.detach_batch(self.log_callback)
+            # 批次结束后回到主页面，下一批次的第一个件号无需再重置
+            if manager.is_logged_in and not manager.at_home:
+                self._quietly(manager.reset_for_next_part)
+            self.state = STATE_READY if manager.is_ready() else STATE_IDLE
+
+    def _keep_alive(self):
+        """空闲时回到主页面检查登录状态（会话过期时重新登录，浏览器崩溃时恢复）"""
+        manager = self._manager
+        if not manager.is_logged_in:
+            return
+        manager.recovery_count = 0
+        if self._quietly(manager.reset_for_next_part):
+            self.state = STATE_READY
+        else:
+            self.state = STATE_IDLE
+            self.log("⚠️ 预先登录的浏览器已不可用，开始处理时将重新登录", "WARNING")
+
+    def _quietly(self, action: Callable[[], bool]) -> bool:
+        """执行浏览器操作，过程日志只写入结构化日志（不刷屏 GUI 日志）"""
+        manager = self._manager
+        manager.set_log_callback(None)
+        try:
+            return action()
+        except Exception as e:
+            logger.warning("自动化服务浏览器操作失败: %s", e)
+            return False
+        finally:
+            manager.set_log_callback(self.log_callback)
+
+    def _fail_pending(self, error: BaseException):
+        """服务不可用时，让等待中的批次立即得到异常"""
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None and job[2] is not None and job[2].set_running_or_notify_cancel():
+                job[2].set_exception(error)
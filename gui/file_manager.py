@@ -4,7 +4,6 @@ PEDA自动化处理工具 - 文件处理模块
 """
 
 import os
-import pandas as pd
 from pathlib import Path
 from tkinter import filedialog, messagebox
 from typing import Optional, List, Dict, Any, Callable
@@ -28,6 +27,8 @@ class FileManager:
         self.supported_excel_types = [
             ("Excel files", "*.xlsx *.xls"),
             ("CSV files", "*.csv"),
+            ("JSON Lines files", "*.jsonl"),
+            ("Parquet files", "*.parquet"),
             ("All files", "*.*")
         ]
         
@@ -107,17 +108,20 @@ class FileManager:
                 return False
                 
             # 检查文件扩展名
+            from config.constants import SUPPORTED_INPUT_EXTENSIONS
             file_ext = Path(file_path).suffix.lower()
-            if file_ext not in ['.xlsx', '.xls', '.csv']:
+            if file_ext not in SUPPORTED_INPUT_EXTENSIONS:
                 self.log(f"不支持的文件格式: {file_ext}", "ERROR")
                 return False
                 
-            # 尝试读取文件头部以验证格式
+            # 尝试读取文件头部以验证格式（只读第一行，不读全文件）
             try:
-                if file_ext == '.csv':
-                    pd.read_csv(file_path, nrows=1)
-                else:
+                if file_ext in ('.xlsx', '.xls'):
+                    import pandas as pd
                     pd.read_excel(file_path, nrows=1)
+                else:
+                    from modules.data_processor import iter_input_chunks
+                    next(iter_input_chunks(file_path, chunk_rows=1), None)
                     
                 self.log(f"Excel文件验证成功: {file_path}")
                 return True
@@ -199,12 +203,11 @@ class FileManager:
             if not self.validate_excel_file(file_path):
                 return None
                 
-            file_ext = Path(file_path).suffix.lower()
-            
-            if file_ext == '.csv':
-                df = pd.read_csv(file_path, encoding='utf-8-sig')
-            else:
-                df = pd.read_excel(file_path)
+            # 与处理流程共用分块读取逻辑，支持 CSV / JSONL / Parquet
+            from modules.data_processor import read_excel_data
+            df = read_excel_data(file_path)
+            if df is None:
+                return None
             
             # 转换为字典列表
             data_list = df.to_dict('records')
@@ -240,18 +243,13 @@ class FileManager:
                 'extension': Path(file_path).suffix.lower()
             }
             
-            # 尝试获取行数和列数
+            # 尝试获取行数和列数（只读元数据与表头，不解析全部数据）
             try:
-                if file_info['extension'] == '.csv':
-                    df = pd.read_csv(file_path, nrows=1)
-                    row_count = sum(1 for _ in open(file_path, 'r', encoding='utf-8-sig'))
-                else:
-                    df = pd.read_excel(file_path)
-                    row_count = len(df)
+                row_count, column_names = self._probe_table_metadata(file_path, file_info['extension'])
                 
                 file_info['rows'] = row_count
-                file_info['columns'] = len(df.columns)
-                file_info['column_names'] = df.columns.tolist()
+                file_info['columns'] = len(column_names)
+                file_info['column_names'] = column_names
                 
             except Exception:
                 file_info['rows'] = 0
@@ -264,6 +262,77 @@ class FileManager:
             self.log(f"获取Excel文件信息失败: {str(e)}", "ERROR")
             return None
     
+    def _probe_table_metadata(self, file_path: str, extension: str):
+        """
+        读取数据文件的行数与列名（元数据快速路径）
+        
+        Args:
+            file_path (str): 文件路径
+            extension (str): 小写扩展名
+            
+        Returns:
+            tuple: (数据行数（不含表头）, 列名列表)
+        """
+        if extension == '.xlsx':
+            return self._probe_xlsx_metadata(file_path)
+        
+        if extension == '.csv':
+            import pandas as pd
+            header = pd.read_csv(file_path, nrows=0, encoding='utf-8-sig')
+            return max(self._count_lines(file_path) - 1, 0), header.columns.tolist()
+        
+        if extension == '.jsonl':
+            import json
+            with open(file_path, 'r', encoding='utf-8-sig') as handle:
+                first_line = handle.readline().strip()
+            column_names = list(json.loads(first_line).keys()) if first_line else []
+            return self._count_lines(file_path), column_names
+        
+        if extension == '.parquet':
+            import pyarrow.parquet as pq
+            metadata = pq.ParquetFile(file_path)
+            return metadata.metadata.num_rows, metadata.schema_arrow.names
+        
+        # .xls 等旧格式没有可流式读取的元数据，只能完整解析
+        import pandas as pd
+        df = pd.read_excel(file_path)
+        return len(df), df.columns.tolist()
+    
+    def _probe_xlsx_metadata(self, file_path: str):
+        """从只读工作簿读取工作表尺寸和表头行"""
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0]
+            header = next(worksheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            column_names = [str(value) for value in header if value is not None]
+            
+            max_row = worksheet.max_row
+            if max_row is None:
+                # 部分工具生成的文件缺少 dimension 记录，退回逐行计数
+                worksheet.reset_dimensions()
+                max_row = sum(1 for _ in worksheet.iter_rows(values_only=True))
+            return max(max_row - 1, 0), column_names
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def _count_lines(file_path: str, block_size: int = 1024 * 1024) -> int:
+        """以二进制分块统计文件行数（末行无换行符时也计入）"""
+        line_count = 0
+        last_byte = b'\n'
+        with open(file_path, 'rb') as handle:
+            while True:
+                block = handle.read(block_size)
+                if not block:
+                    break
+                line_count += block.count(b'\n')
+                last_byte = block[-1:]
+        if last_byte != b'\n':
+            line_count += 1
+        return line_count
+    
     def scan_document_folder(self, folder_path: str, extensions: List[str] = None) -> List[Dict[str, Any]]:
         """
         扫描文档文件夹中的文件
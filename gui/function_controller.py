@@ -4,14 +4,18 @@ PEDA自动化处理工具 - 功能控制模块
 """
 
 import os
-import re
+import queue
 import threading
 from datetime import datetime
 from tkinter import filedialog, messagebox
 
-from config.constants import PART_NUMBER_COLUMN
+from modules.structured_log import get_logger
+from config.constants import (PART_NUMBER_COLUMN, LOG_PUMP_INTERVAL_MS, LOG_PUMP_MAX_BATCH,
+                              LOG_FILTER_LEVELS, LOG_SEARCH_DELAY_MS)
 from .languages import LANGUAGES, get_text
 
+logger = get_logger(__name__)
+
 
 class FunctionController:
     """功能控制器 - 负责处理所有业务逻辑和功能控制"""
@@ -32,13 +36,27 @@ class FunctionController:
         self._browser_finder = None
         # 新增：用于存储合格的件号列表
         self.qualified_part_numbers = []
+        # 当前处理批次的取消令牌（点击停止时通知处理线程）
+        self._cancel_token = None
+        # 日志泵：处理线程的进度只保留最新一次，由日志泵合并刷新
+        self._pending_progress = None
+        self._log_pump_running = False
+        self._log_filter_job = None
+        # 有新的上传记录待刷新到表格（处理线程写入存储后置位，由日志泵刷新）
+        self._records_dirty = False
+        # 常驻自动化服务：持有预先登录的浏览器，连续批次复用（单浏览器模式）
+        self.automation_service = None
+        # 生成上传文件夹的后台线程
+        self._folder_thread = None
+        # 正在后台读取的Excel文件的取消令牌（选择新文件时取消）
+        self._excel_load_token = None
         
     # =================
     # 文件选择方法
     # =================
     
     def choose_excel_file(self):
-        """选择Excel文件并立即进行验证"""
+        """选择Excel文件，在后台线程中读取和验证（选择新文件时取消仍在进行的读取）"""
         file_path = self.app.file_manager.choose_excel_file()
         if not file_path:
             return
@@ -46,24 +64,91 @@ class FunctionController:
         self.app.excel_file_var.set(file_path)
         self.log_message(f"选择了Excel文件: {os.path.basename(file_path)}", "INFO")
 
-        # 清空旧数据
+        # 取消上一个仍在读取的文件，清空旧数据
+        self.cancel_excel_load()
         self.qualified_part_numbers = []
         self.app.total_parts_var.set("")
-        self.app.qualified_parts_var.set("")
-
+        self.app.qualified_parts_var.set("正在读取...")
+        self._update_generate_button_state()
+
+        from modules.cancellation import CancellationToken
+        token = CancellationToken()
+        self._excel_load_token = token
+        self.log_message("正在读取和验证Excel数据...", "INFO")
+        threading.Thread(target=self._load_excel_worker, args=(file_path, token), daemon=True).start()
+
+    def cancel_excel_load(self):
+        """取消正在后台读取的Excel文件（结果不再显示）"""
+        token, self._excel_load_token = self._excel_load_token, None
+        if token is not None:
+            token.cancel("已选择其他文件")
+
+    def _load_excel_worker(self, file_path, token):
+        """后台线程：读取和验证Excel，结果交给主线程显示"""
+        name = os.path.basename(file_path)
         try:
             # 延迟导入以保持UI响应
-            from modules.data_processor import read_excel_data, validate_excel_data
+            from modules.cancellation import OperationCancelled
+            from modules.data_processor import read_excel_data, validate_excel_data, log_invalid_rows
+        except Exception as e:
+            self.app.root.after(0, lambda error=e: self._excel_load_failed(token, error))
+            return
+
+        def on_progress(rows_read, fraction):
+            # 处理进行中时进度条属于处理线程
+            if not self.app.is_processing:
+                self.update_progress_from_callback(fraction * 90, f"读取Excel: {rows_read} 行")
 
-            self.log_message("正在读取和验证Excel数据...", "INFO")
-            data = read_excel_data(file_path)
+        try:
+            data = read_excel_data(file_path, progress_callback=on_progress, cancel_token=token)
+            token.raise_if_cancelled()
+            if not self.app.is_processing:
+                self.update_progress_from_callback(90, "验证Excel数据...")
             validation_result = validate_excel_data(data)
+            token.raise_if_cancelled()
+
+            # 主线程只做界面更新：件号列表和错误说明在这里准备好
+            part_numbers = []
+            if validation_result['headers_valid'] and validation_result['qualified_rows_count'] > 0:
+                part_series = validation_result['qualified_df'][PART_NUMBER_COLUMN].astype(str).str.strip()
+                part_numbers = part_series.tolist()
+            error_lines = []
+            log_invalid_rows(validation_result, lambda message, level: error_lines.append((message, level)))
+            self.app.root.after(0, lambda: self._apply_excel_result(token, validation_result, part_numbers, error_lines))
+        except OperationCancelled:
+            self.log_message(f"已取消读取 {name}", "INFO")
+        except Exception as e:
+            self.app.root.after(0, lambda error=e: self._excel_load_failed(token, error))
 
+    def _finish_excel_load(self, token) -> bool:
+        """主线程：结果仍属于当前选择的文件时结束读取状态并返回True（已被新文件取代时返回False）"""
+        if token is not self._excel_load_token or token.cancelled:
+            return False
+        self._excel_load_token = None
+        if not self.app.is_processing:
+            self.update_progress_from_callback(0, get_text(self.app.current_language, 'ready'))
+        return True
+
+    def _excel_load_failed(self, token, error):
+        """主线程：显示读取或验证失败"""
+        if not self._finish_excel_load(token):
+            return
+        self.app.qualified_parts_var.set("")
+        self.log_message(f"处理Excel文件时出错: {error}", "ERROR")
+        messagebox.showerror("处理失败", f"读取或验证Excel文件时发生错误:\n{error}")
+        self._update_generate_button_state()
+        self.start_preload()
+
+    def _apply_excel_result(self, token, validation_result, part_numbers, error_lines):
+        """主线程：显示验证结果并更新合格件号列表"""
+        if not self._finish_excel_load(token):
+            return
+        try:
             if not validation_result['headers_valid']:
                 missing_cols = ", ".join(validation_result['missing_columns'])
+                self.app.qualified_parts_var.set("")
                 self.log_message(f"Excel表头验证失败，缺少列: {missing_cols}", "ERROR")
                 messagebox.showerror("Excel错误", f"文件缺少必需的列: {missing_cols}")
-                self._update_generate_button_state()
                 return
 
             total_rows = validation_result['total_rows']
@@ -75,31 +160,27 @@ class FunctionController:
                 more_hint = "" if len(duplicates) <= 5 else f" 等 {len(duplicates)} 个"
                 error_text = f"检测到重复件号: {duplicates_preview}{more_hint}"
                 self.log_message(error_text, "ERROR")
-                messagebox.showerror("Excel错误", f"{error_text}\n请移除重复件号后重新导入。")
                 self.app.total_parts_var.set(f"总行数: {total_rows}")
                 self.app.qualified_parts_var.set("合格行数: 0")
+                messagebox.showerror("Excel错误", f"{error_text}\n请移除重复件号后重新导入。")
                 return
             
             self.app.total_parts_var.set(f"总行数: {total_rows}")
             self.app.qualified_parts_var.set(f"合格行数: {qualified_rows}")
 
+            for message, level in error_lines:
+                self.log_message(message, level)
+
             if qualified_rows > 0:
-                part_series = validation_result['qualified_df'][PART_NUMBER_COLUMN].astype(str).str.strip()
-                self.qualified_part_numbers = part_series.tolist()
+                self.qualified_part_numbers = part_numbers
                 self.log_message(f"验证完成: {total_rows}行数据中，有{qualified_rows}行合格。", "SUCCESS")
             else:
                 self.log_message("验证完成，但没有找到合格的数据行。", "WARNING")
-
-        except Exception as e:
-            self.log_message(f"处理Excel文件时出错: {e}", "ERROR")
-            messagebox.showerror("处理失败", f"读取或验证Excel文件时发生错误:\n{e}")
-        
         finally:
             self._update_generate_button_state()
             # 预热
             self.start_preload()
 
-            
     def choose_document_folder(self):
         """选择文档文件夹"""
         folder_path = self.app.file_manager.choose_document_folder()
@@ -108,17 +189,23 @@ class FunctionController:
             self._update_generate_button_state()
 
     def _update_generate_button_state(self):
-        """根据条件更新“生成文件夹”按钮的状态"""
+        """根据条件更新“生成文件夹”按钮的状态（生成过程中保持禁用）"""
         doc_path_exists = self.app.document_path_var.get().strip()
         has_qualified_parts = self.qualified_part_numbers
         
-        if doc_path_exists and has_qualified_parts:
+        if doc_path_exists and has_qualified_parts and not self.folder_generation_running():
             self.app.generate_folder_btn.config(state='normal')
         else:
             self.app.generate_folder_btn.config(state='disabled')
 
+    def folder_generation_running(self) -> bool:
+        """是否正在后台生成上传文件夹"""
+        return self._folder_thread is not None and self._folder_thread.is_alive()
+
     def generate_upload_folders(self):
-        """根据合格的件号列表生成上传文件夹（包含完整的子文件夹结构）"""
+        """根据合格的件号列表生成上传文件夹（包含完整的子文件夹结构），在后台线程中执行"""
+        if self.folder_generation_running():
+            return
         if not self.qualified_part_numbers:
             messagebox.showwarning("无数据", "没有合格的件号用于创建文件夹。")
             return
@@ -128,55 +215,64 @@ class FunctionController:
             messagebox.showerror("路径无效", "请先选择一个有效的目标文件夹。")
             return
 
-        self.log_message(f"开始在 '{target_dir}' 中创建文件夹结构...", "INFO")
-        
-        created_count = 0
-        skipped_count = 0
-        error_count = 0
+        part_numbers = list(self.qualified_part_numbers)
+        fill_missing = bool(self.app.fill_subfolders_var.get())
+        mode = "（补全已存在件号文件夹中缺少的子文件夹）" if fill_missing else ""
+        self.log_message(f"开始在 '{target_dir}' 中为 {len(part_numbers)} 个件号创建文件夹结构{mode}...", "INFO")
         
-        try:
-            from config.constants import DOCUMENT_CATEGORIES
-            
-            for part_number in self.qualified_part_numbers:
-                raw_value = str(part_number).strip()
-                safe_part_number = re.sub(r'[<>:"/\\|?*]', '_', raw_value).rstrip('. ').strip()
-                if not safe_part_number:
-                    skipped_count += 1
-                    self.log_message(f"件号 '{raw_value}' 为空或包含非法字符，已跳过。", "WARNING")
-                    continue
-                
-                folder_path = os.path.join(target_dir, safe_part_number)
-                
-                try:
-                    # 检查主文件夹是否已存在
-                    if os.path.exists(folder_path):
-                        skipped_count += 1
-                        self.log_message(f"文件夹 '{safe_part_number}' 已存在，已跳过。", "INFO")
-                        continue
-                    
-                    # 创建主文件夹
-                    os.makedirs(folder_path, exist_ok=True)
-                    
-                    # 在主文件夹内创建6个子文件夹
-                    for category in DOCUMENT_CATEGORIES:
-                        subfolder_path = os.path.join(folder_path, category)
-                        os.makedirs(subfolder_path, exist_ok=True)
-                    
-                    created_count += 1
-                    self.log_message(f"已创建 '{safe_part_number}' 及其子文件夹。", "SUCCESS")
-                    
-                except Exception as e:
-                    self.log_message(f"创建文件夹 '{folder_path}' 失败: {e}", "ERROR")
-                    error_count += 1
-            
-            summary_message = f"文件夹创建完成。\n\n成功创建: {created_count}（含子文件夹）\n已存在/跳过: {skipped_count}\n失败: {error_count}"
-            self.log_message(summary_message, "SUCCESS")
-            messagebox.showinfo("操作完成", summary_message)
+        self._folder_thread = threading.Thread(target=self._generate_folders_worker,
+                                               args=(target_dir, part_numbers, fill_missing), daemon=True)
+        self._folder_thread.start()
+        texts = LANGUAGES[self.app.current_language]
+        self.app.generate_folder_btn.config(state='disabled', text=texts['generating_folders'])
+
+    def _generate_folders_worker(self, target_dir, part_numbers, fill_missing):
+        """后台线程：并行创建文件夹，进度按批次汇报，结束后在主线程显示汇总"""
+        from modules.folder_generator import generate_part_folders
+        from config.constants import FOLDER_GEN_MAX_ERROR_LINES
+
+        def on_progress(done, total, counts):
+            status = f"生成文件夹: {done}/{total}"
+            self.update_progress_from_callback(done / max(total, 1) * 100, status)
+            if done < total:
+                self.log_message(f"{status}（新建 {counts['created']}，补全 {counts['filled']}，"
+                                 f"已存在 {counts['existing']}，失败 {counts['error']}）", "INFO")
 
+        try:
+            result = generate_part_folders(target_dir, part_numbers, fill_missing=fill_missing,
+                                           progress_callback=on_progress)
         except Exception as e:
             error_msg = f"创建文件夹过程中发生意外错误: {e}"
             self.log_message(error_msg, "ERROR")
-            messagebox.showerror("严重错误", error_msg)
+            self.app.root.after(0, lambda: self._finish_folder_generation("严重错误", error_msg, error=True))
+            return
+
+        for part_number in result['invalid_parts'][:FOLDER_GEN_MAX_ERROR_LINES]:
+            self.log_message(f"件号 '{part_number}' 为空或包含非法字符，已跳过。", "WARNING")
+        for part_number, error in result['errors'][:FOLDER_GEN_MAX_ERROR_LINES]:
+            self.log_message(f"创建件号 '{part_number}' 的文件夹失败: {error}", "ERROR")
+        hidden = len(result['errors']) - FOLDER_GEN_MAX_ERROR_LINES
+        if hidden > 0:
+            self.log_message(f"另有 {hidden} 个件号的文件夹创建失败，未逐一列出。", "ERROR")
+
+        skipped = result['existing'] + result['invalid'] + result['duplicates']
+        summary_message = (f"文件夹创建完成。\n\n成功创建: {result['created']}（含子文件夹）\n"
+                           + (f"补全子文件夹: {result['filled']} 个件号，共 {result['subfolders']} 个子文件夹\n"
+                              if fill_missing else "")
+                           + f"已存在/跳过: {skipped}\n失败: {result['error']}")
+        self.log_message(summary_message, "SUCCESS" if not result['error'] else "WARNING")
+        self.app.root.after(0, lambda: self._finish_folder_generation("操作完成", summary_message))
+
+    def _finish_folder_generation(self, title, message, error=False):
+        """主线程：恢复按钮并显示汇总"""
+        self._folder_thread = None
+        texts = LANGUAGES[self.app.current_language]
+        self.app.generate_folder_btn.config(text=texts['generate_folders'])
+        self._update_generate_button_state()
+        if error:
+            messagebox.showerror(title, message)
+        else:
+            messagebox.showinfo(title, message)
 
     # =================
     # 处理控制方法
@@ -213,7 +309,7 @@ class FunctionController:
         
     def start_processing(self):
         """开始处理"""
-        print("[DEBUG] start_processing called")
+        logger.debug("start_processing called")
         self.log_message("点击了开始处理按钮", "INFO")
         
         if not self.validate_inputs():
@@ -224,8 +320,13 @@ class FunctionController:
             self.log_message("处理已在进行中", "WARNING")
             return
             
+        # 还没有预先登录（如预热尚未完成）时现在交给常驻服务登录，批次排在登录之后执行
+        self.warm_up_browser()
+        
         self.log_message("开始启动处理线程", "INFO")
         self.app.is_processing = True
+        from modules.cancellation import CancellationToken
+        self._cancel_token = CancellationToken()
         self.app.start_btn.config(state='disabled')
         self.app.stop_btn.config(state='normal', fg=self.app.colors['white'])
         
@@ -242,13 +343,31 @@ class FunctionController:
         self.update_status(get_text(self.app.current_language, 'processing'))
         
     def stop_processing(self):
-        """停止处理"""
-        self.app.is_processing = False
-        self.app.start_btn.config(state='normal')
+        """停止处理：通知处理线程取消，线程收尾（关闭浏览器）后再恢复开始按钮"""
         self.app.stop_btn.config(state='disabled', fg=self.app.colors['white'])
         
-        self.log_message("Processing stopped by user")
+        if self.cancel_processing():
+            self.log_message(get_text(self.app.current_language, 'processing_stopping'), "WARNING")
+            self.update_status(get_text(self.app.current_language, 'processing_stopping'))
+            return
+        
+        self.app.is_processing = False
+        self.app.start_btn.config(state='normal')
+        self.log_message(get_text(self.app.current_language, 'processing_stopped'))
         self.update_status(get_text(self.app.current_language, 'idle'))
+    
+    def cancel_processing(self) -> bool:
+        """
+        请求取消正在运行的处理线程
+        
+        Returns:
+            bool: 有正在运行的处理并已发出取消请求返回True
+        """
+        thread = getattr(self.app, 'processing_thread', None)
+        if self._cancel_token is None or thread is None or not thread.is_alive():
+            return False
+        self._cancel_token.cancel()
+        return True
         
     def reset_processing(self):
         """重置处理状态"""
@@ -271,24 +390,23 @@ class FunctionController:
         
     def run_processing(self):
         """运行处理逻辑"""
-        print("[DEBUG] run_processing called")
+        logger.debug("run_processing called")
         result = None  # 新增：用于保存处理结果
         try:
             # 延迟导入，避免应用启动时加载重量级依赖（playwright/pandas 等）
             from interfaces.gui_interface import (
                 run_with_gui_params, run_with_gui_params_v2
             )
+            from core.record_store import PartTimingRecorder
             # 获取用户输入的参数
             excel_path = self.app.excel_file_var.get()
-            print(f"[DEBUG] excel_path: {excel_path}")
             document_path = self.app.document_path_var.get()
-            print(f"[DEBUG] document_path: {document_path}")
             username = self.app.username_var.get()
-            print(f"[DEBUG] username: {username}")
             password = self.app.password_var.get()
-            print(f"[DEBUG] password: {password}")
+            logger.debug("excel_path=%s, document_path=%s, username=%s", excel_path, document_path, username)
             headless_mode = bool(self.app.headless_mode_var.get())
             headless_label = "Headless" if headless_mode else "可视化"
+            resume_mode = bool(self.app.resume_run_var.get())
             
             # 系统语言映射
             sys_lang_map = {
@@ -304,16 +422,22 @@ class FunctionController:
             self.log_message(f"- 用户: {username}")
             self.log_message(f"- 系统语言: {system_language}")
             self.log_message(f"- 浏览器模式: {headless_label}")
+            if resume_mode:
+                self.log_message("- 断点续跑: 跳过上次已完成的件号")
             
-            print(f"[DEBUG] use_browser_reuse: {self.use_browser_reuse}")
+            logger.debug("use_browser_reuse: %s", self.use_browser_reuse)
             # 根据模式选择处理函数
             if self.use_browser_reuse:
-                print("[DEBUG] about to call run_with_gui_params_v2")
+                logger.debug("about to call run_with_gui_params_v2")
                 # 获取浏览器配置
                 browser_path = getattr(self.app, 'browser_custom_path', None)
                 preferred_browser = getattr(self.app, 'browser_preferred_type', 'auto')
                 # 获取登录URL
                 login_url = self.app.login_url_var.get() if self.app.login_url_var.get().strip() else None
+                # 常驻服务可用时用它预先登录的浏览器（服务线程尚未启动时由批次启动并登录）
+                service = self.automation_service if self._keep_browser_warm() else None
+                if service is not None and not service.available():
+                    service = None
                 
                 result = run_with_gui_params_v2(
                     excel_path=excel_path,
@@ -328,11 +452,18 @@ class FunctionController:
                     browser_path=browser_path,
                     preferred_browser=preferred_browser,
                     browser_finder=self._browser_finder,  # 传递预热的 browser_finder
-                    headless=headless_mode
+                    headless=headless_mode,
+                    resume=resume_mode,
+                    cancel_token=self._cancel_token,
+                    max_workers=getattr(self.app, 'max_workers', 1),
+                    part_order=getattr(self.app, 'part_order', None),
+                    metrics_port=getattr(self.app, 'metrics_port', 0),
+                    span_listener=PartTimingRecorder(self.app.upload_record_store),
+                    automation_service=service
                 )
-                print(f"[DEBUG] run_with_gui_params_v2 returned: {result}")
+                logger.debug("run_with_gui_params_v2 returned: %s", result)
             else:
-                print("[DEBUG] about to call run_with_gui_params")
+                logger.debug("about to call run_with_gui_params")
                 result = run_with_gui_params(
                     excel_path=excel_path,
                     document_path=document_path,
@@ -341,21 +472,21 @@ class FunctionController:
                     system_language=system_language,
                     progress_callback=self.update_progress_from_callback,
                     log_callback=self.log_message_from_callback,
-                    headless=headless_mode
+                    headless=headless_mode,
+                    cancel_token=self._cancel_token
                 )
-                print(f"[DEBUG] run_with_gui_params returned: {result}")
+                logger.debug("run_with_gui_params returned: %s", result)
             # 新增：同步统计到界面
             if isinstance(result, dict):
                 self.app.success_count = result.get('success', 0)
                 self.app.failed_count = result.get('failed', 0)
                 self.app.total_count = result.get('total', 0)
-                # === 关键：同步上传记录 ===
-                if 'upload_records' in result:
-                    self.app.upload_records = result['upload_records']
-                    # 新增：刷新表格
-                    self.app.root.after(0, self.app.ui.refresh_upload_records_table)
+                # 上传记录已在处理过程中逐条写入存储，这里只刷新表格
+                self.app.root.after(0, self.refresh_upload_records_table)
                 self.app.root.after(0, self.update_stats_display)
-            if result and (not isinstance(result, dict) or result.get('success', 0) > 0):
+            if isinstance(result, dict) and result.get('cancelled'):
+                self.log_message(get_text(self.app.current_language, 'processing_stopped'), "WARNING")
+            elif result and (not isinstance(result, dict) or result.get('success', 0) > 0):
                 self.log_message("🎉 所有处理完成！", "SUCCESS")
             else:
                 self.log_message("⚠️ 处理过程中出现错误", "ERROR")
@@ -414,45 +545,151 @@ class FunctionController:
                     self.log_message(f"预热警告：浏览器查找失败: {e}", "WARNING")
 
                 self.log_message("预热完成。", "INFO")
+                # 已填写登录信息时接着在后台预先登录（读取界面变量需在主线程）
+                self.app.root.after(0, self.warm_up_browser)
             except Exception as e:
                 self.log_message(f"预热时发生异常: {e}", "WARNING")
 
         t = threading.Thread(target=_worker, daemon=True)
         t.start()
     
+    def _keep_browser_warm(self) -> bool:
+        """是否使用常驻自动化服务（配置允许、浏览器复用模式且只用一个浏览器）"""
+        return (getattr(self.app, 'keep_browser_warm', True) and self.use_browser_reuse
+                and getattr(self.app, 'max_workers', 1) <= 1)
+
+    def warm_up_browser(self):
+        """
+        已填写用户名和密码时，让常驻自动化服务在后台启动浏览器、登录并切换语言（主线程调用）
+
+        登录参数与已登录的浏览器一致时不做任何事；参数变化时服务重新登录。
+        """
+        if not self._keep_browser_warm() or self.app.is_processing:
+            return
+        username = self.app.username_var.get().strip()
+        password = self.app.password_var.get()
+        if not username or not password:
+            return
+        try:
+            if self.automation_service is None:
+                from .automation_service import AutomationService
+                self.automation_service = AutomationService(log_callback=self.log_message_from_callback)
+            sys_lang_map = {'English': 'en', 'Deutsch': 'de', '中文': 'zh'}
+            login_url = self.app.login_url_var.get().strip() or None
+            self.automation_service.warm_up(
+                username=self.app.username_var.get(),
+                password=password,
+                system_language=sys_lang_map.get(self.app.system_language_var.get(), 'zh'),
+                login_url=login_url,
+                browser_path=getattr(self.app, 'browser_custom_path', None),
+                preferred_browser=getattr(self.app, 'browser_preferred_type', 'auto'),
+                browser_finder=self._browser_finder,
+                headless=bool(self.app.headless_mode_var.get()))
+        except Exception as e:
+            self.log_message(f"预先登录启动失败（不影响使用）: {e}", "WARNING")
+
+    def stop_automation_service(self):
+        """关闭常驻自动化服务的浏览器（关闭窗口时调用）"""
+        if self.automation_service is not None:
+            self.automation_service.stop()
+            self.automation_service = None
+
     def update_progress_from_callback(self, progress, status):
-        """从处理回调更新进度"""
-        def update():
-            self.app.progress_var.set(progress)
-            self.app.current_status_var.set(status)
-            self.update_progress_display()
-        self.app.root.after(0, update)
+        """从处理回调更新进度（可在任意线程调用，只保留最新一次，由日志泵刷新）"""
+        self._pending_progress = (progress, status)
     
     def log_message_from_callback(self, message, level="INFO"):
-        print(f"[DEBUG] log_message_from_callback called: {message} [{level}]")
-        """从处理回调添加日志"""
-        def add_log():
-            self.log_message(message, level)
-        self.app.root.after(0, add_log)
+        """从处理回调添加日志（可在任意线程调用，先放入队列，由日志泵批量写入）"""
+        self.log_message(message, level)
+    
+    def start_log_pump(self):
+        """启动日志泵：每 LOG_PUMP_INTERVAL_MS 毫秒在主线程批量刷新日志和进度"""
+        if self._log_pump_running:
+            return
+        self._log_pump_running = True
+        self.app.root.after(LOG_PUMP_INTERVAL_MS, self._pump_log_queue)
+    
+    def _pump_log_queue(self):
+        """取出队列中的日志一次性写入日志存储并刷新视图，并应用最新的进度"""
+        try:
+            records = []
+            while len(records) < LOG_PUMP_MAX_BATCH:
+                try:
+                    records.append(self.app.log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if records:
+                self._append_log_records(records)
+            
+            if self._records_dirty:
+                self._records_dirty = False
+                self.refresh_upload_records_table()
+            
+            pending, self._pending_progress = self._pending_progress, None
+            if pending is not None:
+                progress, status = pending
+                self.app.progress_var.set(progress)
+                self.app.current_status_var.set(status)
+                self.update_progress_display()
+        except Exception as e:
+            logger.exception("日志泵刷新失败: %s", e)
+        
+        try:
+            self.app.root.after(LOG_PUMP_INTERVAL_MS, self._pump_log_queue)
+        except Exception:
+            # 窗口已关闭
+            self._log_pump_running = False
+    
+    def _append_log_records(self, records):
+        """把一批日志 (时间, 消息, 级别) 写入日志存储，视图只重绘可见窗口（日志页未打开过时只写存储）"""
+        self.app.log_store.extend(records)
+        if hasattr(self.app, 'log_view'):
+            self.app.log_view.refresh()
+    
+    def schedule_log_filter(self):
+        """搜索框输入时延迟筛选，连续输入只筛选一次"""
+        if self._log_filter_job is not None:
+            self.app.root.after_cancel(self._log_filter_job)
+        self._log_filter_job = self.app.root.after(LOG_SEARCH_DELAY_MS, self.apply_log_filter)
+    
+    def apply_log_filter(self):
+        """按日志页选择的级别和搜索词刷新日志视图"""
+        self._log_filter_job = None
+        if not hasattr(self.app, 'log_view'):
+            return
+        level = self.app.log_level_var.get()
+        self.app.log_view.set_filter(level if level in LOG_FILTER_LEVELS else None,
+                                     self.app.log_search_var.get())
+    
+    def update_log_count(self, shown, total):
+        """日志页右上角显示筛选结果条数"""
+        if hasattr(self.app, 'log_count_label'):
+            self.app.log_count_label.config(
+                text=get_text(self.app.current_language, 'log_filter_count').format(shown=shown, total=total))
     
     def add_upload_record(self, part_number, filename, success, reason=""):
-        """添加上传记录（标准化字段）"""
-        if not hasattr(self.app, 'upload_records'):
-            self.app.upload_records = []
-        record = {
-            'Date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'Part_number': part_number,
-            'FileName': filename,
-            'Success': success,
-            'Reason': reason
-        }
-        self.app.upload_records.append(record)
+        """添加上传记录（可在任意线程调用：立即写入记录存储，表格由日志泵增量刷新）"""
+        try:
+            self.app.upload_record_store.add(part_number, filename, success, reason)
+        except Exception as e:
+            logger.warning("写入上传记录失败: %s", e)
+            return
+        self._records_dirty = True
+    
+    def refresh_upload_records_table(self):
+        """把新写入的上传记录追加到表格（停在最后一页时只插入新增的行）"""
+        if hasattr(self.app, 'records_view'):
+            self.app.records_view.refresh()
+    
+    def update_records_page_info(self, page, pages, total):
+        """上传记录页显示页码和记录总数"""
+        if hasattr(self.app, 'records_page_label'):
+            self.app.records_page_label.config(
+                text=get_text(self.app.current_language, 'records_page_info').format(page=page, pages=pages, total=total))
 
     def download_report(self):
-        """下载处理报告（明细：件号+文件名，每个文件一行，成功/失败都记录）"""
+        """下载处理报告（上传明细、件号耗时、失败原因汇总；xlsx 三张表或 CSV 三个文件）"""
         try:
-            # 延迟导入 pandas，避免GUI冷启动变慢
-            import pandas as pd
             # 自动生成文件名：YYYYDDMM_file_name.xlsx
             today = datetime.now().strftime("%Y%d%m")
             default_name = f"{today}_file_upload_report.xlsx"
@@ -460,19 +697,15 @@ class FunctionController:
                 title="保存处理报告",
                 defaultextension=".xlsx",
                 initialfile=default_name,
-                filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+                filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("All files", "*.*")]
             )
             if filename:
-                # 导出明细：件号+文件名
-                if hasattr(self.app, 'upload_records') and self.app.upload_records:
-                    df = pd.DataFrame(self.app.upload_records)
-                    # 只保留件号和文件名两列
-                    df = df[['Part_number', 'FileName']]
-                else:
-                    df = pd.DataFrame(columns=['Part_number', 'FileName'])
-                df.to_excel(filename, index=False)
+                # 从记录存储逐批读取、逐行写入，记录再多内存也不增长
+                from core.report_export import export_report
+                counts = export_report(self.app.upload_record_store, filename)
                 messagebox.showinfo("成功", f"报告已保存到: {filename}")
-                self.log_message(f"处理报告已保存: {filename}")
+                self.log_message(f"处理报告已保存: {filename} "
+                                 f"({', '.join(f'{name}: {count}' for name, count in counts.items())})")
         except Exception as e:
             messagebox.showerror("错误", f"保存报告失败: {str(e)}")
             self.log_message(f"保存报告失败: {str(e)}", "ERROR")
@@ -487,7 +720,8 @@ class FunctionController:
             )
             
             if filename:
-                log_content = self.app.log_text.get(1.0, 'end')
+                # 完整历史来自日志溢出文件（内存和控件中只保留最近的部分）
+                log_content = self.app.log_store.history_text()
                 
                 header = f"""
 === PEDA 自动化处理工具 - 错误日志 ===
@@ -513,8 +747,6 @@ Excel文件: {self.app.excel_file_var.get()}
     def download_upload_record(self):
         """下载上传记录（标准表头）"""
         try:
-            # 延迟导入 pandas，避免GUI冷启动变慢
-            import pandas as pd
             default_name = datetime.now().strftime("%Y%m%d") + "_Upload_records.xlsx"
             filename = filedialog.asksaveasfilename(
                 title="保存上传记录",
@@ -523,18 +755,10 @@ Excel文件: {self.app.excel_file_var.get()}
                 filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("All files", "*.*")]
             )
             if filename:
-                columns = ['Date', 'Part_number', 'FileName', 'Success', 'Reason']
-                if hasattr(self.app, 'upload_records') and self.app.upload_records:
-                    df = pd.DataFrame(self.app.upload_records)
-                    df = df.reindex(columns=columns)
-                else:
-                    df = pd.DataFrame(columns=columns)
+                # 从记录存储逐批读取、逐行写入（xlsx 只写模式 / CSV），记录再多内存也不增长
+                from core.record_store import export_upload_records
                 sheet_name = datetime.now().strftime("%Y%m%d") + "_Upload_records"
-                if filename.endswith('.xlsx'):
-                    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                        df.to_excel(writer, sheet_name=sheet_name, index=False)
-                else:
-                    df.to_csv(filename, index=False, encoding='utf-8-sig')
+                export_upload_records(self.app.upload_record_store, filename, sheet_name=sheet_name)
                 messagebox.showinfo("成功", f"上传记录已保存到: {filename}")
                 self.log_message(f"上传记录已保存: {filename}")
         except Exception as e:
@@ -542,20 +766,8 @@ Excel文件: {self.app.excel_file_var.get()}
             self.log_message(f"保存上传记录失败: {str(e)}", "ERROR")
 
     def log_message(self, message, level="INFO"):
-        """添加日志消息（防止未定义报错）"""
-        # 若无日志控件，直接打印
-        try:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            formatted_message = f"[{timestamp}] {level}: {message}\n"
-            if hasattr(self.app, 'log_text'):
-                self.app.log_text.config(state='normal')
-                self.app.log_text.insert('end', formatted_message)
-                self.app.log_text.config(state='disabled')
-                self.app.log_text.see('end')
-            else:
-                print(formatted_message)
-        except Exception as e:
-            print(f"[log_message ERROR] {e} | 原始消息: {message}")
+        """添加日志消息（与处理线程的日志走同一个队列，保证显示顺序）"""
+        self.app.log_queue.put((datetime.now().strftime("%H:%M:%S"), message, level))
     
     def update_stats_display(self):
         """更新统计显示，防止未定义报错"""
@@ -567,7 +779,7 @@ Excel文件: {self.app.excel_file_var.get()}
             else:
                 print(f"[update_stats_display] 成功:{getattr(self.app, 'success_count', 0)} 失败:{getattr(self.app, 'failed_count', 0)} 总数:{getattr(self.app, 'total_count', 0)}")
         except Exception as e:
-            print(f"[update_stats_display ERROR] {e}")
+            logger.warning("更新统计显示失败: %s", e)
     
     def update_progress_display(self):
         """更新进度显示，防止未定义报错"""
@@ -578,7 +790,7 @@ Excel文件: {self.app.excel_file_var.get()}
             else:
                 print(f"[update_progress_display] 当前进度: {getattr(self.app, 'progress_var', 0)}")
         except Exception as e:
-            print(f"[update_progress_display ERROR] {e}")
+            logger.warning("更新进度显示失败: %s", e)
 
     def update_status(self, status):
         """更新状态显示，防止未定义报错"""
@@ -588,14 +800,12 @@ Excel文件: {self.app.excel_file_var.get()}
             else:
                 print(f"[update_status] 状态: {status}")
         except Exception as e:
-            print(f"[update_status ERROR] {e}")
+            logger.warning("更新状态显示失败: %s", e)
     
     def clear_log(self):
-        """清空日志显示区"""
+        """清空日志显示区（溢出文件中的完整历史保留，仍可下载错误日志）"""
         try:
-            if hasattr(self.app, 'log_text'):
-                self.app.log_text.config(state='normal')
-                self.app.log_text.delete(1.0, 'end')
-                self.app.log_text.config(state='disabled')
+            if hasattr(self.app, 'log_view'):
+                self.app.log_view.clear()
         except Exception as e:
-            print(f"[clear_log ERROR] {e}")
+            logger.warning("清空日志失败: %s", e)
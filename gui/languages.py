@@ -19,12 +19,15 @@ LANGUAGES = {
         'remember_password': 'Remember Password',
         'show_password': 'Show Password',
         'headless_mode': 'Headless Mode',
+        'resume_run': 'Resume Last Run',
         'file_selection': '📁 File Selection',
         'excel_file': 'Excel File:',
         'document_path': 'Document Path:',
         'choose_file': '📄 Choose File',
         'choose_folder': '📁 Choose Path',
         'generate_folders': '📁 Generate Folders',
+        'fill_subfolders': 'Fill Missing Subfolders',
+        'generating_folders': '⏳ Generating...',
         'system_settings': '🌐 System Settings',
         'ui_language': 'UI Language:',
         'system_language': 'System Language (after login):',
@@ -42,12 +45,23 @@ LANGUAGES = {
         'total': 'Total:',
         'log_output': '📝 Log Output',
         'clear_log': 'Clear Log',
+        'log_level_filter': 'Level:',
+        'log_all_levels': 'All',
+        'log_search': 'Search:',
+        'log_filter_count': '{shown} / {total} lines',
         'record_management': '💾 Record Management',
         'download_report': 'Download Report',
         'download_error_log': 'Download Error Log',
         'download_upload_record': 'Download Upload Record',
         'main_tab': 'Main',
         'logs_tab': 'Logs',
+        'records_tab': 'Upload Records',
+        'records_page_info': 'Page {page} / {pages}, {total} records',
+        'record_col_date': 'Date',
+        'record_col_part': 'Part Number',
+        'record_col_file': 'File Name',
+        'record_col_success': 'Result',
+        'record_col_reason': 'Reason',
         'validate_inputs': 'Please fill in all required fields',
         'processing_complete': 'Processing Complete',
         'processing_started': 'Processing Started',
@@ -58,6 +72,7 @@ LANGUAGES = {
         'processing': 'Processing...',
         'idle': 'Idle',
         'processing_stopped': 'Processing stopped by user',
+        'processing_stopping': 'Stopping... finishing the current step and closing the browser',
         'processing_reset': 'Processing reset',
         'error_occurred': 'Error occurred during processing',
         'processing_exception': 'Exception occurred during processing',
@@ -111,12 +126,15 @@ PEDA DOCUMENTS/
         'remember_password': 'Passwort merken',
         'show_password': 'Passwort anzeigen',
         'headless_mode': 'Headless-Modus',
+        'resume_run': 'Letzten Lauf fortsetzen',
         'file_selection': '📁 Dateiauswahl',
         'excel_file': 'Excel-Datei:',
         'document_path': 'Dokumentenpfad:',
         'choose_file': '📄 Datei wählen',
         'choose_folder': '📁 Pfad wählen',
         'generate_folders': '📁 Ordner erstellen',
+        'fill_subfolders': 'Fehlende Unterordner ergänzen',
+        'generating_folders': '⏳ Wird erstellt...',
         'system_settings': '🌐 Systemeinstellungen',
         'ui_language': 'Oberflächensprache:',
         'system_language': 'Systemsprache (nach Anmeldung):',
@@ -134,12 +152,23 @@ PEDA DOCUMENTS/
         'total': 'Gesamt:',
         'log_output': '📝 Protokollausgabe',
         'clear_log': 'Protokoll löschen',
+        'log_level_filter': 'Stufe:',
+        'log_all_levels': 'Alle',
+        'log_search': 'Suchen:',
+        'log_filter_count': '{shown} / {total} Zeilen',
         'record_management': '💾 Datensatzverwaltung',
         'download_report': 'Bericht herunterladen',
         'download_error_log': 'Fehlerprotokoll herunterladen',
         'download_upload_record': 'Upload-Datensatz herunterladen',
         'main_tab': 'Haupt',
         'logs_tab': 'Logs',
+        'records_tab': 'Upload-Datensätze',
+        'records_page_info': 'Seite {page} / {pages}, {total} Datensätze',
+        'record_col_date': 'Datum',
+        'record_col_part': 'Teilenummer',
+        'record_col_file': 'Dateiname',
+        'record_col_success': 'Ergebnis',
+        'record_col_reason': 'Grund',
         'validate_inputs': 'Bitte füllen Sie alle erforderlichen Felder aus',
         'processing_complete': 'Verarbeitung abgeschlossen',
         'processing_started': 'Verarbeitung gestartet',
@@ -150,6 +179,7 @@ PEDA DOCUMENTS/
         'processing': 'Verarbeitung...',
         'idle': 'Leerlauf',
         'processing_stopped': 'Verarbeitung durch Benutzer gestoppt',
+        'processing_stopping': 'Wird gestoppt... aktueller Schritt wird beendet und Browser geschlossen',
         'processing_reset': 'Verarbeitung zurückgesetzt',
         'error_occurred': 'Fehler während der Verarbeitung aufgetreten',
         'processing_exception': 'Fehler während der Verarbeitung aufgetreten',
@@ -203,12 +233,15 @@ PEDA DOCUMENTS/
         'remember_password': '记住密码',
         'show_password': '显示密码',
         'headless_mode': 'Headless 模式',
+        'resume_run': '断点续跑',
         'file_selection': '📁 文件选择',
         'excel_file': 'Excel文件:',
         'document_path': '文档路径:',
         'choose_file': '📄 选择文件',
         'choose_folder': '📁 选择路径',
         'generate_folders': '📁 生成文件夹',
+        'fill_subfolders': '补全子文件夹',
+        'generating_folders': '⏳ 正在生成...',
         'system_settings': '🌐 系统设置',
         'ui_language': '界面语言:',
         'system_language': '系统语言 (登录后):',
@@ -226,12 +259,23 @@ PEDA DOCUMENTS/
         'total': '总计:',
         'log_output': '📝 日志输出',
         'clear_log': '清空日志',
+        'log_level_filter': '级别：',
+        'log_all_levels': '全部',
+        'log_search': '搜索：',
+        'log_filter_count': '{shown} / {total} 行',
         'record_management': '💾 记录管理',
         'download_report': '文件上传报告',
         'download_error_log': '下载错误日志',
         'download_upload_record': '下载上传记录',
         'main_tab': '主页',
         'logs_tab': '日志',
+        'records_tab': '上传记录',
+        'records_page_info': '第 {page} / {pages} 页，共 {total} 条记录',
+        'record_col_date': '时间',
+        'record_col_part': '件号',
+        'record_col_file': '文件名',
+        'record_col_success': '结果',
+        'record_col_reason': '原因',
         'validate_inputs': '请填写所有必需字段',
         'processing_complete': '处理完成',
         'processing_started': '开始处理',
@@ -242,6 +286,7 @@ PEDA DOCUMENTS/
         'processing': '处理中...',
         'idle': '空闲',
         'processing_stopped': '处理被用户停止',
+        'processing_stopping': '正在停止... 当前步骤结束后关闭浏览器',
         'processing_reset': '处理重置',
         'error_occurred': '处理期间发生错误',
         'processing_exception': '处理期间发生异常',
@@ -0,0 +1,397 @@
+"""
+PEDA自动化处理工具 - 日志存储和虚拟化日志视图
+
+长时间批处理会产生几十万行日志，直接追加到 Text 控件会让插入和滚动越来越慢、内存持续增长。
+- LogStore: 内存中只保留最近 LOG_VIEW_CAPACITY 条（环形缓冲），完整历史同时写入溢出文件；
+  按级别维护序号索引，级别筛选不需要扫描全部日志
+- VirtualLogView: Text 控件只渲染可见的几十行，滚动条按索引位置换算，
+  搜索结果在新日志到达时增量更新
+"""
+
+import bisect
+import os
+import tkinter as tk
+import tkinter.font as tkfont
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from config.constants import LOG_DIR, LOG_VIEW_CAPACITY, LOG_SPILL_MAX_FILES
+from modules.structured_log import get_logger
+
+logger = get_logger(__name__)
+
+# 日志级别对应的显示颜色
+LEVEL_COLORS = {
+    'ERROR': '#dc3545',
+    'WARNING': '#b8860b',
+    'SUCCESS': '#28a745',
+}
+
+# 多行消息（如异常堆栈）在视图中折叠为一行的分隔符：视图按"一条日志一行"换算行号和滚动位置
+LINE_BREAK_MARK = ' ⏎ '
+
+
+class LogEntry:
+    """一条日志（line 为折叠换行后的单行文本，溢出文件中保留原始换行）"""
+
+    __slots__ = ('seq', 'timestamp', 'level', 'message', 'line', 'folded')
+
+    def __init__(self, seq: int, timestamp: str, level: str, message: str):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.level = level
+        self.message = message
+        self.line = f"[{timestamp}] {level}: {LINE_BREAK_MARK.join(str(message).splitlines())}"
+        # 搜索用的小写文本（不区分大小写匹配）
+        self.folded = self.line.casefold()
+
+
+class SeqIndex:
+    """只在尾部追加、从头部淘汰的序号列表，支持按位置随机访问（O(1)）"""
+
+    def __init__(self):
+        self._items: List[int] = []
+        self._start = 0
+
+    def append(self, seq: int):
+        self._items.append(seq)
+
+    def drop_before(self, seq: int):
+        """淘汰小于 seq 的序号（序号递增，只需从头部开始）"""
+        items = self._items
+        start = self._start
+        while start < len(items) and items[start] < seq:
+            start += 1
+        self._start = start
+        # 淘汰过半时再整体压缩，均摊 O(1)
+        if start > 1024 and start * 2 > len(items):
+            del items[:start]
+            self._start = 0
+
+    def clear(self):
+        self._items = []
+        self._start = 0
+
+    def __len__(self) -> int:
+        return len(self._items) - self._start
+
+    def __getitem__(self, index: int) -> int:
+        return self._items[self._start + index]
+
+    def position(self, seq: int) -> int:
+        """第一个不小于 seq 的序号所在位置"""
+        return bisect.bisect_left(self._items, seq, self._start) - self._start
+
+
+class LogStore:
+    """
+    有容量上限的日志存储（只在 GUI 主线程中使用）
+
+    Args:
+        capacity: 内存中保留的最多条数，超出后淘汰最早的
+        spill_path: 完整历史的溢出文件路径（None 表示不写文件）
+    """
+
+    def __init__(self, capacity: int = LOG_VIEW_CAPACITY, spill_path: Optional[str] = None):
+        self.capacity = max(1, capacity)
+        self._ring: List[Optional[LogEntry]] = [None] * self.capacity
+        self._first_seq = 0
+        self._next_seq = 0
+        self._levels = {}
+        self.spill_path = spill_path
+        self._spill = None
+        if spill_path:
+            try:
+                os.makedirs(os.path.dirname(spill_path) or '.', exist_ok=True)
+                self._spill = open(spill_path, 'a', encoding='utf-8')
+            except OSError as e:
+                logger.warning("无法打开日志文件 %s: %s", spill_path, e)
+                self.spill_path = None
+
+    # ------------------------------------------------------------------ 写入
+    def extend(self, records: Iterable[Tuple[str, str, str]]):
+        """追加一批日志 (时间, 消息, 级别)，同一批只写一次文件"""
+        lines = []
+        for timestamp, message, level in records:
+            seq = self._next_seq
+            entry = LogEntry(seq, timestamp, level, message)
+            self._ring[seq % self.capacity] = entry
+            self._next_seq = seq + 1
+            self._levels.setdefault(level, SeqIndex()).append(seq)
+            lines.append(f"[{timestamp}] {level}: {message}\n")
+
+        if self._next_seq - self._first_seq > self.capacity:
+            self._first_seq = self._next_seq - self.capacity
+            for index in self._levels.values():
+                index.drop_before(self._first_seq)
+
+        if lines and self._spill is not None:
+            try:
+                self._spill.write(''.join(lines))
+                self._spill.flush()
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空内存中的日志（溢出文件保留完整历史）"""
+        self._ring = [None] * self.capacity
+        self._first_seq = self._next_seq
+        self._levels = {}
+
+    def close(self):
+        if self._spill is not None:
+            try:
+                self._spill.close()
+            except OSError:
+                pass
+            self._spill = None
+
+    # ------------------------------------------------------------------ 读取
+    @property
+    def first_seq(self) -> int:
+        return self._first_seq
+
+    @property
+    def next_seq(self) -> int:
+        return self._next_seq
+
+    def __len__(self) -> int:
+        return self._next_seq - self._first_seq
+
+    def get(self, seq: int) -> Optional[LogEntry]:
+        if self._first_seq <= seq < self._next_seq:
+            return self._ring[seq % self.capacity]
+        return None
+
+    def level_index(self, level: str) -> SeqIndex:
+        return self._levels.setdefault(level, SeqIndex())
+
+    def levels(self) -> List[str]:
+        return sorted(self._levels)
+
+    def iter_range(self, start_seq: int):
+        """从 start_seq（含）开始遍历内存中的日志"""
+        for seq in range(max(start_seq, self._first_seq), self._next_seq):
+            yield self._ring[seq % self.capacity]
+
+    def history_text(self) -> str:
+        """完整日志文本：优先读溢出文件，没有文件时返回内存中的部分"""
+        if self.spill_path and self._spill is not None:
+            try:
+                self._spill.flush()
+                with open(self.spill_path, 'r', encoding='utf-8') as handle:
+                    return handle.read()
+            except OSError:
+                pass
+        return ''.join(entry.line + '\n' for entry in self.iter_range(self._first_seq))
+
+
+def default_spill_path() -> str:
+    """本次启动的日志溢出文件路径，顺便清理过旧的文件"""
+    directory = os.path.join(os.getcwd(), LOG_DIR)
+    prune_spill_files(directory)
+    return os.path.join(directory, f"gui_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+
+
+def prune_spill_files(directory: str, max_files: int = LOG_SPILL_MAX_FILES):
+    """只保留最新的 max_files - 1 个溢出文件（为本次启动留出一个）"""
+    try:
+        entries = [os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.startswith('gui_') and name.endswith('.log')]
+        entries.sort(key=os.path.getmtime, reverse=True)
+    except OSError:
+        return
+    for path in entries[max(0, max_files - 1):]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class VirtualLogView:
+    """
+    虚拟化日志视图：Text 控件只包含当前可见窗口的几行
+
+    Args:
+        text: 显示用的 Text 控件（wrap='none'，只读）
+        scrollbar: 纵向滚动条，由视图按行号换算位置
+        store: 日志存储
+        on_filter_changed: 可选，筛选结果变化后的回调 (匹配条数, 内存总条数)
+    """
+
+    def __init__(self, text: tk.Text, scrollbar, store: LogStore,
+                 on_filter_changed: Optional[Callable[[int, int], None]] = None):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.store = store
+        self.on_filter_changed = on_filter_changed
+        self.level: Optional[str] = None
+        self.query = ''
+        # 有搜索词时的匹配序号（增量维护），以及已扫描到的序号
+        self._matches: Optional[SeqIndex] = None
+        self._scanned_seq = 0
+        self._top = 0
+        # 当前窗口第一行的序号：新日志写入时旧日志会被淘汰、行号前移，按序号保持位置
+        self._top_seq: Optional[int] = None
+        self._follow = True
+        self._line_height = tkfont.Font(font=text.cget('font')).metrics('linespace') or 16
+
+        for level, color in LEVEL_COLORS.items():
+            text.tag_configure(level, foreground=color)
+        text.tag_configure('match', background='#fff3a0')
+        scrollbar.configure(command=self._on_scrollbar)
+        text.bind('<Configure>', lambda event: self.render())
+        text.bind('<MouseWheel>', self._on_mousewheel)
+        text.bind('<Button-4>', lambda event: self.scroll(-3))
+        text.bind('<Button-5>', lambda event: self.scroll(3))
+        for key, delta in (('<Prior>', -1), ('<Next>', 1)):
+            text.bind(key, lambda event, delta=delta: self.scroll(delta * self.visible_rows()))
+        text.bind('<Home>', lambda event: self._jump(0))
+        text.bind('<End>', lambda event: self._jump(self.row_count()))
+
+    # ------------------------------------------------------------------ 行索引
+    def row_count(self) -> int:
+        if self._matches is not None:
+            return len(self._matches)
+        if self.level:
+            return len(self.store.level_index(self.level))
+        return len(self.store)
+
+    def _row_seq(self, row: int) -> int:
+        if self._matches is not None:
+            return self._matches[row]
+        if self.level:
+            return self.store.level_index(self.level)[row]
+        return self.store.first_seq + row
+
+    def _seq_row(self, seq: int) -> int:
+        if self._matches is not None:
+            return self._matches.position(seq)
+        if self.level:
+            return self.store.level_index(self.level).position(seq)
+        return max(0, seq - self.store.first_seq)
+
+    def visible_rows(self) -> int:
+        height = self.text.winfo_height()
+        if height <= 1:
+            height = int(self.text.cget('height')) * self._line_height
+        return max(1, height // self._line_height)
+
+    def _scan_new(self):
+        """把新到达（或尚未扫描）的日志并入搜索结果，并淘汰已移出内存的序号"""
+        if self._matches is None:
+            return
+        self._matches.drop_before(self.store.first_seq)
+        needle = self.query
+        level = self.level
+        for entry in self.store.iter_range(self._scanned_seq):
+            if (level is None or entry.level == level) and needle in entry.folded:
+                self._matches.append(entry.seq)
+        self._scanned_seq = self.store.next_seq
+
+    # ------------------------------------------------------------------ 操作
+    def refresh(self):
+        """新日志写入存储后调用：更新索引，跟随末尾时滚到最新"""
+        self._scan_new()
+        if self._follow:
+            self._top = max(0, self.row_count() - self.visible_rows())
+        elif self._top_seq is not None:
+            self._top = self._seq_row(self._top_seq)
+        self.render()
+        self._notify()
+
+    def set_filter(self, level: Optional[str] = None, query: str = ''):
+        """按级别和关键字筛选（关键字不区分大小写，空字符串表示不筛选）"""
+        self.level = level or None
+        self.query = (query or '').strip().casefold()
+        if self.query:
+            self._matches = SeqIndex()
+            self._scanned_seq = self.store.first_seq
+            self._scan_new()
+        else:
+            self._matches = None
+        self._follow = True
+        self._top = max(0, self.row_count() - self.visible_rows())
+        self.render()
+        self._notify()
+
+    def clear(self):
+        self.store.clear()
+        if self._matches is not None:
+            self._matches.clear()
+            self._scanned_seq = self.store.next_seq
+        self._top = 0
+        self._follow = True
+        self.render()
+        self._notify()
+
+    def scroll(self, rows: int):
+        self._jump(self._top + rows)
+        return 'break'
+
+    def _jump(self, top: int):
+        max_top = max(0, self.row_count() - self.visible_rows())
+        self._top = min(max(0, top), max_top)
+        self._follow = self._top >= max_top
+        self.render()
+        return 'break'
+
+    def _on_scrollbar(self, *args):
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self._jump(int(float(args[1]) * self.row_count()))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_rows()
+            self.scroll(amount)
+
+    def _on_mousewheel(self, event):
+        steps = -int(event.delta / 120) if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+        return self.scroll(steps * 3)
+
+    def _notify(self):
+        if self.on_filter_changed is not None:
+            try:
+                self.on_filter_changed(self.row_count(), len(self.store))
+            except Exception:
+                pass
+
+    # ------------------------------------------------------------------ 渲染
+    def render(self):
+        """只把可见窗口内的行写入 Text 控件"""
+        total = self.row_count()
+        rows = self.visible_rows()
+        self._top = min(self._top, max(0, total - rows))
+        end = min(total, self._top + rows)
+        self._top_seq = self._row_seq(self._top) if self._top < total else None
+
+        text = self.text
+        text.config(state='normal')
+        text.delete('1.0', 'end')
+        for row in range(self._top, end):
+            entry = self.store.get(self._row_seq(row))
+            if entry is None:
+                continue
+            suffix = '\n' if row < end - 1 else ''
+            text.insert('end', entry.line + suffix, entry.level if entry.level in LEVEL_COLORS else ())
+        if self.query:
+            self._highlight_matches()
+        text.config(state='disabled')
+
+        if total:
+            self.scrollbar.set(self._top / total, end / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _highlight_matches(self):
+        start = '1.0'
+        length = len(self.query)
+        while True:
+            position = self.text.search(self.query, start, stopindex='end', nocase=True)
+            if not position:
+                break
+            finish = f"{position}+{length}c"
+            self.text.tag_add('match', position, finish)
+            start = finish
@@ -23,11 +23,24 @@ from gui.languages import LANGUAGES, get_text, get_available_languages, get_lang
 from gui.file_manager import FileManager, validate_file_paths
 
 # 导入UI组件模块
-from gui.ui_components import UIComponentManager
+from gui.ui_components import UIComponentManager, RECORD_TABLE_COLUMNS
 
 # 导入功能控制模块
 from gui.function_controller import FunctionController
 
+# 导入日志存储模块
+from gui.log_store import LogStore, default_spill_path
+
+# 上传记录存储（SQLite，逐条写入）
+from core.record_store import open_record_store
+
+# 结构化日志（处理模块的调试日志由后台线程写入 logs/peda.jsonl）
+from modules.structured_log import configure_logging, shutdown_logging
+
+# 启动性能分析（未开启时 phase 为空操作）
+from gui import startup_profile
+from config.constants import STRUCTURED_LOG_LEVEL
+
 # 注：避免在GUI冷启动阶段导入重量级依赖（如 pandas/playwright）。
 # 相关函数在 FunctionController.run_processing 内部按需延迟导入。
 
@@ -36,11 +49,14 @@ class PEDAAutomationGUI:
     
     def __init__(self):
         try:
-            self.root = tk.Tk()
+            with startup_profile.phase('tk.Tk()'):
+                self.root = tk.Tk()
             self.current_language = 'zh'  # 默认中文
             self.system_language = 'zh'   # 默认中文
             self.config_file = 'peda_config.json'
             self.log_queue = queue.Queue()
+            # 日志存储：内存只保留最近的日志，完整历史写入 logs/ 下的溢出文件
+            self.log_store = LogStore(spill_path=default_spill_path())
             
             # 处理状态
             self.is_processing = False
@@ -50,8 +66,8 @@ class PEDAAutomationGUI:
             self.success_count = 0
             self.failed_count = 0
             self.skipped_count = 0
-              # 初始化上传记录
-            self.upload_records = []
+            # 初始化上传记录存储（每个文件的上传结果立即写入数据库，表格分页读取）
+            self.upload_record_store = open_record_store()
             
             # 初始化文件管理器
             self.file_manager = FileManager(log_callback=self.log_message)
@@ -63,10 +79,15 @@ class PEDAAutomationGUI:
             self.function_controller = None
             
             # 界面变量
-            self.setup_variables()
-            self.setup_styles()
-            self.init_ui()
-            self.load_config()
+            with startup_profile.phase('setup_variables / setup_styles'):
+                self.setup_variables()
+                self.setup_styles()
+            with startup_profile.phase('init_ui'):
+                self.init_ui()
+            with startup_profile.phase('load_config'):
+                self.load_config()
+            with startup_profile.phase('setup_logging'):
+                self.setup_logging()
             self.start_log_monitor()
             
             # 延迟2秒后启动预热（给应用初始化时间）
@@ -77,9 +98,15 @@ class PEDAAutomationGUI:
             traceback.print_exc()
             raise
         
+    def setup_logging(self):
+        """按配置文件的 logging 段（默认级别和按模块级别）安装结构化日志"""
+        logging_config = getattr(self, 'logging_config', {}) or {}
+        configure_logging(level=logging_config.get('level', STRUCTURED_LOG_LEVEL),
+                          modules=logging_config.get('modules'))
+        
     def start_log_monitor(self):
-        """启动日志监控"""
-        pass
+        """启动日志监控：处理线程的日志和进度由日志泵按固定间隔批量刷新"""
+        self.function_controller.start_log_pump()
     
     def delayed_preload(self):
         """延迟启动预热"""
@@ -96,6 +123,8 @@ class PEDAAutomationGUI:
         self.remember_password_var = tk.BooleanVar()
         self.show_password_var = tk.BooleanVar()
         self.headless_mode_var = tk.BooleanVar()
+        self.resume_run_var = tk.BooleanVar()
+        self.fill_subfolders_var = tk.BooleanVar()
         self.excel_file_var = tk.StringVar()
         self.document_path_var = tk.StringVar()
         self.ui_language_var = tk.StringVar(value='中文')
@@ -188,17 +217,21 @@ class PEDAAutomationGUI:
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         # 创建功能控制器
         self.function_controller = FunctionController(self)
-        # 使用UI组件管理器创建界面
+        # 使用UI组件管理器创建界面（使用说明、日志、上传记录页在首次切换到时才创建）
         self.ui_manager.create_main_container()
-        self.ui_manager.create_header()
-        self.ui_manager.create_content_area()
+        with startup_profile.phase('create_header'):
+            self.ui_manager.create_header()
+        with startup_profile.phase('create_content_area'):
+            self.ui_manager.create_content_area()
         self.ui_manager.create_status_bar()
         # 启动时间更新
         self.update_time()
         # 所有UI加载完毕后再设置大小和居中，并显示窗口
         self.root.geometry("850x700")
-        self.center_window()
+        with startup_profile.phase('center_window'):
+            self.center_window()
         self.root.deiconify()
+        startup_profile.mark_first_paint(self.root)
         
     def center_window(self):
         """窗口居中显示"""
@@ -246,8 +279,8 @@ class PEDAAutomationGUI:
     def log_message_from_callback(self, message, level="INFO"):
         return self.function_controller.log_message_from_callback(message, level)
     
-    def add_upload_record(self, filename, status, error_msg="", file_type="PDF", file_size=""):
-        return self.function_controller.add_upload_record(filename, status, error_msg, file_type, file_size)
+    def add_upload_record(self, part_number, filename, success, reason=""):
+        return self.function_controller.add_upload_record(part_number, filename, success, reason)
             
     def update_progress_display(self):
         return self.function_controller.update_progress_display()
@@ -350,6 +383,12 @@ class PEDAAutomationGUI:
                 self.notebook.tab(0, text=texts['main_tab'])
                 self.notebook.tab(1, text=texts.get('instructions_tab', 'Instructions'))
                 self.notebook.tab(2, text=texts['logs_tab'])
+                self.notebook.tab(3, text=texts['records_tab'])
+            if hasattr(self, 'records_tree'):
+                for name, text_key, _ in RECORD_TABLE_COLUMNS:
+                    self.records_tree.heading(name, text=texts[text_key])
+            if hasattr(self, 'records_view'):
+                self.records_view.refresh()
             # 使用说明页面（大标题已删除）
             if hasattr(self, 'op_title_label'):
                 self.op_title_label.config(text=texts.get('instructions_op_title', '1. Operation Instructions'))
@@ -379,6 +418,8 @@ class PEDAAutomationGUI:
                 self.show_password_cb.config(text=texts['show_password'])
             if hasattr(self, 'headless_mode_cb'):
                 self.headless_mode_cb.config(text=texts['headless_mode'])
+            if hasattr(self, 'resume_run_cb'):
+                self.resume_run_cb.config(text=texts['resume_run'])
             if hasattr(self, 'save_settings_btn'):
                 self.save_settings_btn.config(text=texts.get('save_settings', texts.get('login', '保存')))
             # 文件选择区
@@ -391,7 +432,11 @@ class PEDAAutomationGUI:
             if hasattr(self, 'document_btn'):
                 self.document_btn.config(text=texts['choose_folder'])
             if hasattr(self, 'generate_folder_btn'):
-                self.generate_folder_btn.config(text=texts.get('generate_folders', '📁 Generate Folders'))
+                generating = self.function_controller.folder_generation_running()
+                self.generate_folder_btn.config(text=texts['generating_folders'] if generating
+                                                else texts.get('generate_folders', '📁 Generate Folders'))
+            if hasattr(self, 'fill_subfolders_cb'):
+                self.fill_subfolders_cb.config(text=texts['fill_subfolders'])
             # 操作按钮
             if hasattr(self, 'start_btn'):
                 self.start_btn.config(text=texts['start_processing'])
@@ -422,6 +467,17 @@ class PEDAAutomationGUI:
                 self.log_title_label.config(text=texts['log_output'])
             if hasattr(self, 'clear_log_btn'):
                 self.clear_log_btn.config(text=texts['clear_log'])
+            if hasattr(self, 'log_level_label'):
+                self.log_level_label.config(text=texts['log_level_filter'])
+            if hasattr(self, 'log_search_label'):
+                self.log_search_label.config(text=texts['log_search'])
+            if hasattr(self, 'log_level_combo'):
+                levels = list(self.log_level_combo.cget('values'))
+                if self.log_level_var.get() not in levels[1:]:
+                    self.log_level_var.set(texts['log_all_levels'])
+                self.log_level_combo.config(values=[texts['log_all_levels']] + levels[1:])
+            if hasattr(self, 'log_view'):
+                self.log_view.refresh()
             # 状态栏
             if hasattr(self, 'status_text'):
                 self.status_text.config(text=texts['ready'])
@@ -451,8 +507,17 @@ class PEDAAutomationGUI:
                 'browser': {
                     'preferred_type': getattr(self, 'browser_preferred_type', 'auto'),
                     'custom_path': getattr(self, 'browser_custom_path', None),
-                    'headless': self.headless_mode_var.get()
-                }
+                    'headless': self.headless_mode_var.get(),
+                    'keep_warm': getattr(self, 'keep_browser_warm', True)
+                },
+                'parallel': {
+                    'max_workers': getattr(self, 'max_workers', 1)
+                },
+                'part_order': getattr(self, 'part_order', None),
+                'metrics': {
+                    'port': getattr(self, 'metrics_port', 0)
+                },
+                'logging': getattr(self, 'logging_config', None) or {'level': STRUCTURED_LOG_LEVEL, 'modules': {}}
             }
             
             with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -463,6 +528,8 @@ class PEDAAutomationGUI:
             try:
                 if hasattr(self, 'function_controller') and self.function_controller:
                     self.function_controller.start_preload()
+                    # 登录信息可能已修改：常驻服务按新的参数预先登录
+                    self.function_controller.warm_up_browser()
             except Exception:
                 pass
             
@@ -498,6 +565,18 @@ class PEDAAutomationGUI:
                 self.browser_preferred_type = browser_config.get('preferred_type', 'auto')
                 self.browser_custom_path = browser_config.get('custom_path', None)
                 self.headless_mode_var.set(browser_config.get('headless', False))
+                # 常驻自动化服务：填好登录信息后在后台预先登录，连续批次复用同一个浏览器
+                self.keep_browser_warm = bool(browser_config.get('keep_warm', True))
+                
+                # 并行处理配置（max_workers 大于1时同时运行多个浏览器）
+                parallel_config = config.get('parallel', {})
+                self.max_workers = max(1, int(parallel_config.get('max_workers', 1) or 1))
+                # 件号处理顺序（excel / longest_first / shortest_first），为空时由处理引擎决定
+                self.part_order = config.get('part_order')
+                # 运行指标 HTTP 端口（Prometheus 格式），0 表示不开端点
+                self.metrics_port = int(config.get('metrics', {}).get('port', 0) or 0)
+                # 结构化日志级别：{'level': 'INFO', 'modules': {'form_handler': 'DEBUG'}}
+                self.logging_config = config.get('logging', {})
                 
                 self.update_ui_texts()
                 self.update_language_buttons()
@@ -523,10 +602,19 @@ class PEDAAutomationGUI:
     def _on_close(self):
         """关闭窗口时，等待处理线程正确结束再退出，确保浏览器资源被清理"""
         self.is_processing = False  # 通知线程停止
+        try:
+            self.function_controller.cancel_processing()
+            self.function_controller.cancel_excel_load()
+        except Exception:
+            pass
         t = getattr(self, 'processing_thread', None)
         if t is not None and t.is_alive():
             # 最多等待10秒，超时后强制退出
             t.join(timeout=10)
+        self.function_controller.stop_automation_service()
+        self.log_store.close()
+        self.upload_record_store.close()
+        shutdown_logging()
         self.root.destroy()
 
     def run(self):
@@ -0,0 +1,95 @@
+"""
+PEDA自动化处理工具 - 上传记录表格（分页）
+
+Treeview 中只包含当前页的记录（RECORDS_PAGE_SIZE 行），数据来自 UploadRecordStore。
+停在最后一页时自动跟随：新记录到达后只插入新增的行，页满后翻到新的一页；
+查看前面的页时只更新页数和总数，不重绘表格。
+"""
+
+from typing import Callable, Optional
+
+from config.constants import RECORDS_PAGE_SIZE
+from core.record_store import UploadRecordStore, FAILED_VALUES
+
+
+class UploadRecordsView:
+    """
+    分页的上传记录表格
+
+    Args:
+        tree: 显示用的 ttk.Treeview（列为 Date / Part_number / FileName / Success / Reason）
+        store: 上传记录存储
+        page_size: 每页行数
+        on_page_changed: 可选，页码或总数变化后的回调 (页码从1开始, 总页数, 记录总数)
+    """
+
+    def __init__(self, tree, store: UploadRecordStore, page_size: int = RECORDS_PAGE_SIZE,
+                 on_page_changed: Optional[Callable[[int, int, int], None]] = None):
+        self.tree = tree
+        self.store = store
+        self.page_size = max(1, page_size)
+        self.on_page_changed = on_page_changed
+        self.page = 0
+        self.total = 0
+        # 当前页已显示的行数和最后一行的记录ID（增量追加的起点）
+        self._page_rows = 0
+        self._last_id = 0
+        self._follow = True
+        tree.tag_configure('failed', foreground='#dc3545')
+
+    def page_count(self) -> int:
+        return max(1, (self.total + self.page_size - 1) // self.page_size)
+
+    def show_page(self, page: int):
+        """重绘指定页（页码从0开始，超出范围时取最近的一页）"""
+        self.total = self.store.count()
+        self.page = min(max(0, page), self.page_count() - 1)
+        self._follow = self.page == self.page_count() - 1
+        rows = self.store.page(self.page * self.page_size, self.page_size)
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._page_rows = 0
+        self._last_id = 0
+        self._insert(rows)
+        self._notify()
+
+    def next_page(self):
+        self.show_page(self.page + 1)
+
+    def previous_page(self):
+        self.show_page(self.page - 1)
+
+    def refresh(self):
+        """有新记录写入后调用：跟随最后一页时只插入新增的行"""
+        if not self._follow:
+            self.total = self.store.count()
+            self._notify()
+            return
+        free = self.page_size - self._page_rows
+        if free > 0:
+            self._insert(self.store.since(self._last_id, free))
+        self.total = self.store.count()
+        if self.total > (self.page + 1) * self.page_size:
+            # 当前页已满，翻到最新一页
+            self.show_page(self.page_count() - 1)
+        else:
+            self._notify()
+
+    def _insert(self, rows):
+        for record_id, *values in rows:
+            # 上传失败的记录用红色显示
+            tags = ('failed',) if values[3] in FAILED_VALUES else ()
+            self.tree.insert('', 'end', iid=str(record_id), values=values, tags=tags)
+        if rows:
+            self._page_rows += len(rows)
+            self._last_id = rows[-1][0]
+            if self._follow:
+                self.tree.see(str(self._last_id))
+
+    def _notify(self):
+        if self.on_page_changed is not None:
+            try:
+                self.on_page_changed(self.page + 1, self.page_count(), self.total)
+            except Exception:
+                pass
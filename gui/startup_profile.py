@@ -0,0 +1,247 @@
+"""
+PEDA自动化处理工具 - GUI 启动性能分析
+
+设置环境变量 PEDA_STARTUP_PROFILE=1 或以 --profile-startup 启动时，start.py 在导入 GUI 之前
+调用 enable()：
+- 替换 builtins.__import__，记录主线程中每个首次导入的模块的累计耗时和自身耗时
+  （源码运行和 PyInstaller 打包运行都适用，不依赖 python -X importtime）
+- phase() 记录各界面部分的构建耗时（可嵌套）
+- 窗口首次绘制（第一个 Expose 事件处理完）时恢复原来的导入函数，输出报告到控制台和
+  LOG_DIR/startup_<时间>.txt，并与目标耗时（源码 / 打包分别设定）比较
+
+未启用时 phase() 是空操作，mark_first_paint() 直接返回。
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from config.constants import (LOG_DIR, STARTUP_PROFILE_ENV, STARTUP_PROFILE_FLAG, STARTUP_TARGET_SOURCE_SECONDS,
+                              STARTUP_TARGET_FROZEN_SECONDS, STARTUP_PROFILE_TOP_IMPORTS)
+from modules.structured_log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _process_start_time() -> Optional[float]:
+    """
+    当前进程的创建时间（Unix 时间戳），取不到时返回 None
+
+    PyInstaller 单文件模式下这是解包后启动的子进程，解包耗时不计入。
+    """
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            creation, exit_time, kernel, user = (wintypes.FILETIME() for _ in range(4))
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.kernel32.GetProcessTimes(handle, ctypes.byref(creation), ctypes.byref(exit_time),
+                                                          ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            # FILETIME: 自 1601-01-01 起的 100 纳秒数
+            ticks = (creation.dwHighDateTime << 32) | creation.dwLowDateTime
+            return ticks / 10_000_000 - 11_644_473_600
+        if os.path.exists('/proc/self/stat'):
+            with open('/proc/self/stat', 'r') as handle:
+                # 进程名可能含空格，从最后一个 ')' 之后按字段取 starttime（第22个字段）
+                fields = handle.read().rsplit(')', 1)[1].split()
+            with open('/proc/stat', 'r') as handle:
+                boot_time = next(int(line.split()[1]) for line in handle if line.startswith('btime'))
+            return boot_time + int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except Exception:
+        return None
+    return None
+
+
+class StartupProfile:
+    """一次 GUI 启动的导入和构建耗时"""
+
+    def __init__(self):
+        self.frozen = bool(getattr(sys, 'frozen', False))
+        self.process_start = _process_start_time()
+        self.wall_t0 = time.time()
+        self.t0 = time.perf_counter()
+        # (模块名, 累计耗时, 自身耗时)，按导入完成顺序
+        self.imports: List[Tuple[str, float, float]] = []
+        # (阶段名, 嵌套深度, 耗时)，按开始顺序
+        self.phases: List[list] = []
+        self.first_paint: Optional[float] = None
+        self.report_path: Optional[str] = None
+        self._depth = 0
+        self._import_stack: List[float] = []
+        self._original_import = None
+        self._main_thread = threading.main_thread()
+
+    # ------------------------------------------------------------------ 导入计时
+    def install_import_hook(self):
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def remove_import_hook(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if threading.current_thread() is not self._main_thread:
+            return original(name, globals, locals, fromlist, level)
+        full_name = name
+        if level:
+            try:
+                full_name = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+            except (ImportError, ValueError):
+                return original(name, globals, locals, fromlist, level)
+        new = [full_name] if full_name not in sys.modules else []
+        for item in fromlist or ():
+            if item != '*' and f"{full_name}.{item}" not in sys.modules:
+                new.append(f"{full_name}.{item}")
+        if not new:
+            return original(name, globals, locals, fromlist, level)
+
+        self._import_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._import_stack.pop()
+            if self._import_stack:
+                self._import_stack[-1] += elapsed
+            loaded = [module for module in new if module in sys.modules]
+            if loaded:
+                self.imports.append((", ".join(loaded), elapsed, elapsed - children))
+
+    # ------------------------------------------------------------------ 阶段计时
+    @contextmanager
+    def phase(self, name: str):
+        entry = [name, self._depth, 0.0]
+        self.phases.append(entry)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry[2] = time.perf_counter() - start
+            self._depth -= 1
+            if self.first_paint is not None:
+                # 首次绘制之后的阶段（如首次打开的标签页）只写日志
+                logger.info("启动分析: %s %.1f ms", name, entry[2] * 1000)
+
+    # ------------------------------------------------------------------ 报告
+    def target_seconds(self) -> float:
+        return STARTUP_TARGET_FROZEN_SECONDS if self.frozen else STARTUP_TARGET_SOURCE_SECONDS
+
+    def mark_first_paint(self):
+        self.first_paint = time.perf_counter()
+        self.remove_import_hook()
+
+    def report(self) -> str:
+        target = self.target_seconds()
+        mode = "PyInstaller 打包" if self.frozen else "源码"
+        lines = ["=== GUI 启动性能分析 ===", f"运行方式: {mode}"]
+        if self.first_paint is not None:
+            since_entry = self.first_paint - self.t0
+            lines.append(f"Python 入口 → 首次绘制: {since_entry:.2f} s")
+            if self.process_start is not None:
+                total = self.wall_t0 - self.process_start + since_entry
+                status = "达标" if total <= target else "未达标"
+                lines.append(f"进程启动 → 首次绘制: {total:.2f} s（目标 {target:.1f} s，{status}）")
+            else:
+                status = "达标" if since_entry <= target else "未达标"
+                lines.append(f"（无法取得进程启动时间，按 Python 入口计算: 目标 {target:.1f} s，{status}）")
+
+        lines.append("构建阶段（ms）:")
+        for name, depth, duration in self.phases:
+            lines.append(f"  {'  ' * depth}{name:<{40 - 2 * depth}} {duration * 1000:>8.1f}")
+
+        lines.append(f"最慢的导入（累计 / 自身，ms），共 {len(self.imports)} 次首次导入:")
+        slowest = sorted(self.imports, key=lambda item: -item[1])[:STARTUP_PROFILE_TOP_IMPORTS]
+        for name, cumulative, own in slowest:
+            lines.append(f"  {name:<40} {cumulative * 1000:>8.1f} / {own * 1000:>7.1f}")
+        return "\n".join(lines)
+
+    def write_report(self, directory: Optional[str] = None) -> Optional[str]:
+        """报告写入 LOG_DIR/startup_<时间>.txt，返回路径（写入失败时返回 None）"""
+        directory = directory or os.path.join(os.getcwd(), LOG_DIR)
+        path = os.path.join(directory, f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write(self.report() + "\n")
+        except OSError as e:
+            logger.warning("启动分析报告写入失败: %s", e)
+            return None
+        self.report_path = path
+        return path
+
+
+_profile: Optional[StartupProfile] = None
+
+
+def requested(argv: Optional[List[str]] = None) -> bool:
+    """命令行参数或环境变量是否要求启动分析"""
+    argv = sys.argv if argv is None else argv
+    return STARTUP_PROFILE_FLAG in argv or os.environ.get(STARTUP_PROFILE_ENV, '') not in ('', '0')
+
+
+def enable() -> StartupProfile:
+    """开始启动分析（应在导入 GUI 模块之前调用）"""
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+        _profile.install_import_hook()
+    return _profile
+
+
+def get_profile() -> Optional[StartupProfile]:
+    return _profile
+
+
+@contextmanager
+def phase(name: str):
+    """记录一个构建阶段的耗时（未启用启动分析时为空操作）"""
+    if _profile is None:
+        yield
+        return
+    with _profile.phase(name):
+        yield
+
+
+def mark_first_paint(root):
+    """
+    窗口显示后调用：第一个 Expose 事件之后、待绘制的内容处理完时记为首次绘制，输出报告
+
+    Args:
+        root: Tk 根窗口
+    """
+    profile = _profile
+    if profile is None:
+        return
+    state = {}
+
+    def finish():
+        root.update_idletasks()
+        profile.mark_first_paint()
+        path = profile.write_report()
+        print(profile.report())
+        if path:
+            print(f"启动分析报告: {path}")
+
+    def on_expose(event=None):
+        if state.get('done'):
+            return
+        state['done'] = True
+        root.unbind('<Expose>', state['binding'])
+        root.after_idle(finish)
+
+    state['binding'] = root.bind('<Expose>', on_expose, add='+')
@@ -6,7 +6,20 @@ PEDA自动化处理工具 - UI组件模块
 import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
+from config.constants import LOG_FILTER_LEVELS
 from .languages import get_text
+from . import startup_profile
+from .log_store import VirtualLogView
+from .records_view import UploadRecordsView
+
+# 上传记录表格的列（与 UploadRecordStore 的字段顺序一致）和对应的语言键、列宽
+RECORD_TABLE_COLUMNS = [
+    ('Date', 'record_col_date', 140),
+    ('Part_number', 'record_col_part', 120),
+    ('FileName', 'record_col_file', 260),
+    ('Success', 'record_col_success', 60),
+    ('Reason', 'record_col_reason', 220),
+]
 
 
 class UIComponentManager:
@@ -89,7 +102,7 @@ class UIComponentManager:
         self.app.zh_btn.pack(side=tk.LEFT, padx=(3, 0))
 
     def create_content_area(self):
-        """创建内容区域"""
+        """创建内容区域（只构建主页面，其余标签页首次切换到时再构建）"""
         self.app.notebook = ttk.Notebook(self.app.main_container)
         self.app.notebook.pack(fill=tk.BOTH, expand=True)
         
@@ -98,15 +111,26 @@ class UIComponentManager:
         self.app.notebook.add(self.app.main_tab, text="Main")
         self.create_main_tab_content()
         
-        # 使用说明页面
-        self.app.instructions_tab = tk.Frame(self.app.notebook, bg=self.colors['white'])
-        self.app.notebook.add(self.app.instructions_tab, text="Instructions")
-        self.create_instructions_tab_content()
-        
-        # 日志页面
-        self.app.log_tab = tk.Frame(self.app.notebook, bg=self.colors['white'])
-        self.app.notebook.add(self.app.log_tab, text="Logs")
-        self.create_log_tab_content()
+        # 使用说明、日志、上传记录页面：先添加空白页，内容延迟构建
+        self._pending_tabs = {}
+        for attr, title, builder in (
+                ('instructions_tab', "Instructions", self.create_instructions_tab_content),
+                ('log_tab', "Logs", self.create_log_tab_content),
+                ('records_tab', "Upload Records", self.create_records_tab_content)):
+            frame = tk.Frame(self.app.notebook, bg=self.colors['white'])
+            setattr(self.app, attr, frame)
+            self.app.notebook.add(frame, text=title)
+            self._pending_tabs[str(frame)] = (attr, builder)
+        self.app.notebook.bind('<<NotebookTabChanged>>', lambda event: self.build_tab(self.app.notebook.select()))
+    
+    def build_tab(self, tab):
+        """构建尚未创建内容的标签页（tab 为标签页控件或其路径名，已构建时直接返回）"""
+        pending = self._pending_tabs.pop(str(tab), None)
+        if pending is None:
+            return
+        attr, builder = pending
+        with startup_profile.phase(f'build {attr}'):
+            builder()
 
     def create_instructions_tab_content(self):
         """创建使用说明页面内容"""
@@ -210,11 +234,13 @@ class UIComponentManager:
         content_frame.pack(fill=tk.BOTH, expand=True)
         
         # 创建各个区域，优化间距
-        self.create_login_section(content_frame)
-        self.create_file_selection_section(content_frame)
-        self.create_operation_control_section(content_frame)
-        self.create_progress_section(content_frame)
-        self.create_record_management_section(content_frame)
+        for name, create_section in (('login_section', self.create_login_section),
+                                     ('file_selection_section', self.create_file_selection_section),
+                                     ('operation_control_section', self.create_operation_control_section),
+                                     ('progress_section', self.create_progress_section),
+                                     ('record_management_section', self.create_record_management_section)):
+            with startup_profile.phase(name):
+                create_section(content_frame)
         
     def create_login_section(self, parent):
         """创建登录信息区域"""
@@ -304,6 +330,13 @@ class UIComponentManager:
                                                   selectcolor=self.colors['white'])
         self.app.headless_mode_cb.pack(side=tk.LEFT, padx=(15, 0))
         
+        self.app.resume_run_cb = tk.Checkbutton(left_options, text=get_text(self.app.current_language, 'resume_run'),
+                                               variable=self.app.resume_run_var,
+                                               bg=self.colors['neutral_100'], fg=self.colors['neutral_600'],
+                                               font=('微软雅黑', 10), activebackground=self.colors['neutral_100'],
+                                               selectcolor=self.colors['white'])
+        self.app.resume_run_cb.pack(side=tk.LEFT, padx=(15, 0))
+        
         # 登录按钮 - 统一按钮样式，设置固定宽度
         self.app.save_settings_btn = tk.Button(options_frame, text=get_text(self.app.current_language, 'login'),
                                           font=('微软雅黑', 10, 'bold'), 
@@ -400,6 +433,14 @@ class UIComponentManager:
                                      height=1, width=15, state='disabled')
         self.app.generate_folder_btn.pack(side=tk.RIGHT, padx=(8, 0))
         
+        # 补全子文件夹：已存在的件号文件夹也创建缺少的类别子文件夹
+        self.app.fill_subfolders_cb = tk.Checkbutton(document_frame, text=get_text(self.app.current_language, 'fill_subfolders'),
+                                                     variable=self.app.fill_subfolders_var,
+                                                     bg=self.colors['neutral_100'], fg=self.colors['neutral_600'],
+                                                     font=('微软雅黑', 10), activebackground=self.colors['neutral_100'],
+                                                     selectcolor=self.colors['white'])
+        self.app.fill_subfolders_cb.pack(side=tk.RIGHT, padx=(8, 0))
+        
         # 选择路径按钮 - 放在生成文件夹按钮左边
         self.app.document_btn = tk.Button(document_frame, text=get_text(self.app.current_language, 'choose_folder'),
                                      font=('微软雅黑', 10, 'bold'), bg=self.colors['primary'],
@@ -577,19 +618,88 @@ class UIComponentManager:
                  padx=15, pady=5, command=self.app.clear_log)
         self.app.clear_log_btn.pack(side=tk.RIGHT)
         
-        # 日志文本区域
+        # 日志筛选栏（级别 + 关键字，基于日志索引筛选，不扫描控件文本）
+        log_filter = tk.Frame(log_container, bg=self.colors['white'])
+        log_filter.pack(fill=tk.X, pady=(0, 5))
+        
+        self.app.log_level_label = tk.Label(log_filter, text=get_text(self.app.current_language, 'log_level_filter'),
+                                            bg=self.colors['white'], font=('微软雅黑', 10))
+        self.app.log_level_label.pack(side=tk.LEFT)
+        all_levels = get_text(self.app.current_language, 'log_all_levels')
+        self.app.log_level_var = tk.StringVar(value=all_levels)
+        self.app.log_level_combo = ttk.Combobox(log_filter, textvariable=self.app.log_level_var,
+                                                values=[all_levels] + LOG_FILTER_LEVELS,
+                                                state='readonly', width=10)
+        self.app.log_level_combo.pack(side=tk.LEFT, padx=(5, 15))
+        self.app.log_level_combo.bind('<<ComboboxSelected>>', lambda event: self.app.function_controller.apply_log_filter())
+        
+        self.app.log_search_label = tk.Label(log_filter, text=get_text(self.app.current_language, 'log_search'),
+                                             bg=self.colors['white'], font=('微软雅黑', 10))
+        self.app.log_search_label.pack(side=tk.LEFT)
+        self.app.log_search_var = tk.StringVar()
+        log_search_entry = tk.Entry(log_filter, textvariable=self.app.log_search_var,
+                                    font=('微软雅黑', 10), width=30)
+        log_search_entry.pack(side=tk.LEFT, padx=(5, 15))
+        log_search_entry.bind('<KeyRelease>', lambda event: self.app.function_controller.schedule_log_filter())
+        
+        self.app.log_count_label = tk.Label(log_filter, text="", bg=self.colors['white'],
+                                            fg=self.colors['dark'], font=('微软雅黑', 9))
+        self.app.log_count_label.pack(side=tk.RIGHT)
+        
+        # 日志文本区域（虚拟化：控件中只有可见的几行，内容由 log_view 按滚动位置渲染）
         log_frame = tk.Frame(log_container, bg=self.colors['white'], relief='solid', bd=1)
         log_frame.pack(fill=tk.BOTH, expand=True)
         
         self.app.log_text = tk.Text(log_frame, font=('微软雅黑', 10), 
                                bg=self.colors['white'], fg=self.colors['dark'],
-                               wrap=tk.WORD, state='disabled')
+                               wrap=tk.NONE, state='disabled')
         
-        log_scrollbar = ttk.Scrollbar(log_frame, command=self.app.log_text.yview)
-        self.app.log_text.configure(yscrollcommand=log_scrollbar.set)
+        log_scrollbar = ttk.Scrollbar(log_frame)
+        log_xscrollbar = ttk.Scrollbar(log_frame, orient=tk.HORIZONTAL, command=self.app.log_text.xview)
+        self.app.log_text.configure(xscrollcommand=log_xscrollbar.set)
         
-        self.app.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         log_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        log_xscrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.app.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.app.log_view = VirtualLogView(self.app.log_text, log_scrollbar, self.app.log_store,
+                                           on_filter_changed=self.app.function_controller.update_log_count)
+        
+    def create_records_tab_content(self):
+        """创建上传记录页面内容（分页表格，数据来自上传记录存储）"""
+        records_container = tk.Frame(self.app.records_tab, bg=self.colors['white'])
+        records_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # 翻页栏
+        records_control = tk.Frame(records_container, bg=self.colors['white'])
+        records_control.pack(fill=tk.X, pady=(0, 5))
+        
+        tk.Button(records_control, text="◀", font=('微软雅黑', 10), width=3,
+                  command=lambda: self.app.records_view.previous_page()).pack(side=tk.LEFT)
+        self.app.records_page_label = tk.Label(records_control, text="", bg=self.colors['white'],
+                                               fg=self.colors['dark'], font=('微软雅黑', 10))
+        self.app.records_page_label.pack(side=tk.LEFT, padx=10)
+        tk.Button(records_control, text="▶", font=('微软雅黑', 10), width=3,
+                  command=lambda: self.app.records_view.next_page()).pack(side=tk.LEFT)
+        
+        # 记录表格
+        records_frame = tk.Frame(records_container, bg=self.colors['white'], relief='solid', bd=1)
+        records_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = [name for name, _, _ in RECORD_TABLE_COLUMNS]
+        self.app.records_tree = ttk.Treeview(records_frame, columns=columns, show='headings')
+        for name, text_key, width in RECORD_TABLE_COLUMNS:
+            self.app.records_tree.heading(name, text=get_text(self.app.current_language, text_key))
+            self.app.records_tree.column(name, width=width, stretch=(name in ('FileName', 'Reason')))
+        
+        records_scrollbar = ttk.Scrollbar(records_frame, command=self.app.records_tree.yview)
+        self.app.records_tree.configure(yscrollcommand=records_scrollbar.set)
+        records_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.app.records_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.app.records_view = UploadRecordsView(self.app.records_tree, self.app.upload_record_store,
+                                                  on_page_changed=self.app.function_controller.update_records_page_info)
+        self.app.records_view.show_page(0)
         
     def create_status_bar(self):
         """创建状态栏"""
@@ -2,13 +2,16 @@ import os
 from playwright.sync_api import sync_playwright
 
 # 导入所需模块
-from modules.data_processor import read_excel_data, select_excel_file, validate_excel_data
+from modules.data_processor import read_excel_data, select_excel_file, validate_excel_data, log_invalid_rows
 from core.workflow_engine import run
+from modules.structured_log import configure_logging
 from config.constants import REQUIRED_COLUMNS
 
 
 def main():
     """主函数，读取Excel数据并处理每一行"""
+    # 处理模块的日志同时输出到控制台（INFO 以上）和 logs/peda.jsonl
+    configure_logging(console=True)
     print("=== PEDA 自动化处理工具 ===")
     print("请选择包含PEDA数据的Excel文件...")
     
@@ -49,6 +52,8 @@ def main():
 
         qualified_df = validation_result['qualified_df']
 
+        log_invalid_rows(validation_result, lambda message, level: print(message))
+
         if qualified_df.empty:
             print("错误: Excel文件中没有合格的数据行可处理")
             print(f"总共 {validation_result['total_rows']} 行，合格 {validation_result['qualified_rows_count']} 行。")
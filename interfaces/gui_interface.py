@@ -2,13 +2,20 @@
 注意：为加快GUI冷启动，避免在模块导入阶段加载重量级依赖。
 所有重量级依赖（playwright/pandas 等）均在函数体内按需导入。"""
 
+import os
+
+from modules.structured_log import get_logger
+
+logger = get_logger(__name__)
+
 
 def run_with_gui_params_v2(excel_path: str, document_path: str, username: str, password: str, 
                           system_language: str = 'en', progress_callback=None, log_callback=None, 
                           upload_record_callback=None, login_url=None, 
                           browser_path=None, preferred_browser="auto", browser_finder=None,
-                          headless: bool = False):
-    print(f"[DEBUG] run_with_gui_params_v2 called with excel_path={excel_path}, document_path={document_path}, username={username}, password={password}, system_language={system_language}, login_url={login_url}, browser_path={browser_path}, preferred_browser={preferred_browser}")
+                          headless: bool = False, resume: bool = False, cancel_token=None,
+                          max_workers: int = 1, part_order=None, metrics_port: int = 0,
+                          span_listener=None, automation_service=None):
     """
     从GUI调用的主要处理函数（浏览器复用版本）
     
@@ -28,13 +35,27 @@ def run_with_gui_params_v2(excel_path: str, document_path: str, username: str, p
         preferred_browser: 首选浏览器类型 ("chrome", "msedge", "auto")
         browser_finder: 预热的浏览器查找器实例（可选，用于加速启动）
         headless: 是否以Headless模式运行浏览器
+        resume: 是否按断点日志续跑（跳过已完成件号）
+        cancel_token: 取消令牌（CancellationToken），GUI点击停止时取消
+        max_workers: 最多同时运行的浏览器数，大于1时使用并行引擎（按服务器延迟自动调整）
+        part_order: 件号处理顺序策略（excel / longest_first / shortest_first），为空时使用引擎默认值
+        metrics_port: 运行指标 HTTP 端口（Prometheus 格式，0 表示不开端点，批次结束仍写快照文件）
+        span_listener: 步骤区间结束回调（可选），如把件号耗时写入上传记录存储的 PartTimingRecorder
+        automation_service: 常驻自动化服务（可选），单浏览器模式下批次交给它用预先登录的浏览器执行
     """
     try:
         # 延迟导入，避免主GUI启动变慢
         from playwright.sync_api import sync_playwright
-        from modules.data_processor import read_excel_data, validate_excel_data
+        from modules.data_processor import read_excel_data, validate_excel_data, log_invalid_rows
         from core.workflow_engine import run_batch_with_reuse
-        from config.constants import REQUIRED_COLUMNS
+        from core.parallel_engine import run_batch_parallel
+        from core.checkpoint_journal import default_journal_path
+        from modules.tracing import default_trace_path, combine_listeners
+        from core.metrics import BatchMetrics, MetricsServer, default_metrics_path
+        from core.run_history import open_run_history
+        from gui.automation_service import AutomationServiceUnavailable
+        from config import constants
+        from config.constants import REQUIRED_COLUMNS, PLAYWRIGHT_TRACE_DIR
 
         if log_callback:
             log_callback("=== PEDA 自动化处理开始（浏览器复用模式）===")
@@ -69,6 +90,9 @@ def run_with_gui_params_v2(excel_path: str, document_path: str, username: str, p
             return False
 
         qualified_df = validation_result['qualified_df']
+
+        if log_callback:
+            log_invalid_rows(validation_result, log_callback)
         
         if qualified_df.empty:
             if log_callback:
@@ -83,26 +107,108 @@ def run_with_gui_params_v2(excel_path: str, document_path: str, username: str, p
         # 转换DataFrame为字典列表
         data_rows = qualified_df.to_dict('records')
         
-        # 调用批量处理函数（浏览器复用）
-        print("[DEBUG] about to call run_batch_with_reuse")
-        with sync_playwright() as playwright:
-            result = run_batch_with_reuse(
-                playwright=playwright,
-                data_rows=data_rows,
-                document_path=document_path,  # 传递文档路径
-                username=username,
-                password=password,
-                system_language=system_language,
-                progress_callback=progress_callback,
-                log_callback=log_callback,
-                upload_record_callback=upload_record_callback,
-                login_url=login_url,
-                browser_path=browser_path,
-                preferred_browser=preferred_browser,
-                browser_finder=browser_finder,  # 传递预热的 browser_finder
-                headless=headless
-            )
-        print(f"[DEBUG] run_batch_with_reuse returned: {result}")
+        batch_args = dict(
+            data_rows=data_rows,
+            document_path=document_path,  # 传递文档路径
+            username=username,
+            password=password,
+            system_language=system_language,
+            progress_callback=progress_callback,
+            log_callback=log_callback,
+            upload_record_callback=upload_record_callback,
+            login_url=login_url,
+            browser_path=browser_path,
+            preferred_browser=preferred_browser,
+            browser_finder=browser_finder,  # 传递预热的 browser_finder
+            headless=headless,
+            journal_path=default_journal_path(excel_path),
+            resume=resume,
+            cancel_token=cancel_token,
+            trace_path=default_trace_path(excel_path),
+            failure_trace_dir=os.path.join(os.getcwd(), PLAYWRIGHT_TRACE_DIR),
+            span_listener=span_listener
+        )
+        if part_order:
+            batch_args['part_order'] = part_order
+
+        # 运行历史：批次配置和结果、每个件号的步骤耗时写入本地数据库（python -m core.run_history 查看）
+        history = open_run_history()
+        batch_id = None
+        if history is not None:
+            batch_id = history.begin_batch(
+                config={
+                    'max_workers': max_workers,
+                    'part_order': part_order,
+                    'headless': headless,
+                    'resume': resume,
+                    'system_language': system_language,
+                    'preferred_browser': preferred_browser,
+                    'warm_browser': automation_service is not None and max_workers <= 1,
+                    'tuning': {name: getattr(constants, name) for name in (
+                        'RETRY_MAX_ATTEMPTS', 'RETRY_BASE_DELAY_SECONDS', 'RETRY_MAX_DELAY_SECONDS',
+                        'AIMD_DECREASE_FACTOR', 'AIMD_SLOWDOWN_RATIO', 'AIMD_WINDOW_PARTS',
+                        'BROWSER_MAX_RECOVERIES')},
+                },
+                source=excel_path,
+                engine='parallel' if max_workers > 1 else 'reuse',
+                total=total_rows)
+            batch_args['span_listener'] = combine_listeners(span_listener, history.recorder(batch_id))
+
+        # 运行指标：可选的本地 /metrics 端点，批次结束后写快照文件
+        metrics = BatchMetrics()
+        batch_args['metrics'] = metrics
+        metrics_server = None
+        if metrics_port:
+            try:
+                metrics_server = MetricsServer(metrics, metrics_port).start()
+                if log_callback:
+                    log_callback(f"📈 运行指标: {metrics_server.url}")
+            except OSError as e:
+                if log_callback:
+                    log_callback(f"⚠️ 运行指标端口 {metrics_port} 无法使用: {e}", "WARNING")
+
+        result = None
+        try:
+            if max_workers > 1:
+                # 并行引擎：每个工作线程各自启动 Playwright 和浏览器
+                result = run_batch_parallel(max_workers=max_workers, **batch_args)
+            else:
+                batch_done = False
+                if automation_service is not None:
+                    # 常驻服务线程持有 Playwright 和已登录的浏览器，批次在该线程中执行
+                    try:
+                        result = automation_service.run_batch(**batch_args)
+                        batch_done = True
+                    except AutomationServiceUnavailable as e:
+                        # 服务在启动中失败（批次没有执行），改为临时启动浏览器
+                        if log_callback:
+                            log_callback(f"⚠️ {e}，改为临时启动浏览器", "WARNING")
+                if not batch_done:
+                    # 调用批量处理函数（浏览器复用）
+                    logger.debug("about to call run_batch_with_reuse")
+                    with sync_playwright() as playwright:
+                        result = run_batch_with_reuse(playwright=playwright, **batch_args)
+        finally:
+            if history is not None:
+                try:
+                    history.finish_batch(batch_id, result)
+                    if log_callback:
+                        log_callback(f"运行历史: 批次 #{batch_id}（python -m core.run_history 查看吞吐量和失败热点）")
+                except Exception as e:
+                    logger.warning("写入运行历史失败: %s", e)
+                finally:
+                    history.close()
+            if metrics_server is not None:
+                metrics_server.stop()
+            try:
+                metrics_path = default_metrics_path(excel_path)
+                metrics.write_snapshot(metrics_path)
+                if log_callback:
+                    log_callback(f"运行指标快照: {metrics_path}")
+            except OSError as e:
+                if log_callback:
+                    log_callback(f"⚠️ 运行指标快照写入失败: {e}", "WARNING")
+        logger.debug("batch returned: %s", result)
         
         # 分析处理结果
         success_rate = result['success'] / result['total'] * 100 if result['total'] > 0 else 0
@@ -111,7 +217,9 @@ def run_with_gui_params_v2(excel_path: str, document_path: str, username: str, p
             log_callback(f"\n=== 最终处理结果 ===")
             log_callback(f"成功率: {success_rate:.1f}% ({result['success']}/{result['total']})")
             
-            if result['success'] == result['total']:
+            if result.get('cancelled'):
+                log_callback("⏹️ 处理已停止，已完成的件号不受影响", "WARNING")
+            elif result['success'] == result['total']:
                 log_callback("🎉 所有件号处理成功！", "SUCCESS")
             elif result['success'] > 0:
                 log_callback(f"⚠️ 部分完成，建议检查失败的件号", "WARNING")
@@ -121,9 +229,7 @@ def run_with_gui_params_v2(excel_path: str, document_path: str, username: str, p
         # 返回完整统计字典，供GUI显示
         return result
     except Exception as e:
-        print(f"[DEBUG] Exception in run_with_gui_params_v2: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("run_with_gui_params_v2 failed: %s", e)
         if log_callback:
             log_callback(f"❌ 处理过程中发生严重错误: {str(e)}", "ERROR")
         return False
@@ -131,7 +237,7 @@ def run_with_gui_params_v2(excel_path: str, document_path: str, username: str, p
 
 def run_with_gui_params(excel_path: str, document_path: str, username: str, password: str, 
                        system_language: str = 'en', progress_callback=None, log_callback=None,
-                       headless: bool = False):
+                       headless: bool = False, cancel_token=None):
     """
     从GUI调用的主要处理函数（原版本，保持向后兼容）
     
@@ -143,11 +249,12 @@ def run_with_gui_params(excel_path: str, document_path: str, username: str, pass
         system_language: 系统语言 ('en' 或 'de')
         progress_callback: 进度回调函数
         log_callback: 日志回调函数
+        cancel_token: 取消令牌（CancellationToken），在件号之间检查
     """
     try:
         # 延迟导入，避免主GUI启动变慢
         from playwright.sync_api import sync_playwright
-        from modules.data_processor import read_excel_data, validate_excel_data
+        from modules.data_processor import read_excel_data, validate_excel_data, log_invalid_rows
         from core.workflow_engine import run
         from config.constants import REQUIRED_COLUMNS
 
@@ -185,6 +292,9 @@ def run_with_gui_params(excel_path: str, document_path: str, username: str, pass
 
         qualified_df = validation_result['qualified_df']
 
+        if log_callback:
+            log_invalid_rows(validation_result, log_callback)
+
         if qualified_df.empty:
             if log_callback:
                 log_callback("错误: Excel文件中没有合格的数据行可处理", "ERROR")
@@ -201,6 +311,10 @@ def run_with_gui_params(excel_path: str, document_path: str, username: str, pass
         # 遍历每行数据执行操作
         with sync_playwright() as playwright:
             for index, row in qualified_df.iterrows():
+                if cancel_token is not None and cancel_token.cancelled:
+                    if log_callback:
+                        log_callback("⏹️ 处理被用户停止", "WARNING")
+                    break
                 current_part = row['part_number']
                 
                 if log_callback:
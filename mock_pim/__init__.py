@@ -0,0 +1,14 @@
+"""
+本地模拟 PIM WebUI 服务和端到端基准测试
+
+- config: 延迟预设和服务配置
+- faults: 带随机种子的故障注入场景
+- server: MockPimServer（标准库 HTTP 服务，DOM 与 modules/ 的选择器一致）
+- benchmark: 对模拟服务运行串行/并行引擎并统计吞吐量和步骤耗时
+"""
+
+from .config import MockPimConfig, LATENCY_PROFILES
+from .faults import FaultRule, FaultScenario
+from .server import MockPimServer
+
+__all__ = ['MockPimConfig', 'LATENCY_PROFILES', 'FaultRule', 'FaultScenario', 'MockPimServer']
@@ -0,0 +1,268 @@
+"""
+端到端基准测试：对本地模拟 PIM 服务运行批量流程
+
+生成临时文档目录和数据行，启动 MockPimServer，用指定的引擎配置（串行 / 并行、
+工作线程数、件号排序策略、延迟预设）处理全部件号，最后报告每小时处理件号数和
+每个步骤的 p50/p95 耗时（来自 tracing 导出的 JSONL）。
+
+用法:
+    python -m mock_pim.benchmark --parts 20 --workers 4 --profile fast --headless
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from config.constants import DOCUMENT_CATEGORIES, PART_ORDER_EXCEL, PART_ORDER_POLICIES
+from .config import MockPimConfig, LATENCY_PROFILES, DEFAULT_LATENCY_PROFILE
+from .faults import FaultScenario
+from .server import MockPimServer, CONTACTS, REGIONS
+
+
+def build_workload(root: str, parts: int, categories: int = 2, files_per_category: int = 1,
+                   file_kb: int = 64) -> List[Dict[str, Any]]:
+    """
+    在 root 下生成文档目录（root/<件号>/<类别>/文件）并返回对应的数据行
+
+    件号之间的文件数量轮流变化，便于观察排序策略的效果。
+    """
+    categories = max(1, min(categories, len(DOCUMENT_CATEGORIES)))
+    payload = os.urandom(1024)
+    data_rows = []
+    for index in range(parts):
+        part_number = f"MOCK{index + 1:05d}"
+        file_count = max(1, files_per_category * (1 + index % 3))
+        for category in DOCUMENT_CATEGORIES[:categories]:
+            category_dir = os.path.join(root, part_number, category)
+            os.makedirs(category_dir, exist_ok=True)
+            for file_index in range(file_count):
+                with open(os.path.join(category_dir, f"doc_{file_index + 1}.pdf"), 'wb') as handle:
+                    for _ in range(max(1, file_kb)):
+                        handle.write(payload)
+        data_rows.append({
+            'part_number': part_number,
+            'contact': CONTACTS[0],
+            'project_type': str(1 + index % 9),
+            'reason': str(1 + index % 999),
+            'sample_quantity': '10',
+            'decision_region': REGIONS[index % len(REGIONS)],
+            'decision_value': '10',
+            'external_info': f"Benchmark {part_number}",
+            'internal_comment': '',
+        })
+    return data_rows
+
+
+def check_pedas(document_path: str, data_rows: List[Dict[str, Any]], pedas: Dict[str, Any]) -> Dict[str, str]:
+    """
+    核对服务端状态：每个件号都应有一个已保存、已验证且包含全部文件的 PEDA
+
+    Returns:
+        Dict[str, str]: 不完整的件号 -> 原因（全部完整时为空）
+    """
+    problems = {}
+    for row in data_rows:
+        part_number = row['part_number']
+        expected = {}
+        part_dir = os.path.join(document_path, part_number)
+        for category in DOCUMENT_CATEGORIES:
+            category_dir = os.path.join(part_dir, category)
+            if os.path.isdir(category_dir):
+                expected[category] = set(os.listdir(category_dir))
+        records = [peda for peda in pedas.values() if peda['part_number'] == part_number]
+        if not records:
+            problems[part_number] = '没有创建 PEDA'
+            continue
+        reasons = []
+        for peda in records:
+            missing = sorted(f"{category}/{name}" for category, names in expected.items()
+                             for name in names - set(peda['uploads'].get(category, [])))
+            if not missing and peda['saved'] and peda['validated']:
+                reasons = []
+                break
+            reasons.append(f"{peda['id']}: " + ", ".join(
+                ([] if peda['saved'] else ['未保存']) + ([] if peda['validated'] else ['未验证']) +
+                ([f"缺少 {len(missing)} 个文件"] if missing else [])))
+        if reasons:
+            problems[part_number] = '; '.join(reasons)
+    return problems
+
+
+def _default_browser_path() -> Optional[str]:
+    """优先使用 Playwright 自带的 Chromium（基准测试机器上通常没有安装 Chrome/Edge）"""
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as playwright:
+            path = playwright.chromium.executable_path
+        return path if path and os.path.exists(path) else None
+    except Exception:
+        return None
+
+
+def run_benchmark(parts: int = 10, workers: int = 1, profile: str = DEFAULT_LATENCY_PROFILE,
+                  part_order: str = PART_ORDER_EXCEL, categories: int = 2,
+                  files_per_category: int = 1, file_kb: int = 64, headless: bool = True,
+                  browser_path: Optional[str] = None, latency: Optional[Dict[str, float]] = None,
+                  keep_files: bool = False, faults: Optional[FaultScenario] = None,
+                  log_callback=None) -> Dict[str, Any]:
+    """
+    运行一次基准测试
+
+    Args:
+        parts: 件号数量
+        workers: 工作线程数，1 为串行引擎，大于 1 为并行引擎
+        profile: 延迟预设
+        part_order: 件号排序策略
+        categories: 每个件号有文件的类别数
+        files_per_category: 每个类别的基础文件数
+        file_kb: 每个文件大小（KB）
+        headless: 是否无头模式
+        browser_path: 浏览器路径，为空时使用 Playwright 自带的 Chromium
+        latency: 覆盖个别接口延迟（毫秒）
+        keep_files: 保留临时目录（文档、追踪文件）便于排查
+        faults: 故障注入场景，为空时不注入故障
+        log_callback: 日志回调 log(message, level)，为空时打印
+
+    Returns:
+        Dict: 配置、引擎结果、耗时、每小时件号数、每步骤耗时统计、服务端请求计数、
+              已注入的故障及每次注入的明细（相对开始的秒数、件号、类型、接口）、
+              服务端核对出的不完整件号
+    """
+    from core.workflow_engine import run_batch_with_reuse
+    from core.parallel_engine import run_batch_parallel
+    from modules.tracing import load_trace_summary
+
+    def log(message: str, level: str = "INFO"):
+        if log_callback:
+            log_callback(message, level)
+        else:
+            print(f"[{level}] {message}")
+
+    work_dir = tempfile.mkdtemp(prefix='peda_benchmark_')
+    document_path = os.path.join(work_dir, 'documents')
+    trace_path = os.path.join(work_dir, 'trace')
+    data_rows = build_workload(document_path, parts, categories, files_per_category, file_kb)
+    browser_path = browser_path or _default_browser_path()
+
+    config = MockPimConfig(profile, latency=latency, faults=faults)
+    server = MockPimServer(config).start()
+    log(f"模拟 PIM 服务: {server.login_url}（延迟预设 {profile}）")
+    try:
+        batch_args = dict(
+            data_rows=data_rows,
+            document_path=document_path,
+            username='benchmark',
+            password='benchmark',
+            log_callback=log,
+            login_url=server.login_url,
+            browser_path=browser_path,
+            headless=headless,
+            part_order=part_order,
+            trace_path=trace_path,
+        )
+        started = time.perf_counter()
+        started_at = time.time()
+        if workers > 1:
+            result = run_batch_parallel(max_workers=workers, **batch_args)
+        else:
+            from playwright.sync_api import sync_playwright
+            with sync_playwright() as playwright:
+                result = run_batch_with_reuse(playwright, **batch_args)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.stop()
+
+    snapshot = server.state.snapshot()
+    trace_file = f"{trace_path}.jsonl"
+    steps = load_trace_summary(trace_file) if os.path.exists(trace_file) else {}
+    report = {
+        'config': {
+            'parts': parts, 'workers': workers, 'profile': profile, 'part_order': part_order,
+            'categories': categories, 'files_per_category': files_per_category, 'file_kb': file_kb,
+            'headless': headless,
+        },
+        'result': {key: value for key, value in result.items() if key != 'failures'},
+        'elapsed_seconds': round(elapsed, 2),
+        'parts_per_hour': round(result.get('success', 0) * 3600 / elapsed, 1) if elapsed > 0 else 0.0,
+        'steps': steps,
+        'server': snapshot['request_counts'],
+        'incomplete_parts': check_pedas(document_path, data_rows, snapshot['pedas']),
+        'faults': config.faults.summary(),
+        'fault_events': [
+            {'at': round(event['time'] - started_at, 1), 'part': event['part'], 'kind': event['kind'],
+             'endpoint': event['endpoint']}
+            for event in config.faults.injected
+        ],
+        'work_dir': work_dir if keep_files else None,
+    }
+    if not keep_files:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """把基准测试结果格式化为便于阅读的文本"""
+    config = report['config']
+    result = report['result']
+    lines = [
+        "=== 基准测试结果 ===",
+        f"配置: {config['parts']} 个件号，{config['workers']} 个工作线程，延迟预设 {config['profile']}，"
+        f"排序 {config['part_order']}",
+        f"结果: 成功 {result.get('success', 0)}，失败 {result.get('failed', 0)}，跳过 {result.get('skipped', 0)}",
+        f"总耗时: {report['elapsed_seconds']:.1f} 秒，吞吐量: {report['parts_per_hour']:.1f} 件/小时",
+        "步骤耗时（秒）:",
+    ]
+    for name, stats in sorted(report['steps'].items(), key=lambda item: -item[1]['p50'] * item[1]['count']):
+        lines.append(f"  {name:<14} {stats['count']:>5} 次  p50 {stats['p50']:>7.2f}  p95 {stats['p95']:>7.2f}"
+                     f"  最大 {stats['max']:>7.2f}  失败 {stats['failed']}")
+    if report.get('faults'):
+        lines.append("已注入故障: " + ", ".join(f"{kind}={count}" for kind, count in sorted(report['faults'].items())))
+        for event in report.get('fault_events', []):
+            endpoint = f"/{event['endpoint']}" if event['endpoint'] else ''
+            lines.append(f"  {event['at']:>7.1f}s  {event['part'] or '-':<12} {event['kind']}{endpoint}")
+    lines.append("服务端请求: " + ", ".join(f"{route}={count}" for route, count in sorted(report['server'].items())))
+    incomplete = report.get('incomplete_parts') or {}
+    if incomplete:
+        lines.append(f"服务端核对: {len(incomplete)} 个件号的 PEDA 不完整")
+        lines.extend(f"  {part_number}: {reason}" for part_number, reason in sorted(incomplete.items()))
+    else:
+        lines.append("服务端核对: 所有件号的 PEDA 均已保存、验证且文件齐全")
+    if report.get('work_dir'):
+        lines.append(f"临时目录: {report['work_dir']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='对模拟 PIM 服务运行端到端基准测试')
+    parser.add_argument('--parts', type=int, default=10, help='件号数量')
+    parser.add_argument('--workers', type=int, default=1, help='工作线程数（1 为串行引擎）')
+    parser.add_argument('--profile', choices=sorted(LATENCY_PROFILES), default=DEFAULT_LATENCY_PROFILE)
+    parser.add_argument('--order', choices=PART_ORDER_POLICIES, default=PART_ORDER_EXCEL, help='件号排序策略')
+    parser.add_argument('--categories', type=int, default=2, help='每个件号有文件的类别数')
+    parser.add_argument('--files', type=int, default=1, help='每个类别的基础文件数')
+    parser.add_argument('--file-kb', type=int, default=64, help='每个文件大小（KB）')
+    parser.add_argument('--headless', action='store_true', help='无头模式')
+    parser.add_argument('--browser', default=None, help='浏览器路径')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录')
+    parser.add_argument('--faults', default=None, help='故障注入场景文件（JSON）')
+    parser.add_argument('--json', default=None, help='把结果另存为 JSON 文件')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(parts=args.parts, workers=args.workers, profile=args.profile,
+                           part_order=args.order, categories=args.categories,
+                           files_per_category=args.files, file_kb=args.file_kb,
+                           headless=args.headless, browser_path=args.browser, keep_files=args.keep,
+                           faults=FaultScenario.from_file(args.faults) if args.faults else None)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
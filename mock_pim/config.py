@@ -0,0 +1,66 @@
+"""
+模拟 PIM 服务的配置：各接口延迟和产品目录
+"""
+
+from typing import Dict, Iterable, Optional
+
+from .faults import FaultScenario
+
+# 延迟预设（毫秒）
+LATENCY_PROFILES: Dict[str, Dict[str, float]] = {
+    # 无延迟：用于功能测试
+    'instant': {
+        'page_load_ms': 0, 'login_ms': 0, 'search_ms': 0, 'create_ms': 0,
+        'upload_ms': 0, 'upload_per_mb_ms': 0, 'save_ms': 0, 'validate_ms': 0, 'pdf_ms': 0,
+    },
+    # 较快的后端
+    'fast': {
+        'page_load_ms': 200, 'login_ms': 500, 'search_ms': 400, 'create_ms': 800,
+        'upload_ms': 600, 'upload_per_mb_ms': 300, 'save_ms': 1000, 'validate_ms': 1500, 'pdf_ms': 500,
+    },
+    # 接近生产环境观察到的耗时
+    'production': {
+        'page_load_ms': 1500, 'login_ms': 3000, 'search_ms': 1800, 'create_ms': 2500,
+        'upload_ms': 2500, 'upload_per_mb_ms': 1200, 'save_ms': 5000, 'validate_ms': 4000, 'pdf_ms': 2000,
+    },
+}
+DEFAULT_LATENCY_PROFILE = 'fast'
+
+
+class MockPimConfig:
+    """
+    模拟服务配置
+
+    Args:
+        latency_profile: 延迟预设名（LATENCY_PROFILES 的键）
+        latency: 覆盖预设中的个别延迟，如 {'save_ms': 8000}
+        unknown_parts: 搜索不到的件号（触发 Product Not Found）
+        unapproved_parts: THP 为 Never Approved 的件号
+        username: 接受的用户名（为空时接受任意用户名）
+        password: 接受的密码（为空时接受任意密码）
+        faults: 故障注入场景，为空时不注入故障
+    """
+
+    def __init__(self, latency_profile: str = DEFAULT_LATENCY_PROFILE,
+                 latency: Optional[Dict[str, float]] = None,
+                 unknown_parts: Optional[Iterable[str]] = None,
+                 unapproved_parts: Optional[Iterable[str]] = None,
+                 username: str = '', password: str = '',
+                 faults: Optional[FaultScenario] = None):
+        if latency_profile not in LATENCY_PROFILES:
+            raise ValueError(f"未知的延迟预设: {latency_profile}，可选: {', '.join(LATENCY_PROFILES)}")
+        self.latency_profile = latency_profile
+        self.latency = dict(LATENCY_PROFILES[latency_profile])
+        self.latency.update(latency or {})
+        self.unknown_parts = set(unknown_parts or ())
+        self.unapproved_parts = set(unapproved_parts or ())
+        self.username = username
+        self.password = password
+        self.faults = faults or FaultScenario()
+
+    def delay_seconds(self, name: str, size_bytes: int = 0) -> float:
+        """某个接口的响应延迟（秒）；上传按文件大小追加延迟"""
+        milliseconds = self.latency.get(f"{name}_ms", 0)
+        if name == 'upload' and size_bytes:
+            milliseconds += self.latency.get('upload_per_mb_ms', 0) * size_bytes / (1024 * 1024)
+        return milliseconds / 1000.0
@@ -0,0 +1,160 @@
+"""
+模拟 PIM 服务的故障注入
+
+由带随机种子的场景文件驱动，在模拟服务中复现生产环境遇到过的故障：
+系统通知弹窗、Fatal Error 对话框、Product Not Found、不消失的等待遮罩、
+上传变慢或失败、会话过期、PDF 地址返回 HTML。
+
+是否注入只取决于 (种子, 故障类型, 件号, 第几次出现)，与请求到达的先后顺序无关，
+所以并行引擎下同一场景文件也能得到相同的故障序列。
+
+场景文件格式（JSON）:
+    {
+        "seed": 42,
+        "faults": [
+            {"kind": "upload_failure", "probability": 0.1},
+            {"kind": "slow_upload", "probability": 0.2, "delay_ms": 20000},
+            {"kind": "fatal_error", "endpoints": ["save"], "parts": ["MOCK00003"], "limit": 1},
+            {"kind": "session_expiry", "probability": 0.05}
+        ]
+    }
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+FAULT_SYSTEM_NOTICE = 'system_notice'          # 主页显示 System Notice 弹窗
+FAULT_FATAL_ERROR = 'fatal_error'              # 接口返回 500，页面弹出 Fatal Error 对话框
+FAULT_PRODUCT_NOT_FOUND = 'product_not_found'  # 搜索没有建议项，回车后弹出 Product Not Found
+FAULT_STUCK_OVERLAY = 'stuck_overlay'          # PEDA 页面的等待遮罩一直不消失
+FAULT_SLOW_UPLOAD = 'slow_upload'              # 上传额外延迟 delay_ms
+FAULT_UPLOAD_FAILURE = 'upload_failure'        # 上传接口返回 500
+FAULT_SESSION_EXPIRY = 'session_expiry'        # 会话失效，接口返回 401、页面回到登录表单
+FAULT_PDF_HTML = 'pdf_html'                    # 封面 PDF 地址返回 HTML 而不是 PDF
+
+FAULT_KINDS = [
+    FAULT_SYSTEM_NOTICE, FAULT_FATAL_ERROR, FAULT_PRODUCT_NOT_FOUND, FAULT_STUCK_OVERLAY,
+    FAULT_SLOW_UPLOAD, FAULT_UPLOAD_FAILURE, FAULT_SESSION_EXPIRY, FAULT_PDF_HTML,
+]
+
+# Fatal Error 可以注入的接口
+FATAL_ERROR_ENDPOINTS = ['create', 'save', 'validate']
+DEFAULT_SLOW_UPLOAD_MS = 15000
+
+
+class FaultRule:
+    """
+    一条故障规则
+
+    Args:
+        kind: 故障类型（FAULT_KINDS 之一）
+        probability: 每次机会注入的概率
+        parts: 只对这些件号注入，为空时对所有件号
+        limit: 最多注入次数，为空时不限
+        delay_ms: slow_upload 的额外延迟（毫秒）
+        endpoints: fatal_error 注入的接口，默认 save
+    """
+
+    def __init__(self, kind: str, probability: float = 1.0, parts: Optional[Iterable[str]] = None,
+                 limit: Optional[int] = None, delay_ms: float = DEFAULT_SLOW_UPLOAD_MS,
+                 endpoints: Optional[Iterable[str]] = None):
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"未知的故障类型: {kind}，可选: {', '.join(FAULT_KINDS)}")
+        endpoints = list(endpoints or ['save'])
+        unknown = [endpoint for endpoint in endpoints if endpoint not in FATAL_ERROR_ENDPOINTS]
+        if unknown:
+            raise ValueError(f"fatal_error 不支持的接口: {', '.join(unknown)}")
+        self.kind = kind
+        self.probability = max(0.0, min(1.0, float(probability)))
+        self.parts = set(parts) if parts else None
+        self.limit = limit
+        self.delay_ms = float(delay_ms)
+        self.endpoints = endpoints
+        self.injected = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FaultRule':
+        return cls(
+            kind=data['kind'],
+            probability=data.get('probability', 1.0),
+            parts=data.get('parts'),
+            limit=data.get('limit'),
+            delay_ms=data.get('delay_ms', DEFAULT_SLOW_UPLOAD_MS),
+            endpoints=data.get('endpoints'),
+        )
+
+    def applies_to(self, part: Optional[str], endpoint: Optional[str]) -> bool:
+        if self.parts is not None and part not in self.parts:
+            return False
+        if self.kind == FAULT_FATAL_ERROR and endpoint not in self.endpoints:
+            return False
+        return self.limit is None or self.injected < self.limit
+
+
+class FaultScenario:
+    """
+    一组故障规则和随机种子
+
+    Args:
+        rules: 故障规则列表
+        seed: 随机种子
+    """
+
+    def __init__(self, rules: Optional[List[FaultRule]] = None, seed: int = 0):
+        self.rules = list(rules or [])
+        self.seed = seed
+        self.injected: List[Dict[str, Any]] = []
+        self._occurrences: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FaultScenario':
+        return cls([FaultRule.from_dict(rule) for rule in data.get('faults', [])], data.get('seed', 0))
+
+    @classmethod
+    def from_file(cls, path: str) -> 'FaultScenario':
+        with open(path, 'r', encoding='utf-8') as handle:
+            return cls.from_dict(json.load(handle))
+
+    def _draw(self, kind: str, part: Optional[str], endpoint: Optional[str], occurrence: int) -> float:
+        """由种子、故障类型、件号和出现次数确定的 [0, 1) 伪随机数"""
+        key = f"{self.seed}:{kind}:{part or ''}:{endpoint or ''}:{occurrence}".encode('utf-8')
+        return int.from_bytes(hashlib.sha256(key).digest()[:8], 'big') / float(1 << 64)
+
+    def check(self, kind: str, part: Optional[str] = None, endpoint: Optional[str] = None) -> Optional[FaultRule]:
+        """
+        判断这一次机会是否注入某类故障
+
+        Args:
+            kind: 故障类型
+            part: 当前请求对应的件号（未知时为空）
+            endpoint: 接口名（fatal_error 使用）
+
+        Returns:
+            FaultRule: 命中的规则，不注入时返回None
+        """
+        with self._lock:
+            rules = [rule for rule in self.rules if rule.kind == kind and rule.applies_to(part, endpoint)]
+            if not rules:
+                return None
+            counter_key = (kind, part, endpoint)
+            occurrence = self._occurrences.get(counter_key, 0)
+            self._occurrences[counter_key] = occurrence + 1
+            draw = self._draw(kind, part, endpoint, occurrence)
+            for rule in rules:
+                if draw < rule.probability:
+                    rule.injected += 1
+                    self.injected.append({'kind': kind, 'part': part, 'endpoint': endpoint, 'time': time.time()})
+                    return rule
+            return None
+
+    def summary(self) -> Dict[str, int]:
+        """每类故障的注入次数"""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for record in self.injected:
+                counts[record['kind']] = counts.get(record['kind'], 0) + 1
+            return counts
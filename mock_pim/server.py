@@ -0,0 +1,501 @@
+"""
+模拟 PIM WebUI 服务
+
+用标准库 ThreadingHTTPServer 实现自动化流程用到的页面和接口（登录、语言切换、
+产品搜索、创建 PEDA、填写表单、上传文档、保存、验证、封面 PDF），DOM 结构与
+modules/ 中的选择器保持一致，可以在没有真实 PIM 系统的情况下端到端运行批量流程。
+配置了故障场景（mock_pim.faults）时，在相应接口注入弹窗、错误、会话过期等故障。
+
+用法:
+    python -m mock_pim.server --port 8765 --profile fast
+    python -m mock_pim.server --faults mock_pim/scenarios/production_faults.json
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+from config.constants import DOCUMENT_CATEGORIES
+from .config import MockPimConfig, LATENCY_PROFILES, DEFAULT_LATENCY_PROFILE
+from .faults import (
+    FaultScenario, FAULT_SYSTEM_NOTICE, FAULT_FATAL_ERROR, FAULT_PRODUCT_NOT_FOUND, FAULT_STUCK_OVERLAY,
+    FAULT_SLOW_UPLOAD, FAULT_UPLOAD_FAILURE, FAULT_SESSION_EXPIRY, FAULT_PDF_HTML
+)
+
+SESSION_COOKIE = 'JSESSIONID'
+WEBUI_PATH = '/webui/WebUI_2'
+LOGIN_FRAGMENT = '#deepLink=1&contextID=GL&workspaceID=Main&screen=homepage'
+CONTACTS = ['Mock Contact']
+REGIONS = ['Asia', 'Europe']
+
+_PAGE_TEMPLATE_PATH = Path(__file__).parent / 'static' / 'webui.html'
+_BOOTSTRAP_MARKER = '/*__MOCK_BOOTSTRAP__*/{}'
+
+
+def build_pdf(text: str) -> bytes:
+    """生成一个只有一页、包含一行文字的最小合法 PDF"""
+    safe_text = re.sub(r'[()\\]', '', text)
+    stream = f"BT /F1 18 Tf 72 720 Td ({safe_text}) Tj ET".encode('latin-1', 'replace')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(output)
+
+
+class MockPimState:
+    """服务端状态：会话、PEDA 记录和各接口的请求计数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sessions: Dict[str, str] = {}
+        self.pedas: Dict[str, Dict[str, Any]] = {}
+        self.request_counts: Dict[str, int] = {}
+        self._next_peda = 1
+
+    def count(self, route: str):
+        with self._lock:
+            self.request_counts[route] = self.request_counts.get(route, 0) + 1
+
+    def new_session(self, username: str) -> str:
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[token] = username
+        return token
+
+    def drop_session(self, token: str):
+        with self._lock:
+            self.sessions.pop(token, None)
+
+    def create_peda(self, part_number: str) -> Dict[str, Any]:
+        with self._lock:
+            peda_id = f"PEDA{self._next_peda:06d}"
+            self._next_peda += 1
+            peda = {
+                'id': peda_id,
+                'part_number': part_number,
+                'form': {},
+                'uploads': {},
+                'unsaved_uploads': {},
+                'saved': False,
+                'validated': False,
+            }
+            self.pedas[peda_id] = peda
+            return peda
+
+    def get_peda(self, peda_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.pedas.get(peda_id)
+
+    def update_peda(self, peda_id: str, **changes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            peda = self.pedas.get(peda_id)
+            if peda is not None:
+                peda.update(changes)
+            return peda
+
+    def add_upload(self, peda_id: str, category: str, file_name: str) -> bool:
+        """上传的文件先挂在 PEDA 上，Save 之后才保留（与真实系统一致）"""
+        with self._lock:
+            peda = self.pedas.get(peda_id)
+            if peda is None:
+                return False
+            peda['unsaved_uploads'].setdefault(category, []).append(file_name)
+            return True
+
+    def save_peda(self, peda_id: str, form: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """保存表单并保留之前上传的文件"""
+        with self._lock:
+            peda = self.pedas.get(peda_id)
+            if peda is not None:
+                peda.update(form=form, saved=True)
+                for category, files in peda['unsaved_uploads'].items():
+                    peda['uploads'].setdefault(category, []).extend(files)
+                peda['unsaved_uploads'] = {}
+            return peda
+
+    def discard_unsaved(self, peda_id: str):
+        """重新打开 PEDA 页面时丢弃未保存的上传"""
+        with self._lock:
+            peda = self.pedas.get(peda_id)
+            if peda is not None:
+                peda['unsaved_uploads'] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前状态的副本，供基准测试统计"""
+        with self._lock:
+            return json.loads(json.dumps({
+                'pedas': self.pedas,
+                'request_counts': self.request_counts,
+                'sessions': len(self.sessions),
+            }))
+
+
+class _MockPimHandler(BaseHTTPRequestHandler):
+    """请求处理：self.server 上挂有 mock_config 和 mock_state"""
+
+    server_version = 'MockPIM/1.0'
+
+    # ------------------------------------------------------------------ 工具方法
+    @property
+    def config(self) -> MockPimConfig:
+        return self.server.mock_config
+
+    @property
+    def state(self) -> MockPimState:
+        return self.server.mock_state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _delay(self, name: str, size_bytes: int = 0):
+        seconds = self.config.delay_seconds(name, size_bytes)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _fault(self, kind: str, part: Optional[str] = None, endpoint: Optional[str] = None):
+        return self.config.faults.check(kind, part, endpoint)
+
+    def _session_user(self, part: Optional[str] = None) -> Optional[str]:
+        """当前会话的用户名；注入会话过期时删除会话并返回None"""
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        morsel = cookie.get(SESSION_COOKIE)
+        if morsel is None:
+            return None
+        user = self.state.sessions.get(morsel.value)
+        if user is not None and self._fault(FAULT_SESSION_EXPIRY, part):
+            self.state.drop_session(morsel.value)
+            return None
+        return user
+
+    def _peda_part(self, peda_id: str) -> Optional[str]:
+        record = self.state.get_peda(peda_id)
+        return record['part_number'] if record else None
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _read_json(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self._read_body() or b'{}')
+        except ValueError:
+            return {}
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(payload).encode('utf-8'), 'application/json', headers)
+
+    def _send_page(self, bootstrap: Dict[str, Any]):
+        template = _PAGE_TEMPLATE_PATH.read_text(encoding='utf-8')
+        page = template.replace(_BOOTSTRAP_MARKER, json.dumps(bootstrap))
+        self._send(200, page.encode('utf-8'), 'text/html; charset=utf-8')
+
+    # ------------------------------------------------------------------ 路由
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        if path == '/' or path == '/webui':
+            self.send_response(302)
+            self.send_header('Location', WEBUI_PATH)
+            self.end_headers()
+        elif path.startswith(WEBUI_PATH):
+            self._handle_webui(path[len(WEBUI_PATH):])
+        elif path == '/api/search':
+            self._handle_search(parse_qs(url.query).get('q', [''])[0])
+        elif path.startswith('/publishing/proof/product/'):
+            self._handle_proof(path.rsplit('/', 1)[-1])
+        else:
+            self._send_json(404, {'error': f'Not found: {path}'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        match = re.fullmatch(r'/api/peda/([^/]+)/(upload|save|validate)', path)
+        if path == '/login':
+            self._handle_login()
+        elif path == '/api/peda':
+            self._handle_create()
+        elif path == '/api/notice/dismiss':
+            self._read_body()
+            self._send_json(200, {'ok': True})
+        elif match:
+            peda_id, action = match.groups()
+            if action == 'upload':
+                self._handle_upload(peda_id, parse_qs(url.query).get('category', [''])[0])
+            elif action == 'save':
+                self._handle_save(peda_id)
+            else:
+                self._handle_validate(peda_id)
+        else:
+            self._read_body()
+            self._send_json(404, {'error': f'Not found: {path}'})
+
+    # ------------------------------------------------------------------ 页面
+    def _handle_webui(self, sub_path: str):
+        self.state.count('page')
+        self._delay('page_load')
+        product = re.fullmatch(r'/product/(.+)', sub_path)
+        peda = re.fullmatch(r'/peda/([^/]+)', sub_path)
+        part = product.group(1) if product else (self._peda_part(peda.group(1)) if peda else None)
+        bootstrap: Dict[str, Any] = {'logged_in': self._session_user(part) is not None, 'view': 'home'}
+        if not bootstrap['logged_in']:
+            self._send_page(bootstrap)
+            return
+
+        if product:
+            part_number = product.group(1)
+            bootstrap.update(view='product', product={
+                'part_number': part_number,
+                'title': f"{part_number}\u00a0(THP_{part_number})",
+                'approved': part_number not in self.config.unapproved_parts,
+            })
+        elif peda:
+            self.state.discard_unsaved(peda.group(1))
+            record = self.state.get_peda(peda.group(1))
+            if record is None:
+                self._send_json(404, {'error': f'PEDA not found: {peda.group(1)}'})
+                return
+            bootstrap.update(view='peda', peda=record, categories=DOCUMENT_CATEGORIES,
+                             contacts=CONTACTS, regions=REGIONS,
+                             stuck_overlay=bool(self._fault(FAULT_STUCK_OVERLAY, part)))
+        else:
+            bootstrap['system_notice'] = bool(self._fault(FAULT_SYSTEM_NOTICE))
+        self._send_page(bootstrap)
+
+    def _handle_login(self):
+        self.state.count('login')
+        payload = self._read_json()
+        self._delay('login')
+        username = payload.get('username', '')
+        password = payload.get('password', '')
+        if not username or (self.config.username and username != self.config.username) \
+                or (self.config.password and password != self.config.password):
+            self._send_json(403, {'error': 'Invalid username or password'})
+            return
+        token = self.state.new_session(username)
+        self._send_json(200, {'ok': True},
+                        {'Set-Cookie': f"{SESSION_COOKIE}={token}; Path=/; HttpOnly"})
+
+    # ------------------------------------------------------------------ 接口
+    def _fatal_error(self, part: Optional[str], endpoint: str) -> bool:
+        """注入 Fatal Error 时返回 500（页面弹出 Fatal Error 对话框）"""
+        if not self._fault(FAULT_FATAL_ERROR, part, endpoint):
+            return False
+        self._send_json(500, {'error': f'Fatal Error during {endpoint}'})
+        return True
+
+    def _require_session(self, part: Optional[str] = None) -> bool:
+        if self._session_user(part) is None:
+            self._send_json(401, {'error': 'Session expired'})
+            return False
+        return True
+
+    def _handle_search(self, query: str):
+        self.state.count('search')
+        query = query.strip()
+        if not self._require_session(query):
+            return
+        self._delay('search')
+        suggestions = []
+        if query and query not in self.config.unknown_parts \
+                and not self._fault(FAULT_PRODUCT_NOT_FOUND, query):
+            # 与真实系统一致：THP 项之外还有一个以件号开头的干扰项
+            suggestions = [f"{query}\u00a0(THP_{query})", f"{query}\u00a0({query}_THP_DOGA)"]
+        self._send_json(200, {'suggestions': suggestions})
+
+    def _handle_create(self):
+        self.state.count('create')
+        payload = self._read_json()
+        part_number = payload.get('part_number', '')
+        if not self._require_session(part_number):
+            return
+        self._delay('create')
+        if not part_number:
+            self._send_json(400, {'error': 'part_number is required'})
+            return
+        if self._fatal_error(part_number, 'create'):
+            return
+        peda = self.state.create_peda(part_number)
+        self._send_json(200, {'id': peda['id']})
+
+    def _handle_upload(self, peda_id: str, category: str):
+        self.state.count('upload')
+        body = self._read_body()
+        part = self._peda_part(peda_id)
+        if not self._require_session(part):
+            return
+        self._delay('upload', len(body))
+        slow = self._fault(FAULT_SLOW_UPLOAD, part)
+        if slow:
+            time.sleep(slow.delay_ms / 1000.0)
+        if self._fault(FAULT_UPLOAD_FAILURE, part):
+            self._send_json(500, {'error': 'Upload failed: internal server error'})
+            return
+        match = re.search(rb'filename="([^"]*)"', body)
+        file_name = match.group(1).decode('utf-8', 'replace') if match else 'unnamed'
+        if category not in DOCUMENT_CATEGORIES or not self.state.add_upload(peda_id, category, file_name):
+            self._send_json(400, {'error': f'Cannot upload to {peda_id}/{category}'})
+            return
+        self._send_json(200, {'ok': True, 'file': file_name})
+
+    def _handle_save(self, peda_id: str):
+        self.state.count('save')
+        payload = self._read_json()
+        part = self._peda_part(peda_id)
+        if not self._require_session(part):
+            return
+        self._delay('save')
+        if self._fatal_error(part, 'save'):
+            return
+        if self.state.save_peda(peda_id, payload.get('form', {})) is None:
+            self._send_json(404, {'error': f'PEDA not found: {peda_id}'})
+            return
+        self._send_json(200, {'ok': True})
+
+    def _handle_validate(self, peda_id: str):
+        self.state.count('validate')
+        self._read_body()
+        part = self._peda_part(peda_id)
+        if not self._require_session(part):
+            return
+        self._delay('validate')
+        if self._fatal_error(part, 'validate'):
+            return
+        if self.state.update_peda(peda_id, validated=True) is None:
+            self._send_json(404, {'error': f'PEDA not found: {peda_id}'})
+            return
+        self._send_json(200, {'ok': True})
+
+    def _handle_proof(self, peda_id: str):
+        self.state.count('pdf')
+        record = self.state.get_peda(peda_id)
+        if not self._require_session(record['part_number'] if record else None):
+            return
+        if record is None or not record['validated']:
+            self._send_json(404, {'error': f'No proof for {peda_id}'})
+            return
+        if 'text/html' in self.headers.get('Accept', '') or self._fault(FAULT_PDF_HTML, record['part_number']):
+            # 浏览器导航：返回内嵌 PDF 的查看页，实际文件由 requests 直接下载
+            page = f'<html><body><embed src="{self.path}" type="application/pdf"></body></html>'
+            self._send(200, page.encode('utf-8'), 'text/html; charset=utf-8')
+            return
+        self._delay('pdf')
+        self._send(200, build_pdf(f"Cover sheet {record['part_number']} {peda_id}"), 'application/pdf')
+
+
+class MockPimServer:
+    """
+    在后台守护线程中运行的模拟 PIM 服务
+
+    Args:
+        config: 服务配置，为空时使用默认延迟预设
+        host: 监听地址
+        port: 监听端口，0 表示自动分配
+        verbose: 是否打印每个请求
+    """
+
+    def __init__(self, config: Optional[MockPimConfig] = None, host: str = '127.0.0.1',
+                 port: int = 0, verbose: bool = False):
+        self.config = config or MockPimConfig()
+        self.state = MockPimState()
+        self._httpd = ThreadingHTTPServer((host, port), _MockPimHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock_config = self.config
+        self._httpd.mock_state = self.state
+        self._httpd.verbose = verbose
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self) -> str:
+        """传给 BrowserManager 的登录网址（与生产环境的 deepLink 格式相同）"""
+        return f"{self.url}{WEBUI_PATH}{LOGIN_FRAGMENT}"
+
+    def start(self) -> 'MockPimServer':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-pim', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'MockPimServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='模拟 PIM WebUI 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--profile', choices=sorted(LATENCY_PROFILES), default=DEFAULT_LATENCY_PROFILE,
+                        help='延迟预设')
+    parser.add_argument('--unknown', nargs='*', default=[], help='搜索不到的件号')
+    parser.add_argument('--unapproved', nargs='*', default=[], help='Never Approved 的件号')
+    parser.add_argument('--faults', default=None, help='故障注入场景文件（JSON）')
+    parser.add_argument('--verbose', action='store_true', help='打印每个请求')
+    args = parser.parse_args(argv)
+
+    faults = FaultScenario.from_file(args.faults) if args.faults else None
+    config = MockPimConfig(args.profile, unknown_parts=args.unknown, unapproved_parts=args.unapproved,
+                           faults=faults)
+    server = MockPimServer(config, args.host, args.port, verbose=args.verbose).start()
+    print(f"模拟 PIM 服务已启动: {server.login_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        if faults is not None:
+            print(f"已注入故障: {faults.summary()}")
+
+
+if __name__ == '__main__':
+    main()
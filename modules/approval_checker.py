@@ -6,7 +6,13 @@ THP审批状态检查模块
 from playwright.sync_api import Page
 from typing import Optional
 
+from .tracing import traced
+from .structured_log import get_logger
 
+logger = get_logger(__name__)
+
+
+@traced('approval_check')
 def check_thp_approval_status(page: Page, part_number: str) -> bool:
     """
     检查THP的审批状态
@@ -22,42 +28,42 @@ def check_thp_approval_status(page: Page, part_number: str) -> bool:
         bool: 已批准返回True，未批准返回False
     """
     try:
-        print(f"\n=== 检查THP {part_number} 的审批状态 ===")
+        logger.info('=== 检查THP %s 的审批状态 ===', part_number)
         
         # 方法1: 查找"Never Approved"文本
-        print("方法1: 查找 'Never Approved' 文本...")
+        logger.debug("方法1: 查找 'Never Approved' 文本...")
         try:
             never_approved_element = page.locator('text="Never Approved"').first
             if never_approved_element.is_visible(timeout=2000):
-                print(f"❌ 检测到THP {part_number} 状态为: Never Approved")
+                logger.error('❌ 检测到THP %s 状态为: Never Approved', part_number)
                 return False
         except Exception as e:
-            print(f"方法1未找到: {e}")
+            logger.debug('方法1未找到: %s', e)
         
         # 方法2: 查找特定的CSS类"NotInApproved"
-        print("方法2: 查找 '.approval.NotInApproved' 元素...")
+        logger.debug("方法2: 查找 '.approval.NotInApproved' 元素...")
         try:
             not_approved_element = page.locator('span.approval.NotInApproved').first
             if not_approved_element.is_visible(timeout=2000):
                 text = not_approved_element.text_content()
-                print(f"❌ 检测到THP {part_number} 审批状态为: {text}")
+                logger.error('❌ 检测到THP %s 审批状态为: %s', part_number, text)
                 return False
         except Exception as e:
-            print(f"方法2未找到: {e}")
+            logger.debug('方法2未找到: %s', e)
         
         # 方法3: 查找包含"approval"类且包含"NotInApproved"的元素
-        print("方法3: 查找 '[class*=\"approval\"][class*=\"NotInApproved\"]' 元素...")
+        logger.debug('方法3: 查找 \'[class*="approval"][class*="NotInApproved"]\' 元素...')
         try:
             approval_element = page.locator('[class*="approval"][class*="NotInApproved"]').first
             if approval_element.is_visible(timeout=2000):
                 text = approval_element.text_content()
-                print(f"❌ 检测到THP {part_number} 审批状态为: {text}")
+                logger.error('❌ 检测到THP %s 审批状态为: %s', part_number, text)
                 return False
         except Exception as e:
-            print(f"方法3未找到: {e}")
+            logger.debug('方法3未找到: %s', e)
         
         # 方法4: 查找"Approved"或其他批准状态，反向确认
-        print("方法4: 查找批准状态元素...")
+        logger.debug('方法4: 查找批准状态元素...')
         try:
             approved_selectors = [
                 'span.approval.InApproved',
@@ -70,21 +76,21 @@ def check_thp_approval_status(page: Page, part_number: str) -> bool:
                     approved_element = page.locator(selector).first
                     if approved_element.is_visible(timeout=1000):
                         text = approved_element.text_content()
-                        print(f"✅ 检测到THP {part_number} 已批准: {text}")
+                        logger.info('✅ 检测到THP %s 已批准: %s', part_number, text)
                         return True
                 except:
                     continue
         except Exception as e:
-            print(f"方法4检查失败: {e}")
+            logger.warning('方法4检查失败: %s', e)
         
         # 如果无法确定状态，假设已批准（允许继续）
-        print(f"⚠️ 无法检测到明确的审批状态，假设THP {part_number} 已批准，继续处理")
+        logger.warning('⚠️ 无法检测到明确的审批状态，假设THP %s 已批准，继续处理', part_number)
         return True
         
     except Exception as e:
-        print(f"❌ 检查THP审批状态时出错: {e}")
+        logger.error('❌ 检查THP审批状态时出错: %s', e)
         # 出错时允许继续，让后续流程来处理
-        print(f"⚠️ 出错，假设THP {part_number} 已批准，继续处理")
+        logger.warning('⚠️ 出错，假设THP %s 已批准，继续处理', part_number)
         return True
 
 
@@ -121,5 +127,5 @@ def get_approval_status_text(page: Page) -> Optional[str]:
         return None
         
     except Exception as e:
-        print(f"获取审批状态文本时出错: {e}")
+        logger.debug('获取审批状态文本时出错: %s', e)
         return None
@@ -7,6 +7,9 @@ import os
 import platform
 from typing import Optional, Tuple
 from pathlib import Path
+from .structured_log import get_logger, level_value
+
+logger = get_logger(__name__)
 
 
 class BrowserFinder:
@@ -39,7 +42,7 @@ class BrowserFinder:
         if self.log_callback:
             self.log_callback(message, level)
         else:
-            print(f"[{level}] {message}")
+            logger.log(level_value(level), message)
     
     def find_browser(self, preferred_browser: Optional[str] = None, 
                      custom_path: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
@@ -1,10 +1,17 @@
 import os
+import re
+import time
 from playwright.sync_api import Playwright, Browser, BrowserContext, Page
-from typing import Optional, Callable
+from typing import Optional, Callable, List
 from .browser_finder import BrowserFinder
+from config.constants import BROWSER_MAX_RECOVERIES, PLAYWRIGHT_TRACE_MAX_FILES, PLAYWRIGHT_TRACE_MAX_MB
 
 # 导入登录相关模块
 from .system_handler import handle_login_popup, set_language_after_login
+from .tracing import traced
+from .structured_log import get_logger, level_value
+
+logger = get_logger(__name__)
 
 
 class BrowserManager:
@@ -15,10 +22,15 @@ class BrowserManager:
     - 浏览器启动和关闭管理
     - 登录状态管理
     - 页面状态重置
-    - 错误恢复机制
+    - 错误恢复机制（浏览器崩溃/断开后自动重启并恢复登录会话）
+    - 失败件号的 Playwright trace（设置 failure_trace_dir 后启用）
+    - 跨批次复用（attach_batch / detach_batch，由常驻自动化服务持有）
+    
+    Args:
+        owns_playwright: cleanup() 时是否一并停止 Playwright（由调用方管理 Playwright 生命周期时为False）
     """
     
-    def __init__(self):
+    def __init__(self, owns_playwright: bool = True):
         self.playwright: Optional[Playwright] = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
@@ -32,6 +44,18 @@ class BrowserManager:
         self.browser_path: Optional[str] = None
         self.browser_type: Optional[str] = None
         self.headless: bool = False
+        self.storage_state: Optional[dict] = None
+        self.crashed: bool = False
+        self.recovery_count: int = 0
+        # 失败件号 trace：上下文创建时开始记录，每个件号一个 chunk，成功时丢弃
+        self.failure_trace_dir: Optional[str] = None
+        self._trace_chunk_open: bool = False
+        self._trace_part: Optional[str] = None
+        self.owns_playwright: bool = owns_playwright
+        # 登录参数（session_key()），参数一致且浏览器可用时可直接复用
+        self.session: Optional[tuple] = None
+        # 页面停在主页面（刚登录、恢复或重置完成），处理下一个件号前无需再重置
+        self.at_home: bool = False
         
     def set_log_callback(self, callback: Callable):
         """设置日志回调函数"""
@@ -42,7 +66,7 @@ class BrowserManager:
         if self.log_callback:
             self.log_callback(message, level)
         else:
-            print(f"[{level}] {message}")
+            logger.log(level_value(level), message)
     
     def initialize(self, playwright: Playwright, username: str, password: str, 
                    system_language: str = 'en', login_url: Optional[str] = None,
@@ -69,6 +93,16 @@ class BrowserManager:
         try:
             self.log("🚀 初始化浏览器管理器...")
             
+            # 重新初始化（复用的管理器登录参数变化或浏览器不可用）时先关闭旧浏览器；
+            # 换了用户或网址时不再使用旧的会话状态
+            session = session_key(username, password, system_language, login_url,
+                                  browser_path, preferred_browser, headless)
+            self._close_browser()
+            if session != self.session:
+                self.storage_state = None
+            self.session = None
+            self.at_home = False
+            
             # 保存参数
             self.playwright = playwright
             self.username = username
@@ -100,17 +134,14 @@ class BrowserManager:
                 return False
             
             # 启动浏览器
-            self.log(f"启动浏览器: {self.browser_type} ({self.browser_path})...")
-            self.browser = self.playwright.chromium.launch(
-                headless=self.headless, 
-                executable_path=self.browser_path
-            )
-            self.context = self.browser.new_context()
-            self.page = self.context.new_page()
+            self._launch_browser()
             
             # 执行登录
             if self._perform_login():
                 self.is_logged_in = True
+                self.session = session
+                self.at_home = True
+                self._save_session_state()
                 self.log("✅ 浏览器初始化和登录完成", "SUCCESS")
                 return True
             else:
@@ -123,6 +154,251 @@ class BrowserManager:
             self.cleanup()
             return False
     
+    def _launch_browser(self):
+        """启动浏览器并创建上下文和页面（有保存的会话时用它恢复登录状态）"""
+        self.log(f"启动浏览器: {self.browser_type} ({self.browser_path})...")
+        self.browser = self.playwright.chromium.launch(
+            headless=self.headless, 
+            executable_path=self.browser_path
+        )
+        if self.storage_state:
+            self.context = self.browser.new_context(storage_state=self.storage_state)
+        else:
+            self.context = self.browser.new_context()
+        self.page = self.context.new_page()
+        self.crashed = False
+        self._attach_crash_handlers()
+        self._start_context_tracing()
+    
+    def _start_context_tracing(self):
+        """在新上下文上开始记录 trace（截图和DOM快照）"""
+        self._trace_chunk_open = False
+        self._trace_part = None
+        if not self.failure_trace_dir:
+            return
+        try:
+            self.context.tracing.start(screenshots=True, snapshots=True)
+            self._trace_chunk_open = True
+        except Exception as e:
+            self.log(f"⚠️ 启动 Playwright trace 失败，本次不记录失败 trace: {e}", "WARNING")
+    
+    def _stop_context_tracing(self):
+        """停止上下文的 trace 记录（丢弃未保存的内容）"""
+        if self.failure_trace_dir and self.context:
+            try:
+                self.context.tracing.stop()
+            except Exception:
+                pass
+        self._trace_chunk_open = False
+        self._trace_part = None
+    
+    def matches(self, username: str, password: str, system_language: str = 'en',
+                login_url: Optional[str] = None, browser_path: Optional[str] = None,
+                preferred_browser: str = "auto", headless: bool = False) -> bool:
+        """
+        浏览器已就绪且登录参数与 initialize() 时一致（可直接复用，无需重新登录）
+        
+        Returns:
+            bool: 可复用返回True
+        """
+        return (self.session is not None
+                and self.session == session_key(username, password, system_language, login_url,
+                                                 browser_path, preferred_browser, headless)
+                and self.is_ready())
+    
+    def attach_batch(self, log_callback: Optional[Callable], failure_trace_dir: Optional[str]):
+        """
+        复用已登录的浏览器开始新批次：切换日志回调和失败 trace 目录，重置恢复次数
+        
+        Args:
+            log_callback: 本批次的日志回调
+            failure_trace_dir: 本批次的失败件号 trace 目录（可选）
+        """
+        self.set_log_callback(log_callback)
+        self.recovery_count = 0
+        self._stop_context_tracing()
+        self.failure_trace_dir = failure_trace_dir
+        if self.context:
+            self._start_context_tracing()
+    
+    def detach_batch(self, log_callback: Optional[Callable] = None):
+        """
+        批次结束但保留浏览器：停止 trace 记录，日志回调换回持有者的回调
+        
+        Args:
+            log_callback: 批次之间使用的日志回调（可选）
+        """
+        self._stop_context_tracing()
+        self.failure_trace_dir = None
+        self.set_log_callback(log_callback)
+    
+    def begin_part_trace(self, part_number: str):
+        """
+        开始记录一个件号的 trace chunk（丢弃之前未保存的记录，如登录和重置过程）
+        
+        Args:
+            part_number: 件号
+        """
+        if not self.failure_trace_dir or not self.context:
+            return
+        try:
+            if self._trace_chunk_open:
+                self.context.tracing.stop_chunk()
+            self.context.tracing.start_chunk(title=part_number)
+            self._trace_chunk_open = True
+            self._trace_part = part_number
+        except Exception as e:
+            self._trace_chunk_open = False
+            self._trace_part = None
+            self.log(f"⚠️ 开始记录件号 {part_number} 的 trace 失败: {e}", "WARNING")
+    
+    def end_part_trace(self, failed: bool) -> Optional[str]:
+        """
+        结束当前件号的 trace chunk：失败时写入 zip，成功时直接丢弃
+        
+        Args:
+            failed: 件号是否失败
+            
+        Returns:
+            Optional[str]: 保存的 trace 文件路径；未保存时返回None
+        """
+        part_number = self._trace_part
+        if not part_number or not self._trace_chunk_open or not self.context:
+            return None
+        self._trace_part = None
+        self._trace_chunk_open = False
+        
+        path = None
+        if failed:
+            os.makedirs(self.failure_trace_dir, exist_ok=True)
+            safe_part = re.sub(r'[^\w.-]+', '_', part_number)
+            path = os.path.join(self.failure_trace_dir, f"{safe_part}_{time.strftime('%Y%m%d_%H%M%S')}.zip")
+        try:
+            if path:
+                self.context.tracing.stop_chunk(path=path)
+            else:
+                self.context.tracing.stop_chunk()
+        except Exception as e:
+            # 浏览器已崩溃时无法导出 trace
+            if failed:
+                self.log(f"⚠️ 保存件号 {part_number} 的 trace 失败: {e}", "WARNING")
+            return None
+        
+        if path:
+            prune_trace_files(self.failure_trace_dir)
+            self.log(f"🎞️ 失败件号 trace 已保存: {path}（用 playwright show-trace 打开）")
+        return path
+    
+    def _attach_crash_handlers(self):
+        """
+        监听页面崩溃、页面关闭和浏览器断开事件
+
+        _close_browser 会先解除 self.browser/self.page 的引用再关闭，
+        所以主动关闭（清理、重启）时触发的事件不会被当作崩溃。
+        """
+        page, browser = self.page, self.browser
+
+        def on_crash(_page):
+            if page is not self.page:
+                return
+            self.crashed = True
+            self.log("💥 检测到浏览器页面崩溃", "ERROR")
+        
+        def on_disconnected(_browser):
+            if browser is not self.browser:
+                return
+            self.crashed = True
+            self.log("💥 检测到浏览器连接已断开", "ERROR")
+        
+        def on_page_close(_page):
+            if page is self.page:
+                self.crashed = True
+        
+        page.on("crash", on_crash)
+        page.on("close", on_page_close)
+        browser.on("disconnected", on_disconnected)
+    
+    def _save_session_state(self):
+        """保存登录后的会话状态（cookies/localStorage，仅保存在内存中），用于崩溃后恢复"""
+        try:
+            self.storage_state = self.context.storage_state()
+        except Exception as e:
+            self.log(f"⚠️ 保存会话状态失败（崩溃后需要重新登录）: {e}", "WARNING")
+    
+    def is_healthy(self) -> bool:
+        """
+        检查浏览器、上下文和页面是否仍可用
+        
+        Returns:
+            bool: 可用返回True
+        """
+        if self.crashed or not self.browser or not self.page:
+            return False
+        try:
+            return self.browser.is_connected() and not self.page.is_closed()
+        except Exception:
+            return False
+    
+    @traced('recover')
+    def recover(self) -> bool:
+        """
+        浏览器崩溃或断开后重新启动浏览器，并用保存的会话状态恢复登录
+        
+        Returns:
+            bool: 恢复成功返回True
+        """
+        if not self.playwright or not self.browser_path:
+            return False
+        if self.recovery_count >= BROWSER_MAX_RECOVERIES:
+            self.log(f"❌ 浏览器已恢复 {self.recovery_count} 次，超过上限，不再自动恢复", "ERROR")
+            return False
+        
+        self.recovery_count += 1
+        self.log(f"🔧 正在恢复浏览器（第 {self.recovery_count} 次）...", "WARNING")
+        self._close_browser()
+        
+        try:
+            self._launch_browser()
+            self.page.goto(self.login_url)
+            self.page.wait_for_timeout(3000)
+            
+            if self._check_login_status():
+                self.log("✅ 已通过保存的会话恢复登录状态")
+            else:
+                self.log("保存的会话已失效，重新登录...")
+                if not self._perform_login():
+                    self.log("❌ 浏览器恢复后重新登录失败", "ERROR")
+                    self.is_logged_in = False
+                    return False
+                self._save_session_state()
+            
+            if not set_language_after_login(self.page):
+                self.log("⚠️ 语言设置失败，但继续执行（可能已经是英语界面）")
+            
+            self.is_logged_in = True
+            self.at_home = True
+            self.log("✅ 浏览器恢复完成", "SUCCESS")
+            return True
+            
+        except Exception as e:
+            self.log(f"❌ 浏览器恢复失败: {str(e)}", "ERROR")
+            self.crashed = True
+            return False
+    
+    def _close_browser(self):
+        """关闭浏览器和上下文（忽略已崩溃对象的异常），保留 Playwright 实例"""
+        context, browser = self.context, self.browser
+        self.context = None
+        self.browser = None
+        self.page = None
+        for resource in (context, browser):
+            try:
+                if resource:
+                    resource.close()
+            except Exception:
+                pass
+    
+    @traced('login')
     def _perform_login(self) -> bool:
         """
         执行登录操作
@@ -177,6 +453,7 @@ class BrowserManager:
             self.log(f"❌ 登录过程发生错误: {str(e)}", "ERROR")
             return False
     
+    @traced('reset')
     def reset_for_next_part(self) -> bool:
         """
         重置状态准备处理下一个件号
@@ -189,6 +466,10 @@ class BrowserManager:
                 self.log("❌ 浏览器未初始化或未登录", "ERROR")
                 return False
             
+            # 浏览器已崩溃或断开：先恢复，恢复后已在主页面
+            if not self.is_healthy():
+                return self.recover()
+            
             self.log("🔄 重置页面状态，准备处理下一个件号...")
             
             # 导航回主页面（使用保存的登录URL）
@@ -202,6 +483,7 @@ class BrowserManager:
                 self.log("⚠️ 检测到登录状态异常，尝试重新登录...")
                 if self._perform_login():
                     self.is_logged_in = True
+                    self.at_home = True
                     # 重新登录后也要切换语言
                     if not set_language_after_login(self.page):
                         self.log("⚠️ 语言设置失败，但继续执行（可能已经是英语界面）")
@@ -216,6 +498,7 @@ class BrowserManager:
             if not set_language_after_login(self.page):
                 self.log("⚠️ 语言设置失败，但继续执行（可能已经是英语界面）")
             
+            self.at_home = True
             return True
             
         except Exception as e:
@@ -249,6 +532,10 @@ class BrowserManager:
         Returns:
             Page: 页面对象，如果未初始化返回None
         """
+        if self.is_logged_in and self.page and not self.is_healthy():
+            self.log("⚠️ 当前页面不可用，尝试恢复浏览器...", "WARNING")
+            if not self.recover():
+                return None
         if self.is_logged_in and self.page:
             return self.page
         return None
@@ -263,7 +550,8 @@ class BrowserManager:
         return (self.is_logged_in and 
                 self.browser is not None and 
                 self.context is not None and 
-                self.page is not None)
+                self.page is not None and
+                self.is_healthy())
     
     def take_screenshot(self, path: str) -> bool:
         """
@@ -285,24 +573,20 @@ class BrowserManager:
             return False
     
     def cleanup(self):
-        """清理资源"""
+        """清理资源（owns_playwright 为False时保留 Playwright 实例）"""
         try:
             self.log("🧹 清理浏览器资源...")
             
-            if self.context:
-                self.context.close()
-                self.context = None
-                
-            if self.browser:
-                self.browser.close()
-                self.browser = None
+            self._close_browser()
 
-            if self.playwright:
+            if self.playwright and self.owns_playwright:
                 self.playwright.stop()
-                self.playwright = None
+            self.playwright = None
                 
             self.page = None
             self.is_logged_in = False
+            self.session = None
+            self.at_home = False
             
             self.log("✅ 浏览器资源清理完成")
             
@@ -316,3 +600,39 @@ class BrowserManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """上下文管理器出口"""
         self.cleanup()
+
+
+def session_key(username: str, password: str, system_language: str = 'en', login_url: Optional[str] = None,
+                browser_path: Optional[str] = None, preferred_browser: str = "auto",
+                headless: bool = False) -> tuple:
+    """登录参数的比较键（BrowserManager.matches 使用）"""
+    return (username or "", password or "", system_language or "", (login_url or "").strip(),
+            browser_path or "", preferred_browser or "auto", bool(headless))
+
+
+def prune_trace_files(trace_dir: str, max_files: int = PLAYWRIGHT_TRACE_MAX_FILES,
+                      max_mb: float = PLAYWRIGHT_TRACE_MAX_MB) -> List[str]:
+    """
+    按保留上限清理 trace 目录（保留最新的文件）
+
+    Returns:
+        List[str]: 被删除的文件路径
+    """
+    try:
+        entries = [os.path.join(trace_dir, name) for name in os.listdir(trace_dir) if name.endswith('.zip')]
+        entries.sort(key=os.path.getmtime, reverse=True)
+    except OSError:
+        return []
+
+    removed = []
+    total_bytes = 0
+    max_bytes = max_mb * 1024 * 1024
+    for index, path in enumerate(entries):
+        try:
+            total_bytes += os.path.getsize(path)
+            if index > 0 and (index >= max_files or total_bytes > max_bytes):
+                os.remove(path)
+                removed.append(path)
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,136 @@
+"""
+Playwright 调用计数（协议往返次数）
+
+用代理包装 Page / Locator，记录每次会访问浏览器的调用（is_visible、get_attribute、
+dispatch_event、click 等），并按当前 tracing 区间（search、fill、upload…）归类。
+用于发现某个步骤悄悄增加了往返次数。
+
+只构造定位器的调用（locator、get_by_*、first、nth…）不访问浏览器，不计数；
+wait_for_timeout 是固定等待，单独计入 waits，不算作往返（其耗时由 tracing 统计）。
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from . import tracing
+
+UNTRACED_STEP = 'untraced'
+
+# 只在本地构造定位器、不访问浏览器的方法和属性
+_LAZY_MEMBERS = {
+    'locator', 'get_by_role', 'get_by_text', 'get_by_label', 'get_by_placeholder',
+    'get_by_alt_text', 'get_by_title', 'get_by_test_id', 'frame_locator',
+    'filter', 'nth', 'and_', 'or_', 'first', 'last', 'content_frame', 'owner',
+}
+# 固定等待
+_WAIT_MEMBERS = {'wait_for_timeout'}
+# 返回值需要继续包装的对象类型
+_PROXIED_TYPES = {'Page', 'Frame', 'Locator', 'FrameLocator', 'ElementHandle', 'Keyboard', 'Mouse'}
+
+
+class CallCounter:
+    """按步骤统计 Playwright 调用次数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (步骤名, 区间ID) -> {方法名: 次数}
+        self._calls: Dict[tuple, Dict[str, int]] = {}
+        self._waits: Dict[str, int] = {}
+
+    @staticmethod
+    def _current_step() -> tuple:
+        current = tracing.current_span()
+        if current is None:
+            return UNTRACED_STEP, None
+        return current.name, current.span_id
+
+    def record(self, method: str):
+        step = self._current_step()
+        with self._lock:
+            if method in _WAIT_MEMBERS:
+                self._waits[step[0]] = self._waits.get(step[0], 0) + 1
+                return
+            calls = self._calls.setdefault(step, {})
+            calls[method] = calls.get(method, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._waits.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        每个步骤的往返统计
+
+        Returns:
+            Dict: {步骤名: {'occurrences', 'total', 'max', 'waits', 'methods'}}
+                  max 为单次步骤（单个区间）的最多往返次数
+        """
+        with self._lock:
+            result: Dict[str, Dict[str, Any]] = {}
+            for (name, _), calls in self._calls.items():
+                stats = result.setdefault(name, {'occurrences': 0, 'total': 0, 'max': 0, 'waits': 0, 'methods': {}})
+                count = sum(calls.values())
+                stats['occurrences'] += 1
+                stats['total'] += count
+                stats['max'] = max(stats['max'], count)
+                for method, method_count in calls.items():
+                    stats['methods'][method] = stats['methods'].get(method, 0) + method_count
+            for name, waits in self._waits.items():
+                result.setdefault(name, {'occurrences': 0, 'total': 0, 'max': 0, 'waits': 0, 'methods': {}})
+                result[name]['waits'] = waits
+            return result
+
+    def format_summary(self) -> str:
+        lines = []
+        for name, stats in sorted(self.summary().items()):
+            methods = ", ".join(f"{method}={count}" for method, count in
+                                sorted(stats['methods'].items(), key=lambda item: -item[1]))
+            lines.append(f"{name}: {stats['occurrences']} 次，共 {stats['total']} 次往返，单次最多 {stats['max']}，"
+                         f"固定等待 {stats['waits']} 次（{methods}）")
+        return "\n".join(lines)
+
+
+class _CountingProxy:
+    """转发所有属性到被包装对象，访问浏览器的方法调用计数"""
+
+    def __init__(self, target: Any, counter: CallCounter):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_counter', counter)
+
+    def _wrap(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if type(value).__name__ in _PROXIED_TYPES:
+            return _CountingProxy(value, self._counter)
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+        if not callable(value):
+            return self._wrap(value)
+        if name in _LAZY_MEMBERS:
+            def lazy(*args, **kwargs):
+                return self._wrap(value(*args, **kwargs))
+            return lazy
+
+        def counted(*args, **kwargs):
+            self._counter.record(name)
+            return self._wrap(value(*args, **kwargs))
+        return counted
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._target, name, value)
+
+    def __repr__(self) -> str:
+        return f"<Counting {self._target!r}>"
+
+
+def counting_page(page, counter: Optional[CallCounter] = None):
+    """
+    包装页面对象，返回 (代理页面, 计数器)
+
+    代理可以直接传给 process_single_peda 等处理函数。
+    """
+    counter = counter or CallCounter()
+    return _CountingProxy(page, counter), counter
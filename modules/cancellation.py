@@ -0,0 +1,109 @@
+"""
+协作式取消
+
+GUI 点击“停止”时调用 CancellationToken.cancel()，处理线程在步骤之间和较长的等待中
+检查令牌，抛出 OperationCancelled 后由批处理引擎收尾（关闭浏览器、返回已完成的统计）。
+"""
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# 可取消等待时每次实际等待的最长时间（毫秒）
+CANCEL_CHECK_INTERVAL_MS = 500
+
+
+class OperationCancelled(Exception):
+    """处理被用户取消"""
+
+
+class CancellationToken:
+    """线程安全的取消令牌"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ""
+
+    def cancel(self, reason: str = "用户停止处理"):
+        """请求取消（可从任意线程调用）"""
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """已请求取消时抛出 OperationCancelled"""
+        if self._event.is_set():
+            raise OperationCancelled(self.reason)
+
+    def wait(self, seconds: float) -> bool:
+        """
+        等待指定秒数，期间被取消则提前返回
+
+        Returns:
+            bool: 被取消返回True
+        """
+        return self._event.wait(seconds)
+
+
+def check_cancelled(token: Optional[CancellationToken]):
+    """令牌可为空的取消检查"""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def cancellable_wait(page, milliseconds: int, token: Optional[CancellationToken] = None):
+    """
+    page.wait_for_timeout 的可取消版本：分段等待，每段之间检查取消令牌
+
+    Args:
+        page: Playwright页面对象
+        milliseconds: 等待时间（毫秒）
+        token: 取消令牌（为空时等同于 page.wait_for_timeout）
+    """
+    if token is None:
+        page.wait_for_timeout(milliseconds)
+        return
+
+    remaining = milliseconds
+    while remaining > 0:
+        token.raise_if_cancelled()
+        step = min(remaining, CANCEL_CHECK_INTERVAL_MS)
+        page.wait_for_timeout(step)
+        remaining -= step
+    token.raise_if_cancelled()
+
+
+def _poll_until(wait: Callable[[float], Any], timeout: float, token: Optional[CancellationToken]):
+    """
+    把一次长等待拆成多次最长 CANCEL_CHECK_INTERVAL_MS 的短等待，每次之前检查取消令牌
+
+    wait(timeout_ms) 超时抛出 Playwright 的 TimeoutError；总时间用完后抛出最后一次的超时异常。
+    """
+    if token is None:
+        return wait(timeout)
+
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    deadline = time.monotonic() + timeout / 1000
+    while True:
+        token.raise_if_cancelled()
+        remaining = (deadline - time.monotonic()) * 1000
+        try:
+            return wait(max(1.0, min(remaining, CANCEL_CHECK_INTERVAL_MS)))
+        except PlaywrightTimeoutError:
+            if time.monotonic() >= deadline:
+                raise
+
+
+def cancellable_wait_for_function(page, expression: str, timeout: float,
+                                  token: Optional[CancellationToken] = None):
+    """page.wait_for_function 的可取消版本（token 为空时等同于原调用）"""
+    return _poll_until(lambda ms: page.wait_for_function(expression, timeout=ms), timeout, token)
+
+
+def cancellable_load_state(page, state: str, timeout: float, token: Optional[CancellationToken] = None):
+    """page.wait_for_load_state 的可取消版本（token 为空时等同于原调用）"""
+    return _poll_until(lambda ms: page.wait_for_load_state(state, timeout=ms), timeout, token)
@@ -1,75 +1,353 @@
+import numbers
 import os
+import re
 import tkinter as tk
 from tkinter import filedialog
 
+import numpy as np
 import pandas as pd
 
-from config.constants import PART_NUMBER_COLUMN, REQUIRED_COLUMNS
+from config.constants import DROPDOWN_VALUES, PART_NUMBER_COLUMN, REQUIRED_COLUMNS
+from .cancellation import OperationCancelled, check_cancelled
+from .structured_log import get_logger
 
+logger = get_logger(__name__)
 
-def _strip_string(value):
-    return value.strip() if isinstance(value, str) else value
 
-def read_excel_data(file_path):
-    """从Excel文件读取数据"""
+# 单元格校验错误码（cell_errors 中使用，空字符串表示该单元格通过校验）
+ERROR_MISSING = 'missing'                # 必填字段为空
+ERROR_INVALID_OPTION = 'invalid_option'  # 不在下拉框已知可选值中
+ERROR_INVALID_CODE = 'invalid_code'      # 代码字段不是纯数字
+ERROR_NOT_INTEGER = 'not_integer'        # 数值字段不是非负整数
+
+# 需要按数字代码校验格式的下拉框字段
+_CODE_COLUMNS = ['reason', 'project_type']
+# 需要按非负整数校验的字段（sample_quantity 为选填，空值不报错）
+_INTEGER_COLUMNS = ['decision_value', 'sample_quantity']
+_DIGITS_PATTERN = r'\d+'
+
+
+_NUMERIC_TEXT = re.compile(r'(\d+)\.0+')
+# 浮点数按整数转文本的范围（超出 int64 时保留原样）
+_MAX_EXACT_FLOAT = 2 ** 53
+
+
+def _cell_text(value, numeric_text: bool):
+    """单元格转换为去除首尾空白的字符串，缺失或空白返回 None（object 列逐个转换使用）"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        if numeric_text and text.endswith('0'):
+            match = _NUMERIC_TEXT.fullmatch(text)
+            if match:
+                return match.group(1)
+        return text
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if value.is_integer() and abs(value) < _MAX_EXACT_FLOAT:
+            return str(int(value))
+        return str(value)
+    if value is pd.NA or value is pd.NaT:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _normalize_column(series: pd.Series, numeric_text: bool = False) -> pd.Series:
+    """把一列统一为去除首尾空白的字符串（StringDtype），空白视为缺失。
+
+    Excel 中含空单元格的数字列会被读成浮点数（250 -> 250.0），整数值的浮点数按整数转文本，
+    避免下拉框按 "250.0" 取值失败；混合类型（object）列中的浮点数单元格同样处理。
+    numeric_text=True 时对文本形式的 "250.0"（CSV/JSONL）也去掉 ".0" 后缀。
+    整数列直接转文本，浮点列按数值判断，不再对整列做字符串正则替换。
+    """
+    kind = series.dtype.kind
+    if kind in 'iu':
+        return series.astype('string')
+    if kind == 'f':
+        values = series.to_numpy(dtype='float64')
+        present = ~np.isnan(values)
+        integral = present & (np.mod(values, 1) == 0) & (np.abs(values) < _MAX_EXACT_FLOAT)
+        text = np.full(len(values), None, dtype=object)
+        text[integral] = values[integral].astype('int64').astype(str)
+        fractional = present & ~integral
+        text[fractional] = values[fractional].astype(str)
+        return pd.Series(text, index=series.index, dtype='string')
+    return pd.Series([_cell_text(value, numeric_text) for value in series.to_numpy(dtype=object)],
+                     index=series.index, dtype='string')
+
+# 流式读取时每个数据块的行数
+CHUNK_ROWS = 5000
+
+# 文件类型显示名称
+_FILE_TYPE_NAMES = {
+    '.csv': 'CSV',
+    '.jsonl': 'JSONL',
+    '.parquet': 'Parquet',
+    '.xlsx': 'Excel',
+    '.xls': 'Excel'
+}
+
+
+def _report_progress(progress_callback, rows_read, fraction):
+    """调用进度回调（rows_read: 已读取行数, fraction: 0~1 的读取进度）"""
+    if progress_callback:
+        progress_callback(rows_read, min(max(fraction, 0.0), 1.0))
+
+
+def _iter_csv_chunks(file_path, chunk_rows, progress_callback):
+    """按块读取CSV（全部按字符串读取，省去类型推断，由校验阶段统一规范化）"""
+    total_bytes = os.path.getsize(file_path) or 1
+    rows_read = 0
+    with open(file_path, 'rb') as handle:
+        reader = pd.read_csv(handle, encoding='utf-8-sig', dtype=str, chunksize=chunk_rows)
+        for chunk in reader:
+            rows_read += len(chunk)
+            _report_progress(progress_callback, rows_read, handle.tell() / total_bytes)
+            yield chunk
+
+
+def _iter_jsonl_chunks(file_path, chunk_rows, progress_callback):
+    """按块读取JSONL（每行一个JSON对象）"""
+    total_bytes = os.path.getsize(file_path) or 1
+    rows_read = 0
+    with open(file_path, 'rb') as handle:
+        reader = pd.read_json(handle, lines=True, chunksize=chunk_rows, dtype=False, convert_dates=False)
+        for chunk in reader:
+            rows_read += len(chunk)
+            _report_progress(progress_callback, rows_read, handle.tell() / total_bytes)
+            yield chunk
+
+
+def _iter_parquet_chunks(file_path, chunk_rows, progress_callback):
+    """按行批次读取Parquet（需要可选依赖 pyarrow）"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("读取Parquet文件需要安装 pyarrow: pip install pyarrow")
+
+    parquet_file = pq.ParquetFile(file_path)
+    total_rows = parquet_file.metadata.num_rows or 1
+    rows_read = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        chunk = batch.to_pandas()
+        chunk.index = pd.RangeIndex(rows_read, rows_read + len(chunk))
+        rows_read += len(chunk)
+        _report_progress(progress_callback, rows_read, rows_read / total_rows)
+        yield chunk
+
+
+def _iter_xlsx_chunks(file_path, chunk_rows, progress_callback):
+    """用只读工作簿逐行读取第一个工作表，按块产出（索引与Excel行号对应：索引 = 行号 - 2）"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total_rows = max((sheet.max_row or 1) - 1, 1)
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+
+        records, index = [], []
+        rows_read = 0
+        for row_offset, values in enumerate(rows):
+            if values is None or all(value is None or value == '' for value in values):
+                continue  # 跳过整行为空的行
+            records.append(values[:len(columns)])
+            index.append(row_offset)
+            if len(records) >= chunk_rows:
+                rows_read += len(records)
+                _report_progress(progress_callback, rows_read, (row_offset + 1) / total_rows)
+                yield pd.DataFrame.from_records(records, columns=columns, index=index)
+                records, index = [], []
+        if records:
+            rows_read += len(records)
+            yield pd.DataFrame.from_records(records, columns=columns, index=index)
+        _report_progress(progress_callback, rows_read, 1.0)
+    finally:
+        workbook.close()
+
+
+def iter_input_chunks(file_path, chunk_rows: int = CHUNK_ROWS, progress_callback=None):
+    """
+    按数据块流式读取输入文件（xlsx / csv / jsonl / parquet），逐块产出DataFrame。
+
+    .xls 及未知扩展名无法流式读取，整体读取后作为一个数据块产出。
+
+    Args:
+        file_path: 输入文件路径
+        chunk_rows: 每个数据块的行数
+        progress_callback: 进度回调 progress_callback(rows_read, fraction)
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.csv':
+        yield from _iter_csv_chunks(file_path, chunk_rows, progress_callback)
+    elif extension == '.jsonl':
+        yield from _iter_jsonl_chunks(file_path, chunk_rows, progress_callback)
+    elif extension == '.parquet':
+        yield from _iter_parquet_chunks(file_path, chunk_rows, progress_callback)
+    elif extension == '.xlsx':
+        yield from _iter_xlsx_chunks(file_path, chunk_rows, progress_callback)
+    else:
+        df = pd.read_excel(file_path)
+        _report_progress(progress_callback, len(df), 1.0)
+        yield df
+
+
+def read_excel_data(file_path, progress_callback=None, chunk_rows: int = CHUNK_ROWS, cancel_token=None):
+    """
+    从输入文件读取数据（支持 xlsx / xls / csv / jsonl / parquet）
+
+    Args:
+        file_path: 输入文件路径
+        progress_callback: 可选的读取进度回调 progress_callback(rows_read, fraction)
+        chunk_rows: 流式读取时每个数据块的行数
+        cancel_token: 可选的取消令牌，每读完一个数据块检查一次，取消时抛出 OperationCancelled
+
+    Returns:
+        pd.DataFrame: 读取的数据，失败或没有数据行时返回None
+    """
     try:
         # 检查文件是否存在
         if not os.path.exists(file_path):
-            print(f"错误: 文件不存在 - {file_path}")
+            logger.error('错误: 文件不存在 - %s', file_path)
             return None
         
         # 检查文件权限
         if not os.access(file_path, os.R_OK):
-            print(f"错误: 文件无读取权限 - {file_path}")
+            logger.error('错误: 文件无读取权限 - %s', file_path)
             return None
         
-        print(f"正在读取文件: {os.path.basename(file_path)}")
+        logger.debug('正在读取文件: %s', os.path.basename(file_path))
         
         # 根据文件扩展名选择读取方式
-        if file_path.lower().endswith('.csv'):
-            df = pd.read_csv(file_path, encoding='utf-8')
-            print("文件类型: CSV")
-        elif file_path.lower().endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file_path)
-            print("文件类型: Excel")
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in _FILE_TYPE_NAMES:
+            logger.debug('文件类型: %s', _FILE_TYPE_NAMES[extension])
         else:
-            print(f"警告: 未知文件类型，尝试按Excel格式读取")
-            df = pd.read_excel(file_path)
+            logger.warning('警告: 未知文件类型，尝试按Excel格式读取')
+
+        chunks = []
+        for chunk in iter_input_chunks(file_path, chunk_rows, progress_callback):
+            check_cancelled(cancel_token)
+            chunks.append(chunk)
+        df = pd.concat(chunks) if len(chunks) > 1 else (chunks[0] if chunks else pd.DataFrame())
         
         # 显示基本信息
-        print(f"数据读取成功: {len(df)} 行, {len(df.columns)} 列")
+        logger.debug('数据读取成功: %s 行, %s 列', len(df), len(df.columns))
         
         if len(df) == 0:
-            print("警告: 文件中没有数据行")
+            logger.warning('警告: 文件中没有数据行')
             return None
         
         return df
         
+    except OperationCancelled:
+        raise
     except pd.errors.EmptyDataError:
-        print(f"错误: 文件为空或没有数据 - {file_path}")
+        logger.error('错误: 文件为空或没有数据 - %s', file_path)
         return None
     except pd.errors.ParserError as e:
-        print(f"错误: 文件格式解析失败 - {e}")
+        logger.error('错误: 文件格式解析失败 - %s', e)
+        return None
+    except ValueError as e:
+        logger.error('错误: 文件内容解析失败 - %s', e)
+        return None
+    except ImportError as e:
+        logger.error('错误: %s', e)
         return None
     except PermissionError:
-        print(f"错误: 文件被其他程序占用或权限不足 - {file_path}")
+        logger.error('错误: 文件被其他程序占用或权限不足 - %s', file_path)
         return None
     except FileNotFoundError:
-        print(f"错误: 文件未找到 - {file_path}")
+        logger.error('错误: 文件未找到 - %s', file_path)
         return None
     except Exception as e:
-        print(f"错误: 读取Excel文件时发生未知错误 - {e}")
-        print(f"文件路径: {file_path}")
+        logger.error('错误: 读取Excel文件时发生未知错误 - %s', e)
+        logger.debug('文件路径: %s', file_path)
         return None
 
+def _validation_result(**overrides):
+    """构造验证结果字典（未覆盖的键取默认值）"""
+    result = {
+        'headers_valid': False,
+        'missing_columns': [],
+        'total_rows': 0,
+        'qualified_rows_count': 0,
+        'qualified_df': pd.DataFrame(),
+        'has_duplicates': False,
+        'duplicate_part_numbers': [],
+        'invalid_rows_count': 0,
+        'cell_errors': pd.DataFrame(),
+        'error_summary': {}
+    }
+    result.update(overrides)
+    return result
+
+
+def _check_cells(working_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    对整张表做一次向量化的单元格校验，返回与 working_df 同索引的错误码表。
+
+    每列一个错误码（空字符串表示通过），同一单元格只记录第一个命中的错误。
+    会就地把 decision_region 规范为下拉框中的标准写法（如 asia -> Asia）。
+    """
+    checked_columns = list(REQUIRED_COLUMNS) + [
+        col for col in _INTEGER_COLUMNS if col in working_df.columns and col not in REQUIRED_COLUMNS
+    ]
+    cell_errors = pd.DataFrame('', index=working_df.index, columns=checked_columns)
+
+    # 1. 必填字段为空
+    for column in REQUIRED_COLUMNS:
+        cell_errors.loc[working_df[column].isna(), column] = ERROR_MISSING
+
+    # 2. 数字代码格式（reason, project_type）
+    for column in _CODE_COLUMNS:
+        values = working_df[column]
+        invalid = values.notna() & ~values.str.fullmatch(_DIGITS_PATTERN).fillna(False)
+        cell_errors.loc[invalid, column] = ERROR_INVALID_CODE
+
+    # 3. 非负整数（decision_value 必填，sample_quantity 选填）
+    for column in _INTEGER_COLUMNS:
+        if column not in working_df.columns:
+            continue
+        values = working_df[column]
+        invalid = values.notna() & ~values.str.fullmatch(_DIGITS_PATTERN).fillna(False)
+        cell_errors.loc[invalid & (cell_errors[column] == ''), column] = ERROR_NOT_INTEGER
+
+    # 4. 下拉框取值范围（忽略大小写，命中后统一为标准写法）
+    for column, options in DROPDOWN_VALUES.items():
+        if not options or column not in working_df.columns:
+            continue
+        canonical = {str(option).lower(): str(option) for option in options}
+        values = working_df[column]
+        mapped = values.str.lower().map(canonical)
+        invalid = values.notna() & mapped.isna()
+        cell_errors.loc[invalid & (cell_errors[column] == ''), column] = ERROR_INVALID_OPTION
+        working_df[column] = mapped.where(mapped.notna(), values).astype('string')
+
+    return cell_errors
+
+
 def validate_excel_data(df: pd.DataFrame):
     """
-    验证DataFrame是否符合要求。
+    验证DataFrame是否符合要求（整表向量化校验，一次完成）。
 
     1. 检查所有必需的列是否存在。
-    2. 检查必填字段（part_number, reason, decision_region, decision_value）是否为空，筛选出"合格"的数据行。
-       - "合格"定义：4个必填字段都不能为空。
-       - 选填字段（contact, project_type, sample_quantity）可以为空。
+    2. 检查件号唯一性。
+    3. 逐单元格校验并筛选出"合格"的数据行：
+       - 5个必填字段（part_number, reason, decision_region, decision_value, project_type）不能为空；
+       - reason / project_type 必须是数字代码，且在 DROPDOWN_VALUES 配置了可选值时必须命中；
+       - decision_region 必须是 DROPDOWN_VALUES 中的已知区域（忽略大小写）；
+       - decision_value、sample_quantity（有值时）必须是非负整数。
+       - 选填字段（contact, external_info, internal_comment, sample_quantity）可以为空。
 
     Args:
         df (pd.DataFrame): 从Excel读取的DataFrame。
@@ -80,74 +358,113 @@ def validate_excel_data(df: pd.DataFrame):
                   'headers_valid': bool,      # 表头是否有效
                   'missing_columns': list,    # 缺少的必填列名
                   'total_rows': int,          # 总行数
-                  'qualified_rows_count': int,# 合格行数（必填字段不为空）
+                  'qualified_rows_count': int,# 合格行数（所有单元格通过校验）
                   'qualified_df': pd.DataFrame,# 只包含合格行的DataFrame
                   'has_duplicates': bool,     # 件号是否存在重复
-                  'duplicate_part_numbers': list # 重复的件号列表
+                  'duplicate_part_numbers': list, # 重复的件号列表
+                  'invalid_rows_count': int,  # 存在错误的行数
+                  'cell_errors': pd.DataFrame,# 与原表同索引的错误码表（'' 表示通过）
+                  'error_summary': dict       # {列名: {错误码: 行数}}
               }
     """
     if df is None or df.empty:
-        return {
-            'headers_valid': False,
-            'missing_columns': REQUIRED_COLUMNS,
-            'total_rows': 0,
-            'qualified_rows_count': 0,
-            'qualified_df': pd.DataFrame(),
-            'has_duplicates': False,
-            'duplicate_part_numbers': []
-        }
+        return _validation_result(missing_columns=REQUIRED_COLUMNS)
 
     # 1. 检查表头 - 只检查必填列
     missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
     if missing_columns:
-        return {
-            'headers_valid': False,
-            'missing_columns': missing_columns,
-            'total_rows': len(df),
-            'qualified_rows_count': 0,
-            'qualified_df': pd.DataFrame(),
-            'has_duplicates': False,
-            'duplicate_part_numbers': []
-        }
+        return _validation_result(missing_columns=missing_columns, total_rows=len(df))
 
     working_df = df.copy()
-    for column in REQUIRED_COLUMNS:
+    numeric_columns = _CODE_COLUMNS + _INTEGER_COLUMNS
+    for column in REQUIRED_COLUMNS + _INTEGER_COLUMNS:
         if column in working_df.columns:
-            working_df[column] = working_df[column].apply(_strip_string)
-            working_df[column] = working_df[column].replace('', pd.NA)
+            working_df[column] = _normalize_column(working_df[column], numeric_text=column in numeric_columns)
 
     # 2. 检查件号唯一性
-    if PART_NUMBER_COLUMN in working_df.columns:
-        normalized_parts = working_df[PART_NUMBER_COLUMN].dropna().astype(str).str.strip()
-        normalized_parts = normalized_parts[normalized_parts != '']
-        duplicate_values = sorted(normalized_parts[normalized_parts.duplicated(keep=False)].unique().tolist())
-    else:
-        duplicate_values = []
+    normalized_parts = working_df[PART_NUMBER_COLUMN].dropna()
+    duplicate_values = sorted(normalized_parts[normalized_parts.duplicated(keep=False)].unique().tolist())
 
     if duplicate_values:
-        return {
-            'headers_valid': True,
-            'missing_columns': [],
-            'total_rows': len(df),
-            'qualified_rows_count': 0,
-            'qualified_df': pd.DataFrame(),
-            'has_duplicates': True,
-            'duplicate_part_numbers': duplicate_values
-        }
-
-    # 3. 筛选合格行 - 只检查4个必填字段不为空或空白字符串
-    qualified_df = working_df.dropna(subset=REQUIRED_COLUMNS)
-    qualified_rows_count = len(qualified_df)
-
-    return {
-        'headers_valid': True,
-        'missing_columns': [],
-        'total_rows': len(df),
-        'qualified_rows_count': qualified_rows_count,
-        'qualified_df': qualified_df,
-        'has_duplicates': False,
-        'duplicate_part_numbers': []
-    }
+        return _validation_result(
+            headers_valid=True,
+            total_rows=len(df),
+            has_duplicates=True,
+            duplicate_part_numbers=duplicate_values
+        )
+
+    # 3. 单元格校验并筛选合格行
+    cell_errors = _check_cells(working_df)
+    row_has_error = cell_errors.ne('').any(axis=1)
+
+    error_summary = {}
+    for column in cell_errors.columns:
+        counts = cell_errors.loc[cell_errors[column] != '', column].value_counts()
+        if not counts.empty:
+            error_summary[column] = {code: int(count) for code, count in counts.items()}
+
+    qualified_df = working_df.loc[~row_has_error].copy()
+    for column in REQUIRED_COLUMNS + _INTEGER_COLUMNS:
+        if column in qualified_df.columns:
+            # 还原为普通 object 列，下游 to_dict('records') 得到的是 str / None
+            qualified_df[column] = qualified_df[column].astype(object).where(qualified_df[column].notna(), None)
+
+    return _validation_result(
+        headers_valid=True,
+        total_rows=len(df),
+        qualified_rows_count=len(qualified_df),
+        qualified_df=qualified_df,
+        invalid_rows_count=int(row_has_error.sum()),
+        cell_errors=cell_errors,
+        error_summary=error_summary
+    )
+
+
+def describe_cell_errors(validation_result, limit: int = 5):
+    """
+    把校验结果中的错误整理为可读的日志行。
+
+    Args:
+        validation_result: validate_excel_data 的返回值
+        limit: 最多列出的错误单元格数量
+
+    Returns:
+        list: 日志文本列表，没有错误时为空列表
+    """
+    cell_errors = validation_result.get('cell_errors')
+    if cell_errors is None or cell_errors.empty or not validation_result.get('error_summary'):
+        return []
+
+    lines = []
+    for column, codes in validation_result['error_summary'].items():
+        detail = ", ".join(f"{code} x{count}" for code, count in codes.items())
+        lines.append(f"列 {column}: {detail}")
+
+    stacked = cell_errors.stack()
+    stacked = stacked[stacked != '']
+    for (row_index, column), code in stacked.head(limit).items():
+        # Excel 行号 = DataFrame 索引 + 2（表头占第1行）
+        excel_row = row_index + 2 if isinstance(row_index, numbers.Integral) else row_index
+        lines.append(f"  第 {excel_row} 行 {column}: {code}")
+    if len(stacked) > limit:
+        lines.append(f"  ... 共 {len(stacked)} 个错误单元格")
+    return lines
+
+
+def log_invalid_rows(validation_result, log, limit: int = 5):
+    """
+    记录未通过字段校验而被排除的行数和错误明细（没有被排除的行时不记录）
+
+    Args:
+        validation_result: validate_excel_data 的返回值
+        log: 日志函数 log(message, level)
+        limit: 最多列出的错误单元格数量
+    """
+    if not validation_result.get('invalid_rows_count'):
+        return
+    log(f"有 {validation_result['invalid_rows_count']} 行未通过字段校验，已排除:", "WARNING")
+    for line in describe_cell_errors(validation_result, limit):
+        log(line, "WARNING")
 
 
 def select_excel_file():
@@ -161,6 +478,8 @@ def select_excel_file():
             filetypes=[
                 ("Excel文件", "*.xlsx *.xls"),
                 ("CSV文件", "*.csv"), 
+                ("JSONL文件", "*.jsonl"),
+                ("Parquet文件", "*.parquet"),
                 ("所有文件", "*.*")
             ],
             initialdir="."  # 从当前目录开始
@@ -170,5 +489,5 @@ def select_excel_file():
         return file_path
         
     except Exception as e:
-        print(f"打开文件选择对话框时出错: {e}")
+        logger.debug('打开文件选择对话框时出错: %s', e)
         return None 
@@ -3,10 +3,20 @@ from pathlib import Path
 from typing import Dict, List, Optional, Callable
 
 # 导入配置常量
-from config.constants import DOCUMENT_CATEGORIES, FILE_TYPE_FILTERS
+from config.constants import (
+    DOCUMENT_CATEGORIES, FILE_TYPE_FILTERS, CHECKPOINT_STEP_FILE_UPLOADED, CHECKPOINT_STEP_SAVED,
+    CHECKPOINT_STEP_VALIDATED, CHECKPOINT_STEP_PDF_EXPORTED, OVERLAY_APPEAR_TIMEOUT_MS
+)
 
-# 导入表单处理模块（用于save_and_validate_peda函数调用）
-from modules.form_handler import save_and_validate_peda
+# 导入表单处理模块（保存验证和等待遮罩消失）
+from modules.form_handler import save_and_validate_peda, wait_for_overlay_gone
+from modules.cancellation import OperationCancelled, check_cancelled
+from modules.popup_handler import fatal_error_shown, handle_fatal_error_popup
+from modules import tracing
+from modules.tracing import traced
+from modules.structured_log import get_logger
+
+logger = get_logger(__name__)
 
 
 class DocumentManager:
@@ -21,14 +31,14 @@ class DocumentManager:
     def validate_structure(self) -> bool:
         """验证件号文件夹结构是否正确"""
         if not self.part_folder.exists():
-            print(f"错误: 件号文件夹不存在: {self.part_folder}")
+            logger.error('错误: 件号文件夹不存在: %s', self.part_folder)
             return False
             
         if not self.part_folder.is_dir():
-            print(f"错误: {self.part_folder} 不是一个目录")
+            logger.error('错误: %s 不是一个目录', self.part_folder)
             return False
             
-        print(f"件号文件夹验证通过: {self.part_folder}")
+        logger.debug('件号文件夹验证通过: %s', self.part_folder)
         return True
     
     def scan_documents(self) -> Dict[str, List[str]]:
@@ -47,11 +57,11 @@ class DocumentManager:
         files = []
         
         if not category_path.exists():
-            print(f"信息: 类别目录不存在: {category_path}")
+            logger.debug('信息: 类别目录不存在: %s', category_path)
             return files
             
         if not category_path.is_dir():
-            print(f"警告: {category_path} 不是一个目录")
+            logger.warning('警告: %s 不是一个目录', category_path)
             return files
         
         # Windows 系统自动生成的文件，需要排除
@@ -71,14 +81,14 @@ class DocumentManager:
                 if self._validate_file(file_path):
                     files.append(str(file_path))
                 else:
-                    print(f"警告: 文件验证失败: {file_path}")
+                    logger.warning('警告: 文件验证失败: %s', file_path)
             
             # 按文件名排序
             files.sort()
-            print(f"{category}: 找到 {len(files)} 个有效文件")
+            logger.debug('%s: 找到 %s 个有效文件', category, len(files))
             
         except Exception as e:
-            print(f"错误: 扫描类别 {category} 时出错: {e}")
+            logger.error('错误: 扫描类别 %s 时出错: %s', category, e)
             
         return files
     
@@ -87,21 +97,21 @@ class DocumentManager:
         try:
             # 检查文件是否可读
             if not os.access(file_path, os.R_OK):
-                print(f"警告: 文件无读取权限: {file_path}")
+                logger.warning('警告: 文件无读取权限: %s', file_path)
                 return False
                 
             # 检查文件大小（避免过大文件，这里设置为50MB）
             file_size = file_path.stat().st_size
             max_size = 50 * 1024 * 1024  # 50MB
             if file_size > max_size:
-                print(f"警告: 文件过大 ({file_size / 1024 / 1024:.1f}MB): {file_path}")
-                print(f"⚠️ 建议将文件压缩或分割后再上传")
+                logger.warning('警告: 文件过大 (%.1fMB): %s', file_size / 1024 / 1024, file_path)
+                logger.warning('⚠️ 建议将文件压缩或分割后再上传')
                 return False
                 
             return True
             
         except Exception as e:
-            print(f"错误: 验证文件时出错 {file_path}: {e}")
+            logger.error('错误: 验证文件时出错 %s: %s', file_path, e)
             return False
     
     def get_upload_summary(self) -> Dict:
@@ -118,10 +128,24 @@ class DocumentManager:
         }
 
 
-def process_document_upload(page, document_manager: DocumentManager, part_number: str = None, data_row = None, upload_record_callback=None, log_callback: Optional[Callable] = None) -> Dict:
-    """处理文档上传的主要逻辑，支持上传记录回调"""
+def upload_file_key(category: str, file_path: str) -> str:
+    """断点日志中标识已上传文件的键（类别/文件名）"""
+    return f"{category}/{os.path.basename(file_path)}"
+
+
+def process_document_upload(page, document_manager: DocumentManager, part_number: str = None, data_row = None, upload_record_callback=None, log_callback: Optional[Callable] = None,
+                            step_callback: Optional[Callable] = None, completed_steps=None, uploaded_files=None,
+                            cancel_token=None) -> Dict:
+    """处理文档上传的主要逻辑，支持上传记录回调
+
+    续跑时 uploaded_files 为上次已上传并保存的文件键集合，这些文件不会重复上传；
+    completed_steps 透传给 save_and_validate_peda 以跳过已完成的保存/验证，
+    但本次上传了文件时必须重新保存和验证（PIM 只在 Save 后保留上传的文件）；
+    cancel_token 在每个文件上传前检查，取消时抛出 OperationCancelled。
+    """
     upload_results = {
         "success_count": 0,
+        "new_uploads": 0,
         "failed_count": 0,
         "category_results": {},
         "errors": []
@@ -148,51 +172,61 @@ def process_document_upload(page, document_manager: DocumentManager, part_number
         }
         
         if not files:
-            print(f"跳过类别 {category}: 没有文件")
+            logger.debug('跳过类别 %s: 没有文件', category)
             category_result["status"] = "skipped_no_files"
         else:
-            print(f"开始上传类别 {category}: {len(files)} 个文件")
+            logger.debug('开始上传类别 %s: %s 个文件', category, len(files))
             category_result = upload_category_files(
-                page, category, files, part_number=part_number, upload_record_callback=upload_record_callback
+                page, category, files, part_number=part_number, upload_record_callback=upload_record_callback,
+                step_callback=step_callback, skip_files=uploaded_files, cancel_token=cancel_token
             )
         
         upload_results["category_results"][category] = category_result
         upload_results["success_count"] += category_result.get("uploaded_files", 0)
+        upload_results["new_uploads"] += category_result.get("new_uploads", 0)
         upload_results["failed_count"] += category_result.get("failed_files", 0)
     
     # 执行保存和验证
     if upload_results['success_count'] > 0:
-        print(f"\n成功上传了 {upload_results['success_count']} 个文件，开始保存、验证和跳转...")
+        logger.debug('成功上传了 %s 个文件，开始保存、验证和跳转...', upload_results['success_count'])
         
         # 如果有上传失败的文件，给出提示但继续尝试保存
         if upload_results['failed_count'] > 0:
-            print(f"⚠️ 注意：有 {upload_results['failed_count']} 个文件上传失败")
-            print("将尝试保存已上传的文件...")
+            logger.warning('⚠️ 注意：有 %s 个文件上传失败', upload_results['failed_count'])
+            logger.debug('将尝试保存已上传的文件...')
         
+        # 本次上传的文件只有保存后才会保留，上次的保存/验证/PDF 不再算数
+        if upload_results['new_uploads'] > 0 and completed_steps:
+            completed_steps = set(completed_steps) - {CHECKPOINT_STEP_SAVED, CHECKPOINT_STEP_VALIDATED,
+                                                      CHECKPOINT_STEP_PDF_EXPORTED}
+
         # 导入表单处理模块（这里使用动态导入避免循环依赖）
         from modules.form_handler import save_and_validate_peda
-        save_and_validate_success = save_and_validate_peda(page, part_number, document_manager, data_row, log_callback=log_callback)
+        save_and_validate_success = save_and_validate_peda(page, part_number, document_manager, data_row, log_callback=log_callback,
+                                                           step_callback=step_callback, completed_steps=completed_steps,
+                                                           cancel_token=cancel_token)
         upload_results['save_and_validate'] = save_and_validate_success
         upload_results['pdf_saved'] = save_and_validate_success
     else:
-        print("⚠️ 没有成功上传的文件，跳过保存和验证")
+        logger.warning('⚠️ 没有成功上传的文件，跳过保存和验证')
         upload_results['save_and_validate'] = False
     
     return upload_results
 
 
+@traced('document_tab')
 def click_document_maintenance_tab(page) -> bool:
     """点击Document maintenance标签并等待内容加载"""
     try:
-        print("尝试点击Document maintenance标签...")
+        logger.debug('尝试点击Document maintenance标签...')
         
         # 先检查当前状态
         try:
             if page.locator("#stibo_tab_Document_maintenance.tabs-panel-tab--selected").is_visible(timeout=1000):
-                print("✅ Document maintenance标签已经是选中状态")
+                logger.info('✅ Document maintenance标签已经是选中状态')
                 return True
         except:
-            print("Document maintenance标签当前未选中，需要点击")
+            logger.debug('Document maintenance标签当前未选中，需要点击')
             
         # 使用多种点击方法，优先使用最稳定的方法
         click_methods = [
@@ -209,7 +243,7 @@ def click_document_maintenance_tab(page) -> bool:
         clicked = False
         for i, method in enumerate(click_methods, 1):
             try:
-                print(f"尝试点击方法 {i}...")
+                logger.debug('尝试点击方法 %s...', i)
                 method()
                 
                 # 等待标签状态改变
@@ -217,47 +251,55 @@ def click_document_maintenance_tab(page) -> bool:
                 
                 # 验证是否成功切换 - 恢复原版本的简单有效验证
                 if page.locator("#stibo_tab_Document_maintenance.tabs-panel-tab--selected").is_visible(timeout=3000):
-                    print(f"✅ Document maintenance标签点击成功 (方法 {i})")
-                    print("✅ 已成功切换到Document maintenance标签页")
+                    logger.info('✅ Document maintenance标签点击成功 (方法 %s)', i)
+                    logger.info('✅ 已成功切换到Document maintenance标签页')
                     clicked = True
                     break
                 else:
-                    print(f"⚠️ 方法 {i} 点击后标签页未正确切换")
+                    logger.warning('⚠️ 方法 %s 点击后标签页未正确切换', i)
                     
             except Exception as e:
-                print(f"点击方法 {i} 失败: {e}")
+                logger.warning('点击方法 %s 失败: %s', i, e)
         
         if not clicked:
-            print("❌ 无法成功切换到Document maintenance标签")
+            logger.error('❌ 无法成功切换到Document maintenance标签')
             return False
         
         # 等待页面内容加载
-        print("等待Document maintenance页面内容加载...")
+        logger.debug('等待Document maintenance页面内容加载...')
         page.wait_for_timeout(3000)
         
         # 等待文档上传按钮出现
-        print("等待文档上传按钮出现...")
+        logger.debug('等待文档上传按钮出现...')
         try:
             # 等待任意一个上传按钮变为可见
             page.wait_for_selector("i.material-icons:has-text('add_circle')", timeout=10000)
-            print("✅ 文档上传按钮已出现")
+            logger.info('✅ 文档上传按钮已出现')
             return True
         except Exception as e:
-            print(f"⚠️ 等待上传按钮超时: {e}")
+            logger.warning('⚠️ 等待上传按钮超时: %s', e)
             # 即使上传按钮检测超时，如果标签切换成功就继续
-            print("标签切换成功，继续尝试文档上传...")
+            logger.debug('标签切换成功，继续尝试文档上传...')
             return True
             
     except Exception as e:
-        print(f"❌ 点击Document maintenance标签失败: {e}")
+        logger.error('❌ 点击Document maintenance标签失败: %s', e)
         return False
 
 
-def upload_category_files(page, category: str, files: List[str], part_number=None, upload_record_callback=None) -> Dict:
-    """上传指定类别的所有文件，支持上传记录回调"""
+def upload_category_files(page, category: str, files: List[str], part_number=None, upload_record_callback=None,
+                          step_callback: Optional[Callable] = None, skip_files=None, cancel_token=None) -> Dict:
+    """上传指定类别的所有文件，支持上传记录回调
+
+    每个文件上传成功后调用 step_callback(CHECKPOINT_STEP_FILE_UPLOADED, file=..., size=...)；
+    skip_files 中的文件视为已上传（断点续跑）。结果中 uploaded_files 包含跳过的文件，
+    new_uploads 只统计本次实际上传的文件。
+    """
+    skip_files = skip_files or set()
     result = {
         "total_files": len(files),
         "uploaded_files": 0,
+        "new_uploads": 0,
         "failed_files": 0,
         "errors": [],
         "status": "processing"
@@ -265,24 +307,38 @@ def upload_category_files(page, category: str, files: List[str], part_number=Non
     
     for file_path in files:
         file_name = os.path.basename(file_path)
+        file_key = upload_file_key(category, file_path)
+        if file_key in skip_files:
+            result["uploaded_files"] += 1
+            logger.debug('已在上次运行中上传，跳过: %s - %s', category, file_name)
+            continue
+        check_cancelled(cancel_token)
         try:
-            if upload_single_file(page, category, file_path):
+            if upload_single_file(page, category, file_path, cancel_token=cancel_token):
                 result["uploaded_files"] += 1
-                print(f"上传成功: {category} - {file_name}")
+                result["new_uploads"] += 1
+                logger.debug('上传成功: %s - %s', category, file_name)
+                if step_callback:
+                    try:
+                        step_callback(CHECKPOINT_STEP_FILE_UPLOADED, file=file_key, size=os.path.getsize(file_path))
+                    except Exception as e:
+                        logger.warning('⚠️ 记录上传步骤失败: %s', e)
                 if upload_record_callback:
                     upload_record_callback(part_number, file_name, "成功", "")
             else:
                 result["failed_files"] += 1
                 error_msg = f"上传失败: {category} - {file_name}"
                 result["errors"].append(error_msg)
-                print(error_msg)
+                logger.error(error_msg)
                 if upload_record_callback:
                     upload_record_callback(part_number, file_name, "失败", error_msg)
+        except OperationCancelled:
+            raise
         except Exception as e:
             result["failed_files"] += 1
             error_msg = f"上传异常: {category} - {file_name}: {e}"
             result["errors"].append(error_msg)
-            print(error_msg)
+            logger.error(error_msg)
             if upload_record_callback:
                 upload_record_callback(part_number, file_name, "失败", error_msg)
     
@@ -296,28 +352,27 @@ def upload_category_files(page, category: str, files: List[str], part_number=Non
     return result
 
 
-def _wait_for_overlay_gone(page, timeout: int = 30000):
-    """等待页面加载遮罩（waitScreenOverlay）完全消失后再继续操作"""
+def _upload_span_attrs(page, category: str, file_path: str) -> Dict:
+    """上传区间的属性：类别、文件名和文件大小（供运行指标统计上传字节数）"""
+    attrs = {'category': category, 'file': os.path.basename(file_path)}
     try:
-        page.wait_for_selector(
-            "#waitScreenOverlayGlass, .waitscreenoverlayglass, #waitScreenOverlay",
-            state="hidden",
-            timeout=timeout
-        )
-    except Exception:
-        pass  # 遮罩不存在或已消失，忽略
+        attrs['bytes'] = os.path.getsize(file_path)
+    except OSError:
+        pass
+    return attrs
 
 
-def upload_single_file(page, category: str, file_path: str) -> bool:
-    """上传单个文件到指定类别"""
+@traced('upload', attrs=_upload_span_attrs)
+def upload_single_file(page, category: str, file_path: str, cancel_token=None) -> bool:
+    """上传单个文件到指定类别（cancel_token 在等待遮罩时检查，取消时抛出 OperationCancelled）"""
     try:
-        print(f"准备上传文件: {Path(file_path).name} 到 {category}")
+        logger.debug('准备上传文件: %s 到 %s', Path(file_path).name, category)
         
         # 转换类别名称为ID格式
         category_id = category.replace(" ", "_")
 
         # 等待页面加载遮罩消失，避免遮罩拦截点击
-        _wait_for_overlay_gone(page)
+        wait_for_overlay_gone(page, 30000, cancel_token)
 
         # 快速滚动到目标区域（增加等待时间）
         try:
@@ -340,13 +395,13 @@ def upload_single_file(page, category: str, file_path: str) -> bool:
                 if upload_button.is_visible(timeout=1000):  # 增加到1秒
                     upload_button.click()
                     button_clicked = True
-                    print(f"✅ 上传按钮点击成功 (方法 {i})")
+                    logger.info('✅ 上传按钮点击成功 (方法 %s)', i)
                     break
             except Exception as e:
-                print(f"上传按钮选择器 {i} 失败: {e}")
+                logger.warning('上传按钮选择器 %s 失败: %s', i, e)
         
         if not button_clicked:
-            print(f"❌ 无法点击 {category} 的上传按钮")
+            logger.error('❌ 无法点击 %s 的上传按钮', category)
             return False
         
         # 增加文件选择等待时间
@@ -361,9 +416,9 @@ def upload_single_file(page, category: str, file_path: str) -> bool:
             if file_input.is_visible(timeout=2000):  # 增加到2秒
                 file_input.set_input_files(file_path)
                 upload_success = True
-                print(f"✅ 直接文件输入成功: {Path(file_path).name}")
+                logger.info('✅ 直接文件输入成功: %s', Path(file_path).name)
         except Exception as e:
-            print(f"直接文件输入失败: {e}")
+            logger.warning('直接文件输入失败: %s', e)
         
         # 方法2: 尝试file_chooser（增加超时时间）
         if not upload_success:
@@ -373,9 +428,9 @@ def upload_single_file(page, category: str, file_path: str) -> bool:
                 file_chooser = fc_info.value
                 file_chooser.set_files(file_path)
                 upload_success = True
-                print(f"✅ file_chooser方法成功: {Path(file_path).name}")
+                logger.info('✅ file_chooser方法成功: %s', Path(file_path).name)
             except Exception as e:
-                print(f"file_chooser方法失败: {e}")
+                logger.warning('file_chooser方法失败: %s', e)
         
         # 方法3: Choose File按钮方法
         if not upload_success:
@@ -384,12 +439,12 @@ def upload_single_file(page, category: str, file_path: str) -> bool:
                 if choose_file_btn.is_visible(timeout=2000):  # 增加到2秒
                     choose_file_btn.set_input_files(file_path)
                     upload_success = True
-                    print(f"✅ Choose File按钮方法成功: {Path(file_path).name}")
+                    logger.info('✅ Choose File按钮方法成功: %s', Path(file_path).name)
             except Exception as e:
-                print(f"Choose File按钮方法失败: {e}")
+                logger.warning('Choose File按钮方法失败: %s', e)
         
         if not upload_success:
-            print(f"❌ 所有文件上传方法都失败")
+            logger.error('❌ 所有文件上传方法都失败')
             return False
         
         # 快速处理Insert按钮
@@ -397,14 +452,22 @@ def upload_single_file(page, category: str, file_path: str) -> bool:
             insert_button = page.get_by_role("button", name="Insert")
             if insert_button.is_visible(timeout=2000):  # 增加到2秒
                 insert_button.click()
-                print("✅ 已点击Insert按钮")
+                logger.info('✅ 已点击Insert按钮')
         except:
             pass  # Insert按钮可能不存在，继续
 
-        # 等待上传后遮罩消失（替代固定等待，确保下次操作不被拦截）
-        _wait_for_overlay_gone(page)
+        # 等待上传请求的遮罩出现再消失（替代固定等待，确保下次操作不被拦截）
+        wait_for_overlay_gone(page, 30000, cancel_token, appear_timeout=OVERLAY_APPEAR_TIMEOUT_MS)
+
+        # 上传接口出错时系统弹出 Fatal Error：关闭弹窗，按上传失败处理
+        if fatal_error_shown(page):
+            logger.error('❌ 上传文件 %s 失败：系统弹出 Fatal Error', Path(file_path).name)
+            handle_fatal_error_popup(page)
+            return False
         return True
             
+    except OperationCancelled:
+        raise
     except Exception as e:
-        print(f"❌ 上传文件 {Path(file_path).name} 到 {category} 失败: {e}")
+        logger.error('❌ 上传文件 %s 到 %s 失败: %s', Path(file_path).name, category, e)
         return False
\ No newline at end of file
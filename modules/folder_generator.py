@@ -0,0 +1,123 @@
+"""
+上传文件夹生成
+
+为每个件号在文档目录下创建 <件号>/<DOCUMENT_CATEGORIES> 的文件夹结构。
+文档目录常在网络共享上，每次文件系统调用都是一次往返，所以：
+- 用有上限的线程池并行处理件号（FOLDER_GEN_MAX_WORKERS）
+- 直接 mkdir，已存在时由 FileExistsError 判断，不先调用 exists
+- 补全子文件夹时对已存在的件号文件夹只列一次目录，再创建缺少的类别
+进度按 FOLDER_GEN_PROGRESS_EVERY 个件号汇报一次，不逐个件号写日志。
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.constants import DOCUMENT_CATEGORIES, FOLDER_GEN_MAX_WORKERS, FOLDER_GEN_PROGRESS_EVERY
+
+# 单个件号的结果
+FOLDER_CREATED = 'created'      # 新建件号文件夹及全部子文件夹
+FOLDER_FILLED = 'filled'        # 件号文件夹已存在，补全了缺少的子文件夹
+FOLDER_EXISTING = 'existing'    # 件号文件夹已存在，未改动
+FOLDER_INVALID = 'invalid'      # 件号为空或只含非法字符
+FOLDER_ERROR = 'error'
+
+
+def safe_folder_name(part_number) -> str:
+    """件号转换为合法的文件夹名（非法字符替换为下划线，去掉结尾的点和空格）"""
+    return re.sub(r'[<>:"/\\|?*]', '_', str(part_number).strip()).rstrip('. ').strip()
+
+
+def create_part_folder(target_dir: str, name: str, fill_missing: bool = False,
+                       categories: Iterable[str] = DOCUMENT_CATEGORIES) -> Tuple[str, int]:
+    """
+    创建一个件号的文件夹结构
+
+    Args:
+        target_dir: 文档目录
+        name: 件号文件夹名（safe_folder_name 的结果）
+        fill_missing: 件号文件夹已存在时是否补全缺少的类别子文件夹
+        categories: 类别子文件夹
+
+    Returns:
+        Tuple[str, int]: (结果 FOLDER_*, 新建的子文件夹数)
+    """
+    folder_path = os.path.join(target_dir, name)
+    try:
+        os.mkdir(folder_path)
+    except FileExistsError:
+        if not fill_missing:
+            return FOLDER_EXISTING, 0
+        existing = set(os.listdir(folder_path))
+        missing = [category for category in categories if category not in existing]
+        for category in missing:
+            os.makedirs(os.path.join(folder_path, category), exist_ok=True)
+        return (FOLDER_FILLED if missing else FOLDER_EXISTING), len(missing)
+
+    created = 0
+    for category in categories:
+        os.mkdir(os.path.join(folder_path, category))
+        created += 1
+    return FOLDER_CREATED, created
+
+
+def generate_part_folders(target_dir: str, part_numbers: Iterable, fill_missing: bool = False,
+                          max_workers: int = FOLDER_GEN_MAX_WORKERS,
+                          progress_callback: Optional[Callable[[int, int, Dict[str, int]], None]] = None,
+                          progress_every: int = FOLDER_GEN_PROGRESS_EVERY) -> Dict:
+    """
+    为件号列表生成文件夹结构（并行）
+
+    Args:
+        target_dir: 文档目录
+        part_numbers: 件号列表（重复的件号和映射到同一文件夹名的件号只处理一次）
+        fill_missing: 已存在的件号文件夹是否补全缺少的类别子文件夹
+        max_workers: 线程池大小
+        progress_callback: 可选，进度回调 (已处理数, 总数, 各结果计数)，每 progress_every 个件号和结束时调用
+        progress_every: 进度回调间隔（件号数）
+
+    Returns:
+        Dict: {'total', 'created', 'filled', 'existing', 'invalid', 'duplicates', 'error',
+               'subfolders': 补全的子文件夹数, 'errors': [(件号, 错误信息)], 'invalid_parts': [件号]}
+    """
+    counts = {FOLDER_CREATED: 0, FOLDER_FILLED: 0, FOLDER_EXISTING: 0, FOLDER_INVALID: 0, FOLDER_ERROR: 0}
+    errors: List[Tuple[str, str]] = []
+    invalid_parts: List[str] = []
+    names: Dict[str, str] = {}
+    total = 0
+    for part_number in part_numbers:
+        total += 1
+        name = safe_folder_name(part_number)
+        if not name:
+            counts[FOLDER_INVALID] += 1
+            invalid_parts.append(str(part_number).strip())
+        else:
+            names.setdefault(name, str(part_number).strip())
+    duplicates = total - counts[FOLDER_INVALID] - len(names)
+
+    def work(name: str) -> Tuple[str, str, int, str]:
+        try:
+            outcome, subfolders = create_part_folder(target_dir, name, fill_missing)
+            return name, outcome, subfolders, ''
+        except OSError as e:
+            return name, FOLDER_ERROR, 0, str(e)
+
+    subfolders = 0
+    done = total - len(names)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(names) or 1)),
+                            thread_name_prefix="folder-gen") as executor:
+        for index, (name, outcome, created, error) in enumerate(executor.map(work, names), 1):
+            counts[outcome] += 1
+            if outcome == FOLDER_FILLED:
+                subfolders += created
+            if error:
+                errors.append((names[name], error))
+            done += 1
+            if progress_callback is not None and index % max(1, progress_every) == 0:
+                progress_callback(done, total, dict(counts))
+    if progress_callback is not None:
+        progress_callback(total, total, dict(counts))
+
+    return dict(counts, total=total, duplicates=duplicates, subfolders=subfolders,
+                errors=errors, invalid_parts=invalid_parts)
@@ -1,24 +1,99 @@
+import logging
 import os
 # PDF打印功能导入
 from .pdf_processor import print_coversheet_pdf_v12
+from .popup_handler import fatal_error_shown, handle_fatal_error_popup
+from .cancellation import OperationCancelled, check_cancelled, cancellable_wait, cancellable_wait_for_function
+from . import tracing
+from config.constants import (
+    CHECKPOINT_STEP_SAVED, CHECKPOINT_STEP_VALIDATED, CHECKPOINT_STEP_PDF_EXPORTED, OVERLAY_APPEAR_TIMEOUT_MS
+)
+from .structured_log import get_logger
 
-def fill_peda_form(page, data_row):
-    """填写PEDA表单 (假设已为英语界面)"""
+logger = get_logger(__name__)
+
+# GWT 请求进行中显示等待遮罩，遮罩消失即服务器已响应
+# 遮罩是 position: fixed，offsetParent 恒为 null，不能用来判断是否可见
+_OVERLAY_SELECTOR = '#waitScreenOverlayGlass, .waitscreenoverlayglass, #waitScreenOverlay'
+_OVERLAY_SHOWN_JS = """() => [...document.querySelectorAll('%s')]
+    .some(overlay => overlay.getClientRects().length > 0)""" % _OVERLAY_SELECTOR
+_OVERLAY_GONE_JS = """() => [...document.querySelectorAll('%s')]
+    .every(overlay => overlay.getClientRects().length === 0)""" % _OVERLAY_SELECTOR
+
+
+def wait_for_overlay_gone(page, timeout: int, cancel_token=None, appear_timeout: int = 0) -> bool:
+    """
+    等待等待遮罩消失（可取消）
+
+    不用 networkidle：页面发过请求后再插入 iframe（如 Cover Sheet 的 proof），
+    Playwright 的 networkidle 要等到主页面的下一个请求结束才会再次触发。
+
+    刚点击按钮时请求可能还没发出，遮罩尚未出现就会被误判为“已消失”；
+    点击后调用时传入 appear_timeout，先等遮罩出现（最多 appear_timeout 毫秒，
+    请求很快、遮罩已经消失时不算失败），再等它消失。
+
+    Returns:
+        bool: 遮罩已消失返回True，超时返回False
+    """
+    if appear_timeout > 0:
+        try:
+            cancellable_wait_for_function(page, _OVERLAY_SHOWN_JS, appear_timeout, cancel_token)
+        except OperationCancelled:
+            raise
+        except Exception:
+            logger.debug('%s 毫秒内未出现等待遮罩，视为请求已结束', appear_timeout)
+    with tracing.span('overlay_wait') as overlay_span:
+        try:
+            cancellable_wait_for_function(page, _OVERLAY_GONE_JS, timeout, cancel_token)
+            return True
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            overlay_span.fail()  # 遮罩迟迟不消失或页面已不可用，不作为延迟样本
+            logger.debug('等待遮罩消失超时: %s', e)
+            return False
+
+
+def _wait_for_form_save(page, cancel_token=None) -> bool:
+    """
+    等待表单保存请求结束（可取消）
+
+    Returns:
+        bool: 保存成功返回True；系统弹出 Fatal Error 时关闭弹窗并返回False
+    """
+    if not wait_for_overlay_gone(page, 10000, cancel_token, appear_timeout=OVERLAY_APPEAR_TIMEOUT_MS):
+        logger.warning('⚠️ 等待表单保存完成超时，继续执行')
+    if fatal_error_shown(page):
+        # 弹窗的遮罩会挡住后续所有点击，必须先关闭
+        logger.error('❌ 表单保存失败：系统弹出 Fatal Error')
+        handle_fatal_error_popup(page)
+        return False
+    logger.info('✅ 表单保存成功')
+    return True
+
+
+@tracing.traced('fill')
+def fill_peda_form(page, data_row, failure_info=None, cancel_token=None):
+    """填写PEDA表单 (假设已为英语界面)
+
+    failure_info 为可选字典，填写失败时写入 'error'（异常信息），供重试调度区分失败类型；
+    cancel_token 在保存后的等待中检查，取消时抛出 OperationCancelled。
+    """
     try:
         # 新增：确保在PEDA Detail页
         try:
             if not page.locator("#stibo_tab_PEDA_Details.tabs-panel-tab--selected").is_visible(timeout=2000):
-                print("当前不在PEDA Detail页，尝试切换...")
+                logger.debug('当前不在PEDA Detail页，尝试切换...')
                 page.locator("#stibo_tab_PEDA_Details").click(force=True)
                 page.wait_for_timeout(1000)
                 if not page.locator("#stibo_tab_PEDA_Details.tabs-panel-tab--selected").is_visible(timeout=3000):
-                    print("⚠️ 切换到PEDA Detail页失败，后续表单填写可能异常")
+                    logger.warning('⚠️ 切换到PEDA Detail页失败，后续表单填写可能异常')
                 else:
-                    print("✅ 已成功切换到PEDA Detail页")
+                    logger.info('✅ 已成功切换到PEDA Detail页')
             else:
-                print("已在PEDA Detail页")
+                logger.debug('已在PEDA Detail页')
         except Exception as e:
-            print(f"切换到PEDA Detail页异常: {e}")
+            logger.warning('切换到PEDA Detail页异常: %s', e)
         
         # 提取数据并确保所有值都是字符串类型
         contact = data_row.get('contact', '')
@@ -66,11 +141,11 @@ def fill_peda_form(page, data_row):
                 # 触发change事件确保表单检测到变更
                 contact_field.dispatch_event("change")
                 page.wait_for_timeout(500)
-                print(f"✅ 联系人填写成功: {contact}")
+                logger.info('✅ 联系人填写成功: %s', contact)
             else:
-                print("⏭️ 联系人为空，跳过填写")
+                logger.debug('⏭️ 联系人为空，跳过填写')
         except Exception as e:
-            print(f"⚠️ 联系人填写失败（选填项，继续执行）: {e}")
+            logger.warning('⚠️ 联系人填写失败（选填项，继续执行）: %s', e)
 
         # 填写 External Info（选填，有值才填）
         try:
@@ -81,11 +156,11 @@ def fill_peda_form(page, data_row):
                 external_info_field.dispatch_event("input")
                 external_info_field.dispatch_event("change")
                 page.wait_for_timeout(500)
-                print(f"✅ External Info 填写成功: {external_info}")
+                logger.info('✅ External Info 填写成功: %s', external_info)
             else:
-                print("⏭️ External Info 为空，跳过填写")
+                logger.debug('⏭️ External Info 为空，跳过填写')
         except Exception as e:
-            print(f"⚠️ External Info 填写失败（选填项，继续执行）: {e}")
+            logger.warning('⚠️ External Info 填写失败（选填项，继续执行）: %s', e)
 
         # 填写 Internal Comment（选填，有值才填）
         try:
@@ -96,11 +171,11 @@ def fill_peda_form(page, data_row):
                 internal_comment_field.dispatch_event("input")
                 internal_comment_field.dispatch_event("change")
                 page.wait_for_timeout(500)
-                print(f"✅ Internal Comment 填写成功: {internal_comment}")
+                logger.info('✅ Internal Comment 填写成功: %s', internal_comment)
             else:
-                print("⏭️ Internal Comment 为空，跳过填写")
+                logger.debug('⏭️ Internal Comment 为空，跳过填写')
         except Exception as e:
-            print(f"⚠️ Internal Comment 填写失败（选填项，继续执行）: {e}")
+            logger.warning('⚠️ Internal Comment 填写失败（选填项，继续执行）: %s', e)
         
         # 填写项目类型
         try:
@@ -109,9 +184,9 @@ def fill_peda_form(page, data_row):
             # 触发change事件
             project_type_field.dispatch_event("change")
             page.wait_for_timeout(500)
-            print(f"✅ 项目类型填写成功: {project_type}")
+            logger.info('✅ 项目类型填写成功: %s', project_type)
         except Exception as e:
-            print(f"❌ 项目类型填写失败: {e}")
+            logger.error('❌ 项目类型填写失败: %s', e)
             raise
         
         # 填写原因
@@ -121,9 +196,9 @@ def fill_peda_form(page, data_row):
             # 触发change事件
             reason_field.dispatch_event("change")
             page.wait_for_timeout(500)
-            print(f"✅ 原因填写成功: {reason}")
+            logger.info('✅ 原因填写成功: %s', reason)
         except Exception as e:
-            print(f"❌ 原因填写失败: {e}")
+            logger.error('❌ 原因填写失败: %s', e)
             raise
         
         # 填写样品数量（选填，有值才填）
@@ -135,11 +210,11 @@ def fill_peda_form(page, data_row):
                 quantity_field.dispatch_event("input")
                 quantity_field.dispatch_event("change")
                 page.wait_for_timeout(500)
-                print(f"✅ 样品数量填写成功: {sample_quantity}")
+                logger.info('✅ 样品数量填写成功: %s', sample_quantity)
             else:
-                print("⏭️ 样品数量为空，跳过填写")
+                logger.debug('⏭️ 样品数量为空，跳过填写')
         except Exception as e:
-            print(f"⚠️ 样品数量填写失败（选填项，继续执行）: {e}")
+            logger.warning('⚠️ 样品数量填写失败（选填项，继续执行）: %s', e)
         
         # 填写决策值
         try:
@@ -148,18 +223,18 @@ def fill_peda_form(page, data_row):
             # 触发change事件
             decision_field.dispatch_event("change")
             page.wait_for_timeout(500)
-            print(f"✅ {decision_region} 决策值填写成功: {decision_value}")
+            logger.info('✅ %s 决策值填写成功: %s', decision_region, decision_value)
         except Exception as e:
-            print(f"❌ {decision_region} 决策值填写失败: {e}")
+            logger.error('❌ %s 决策值填写失败: %s', decision_region, e)
             raise
         
         # 等待表单状态更新
-        print("等待表单状态更新...")
+        logger.debug('等待表单状态更新...')
         page.wait_for_timeout(2000)
         
         # 保存表单
         try:
-            print("等待保存按钮变为可用状态...")
+            logger.debug('等待保存按钮变为可用状态...')
             
             # 直接选择第一个可用的保存按钮（从调试信息可知第1个按钮是可用的）
             save_buttons = page.locator("button:has-text('Save')")
@@ -167,268 +242,330 @@ def fill_peda_form(page, data_row):
             # 检查第一个按钮是否可用
             first_button = save_buttons.first
             if first_button.is_enabled():
-                print("找到可用的保存按钮，准备点击...")
+                logger.debug('找到可用的保存按钮，准备点击...')
                 first_button.click()
-                page.wait_for_load_state("networkidle", timeout=10000)
-                print("✅ 表单保存成功")
-                return True
+                return _wait_for_form_save(page, cancel_token)
             else:
                 # 如果第一个不可用，尝试找到可用的按钮
                 count = save_buttons.count()
                 for i in range(count):
                     button = save_buttons.nth(i)
                     if button.is_enabled():
-                        print(f"使用第 {i+1} 个可用的保存按钮...")
+                        logger.debug('使用第 %s 个可用的保存按钮...', i+1)
                         button.click()
-                        page.wait_for_load_state("networkidle", timeout=10000)
-                        print("✅ 表单保存成功")
-                        return True
+                        return _wait_for_form_save(page, cancel_token)
                 
-                print("❌ 没有找到可用的保存按钮")
+                logger.error('❌ 没有找到可用的保存按钮')
                 return False
                     
+        except OperationCancelled:
+            raise
         except Exception as e:
-            print(f"❌ 表单保存失败: {e}")
-            # 显示所有保存按钮的状态以便调试
-            try:
-                save_buttons = page.locator("button:has-text('Save')")
-                count = save_buttons.count()
-                print(f"找到 {count} 个保存按钮:")
-                for i in range(count):
-                    button = save_buttons.nth(i)
-                    is_enabled = button.is_enabled()
-                    title = button.get_attribute("title") or "无title"
-                    class_attr = button.get_attribute("class") or "无class"
-                    print(f"  按钮 {i+1}: 可用={is_enabled}, title='{title}', class='{class_attr}'")
-            except Exception as debug_e:
-                print(f"调试信息获取失败: {debug_e}")
+            logger.error('❌ 表单保存失败: %s', e)
+            # 显示所有保存按钮的状态以便调试（每个按钮要多次访问浏览器，只在 DEBUG 级别获取）
+            if logger.isEnabledFor(logging.DEBUG):
+                try:
+                    save_buttons = page.locator("button:has-text('Save')")
+                    count = save_buttons.count()
+                    logger.debug('找到 %s 个保存按钮:', count)
+                    for i in range(count):
+                        button = save_buttons.nth(i)
+                        is_enabled = button.is_enabled()
+                        title = button.get_attribute("title") or "无title"
+                        class_attr = button.get_attribute("class") or "无class"
+                        logger.debug("  按钮 %s: 可用=%s, title='%s', class='%s'", i+1, is_enabled, title, class_attr)
+                except Exception as debug_e:
+                    logger.debug('调试信息获取失败: %s', debug_e)
             return False
         
+    except OperationCancelled:
+        raise
     except Exception as e:
-        print(f"❌ 填写PEDA表单时发生错误: {e}")
-        import traceback
-        print(f"详细错误信息: {traceback.format_exc()}")
+        logger.error('❌ 填写PEDA表单时发生错误: %s', e, exc_info=True)
+        if failure_info is not None:
+            failure_info['error'] = str(e)
         return False
 
 from typing import Optional, Callable
 
-def save_and_validate_peda(page, part_number: str = None, document_manager = None, data_row = None, log_callback: Optional[Callable] = None) -> bool:
-    """保存PEDA、验证并跳转到Cover Sheet"""
+
+def _notify_step(step_callback: Optional[Callable], step: str, **info):
+    """通知断点日志某个步骤已完成（回调异常不影响主流程）"""
+    if not step_callback:
+        return
     try:
-        print("\n=== 开始保存、验证和跳转到Cover Sheet ===")
+        step_callback(step, **info)
+    except Exception as e:
+        logger.warning('⚠️ 记录步骤 %s 失败: %s', step, e)
+
+
+def save_and_validate_peda(page, part_number: str = None, document_manager = None, data_row = None, log_callback: Optional[Callable] = None,
+                           step_callback: Optional[Callable] = None, completed_steps=None,
+                           cancel_token=None) -> bool:
+    """保存PEDA、验证并跳转到Cover Sheet
+
+    step_callback(step, **info) 在保存、验证、PDF导出完成后调用；
+    completed_steps 为续跑时上次已完成的步骤，对应步骤会被跳过；
+    cancel_token 在各阶段之间和较长等待中检查，取消时抛出 OperationCancelled。
+    """
+    completed_steps = set(completed_steps or ())
+    try:
+        logger.info('=== 开始保存、验证和跳转到Cover Sheet ===')
         # ====== 新增调试日志，检查data_row字段读取情况 ======
         if data_row is not None:
-            print(f"[调试] data_row.keys(): {list(data_row.keys())}")
-            print(f"[调试] external_info: {data_row.get('external_info', None)}")
-            print(f"[调试] internal_comment: {data_row.get('internal_comment', None)}")
+            logger.debug('[调试] data_row.keys(): %s', data_row.keys())
+            logger.debug('[调试] external_info: %s', data_row.get('external_info', None))
+            logger.debug('[调试] internal_comment: %s', data_row.get('internal_comment', None))
         else:
-            print("[调试] data_row is None!")
+            logger.debug('[调试] data_row is None!')
         
-        # 第一步：点击Save按钮
-        print("1. 查找并点击Save按钮...")
+        if CHECKPOINT_STEP_SAVED in completed_steps:
+            logger.info('1. 上次运行已保存PEDA，跳过Save步骤')
+        else:
+            with tracing.span('save') as save_span:
+                # 第一步：点击Save按钮
+                logger.info('1. 查找并点击Save按钮...')
         
-        # 首先等待页面处理完成（等待遮罩层消失）
-        print("等待页面处理完成...")
-        try:
-            page.wait_for_function(
-                """() => {
-                    const overlay = document.querySelector('#waitScreenOverlayGlass, .waitscreenoverlayglass');
-                    return !overlay || overlay.style.display === 'none' || !overlay.offsetParent;
-                }""",
-                timeout=20000
-            )
-            print("✅ 页面处理完成")
-        except Exception as e:
-            print(f"⚠️ 等待页面处理超时: {e}")
-            # 强制清除遮罩层
-            page.evaluate("""
-                const overlays = document.querySelectorAll('#waitScreenOverlayGlass, .waitscreenoverlayglass, #waitScreenOverlay');
-                overlays.forEach(overlay => {
-                    if (overlay) {
-                        overlay.style.display = 'none';
-                        overlay.style.visibility = 'hidden';
-                        overlay.remove();
-                    }
-                });
-            """)
+                # 首先等待页面处理完成（等待遮罩层消失）
+                logger.debug('等待页面处理完成...')
+                if wait_for_overlay_gone(page, 20000, cancel_token):
+                    logger.info('✅ 页面处理完成')
+                else:
+                    logger.warning('⚠️ 等待页面处理超时')
+                    # 强制清除遮罩层
+                    page.evaluate("""
+                        const overlays = document.querySelectorAll('#waitScreenOverlayGlass, .waitscreenoverlayglass, #waitScreenOverlay');
+                        overlays.forEach(overlay => {
+                            if (overlay) {
+                                overlay.style.display = 'none';
+                                overlay.style.visibility = 'hidden';
+                                overlay.remove();
+                            }
+                        });
+                    """)
         
-        # 等待Save按钮变为可用状态（这需要所有文件都上传完成）
-        print("等待所有文件上传完成，Save按钮变为可用状态...")
-        print("⚠️ 注意：只有当所有文件都成功上传后，Save按钮才会变为可用")
+                # 等待Save按钮变为可用状态（这需要所有文件都上传完成）
+                logger.debug('等待所有文件上传完成，Save按钮变为可用状态...')
+                logger.warning('⚠️ 注意：只有当所有文件都成功上传后，Save按钮才会变为可用')
         
-        save_button_available = False
-        max_wait_time = 60  # 最多等待60秒
-        wait_interval = 3   # 每3秒检查一次
+                save_button_available = False
+                max_wait_time = 60  # 最多等待60秒
+                wait_interval = 3   # 每3秒检查一次
         
-        for attempt in range(max_wait_time // wait_interval):
-            try:
-                # 检查是否有可用的Save按钮
-                result = page.evaluate("""
-                    () => {
-                        const saveButtons = document.querySelectorAll('button[class*="SaveButton"]');
-                        let availableButton = null;
-                        let totalButtons = saveButtons.length;
-                        let enabledButtons = 0;
+                for attempt in range(max_wait_time // wait_interval):
+                    check_cancelled(cancel_token)
+                    try:
+                        # 检查是否有可用的Save按钮
+                        result = page.evaluate("""
+                            () => {
+                                const saveButtons = document.querySelectorAll('button[class*="SaveButton"]');
+                                let availableButton = null;
+                                let totalButtons = saveButtons.length;
+                                let enabledButtons = 0;
                         
-                        for (let button of saveButtons) {
-                            if (!button.disabled && !button.classList.contains('stibo-GraphicsButton-disabled')) {
-                                availableButton = button;
-                                enabledButtons++;
-                            }
-                        }
+                                for (let button of saveButtons) {
+                                    if (!button.disabled && !button.classList.contains('stibo-GraphicsButton-disabled')) {
+                                        availableButton = button;
+                                        enabledButtons++;
+                                    }
+                                }
                         
-                        return {
-                            hasAvailableButton: availableButton !== null,
-                            totalButtons: totalButtons,
-                            enabledButtons: enabledButtons
-                        };
-                    }
-                """)
+                                return {
+                                    hasAvailableButton: availableButton !== null,
+                                    totalButtons: totalButtons,
+                                    enabledButtons: enabledButtons
+                                };
+                            }
+                        """)
                 
-                print(f"检查第 {attempt + 1} 次: 总按钮数={result['totalButtons']}, 可用按钮数={result['enabledButtons']}")
+                        logger.debug('检查第 %s 次: 总按钮数=%s, 可用按钮数=%s', attempt + 1, result['totalButtons'], result['enabledButtons'])
                 
-                if result['hasAvailableButton']:
-                    print("✅ 检测到可用的Save按钮，所有文件上传完成")
-                    save_button_available = True
-                    break
-                else:
-                    print(f"Save按钮仍不可用，等待 {wait_interval} 秒...")
-                    page.wait_for_timeout(wait_interval * 1000)
+                        if result['hasAvailableButton']:
+                            logger.info('✅ 检测到可用的Save按钮，所有文件上传完成')
+                            save_button_available = True
+                            break
+                        else:
+                            logger.debug('Save按钮仍不可用，等待 %s 秒...', wait_interval)
+                            cancellable_wait(page, wait_interval * 1000, cancel_token)
                     
-            except Exception as e:
-                print(f"检查Save按钮状态时出错: {e}")
-                page.wait_for_timeout(wait_interval * 1000)
+                    except OperationCancelled:
+                        raise
+                    except Exception as e:
+                        logger.debug('检查Save按钮状态时出错: %s', e)
+                        cancellable_wait(page, wait_interval * 1000, cancel_token)
         
-        if not save_button_available:
-            print("⚠️ 等待Save按钮可用超时")
-            print("可能的原因：")
-            print("1. 仍有文件正在上传中")
-            print("2. 有文件上传失败")
-            print("3. 页面存在其他问题")
-            print("将尝试强制操作...")
-        else:
-            print("✅ Save按钮已可用，准备保存")
+                if not save_button_available:
+                    logger.warning('⚠️ 等待Save按钮可用超时')
+                    logger.warning('可能的原因：')
+                    logger.warning('1. 仍有文件正在上传中')
+                    logger.warning('2. 有文件上传失败')
+                    logger.warning('3. 页面存在其他问题')
+                    logger.debug('将尝试强制操作...')
+                else:
+                    logger.info('✅ Save按钮已可用，准备保存')
         
-        # 使用第一个选择器点击Save按钮（根据日志验证有效）
-        try:
-            save_button = page.locator("button.SaveButton:has-text('Save'):not([disabled])").first
-            if save_button.is_visible(timeout=2000) and save_button.is_enabled():
-                save_button.click(force=True)
-                print("✅ Save按钮点击成功 (选择器 1)")
-                save_clicked = True
-            else:
-                print("Save按钮不可用")
-                save_clicked = False
-        except Exception as e:
-            print(f"Save按钮点击失败: {e}")
-            save_clicked = False
+                # 使用第一个选择器点击Save按钮（根据日志验证有效）
+                try:
+                    save_button = page.locator("button.SaveButton:has-text('Save'):not([disabled])").first
+                    if save_button.is_visible(timeout=2000) and save_button.is_enabled():
+                        save_button.click(force=True)
+                        logger.info('✅ Save按钮点击成功 (选择器 1)')
+                        save_clicked = True
+                    else:
+                        logger.debug('Save按钮不可用')
+                        save_clicked = False
+                except Exception as e:
+                    logger.warning('Save按钮点击失败: %s', e)
+                    save_clicked = False
         
-        if not save_clicked:
-            print("❌ 无法找到或点击Save按钮")
-            return False
+                if not save_clicked:
+                    logger.error('❌ 无法找到或点击Save按钮')
+                    save_span.fail()
+                    return False
         
-        # 第二步：等待Save按钮变灰（disabled状态）
-        print("2. 等待Save按钮变为禁用状态...")
-        try:
-            # 等待Save按钮变为disabled状态，最多等待30秒
-            page.wait_for_function(
-                """() => {
-                    const saveButton = document.querySelector('button.SaveButton, button[class*="SaveButton"]');
-                    return saveButton && (saveButton.disabled || saveButton.classList.contains('stibo-GraphicsButton-disabled'));
-                }""",
-                timeout=30000
-            )
-            print("✅ Save按钮已变为禁用状态，保存完成")
-        except Exception as e:
-            print(f"⚠️ 等待Save按钮禁用超时，但可能已保存成功: {e}")
-            # 继续执行，不中断流程
+                # 第二步：等待Save按钮变灰（disabled状态）
+                logger.info('2. 等待Save按钮变为禁用状态...')
+                try:
+                    # 等待Save按钮变为disabled状态或弹出Fatal Error，最多等待30秒（save_roundtrip 区间即服务器保存时间）
+                    with tracing.span('save_roundtrip') as roundtrip_span:
+                        cancellable_wait_for_function(
+                            page,
+                            """() => {
+                                const saveButton = document.querySelector('button.SaveButton, button[class*="SaveButton"]');
+                                if (saveButton && (saveButton.disabled || saveButton.classList.contains('stibo-GraphicsButton-disabled'))) {
+                                    return true;
+                                }
+                                return [...document.querySelectorAll('.portal-popup-header__title')]
+                                    .some(title => title.textContent.includes('Fatal Error'));
+                            }""",
+                            30000, cancel_token
+                        )
+                        save_failed = fatal_error_shown(page)
+                        if save_failed:
+                            roundtrip_span.fail()
+                    if save_failed:
+                        # 保存失败：上传的文件没有保留，不记录 saved，交给重试重新上传
+                        logger.error('❌ 保存失败：系统弹出 Fatal Error')
+                        handle_fatal_error_popup(page)
+                        save_span.fail()
+                        return False
+                    logger.info('✅ Save按钮已变为禁用状态，保存完成')
+                except OperationCancelled:
+                    raise
+                except Exception as e:
+                    logger.warning('⚠️ 等待Save按钮禁用超时，但可能已保存成功: %s', e)
+                    # 继续执行，不中断流程
         
-        # 额外等待确保保存完全完成
-        page.wait_for_timeout(2000)
+                # 额外等待确保保存完全完成
+                page.wait_for_timeout(2000)
+                _notify_step(step_callback, CHECKPOINT_STEP_SAVED)
         
-        # 第三步：点击Validate按钮（使用第一个选择器，根据日志验证有效）
-        print("3. 查找并点击Validate PEDA按钮...")
-        try:
-            validate_button = page.locator("button.RunBusinessActionButton:has-text('Validate PEDA')")
-            if validate_button.is_visible() and validate_button.is_enabled():
-                validate_button.click()
-                print("✅ Validate PEDA按钮点击成功 (选择器 1)")
-                validate_clicked = True
-            else:
-                print("Validate PEDA按钮不可用")
-                validate_clicked = False
-        except Exception as e:
-            print(f"Validate PEDA按钮点击失败: {e}")
-            validate_clicked = False
+        check_cancelled(cancel_token)
+        if CHECKPOINT_STEP_VALIDATED in completed_steps:
+            logger.info('3. 上次运行已验证PEDA，跳过Validate步骤')
+        else:
+            with tracing.span('validate') as validate_span:
+                # 第三步：点击Validate按钮（使用第一个选择器，根据日志验证有效）
+                logger.info('3. 查找并点击Validate PEDA按钮...')
+                try:
+                    validate_button = page.locator("button.RunBusinessActionButton:has-text('Validate PEDA')")
+                    if validate_button.is_visible() and validate_button.is_enabled():
+                        validate_button.click()
+                        logger.info('✅ Validate PEDA按钮点击成功 (选择器 1)')
+                        validate_clicked = True
+                    else:
+                        logger.debug('Validate PEDA按钮不可用')
+                        validate_clicked = False
+                except Exception as e:
+                    logger.warning('Validate PEDA按钮点击失败: %s', e)
+                    validate_clicked = False
         
-        if not validate_clicked:
-            print("❌ 无法找到或点击Validate PEDA按钮")
-            return False
+                if not validate_clicked:
+                    logger.error('❌ 无法找到或点击Validate PEDA按钮')
+                    validate_span.fail()
+                    return False
+        
+                # 第四步：等待验证完成和页面跳转
+                logger.info('4. 等待PEDA验证完成和页面跳转...')
+                cancellable_wait(page, 8000, cancel_token)  # 等待验证过程和页面跳转
+                if fatal_error_shown(page):
+                    # 验证失败：不记录 validated，交给重试重新验证
+                    logger.error('❌ 验证失败：系统弹出 Fatal Error')
+                    handle_fatal_error_popup(page)
+                    validate_span.fail()
+                    return False
+                _notify_step(step_callback, CHECKPOINT_STEP_VALIDATED)
         
-        # 第四步：等待验证完成和页面跳转
-        print("4. 等待PEDA验证完成和页面跳转...")
-        page.wait_for_timeout(8000)  # 等待验证过程和页面跳转
+        if CHECKPOINT_STEP_PDF_EXPORTED in completed_steps:
+            logger.info('5. 上次运行已导出Cover Sheet PDF，跳过Cover Sheet和PDF导出')
+            return True
         
         # 第五步：点击Cover Sheet标签
-        print("5. 点击Cover Sheet标签...")
-        try:
-            # 等待页面跳转完成
-            page.wait_for_load_state("networkidle", timeout=10000)
-            page.wait_for_timeout(2000)
-            
-            # 先检查Cover Sheet标签是否已经选中
-            tab_already_selected = False
+        check_cancelled(cancel_token)
+        logger.info('5. 点击Cover Sheet标签...')
+        with tracing.span('cover_sheet') as cover_span:
             try:
-                if page.locator("#stibo_tab_Cover_Sheet.tabs-panel-tab--selected").is_visible(timeout=1000):
-                    print("✅ Cover Sheet标签已经是选中状态，跳过点击直接下载PDF")
-                    tab_already_selected = True
-            except:
-                print("Cover Sheet标签当前未选中，需要点击")
+                # 等待验证请求完成（遮罩消失）
+                wait_for_overlay_gone(page, 10000, cancel_token)
+                page.wait_for_timeout(2000)
             
-            if tab_already_selected:
-                clicked = True  # 标签已选中，视为点击成功，继续执行PDF下载
+                # 先检查Cover Sheet标签是否已经选中
+                tab_already_selected = False
+                try:
+                    if page.locator("#stibo_tab_Cover_Sheet.tabs-panel-tab--selected").is_visible(timeout=1000):
+                        logger.info('✅ Cover Sheet标签已经是选中状态，跳过点击直接下载PDF')
+                        tab_already_selected = True
+                except:
+                    logger.debug('Cover Sheet标签当前未选中，需要点击')
             
-            # 使用强制点击方法（根据日志验证有效）
-            try:
-                print("尝试Cover Sheet标签点击方法 1...")
-                page.locator("#stibo_tab_Cover_Sheet").click(force=True)
+                if tab_already_selected:
+                    clicked = True  # 标签已选中，视为点击成功，继续执行PDF下载
+            
+                # 使用强制点击方法（根据日志验证有效）
+                try:
+                    logger.debug('尝试Cover Sheet标签点击方法 1...')
+                    page.locator("#stibo_tab_Cover_Sheet").click(force=True)
                 
-                # 等待标签状态改变
-                page.wait_for_timeout(1500)
+                    # 等待标签状态改变
+                    page.wait_for_timeout(1500)
                 
-                # 验证是否成功切换
-                if page.locator("#stibo_tab_Cover_Sheet.tabs-panel-tab--selected").is_visible(timeout=3000):
-                    print("✅ Cover Sheet标签点击成功 (方法 1)")
-                    print("✅ 已成功切换到Cover Sheet标签页")
-                    clicked = True
-                else:
-                    print("⚠️ 标签页切换失败")
-                    clicked = False
+                    # 验证是否成功切换
+                    if page.locator("#stibo_tab_Cover_Sheet.tabs-panel-tab--selected").is_visible(timeout=3000):
+                        logger.info('✅ Cover Sheet标签点击成功 (方法 1)')
+                        logger.info('✅ 已成功切换到Cover Sheet标签页')
+                        clicked = True
+                    else:
+                        logger.warning('⚠️ 标签页切换失败')
+                        clicked = False
                         
-            except Exception as e:
-                print(f"Cover Sheet点击失败: {e}")
-                clicked = False
+                except Exception as e:
+                    logger.warning('Cover Sheet点击失败: %s', e)
+                    clicked = False
             
-            if not clicked:
-                print("❌ 无法成功切换到Cover Sheet标签")
-                print("⚠️ 未能自动点击Cover Sheet标签")
-                print("请手动点击Cover Sheet标签查看相关信息")
-                print("常见原因：页面结构变化、元素被遮挡或网络延迟")
-                return False
-            else:
-                # 等待Cover Sheet页面内容加载
-                print("等待Cover Sheet页面内容加载...")
-                page.wait_for_timeout(3000)
+                if not clicked:
+                    logger.error('❌ 无法成功切换到Cover Sheet标签')
+                    logger.warning('⚠️ 未能自动点击Cover Sheet标签')
+                    logger.debug('请手动点击Cover Sheet标签查看相关信息')
+                    logger.debug('常见原因：页面结构变化、元素被遮挡或网络延迟')
+                    cover_span.fail()
+                    return False
+                else:
+                    # 等待Cover Sheet页面内容加载
+                    logger.debug('等待Cover Sheet页面内容加载...')
+                    page.wait_for_timeout(3000)
         
-        except Exception as e:
-            print(f"⚠️ 点击Cover Sheet标签时出错: {e}")
-            print("这通常不影响PEDA的保存和验证，请手动点击Cover Sheet标签")
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                logger.warning('⚠️ 点击Cover Sheet标签时出错: %s', e)
+                logger.debug('这通常不影响PEDA的保存和验证，请手动点击Cover Sheet标签')
         
-        print("=== PEDA保存、验证和Cover Sheet流程完成 ===\n")
+        logger.info('=== PEDA保存、验证和Cover Sheet流程完成 ===')
         
         # 新增：自动导出Cover Sheet PDF
+        check_cancelled(cancel_token)
         if part_number:
-            print(f"\n=== 开始为 {part_number} 导出Cover Sheet PDF ===")
+            logger.info('=== 开始为 %s 导出Cover Sheet PDF ===', part_number)
             if log_callback:
                 try:
                     log_callback(f"=== 开始为 {part_number} 导出Cover Sheet PDF ===", "INFO")
@@ -439,15 +576,15 @@ def save_and_validate_peda(page, part_number: str = None, document_manager = Non
             if document_manager and hasattr(document_manager, 'part_folder'):
                 # 直接保存到件号文件夹内，与上传文件在一起
                 pdf_save_dir = str(document_manager.part_folder)
-                print(f"=== PDF_Print_V12: 开始为 {part_number} 下载PDF ===")
-                print(f"保存目录: {pdf_save_dir}")
+                logger.info('=== PDF_Print_V12: 开始为 %s 下载PDF ===', part_number)
+                logger.debug('保存目录: %s', pdf_save_dir)
             else:
                 # 备选方案：使用默认路径（document_maintenance_path 不再从Excel读取）
-                print("⚠️ 警告：document_manager 不可用，使用默认路径")
+                logger.warning('⚠️ 警告：document_manager 不可用，使用默认路径')
                 base_path = "C:\\OES\\AI\\PIMS_Automation\\IAM\\PEDA\\PEDA_Ducuments"
                 pdf_save_dir = os.path.join(base_path, part_number)
-                print(f"=== 使用默认路径保存PDF ===")
-                print(f"保存目录: {pdf_save_dir}")
+                logger.info('=== 使用默认路径保存PDF ===')
+                logger.debug('保存目录: %s', pdf_save_dir)
                 
                 # 确保目录存在
                 os.makedirs(pdf_save_dir, exist_ok=True)
@@ -456,14 +593,15 @@ def save_and_validate_peda(page, part_number: str = None, document_manager = Non
             pdf_success = print_coversheet_pdf_v12(page, part_number, pdf_save_dir)
 
             if pdf_success:
-                print(f"✅ {part_number} 的Cover Sheet PDF导出成功")
+                logger.info('✅ %s 的Cover Sheet PDF导出成功', part_number)
+                _notify_step(step_callback, CHECKPOINT_STEP_PDF_EXPORTED)
                 if log_callback:
                     try:
                         log_callback(f"✅ {part_number} 的Cover Sheet PDF导出成功", "SUCCESS")
                     except Exception:
                         pass
             else:
-                print(f"❌ {part_number} 的Cover Sheet PDF导出失败")
+                logger.error('❌ %s 的Cover Sheet PDF导出失败', part_number)
                 if log_callback:
                     try:
                         log_callback(f"❌ {part_number} 的Cover Sheet PDF导出失败", "ERROR")
@@ -473,6 +611,8 @@ def save_and_validate_peda(page, part_number: str = None, document_manager = Non
         
         return True
         
+    except OperationCancelled:
+        raise
     except Exception as e:
-        print(f"❌ 保存和验证PEDA时发生错误: {e}")
+        logger.error('❌ 保存和验证PEDA时发生错误: %s', e)
         return False
\ No newline at end of file
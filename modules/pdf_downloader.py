@@ -1,11 +1,9 @@
-import requests
 from datetime import datetime
 from playwright.sync_api import Page
 from pathlib import Path
-import urllib3
+from .structured_log import get_logger
 
-# 禁用SSL警告
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+logger = get_logger(__name__)
 
 def handle_pdf_final(page: Page, part_number: str, save_dir: str) -> bool:
     """
@@ -13,7 +11,7 @@ def handle_pdf_final(page: Page, part_number: str, save_dir: str) -> bool:
     
     直接从URL下载原始PDF文件
     """
-    print("🎯 PDF_Print_Final: 开始处理PDF页面...")
+    logger.info('🎯 PDF_Print_Final: 开始处理PDF页面...')
     
     # 确保保存目录存在
     save_path = Path(save_dir)
@@ -24,16 +22,22 @@ def handle_pdf_final(page: Page, part_number: str, save_dir: str) -> bool:
     file_name = f"{part_number}_CoverSheet_{timestamp}.pdf"
     full_file_path = save_path / file_name
 
-    # 直接HTTP请求下载原始PDF
+    # 直接HTTP请求下载原始PDF（requests/urllib3 只在导出 PDF 时才导入，不拖慢启动）
+    import requests
+    import urllib3
+    
+    # 禁用SSL警告
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    
     try:
-        print("\n--- 尝试直接下载原始PDF文件 ---")
+        logger.debug('--- 尝试直接下载原始PDF文件 ---')
         pdf_url = page.url
-        print(f"从URL下载: {pdf_url}")
+        logger.debug('从URL下载: %s', pdf_url)
 
         # 从Playwright获取当前页面的cookies，用于身份验证
         cookies_list = page.context.cookies()
         cookies_dict = {cookie['name']: cookie['value'] for cookie in cookies_list}
-        print("已获取浏览器Cookies用于请求认证。")
+        logger.debug('已获取浏览器Cookies用于请求认证。')
 
         # 使用requests库发送带有cookies的GET请求，禁用SSL验证
         response = requests.get(
@@ -50,15 +54,15 @@ def handle_pdf_final(page: Page, part_number: str, save_dir: str) -> bool:
         
         # 检查文件是否成功保存且大小合理
         if full_file_path.exists() and full_file_path.stat().st_size > 100:
-            print(f"✅ PDF文件已成功下载到: {full_file_path}")
-            print(f"   文件大小: {full_file_path.stat().st_size} 字节")
+            logger.info('✅ PDF文件已成功下载到: %s', full_file_path)
+            logger.debug('   文件大小: %s 字节', full_file_path.stat().st_size)
             return True
         else:
-            print("❌ 文件写入失败或文件为空")
+            logger.error('❌ 文件写入失败或文件为空')
             return False
 
     except Exception as e:
-        print(f"❌ PDF下载失败: {e}")
+        logger.error('❌ PDF下载失败: %s', e)
         return False
 
 if __name__ == "__main__":
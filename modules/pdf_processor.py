@@ -2,7 +2,13 @@ from datetime import datetime
 from playwright.sync_api import Page
 from pathlib import Path
 
+from .tracing import traced
+from .structured_log import get_logger
 
+logger = get_logger(__name__)
+
+
+@traced('pdf')
 def print_coversheet_pdf_v12(page: Page, part_number: str, save_dir: str) -> bool:
     """
     PDF_Print_V12: PDF导航模块
@@ -18,26 +24,24 @@ def print_coversheet_pdf_v12(page: Page, part_number: str, save_dir: str) -> boo
         bool: 处理成功返回True，失败返回False
     """
     try:
-        print(f"\n=== PDF_Print_V12: 开始为 {part_number} 下载PDF ===")
-        print(f"保存目录: {save_dir}")
+        logger.info('=== PDF_Print_V12: 开始为 %s 下载PDF ===', part_number)
+        logger.debug('保存目录: %s', save_dir)
         # 确保保存目录存在
         Path(save_dir).mkdir(parents=True, exist_ok=True)
         
         # 步骤1: 查找PDF iframe并导航
         success = find_and_navigate_to_pdf(page)
         if not success:
-            print("❌ 未找到PDF页面")
+            logger.error('❌ 未找到PDF页面')
             return False
         
         # 步骤2: 调用Final模块处理PDF
-        print("调用PDF_Print_Final模块处理PDF...")
+        logger.debug('调用PDF_Print_Final模块处理PDF...')
         from .pdf_downloader import handle_pdf_final
         return handle_pdf_final(page, part_number, save_dir)
             
     except Exception as e:
-        print(f"❌ PDF下载失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error('❌ PDF下载失败: %s', e, exc_info=True)
         return False
 
 
@@ -46,24 +50,24 @@ def find_and_navigate_to_pdf(page: Page) -> bool:
     查找并导航到PDF页面
     """
     try:
-        print("查找PDF iframe...")
+        logger.debug('查找PDF iframe...')
         
         # 检查页面中的所有iframe
         iframes = page.query_selector_all("iframe")
-        print(f"找到 {len(iframes)} 个iframe")
+        logger.debug('找到 %s 个iframe', len(iframes))
         
         pdf_iframe_src = None
         for i, iframe in enumerate(iframes):
             src = iframe.get_attribute("src")
-            print(f"iframe {i}: src = {src}")
+            logger.debug('iframe %s: src = %s', i, src)
             
             if src and "publishing/proof/product" in src:
                 pdf_iframe_src = src
-                print(f"✅ 找到PDF iframe {i}: {src}")
+                logger.info('✅ 找到PDF iframe %s: %s', i, src)
                 break
         
         if not pdf_iframe_src:
-            print("❌ 未找到PDF iframe")
+            logger.error('❌ 未找到PDF iframe')
             return False
         
         # 构建完整的PDF URL
@@ -73,21 +77,19 @@ def find_and_navigate_to_pdf(page: Page) -> bool:
         else:
             pdf_url = pdf_iframe_src
         
-        print("直接导航到PDF页面...")
-        print(f"PDF URL: {pdf_url}")
+        logger.debug('直接导航到PDF页面...')
+        logger.debug('PDF URL: %s', pdf_url)
         
         page.goto(pdf_url)
         
         # 简单等待页面加载
-        print("等待页面加载...")
+        logger.debug('等待页面加载...')
         page.wait_for_timeout(8000)
-        print("✅ 页面加载完成，准备交由Final模块处理")
+        logger.info('✅ 页面加载完成，准备交由Final模块处理')
         return True
         
     except Exception as e:
-        print(f"❌ 导航到PDF页面失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error('❌ 导航到PDF页面失败: %s', e, exc_info=True)
         return False
 
 
@@ -6,12 +6,30 @@ from typing import Dict, Any, Optional, Callable
 from .document_manager import DocumentManager, process_document_upload
 from .system_handler import enhanced_product_search
 from .form_handler import fill_peda_form
+from .cancellation import OperationCancelled, check_cancelled, cancellable_wait_for_function
+from . import tracing
+from config.constants import (
+    CHECKPOINT_STEP_RESOLVED, CHECKPOINT_STEP_PEDA_CREATED, CHECKPOINT_STEP_FORM_FILLED,
+    CHECKPOINT_STEP_FILE_UPLOADED, CHECKPOINT_STEP_SAVED,
+    FAILURE_EMPTY_PART_NUMBER, FAILURE_DOCUMENT_STRUCTURE, FAILURE_PRODUCT_NOT_FOUND,
+    FAILURE_SEARCH_NO_SUGGESTIONS, FAILURE_NEVER_APPROVED, FAILURE_CREATE_PEDA, FAILURE_CREATE_PEDA_UNCONFIRMED,
+    FAILURE_RESUME_OPEN, FAILURE_FORM_FILL, FAILURE_UPLOAD, FAILURE_SAVE_VALIDATE,
+    FAILURE_EXCEPTION
+)
+from .structured_log import get_logger, level_value
 
+logger = get_logger(__name__)
 
+
+@tracing.traced('part', attrs=lambda page, data_row, *args, **kwargs: {'part_number': data_row.get('part_number')})
 def process_single_peda(page: Page, data_row: Dict[str, Any], 
                        document_maintenance_path: str,
                        log_callback: Optional[Callable] = None,
-                       upload_record_callback: Optional[Callable] = None) -> bool:
+                       upload_record_callback: Optional[Callable] = None,
+                       step_callback: Optional[Callable] = None,
+                       checkpoint=None,
+                       failure_info: Optional[Dict[str, Any]] = None,
+                       cancel_token=None) -> bool:
     """
     处理单个PEDA（不包含浏览器管理）
     
@@ -21,6 +39,10 @@ def process_single_peda(page: Page, data_row: Dict[str, Any],
         document_maintenance_path: 文档主目录路径（从GUI传入）
         log_callback: 日志回调函数
         upload_record_callback: 上传记录回调函数
+        step_callback: 步骤完成回调 step_callback(step, **info)，用于写断点日志
+        checkpoint: 上次运行留下的件号进度（PartCheckpoint），用于从最后一个安全步骤续跑
+        failure_info: 可选字典，处理失败时写入 step / reason / error，供重试调度分类
+        cancel_token: 取消令牌（CancellationToken），在步骤之间和较长等待中检查
         
     Returns:
         bool: 处理成功返回True
@@ -30,7 +52,32 @@ def process_single_peda(page: Page, data_row: Dict[str, Any],
         if log_callback:
             log_callback(message, level)
         else:
-            print(f"[{level}] {message}")
+            logger.log(level_value(level), message)
+    
+    def step_done(step: str, **info):
+        """记录步骤完成（断点日志写入失败不影响处理）"""
+        if not step_callback:
+            return
+        try:
+            step_callback(step, **info)
+        except Exception as e:
+            log(f"⚠️ 记录步骤 {step} 失败: {e}", "WARNING")
+        # 步骤已记入断点日志，此时是安全的取消点
+        check_cancelled(cancel_token)
+    
+    # 件号区间（@traced('part')），失败步骤和原因同时记在区间上，供报告汇总
+    part_span = tracing.current_span()
+    
+    def fail(step: str, reason: str, error: str = '') -> bool:
+        """记录失败步骤和原因，返回False"""
+        if failure_info is not None:
+            failure_info.update({'step': step, 'reason': reason, 'error': error})
+        if part_span is not None:
+            part_span.set(failed_step=step, reason=reason)
+        return False
+    
+    resume_peda = checkpoint is not None and checkpoint.peda_created
+    completed_steps = set(checkpoint.steps) if checkpoint is not None else set()
     
     try:
         # 从data_row中提取数据（必填字段）
@@ -48,7 +95,7 @@ def process_single_peda(page: Page, data_row: Dict[str, Any],
         
         if not part_number:
             log("❌ 件号为空，跳过处理", "ERROR")
-            return False
+            return fail('validate', FAILURE_EMPTY_PART_NUMBER)
         
         log(f"开始处理件号: {part_number}")
         log(f"文档路径: {document_maintenance_path}")
@@ -59,65 +106,104 @@ def process_single_peda(page: Page, data_row: Dict[str, Any],
         # 验证文档结构
         if not doc_manager.validate_structure():
             log(f"件号 {part_number} 的文档结构验证失败，跳过处理", "ERROR")
-            return False
+            return fail('documents', FAILURE_DOCUMENT_STRUCTURE)
         
         # 扫描文档并获取摘要
         doc_manager.scan_documents()
         summary = doc_manager.get_upload_summary()
         log(f"文档扫描完成: 共 {summary['total_files']} 个文件在 {summary['categories_with_files']} 个类别中")
         
-        # 步骤1: 搜索产品
-        log(f"搜索产品: {part_number}")
-        if not enhanced_product_search(page, part_number):
-            log(f"❌ 产品 {part_number} 搜索失败", "ERROR")
-            return False
+        check_cancelled(cancel_token)
+        if resume_peda:
+            # 续跑：PEDA 已在上次运行中创建，直接打开，避免重复创建
+            log(f"🔁 件号 {part_number} 的PEDA已在上次运行中创建，从步骤 '{checkpoint.last_step()}' 之后继续")
+            if not open_existing_peda(page, checkpoint.peda_url, log):
+                log(f"❌ 无法打开上次创建的PEDA，为避免重复创建已停止处理该件号，请手动检查: {checkpoint.peda_url}", "ERROR")
+                return fail(CHECKPOINT_STEP_PEDA_CREATED, FAILURE_RESUME_OPEN)
+        else:
+            # 步骤1: 搜索产品
+            log(f"搜索产品: {part_number}")
+            search_info = {}
+            if not enhanced_product_search(page, part_number, search_info=search_info):
+                log(f"❌ 产品 {part_number} 搜索失败", "ERROR")
+                # 有候选项但没有匹配的THP项、或回车搜索后弹出 Product Not Found 视为产品不存在；
+                # 建议列表和搜索结果都没有出现可能只是系统慢，按暂时性失败重试
+                if search_info.get('candidates') or search_info.get('not_found'):
+                    reason = FAILURE_PRODUCT_NOT_FOUND
+                else:
+                    reason = FAILURE_SEARCH_NO_SUGGESTIONS
+                return fail(CHECKPOINT_STEP_RESOLVED, reason)
         
-        log("✅ 产品搜索成功")
+            log("✅ 产品搜索成功")
+            step_done(CHECKPOINT_STEP_RESOLVED)
         
-        # 步骤2: 创建PEDA
-        log("创建新的PEDA...")
-        try:
-            # 等待more_horiz按钮出现（确保页面加载完成）
-            page.get_by_role("button", name="more_horiz").wait_for(state="visible", timeout=10000)
+            # 步骤2: 创建PEDA
+            with tracing.span('create') as create_span:
+                log("创建新的PEDA...")
+                create_clicked = False
+                try:
+                    # 等待more_horiz按钮出现（确保页面加载完成）
+                    page.get_by_role("button", name="more_horiz").wait_for(state="visible", timeout=10000)
             
-            # 检查THP审批状态
-            from .approval_checker import check_thp_approval_status
-            if not check_thp_approval_status(page, part_number):
-                log(f"⚠️ 件号 {part_number} 的THP未批准，跳过处理", "WARNING")
-                return False
+                    # 检查THP审批状态
+                    from .approval_checker import check_thp_approval_status
+                    if not check_thp_approval_status(page, part_number):
+                        log(f"⚠️ 件号 {part_number} 的THP未批准，跳过处理", "WARNING")
+                        create_span.fail()
+                        return fail(CHECKPOINT_STEP_PEDA_CREATED, FAILURE_NEVER_APPROVED)
             
-            log("✅ THP审批状态检查通过")
+                    log("✅ THP审批状态检查通过")
             
-            # 点击创建PEDA
-            page.get_by_role("button", name="more_horiz").click()
-            page.get_by_role("button", name="Create new PEDA").click()
+                    # 点击创建PEDA
+                    page.get_by_role("button", name="more_horiz").click()
+                    # 从这里起失败都可能已创建PEDA（点击可能已发出），不能自动重试
+                    create_clicked = True
+                    page.get_by_role("button", name="Create new PEDA").click()
             
-            log("等待PEDA页面加载...")
-            page.wait_for_timeout(5000)
+                    # 等PEDA页面出现后再记录地址，否则记录的可能还是产品页
+                    log("等待PEDA页面加载...")
+                    cancellable_wait_for_function(
+                        page, "() => !!document.querySelector('#stibo_tab_PEDA_Details')", 30000, cancel_token
+                    )
+                    step_done(CHECKPOINT_STEP_PEDA_CREATED, peda_url=page.url)
             
-            # 新增：确保在PEDA Detail页
-            try:
-                if not page.get_by_text("PEDA Details", exact=True).is_visible(timeout=2000):
-                    page.get_by_text("PEDA Details", exact=True).click()
-                    page.wait_for_timeout(1000)
-            except Exception as e:
-                log(f"切换到PEDA Detail页失败: {e}", "WARNING")
+                    # 新增：确保在PEDA Detail页
+                    try:
+                        if not page.get_by_text("PEDA Details", exact=True).is_visible(timeout=2000):
+                            page.get_by_text("PEDA Details", exact=True).click()
+                            page.wait_for_timeout(1000)
+                    except Exception as e:
+                        log(f"切换到PEDA Detail页失败: {e}", "WARNING")
         
-        except Exception as e:
-            log(f"❌ 创建PEDA页面失败: {str(e)}", "ERROR")
-            return False
+                except OperationCancelled:
+                    raise
+                except Exception as e:
+                    log(f"❌ 创建PEDA页面失败: {str(e)}", "ERROR")
+                    create_span.fail()
+                    if create_clicked:
+                        log(f"⚠️ 已点击创建但未确认PEDA页面，为避免重复创建不再重试，请手动检查件号 {part_number} 的PEDA", "WARNING")
+                        return fail(CHECKPOINT_STEP_PEDA_CREATED, FAILURE_CREATE_PEDA_UNCONFIRMED, str(e))
+                    return fail(CHECKPOINT_STEP_PEDA_CREATED, FAILURE_CREATE_PEDA, str(e))
         
         # 步骤3: 填写PEDA表单
-        log("填写PEDA表单...")
-        if not fill_peda_form(page, data_row):
-            log("❌ PEDA表单填写失败", "ERROR")
-            return False
-        
-        log("✅ PEDA表单填写完成")
+        if CHECKPOINT_STEP_FORM_FILLED in completed_steps:
+            log("PEDA表单已在上次运行中填写，跳过")
+        else:
+            log("填写PEDA表单...")
+            form_failure = {}
+            if not fill_peda_form(page, data_row, failure_info=form_failure, cancel_token=cancel_token):
+                log("❌ PEDA表单填写失败", "ERROR")
+                return fail(CHECKPOINT_STEP_FORM_FILLED, FAILURE_FORM_FILL, form_failure.get('error', ''))
+            
+            log("✅ PEDA表单填写完成")
+            step_done(CHECKPOINT_STEP_FORM_FILLED)
         
         # 步骤4: 文档上传
         log("开始文档上传流程...")
-        upload_results = process_document_upload(page, doc_manager, part_number, data_row, upload_record_callback=upload_record_callback, log_callback=log_callback)
+        upload_results = process_document_upload(page, doc_manager, part_number, data_row, upload_record_callback=upload_record_callback, log_callback=log_callback,
+                                                  step_callback=step_callback, completed_steps=completed_steps,
+                                                  uploaded_files=set(checkpoint.uploaded_files) if checkpoint is not None else None,
+                                                  cancel_token=cancel_token)
         
         # 显示上传结果
         log("\n=== 文档上传完成 ===")
@@ -145,10 +231,19 @@ def process_single_peda(page: Page, data_row: Dict[str, Any],
             return True
         else:
             log(f"⚠️ 件号 {part_number} PEDA创建部分失败", "ERROR")
-            return False
+            if upload_results['success_count'] == 0 and upload_results['failed_count'] == 0:
+                return fail('documents', FAILURE_DOCUMENT_STRUCTURE, "没有可上传的文件")
+            if upload_results['failed_count'] > 0:
+                upload_errors = [error for result in upload_results.get('category_results', {}).values()
+                                 for error in result.get('errors', [])]
+                return fail(CHECKPOINT_STEP_FILE_UPLOADED, FAILURE_UPLOAD, "; ".join(upload_errors))
+            return fail(CHECKPOINT_STEP_SAVED, FAILURE_SAVE_VALIDATE)
             
+    except OperationCancelled:
+        raise
     except Exception as e:
         log(f"❌ 处理件号 {part_number} 时发生异常: {str(e)}", "ERROR")
+        fail('exception', FAILURE_EXCEPTION, str(e))
         
         # 截图保存错误状态
         try:
@@ -169,6 +264,31 @@ def process_single_peda(page: Page, data_row: Dict[str, Any],
         return False
 
 
+@tracing.traced('resume_open')
+def open_existing_peda(page: Page, peda_url: str, log: Callable) -> bool:
+    """
+    打开已创建的PEDA页面（断点续跑）
+    
+    Args:
+        page: 已登录的页面对象
+        peda_url: 创建PEDA后记录的页面地址
+        log: 日志函数
+        
+    Returns:
+        bool: PEDA页面加载成功返回True
+    """
+    try:
+        log(f"打开已创建的PEDA: {peda_url}")
+        page.goto(peda_url)
+        page.wait_for_load_state("networkidle", timeout=30000)
+        page.wait_for_selector("#stibo_tab_PEDA_Details, #stibo_tab_Document_maintenance", timeout=30000)
+        log("✅ 已打开上次创建的PEDA")
+        return True
+    except Exception as e:
+        log(f"打开已创建的PEDA失败: {e}", "WARNING")
+        return False
+
+
 def validate_data_row(data_row: Dict[str, Any]) -> bool:
     """
     验证单行数据的完整性（只验证必填字段）
@@ -5,6 +5,9 @@
 
 from playwright.sync_api import Page
 from typing import Optional
+from .structured_log import get_logger
+
+logger = get_logger(__name__)
 
 
 def detect_popup(page: Page, timeout: int = 2000) -> bool:
@@ -21,7 +24,7 @@ def detect_popup(page: Page, timeout: int = 2000) -> bool:
     try:
         # 检测遮罩层
         if page.locator('.gwt-PopupPanelGlass').is_visible(timeout=timeout):
-            print("✅ 检测到遮罩层 (.gwt-PopupPanelGlass)")
+            logger.info('✅ 检测到遮罩层 (.gwt-PopupPanelGlass)')
             return True
         
         # 检测常见弹窗元素
@@ -35,15 +38,59 @@ def detect_popup(page: Page, timeout: int = 2000) -> bool:
         
         for selector in popup_selectors:
             if page.locator(selector).is_visible(timeout=500):
-                print(f"✅ 检测到弹窗元素: {selector}")
+                logger.info('✅ 检测到弹窗元素: %s', selector)
                 return True
         
         return False
     except Exception as e:
-        print(f"检测弹窗时出错: {e}")
+        logger.debug('检测弹窗时出错: %s', e)
+        return False
+
+
+def product_not_found_shown(page: Page, timeout: int = 3000) -> bool:
+    """
+    检测是否弹出了"Product Not Found"弹窗（搜索已完成但没有结果）
+    
+    Args:
+        page: Playwright页面对象
+        timeout: 等待弹窗出现的时间（毫秒）
+        
+    Returns:
+        bool: 弹窗出现返回True
+    """
+    try:
+        page.locator(
+            '.portal-popup-header__title:has-text("Product Not Found"), '
+            '.stibo-GraphicsButton:has-text("Go back")'
+        ).first.wait_for(state='visible', timeout=timeout)
+        logger.info('检测到 Product Not Found 弹窗')
+        return True
+    except Exception as e:
+        logger.debug('未检测到 Product Not Found 弹窗: %s', e)
         return False
 
 
+def fatal_error_shown(page: Page) -> bool:
+    """
+    检测当前是否显示"Fatal Error"弹窗（服务器处理请求失败）
+
+    弹窗和等待遮罩消失同时出现，请求结束后立即检查即可，不额外等待
+    
+    Args:
+        page: Playwright页面对象
+        
+    Returns:
+        bool: 弹窗显示中返回True
+    """
+    try:
+        if page.locator('.portal-popup-header__title:has-text("Fatal Error")').first.is_visible():
+            logger.warning('检测到 Fatal Error 弹窗')
+            return True
+    except Exception as e:
+        logger.debug('检测 Fatal Error 弹窗失败: %s', e)
+    return False
+
+
 def handle_product_not_found_popup(page: Page) -> bool:
     """
     处理"Product Not Found"弹窗
@@ -57,20 +104,20 @@ def handle_product_not_found_popup(page: Page) -> bool:
         bool: 成功处理返回True
     """
     try:
-        print("\n=== 检测产品未找到弹窗 ===")
+        logger.info('=== 检测产品未找到弹窗 ===')
         
         # 等待弹窗出现
         page.wait_for_timeout(2000)
         
         # 检测是否有弹窗
         if not detect_popup(page):
-            print("未检测到弹窗，无需处理")
+            logger.debug('未检测到弹窗，无需处理')
             return True
         
-        print("检测到弹窗，开始处理...")
+        logger.debug('检测到弹窗，开始处理...')
         
         # 方法1: 尝试点击 "Go back" 按钮
-        print("尝试点击 'Go back' 按钮...")
+        logger.debug("尝试点击 'Go back' 按钮...")
         go_back_selectors = [
             'button.stibo-GraphicsButton:has-text("Go back")',
             'button:has-text("Go back")',
@@ -83,21 +130,21 @@ def handle_product_not_found_popup(page: Page) -> bool:
                 button = page.locator(selector).first
                 if button.is_visible(timeout=1000):
                     button.click(force=True)
-                    print(f"✅ 成功点击 'Go back' 按钮 (选择器 {i})")
+                    logger.info("✅ 成功点击 'Go back' 按钮 (选择器 %s)", i)
                     page.wait_for_timeout(1000)
                     
                     # 验证弹窗是否关闭
                     if not detect_popup(page, timeout=1000):
-                        print("✅ 弹窗已关闭，页面恢复正常")
+                        logger.info('✅ 弹窗已关闭，页面恢复正常')
                         return True
                     else:
-                        print("⚠️ 弹窗仍然存在，尝试其他方法")
+                        logger.warning('⚠️ 弹窗仍然存在，尝试其他方法')
             except Exception as e:
-                print(f"选择器 {i} 失败: {e}")
+                logger.warning('选择器 %s 失败: %s', i, e)
                 continue
         
         # 方法2: 尝试点击 "OK" 按钮（备用）
-        print("尝试点击 'OK' 按钮...")
+        logger.debug("尝试点击 'OK' 按钮...")
         ok_selectors = [
             'button.stibo-GraphicsButton:has-text("OK")',
             'button:has-text("OK")',
@@ -109,41 +156,41 @@ def handle_product_not_found_popup(page: Page) -> bool:
                 button = page.locator(selector).first
                 if button.is_visible(timeout=1000):
                     button.click(force=True)
-                    print(f"✅ 成功点击 'OK' 按钮 (选择器 {i})")
+                    logger.info("✅ 成功点击 'OK' 按钮 (选择器 %s)", i)
                     page.wait_for_timeout(1000)
                     
                     if not detect_popup(page, timeout=1000):
-                        print("✅ 弹窗已关闭")
+                        logger.info('✅ 弹窗已关闭')
                         return True
             except Exception as e:
-                print(f"选择器 {i} 失败: {e}")
+                logger.warning('选择器 %s 失败: %s', i, e)
                 continue
         
         # 方法3: 尝试按 ESC 键
-        print("尝试按 ESC 键关闭弹窗...")
+        logger.debug('尝试按 ESC 键关闭弹窗...')
         try:
             page.keyboard.press("Escape")
             page.wait_for_timeout(1000)
             
             if not detect_popup(page, timeout=1000):
-                print("✅ ESC 键成功关闭弹窗")
+                logger.info('✅ ESC 键成功关闭弹窗')
                 return True
         except Exception as e:
-            print(f"ESC 键失败: {e}")
+            logger.warning('ESC 键失败: %s', e)
         
         # 方法4: 强制清理遮罩层和弹窗
-        print("尝试强制清理遮罩层和弹窗...")
+        logger.debug('尝试强制清理遮罩层和弹窗...')
         success = clear_all_popups(page)
         
         if success:
-            print("✅ 产品未找到弹窗处理完成")
+            logger.info('✅ 产品未找到弹窗处理完成')
             return True
         else:
-            print("❌ 产品未找到弹窗处理失败")
+            logger.error('❌ 产品未找到弹窗处理失败')
             return False
         
     except Exception as e:
-        print(f"❌ 处理产品未找到弹窗时出错: {e}")
+        logger.error('❌ 处理产品未找到弹窗时出错: %s', e)
         # 尝试最后的清理
         clear_all_popups(page)
         return False
@@ -162,26 +209,26 @@ def handle_fatal_error_popup(page: Page) -> bool:
         bool: 成功处理返回True
     """
     try:
-        print("\n=== 检测Fatal Error弹窗 ===")
+        logger.info('=== 检测Fatal Error弹窗 ===')
         
         # 检测Fatal Error关键词
-        error_keywords = ["Fatal", "Error", "error had occurred"]
+        error_keywords = ["Fatal Error", "Fatal", "Error", "error had occurred"]
         has_error = False
         
         for keyword in error_keywords:
             try:
                 if page.locator(f'text="{keyword}"').is_visible(timeout=1000):
-                    print(f"✅ 检测到错误弹窗: 包含关键词 '{keyword}'")
+                    logger.warning("✅ 检测到错误弹窗: 包含关键词 '%s'", keyword)
                     has_error = True
                     break
             except:
                 continue
         
         if not has_error:
-            print("未检测到Fatal Error弹窗")
+            logger.debug('未检测到Fatal Error弹窗')
             return True
         
-        print("开始处理Fatal Error弹窗...")
+        logger.info('开始处理Fatal Error弹窗...')
         
         # 尝试点击OK或Close按钮
         close_selectors = [
@@ -195,7 +242,7 @@ def handle_fatal_error_popup(page: Page) -> bool:
                 button = page.locator(selector).first
                 if button.is_visible(timeout=1000):
                     button.click(force=True)
-                    print(f"✅ 点击关闭按钮: {selector}")
+                    logger.info('✅ 点击关闭按钮: %s', selector)
                     page.wait_for_timeout(1000)
                     break
             except:
@@ -203,11 +250,11 @@ def handle_fatal_error_popup(page: Page) -> bool:
         
         # 强制清理
         clear_all_popups(page)
-        print("✅ Fatal Error弹窗处理完成")
+        logger.info('✅ Fatal Error弹窗处理完成')
         return True
         
     except Exception as e:
-        print(f"❌ 处理Fatal Error弹窗时出错: {e}")
+        logger.error('❌ 处理Fatal Error弹窗时出错: %s', e)
         clear_all_popups(page)
         return False
 
@@ -225,7 +272,7 @@ def clear_all_popups(page: Page) -> bool:
         bool: 清理成功返回True
     """
     try:
-        print("执行强制清理...")
+        logger.debug('执行强制清理...')
         
         # 执行JavaScript清理
         page.evaluate("""
@@ -258,14 +305,14 @@ def clear_all_popups(page: Page) -> bool:
         
         # 验证清理结果
         if not detect_popup(page, timeout=500):
-            print("✅ 强制清理成功，页面恢复正常")
+            logger.info('✅ 强制清理成功，页面恢复正常')
             return True
         else:
-            print("⚠️ 清理后仍检测到弹窗元素")
+            logger.warning('⚠️ 清理后仍检测到弹窗元素')
             return False
         
     except Exception as e:
-        print(f"❌ 强制清理失败: {e}")
+        logger.error('❌ 强制清理失败: %s', e)
         return False
 
 
@@ -285,7 +332,7 @@ def handle_any_popup(page: Page) -> bool:
         if not detect_popup(page):
             return True
         
-        print("\n=== 检测到弹窗，尝试通用处理 ===")
+        logger.info('=== 检测到弹窗，尝试通用处理 ===')
         
         # 尝试各种常见的关闭方式
         close_actions = [
@@ -301,20 +348,20 @@ def handle_any_popup(page: Page) -> bool:
                 button = page.locator(selector).first
                 if button.is_visible(timeout=500):
                     button.click(force=True)
-                    print(f"✅ 点击 '{name}' 按钮")
+                    logger.info("✅ 点击 '%s' 按钮", name)
                     page.wait_for_timeout(1000)
                     
                     if not detect_popup(page, timeout=500):
-                        print("✅ 弹窗已关闭")
+                        logger.info('✅ 弹窗已关闭')
                         return True
             except:
                 continue
         
         # 如果常规方法失败，强制清理
-        print("常规方法失败，执行强制清理...")
+        logger.warning('常规方法失败，执行强制清理...')
         return clear_all_popups(page)
         
     except Exception as e:
-        print(f"❌ 通用弹窗处理失败: {e}")
+        logger.error('❌ 通用弹窗处理失败: %s', e)
         clear_all_popups(page)
         return False
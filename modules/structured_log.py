@@ -0,0 +1,173 @@
+"""
+结构化日志（按模块分级，后台线程写入 JSONL）
+
+各处理模块通过 get_logger(__name__) 取得自己的日志器（peda.<模块名>），按级别记录：
+逐个选择器、候选元素、按钮的尝试用 DEBUG，步骤结果用 INFO，可继续的问题用 WARNING，失败用 ERROR。
+
+configure_logging() 在 'peda' 日志器上安装队列处理器：调用线程只把记录放进队列，
+后台 QueueListener 线程负责格式化并写入按大小轮转的 JSONL 文件（可选同时输出到控制台）。
+级别被禁用时 logger.debug(...) 在 isEnabledFor 处直接返回，既不格式化消息也不入队；
+消息参数用 %s 占位延迟格式化，需要额外访问浏览器才能得到的调试信息先判断 isEnabledFor。
+
+未调用 configure_logging() 时（如单独调用某个处理函数），只有 WARNING 以上的消息
+由 logging 的默认处理输出到 stderr。
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+from config.constants import (LOG_DIR, STRUCTURED_LOG_FILE, STRUCTURED_LOG_LEVEL,
+                              STRUCTURED_LOG_MAX_MB, STRUCTURED_LOG_BACKUPS)
+
+ROOT_LOGGER = 'peda'
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_atexit_registered = False
+# 上次配置过级别的模块，重新配置时先恢复为继承默认级别
+_configured_modules = set()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """模块日志器：modules.form_handler -> peda.form_handler（按模块名配置级别）"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name.rsplit('.', 1)[-1]}")
+
+
+def level_value(value: Union[str, int]) -> int:
+    """级别名转为 logging 级别（log_callback 使用的 SUCCESS 等非标准级别按 INFO 处理）"""
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).upper())
+    return level if isinstance(level, int) else logging.INFO
+
+
+class JsonLineFormatter(logging.Formatter):
+    """每条记录一行 JSON：时间、级别、模块、线程、件号/步骤（来自 tracing 区间）、消息和异常"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'module': record.name[len(ROOT_LOGGER) + 1:] or record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key in ('part_number', 'step'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    在调用线程中补充上下文并放入队列
+
+    当前 tracing 区间的件号和步骤名只能在调用线程中取得；消息和异常在这里格式化成字符串，
+    避免队列中的记录引用页面对象等可变参数。只有通过级别检查的记录才会到达这里。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        from .tracing import current_span
+
+        current = current_span()
+        if current is not None:
+            record.step = current.name
+            record.part_number = current.attrs.get('part_number')
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: Union[str, int] = STRUCTURED_LOG_LEVEL,
+                      modules: Optional[Dict[str, Union[str, int]]] = None,
+                      console: bool = False,
+                      log_dir: Optional[str] = None) -> Optional[str]:
+    """
+    安装异步日志输出（可重复调用，重新配置时先停止之前的后台线程）
+
+    Args:
+        level: 默认级别（DEBUG / INFO / WARNING / ERROR）
+        modules: 按模块设置级别，如 {'form_handler': 'DEBUG', 'popup_handler': 'WARNING'}
+        console: 是否同时输出到控制台（命令行模式使用，控制台只显示 INFO 以上）
+        log_dir: JSONL 文件目录，默认当前目录下的 LOG_DIR
+
+    Returns:
+        Optional[str]: JSONL 文件路径；目录无法创建时返回 None（仍可输出到控制台）
+    """
+    global _listener, _atexit_registered
+
+    with _lock:
+        _stop_listener()
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level_value(level))
+        root.propagate = False
+        for name in _configured_modules:
+            get_logger(name).setLevel(logging.NOTSET)
+        _configured_modules.clear()
+        for name, module_level in (modules or {}).items():
+            get_logger(name).setLevel(level_value(module_level))
+            _configured_modules.add(name)
+
+        handlers = []
+        path = os.path.join(log_dir or os.path.join(os.getcwd(), LOG_DIR), STRUCTURED_LOG_FILE)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=int(STRUCTURED_LOG_MAX_MB * 1024 * 1024),
+                backupCount=STRUCTURED_LOG_BACKUPS, encoding='utf-8', delay=True)
+            file_handler.setFormatter(JsonLineFormatter())
+            handlers.append(file_handler)
+        except OSError as e:
+            print(f"[structured_log] 无法创建日志文件 {path}: {e}", file=sys.stderr)
+            path = None
+        if console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(logging.Formatter('%(message)s'))
+            handlers.append(console_handler)
+
+        record_queue = queue.SimpleQueue()
+        root.handlers = [_ContextQueueHandler(record_queue)]
+        _listener = logging.handlers.QueueListener(record_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+        if not _atexit_registered:
+            atexit.register(shutdown_logging)
+            _atexit_registered = True
+        return path
+
+
+def set_module_level(name: str, level: Union[str, int]):
+    """运行中调整某个模块的日志级别"""
+    get_logger(name).setLevel(level_value(level))
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def shutdown_logging():
+    """写完队列中剩余的记录并关闭文件（程序退出时自动调用）"""
+    with _lock:
+        _stop_listener()
+        logging.getLogger(ROOT_LOGGER).handlers = []
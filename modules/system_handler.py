@@ -1,9 +1,19 @@
+import time
+
+from . import tracing
+from .tracing import traced
+from .structured_log import get_logger
+
+logger = get_logger(__name__)
+
+
+@traced('set_language')
 def set_language_after_login(page):
     """
     登录后立即设置语言为英语
     """
     try:
-        print("开始设置语言为English...")
+        logger.debug('开始设置语言为English...')
 
         # 等待页面完全加载
         page.wait_for_load_state("networkidle", timeout=15000)
@@ -13,53 +23,54 @@ def set_language_after_login(page):
         try:
             search_placeholder_en = "Search for products, documents, ..."
             if page.get_by_placeholder(search_placeholder_en).is_visible(timeout=3000):
-                print("✅ 检测到主页已为英语界面，无需切换")
+                logger.info('✅ 检测到主页已为英语界面，无需切换')
                 return True
         except:
             pass
 
-        print("开始切换语言到English...")
+        logger.debug('开始切换语言到English...')
         
         # 第一步：点击System Settings按钮
         page.locator('div[title="System Settings"]').click()
-        print("✅ 已点击System Settings按钮")
+        logger.info('✅ 已点击System Settings按钮')
         page.wait_for_timeout(1000)
 
         # 第二步：选择English选项 (使用更精确的定位器)
         page.locator('div.selectable-item[title="English"]').click()
-        print("✅ 已选择English选项")
+        logger.info('✅ 已选择English选项')
         
         # 第三步：等待页面刷新完成
-        print("等待页面刷新...")
+        logger.debug('等待页面刷新...')
         page.wait_for_load_state("networkidle", timeout=10000)
         page.wait_for_timeout(2000)
 
         # 验证语言切换结果
         try:
             if page.get_by_placeholder(search_placeholder_en).is_visible(timeout=5000):
-                print("✅ 语言成功切换到英语")
+                logger.info('✅ 语言成功切换到英语')
                 return True
             else:
-                print("✅ 语言切换完成（验证可能因页面变化而失败）")
+                logger.info('✅ 语言切换完成（验证可能因页面变化而失败）')
                 return True
         except:
-            print("✅ 语言切换操作完成")
+            logger.info('✅ 语言切换操作完成')
             return True
 
     except Exception as e:
-        print(f"❌ 语言设置时发生异常: {e}")
+        logger.error('❌ 语言设置时发生异常: %s', e)
         # 保存截图用于调试
         try:
             page.screenshot(path="language_setting_error.png")
-            print("已保存语言设置错误截图: language_setting_error.png")
+            logger.warning('已保存语言设置错误截图: language_setting_error.png')
         except:
             pass
         return False
 
+@traced('login_popup')
 def handle_login_popup(page):
     """处理登录后的系统通知弹窗 - 使用正确的选择器"""
     try:
-        print("正在检测系统通知弹窗...")
+        logger.debug('正在检测系统通知弹窗...')
         
         # 使用正确的弹窗检测选择器
         popup_detected = False
@@ -74,19 +85,19 @@ def handle_login_popup(page):
         for i, selector in enumerate(popup_selectors, 1):
             try:
                 if page.locator(selector).is_visible(timeout=2000):
-                    print(f"✅ 检测到系统通知弹窗 (选择器 {i}: {selector})")
+                    logger.info('✅ 检测到系统通知弹窗 (选择器 %s: %s)', i, selector)
                     popup_detected = True
                     break
             except:
                 continue        
         if not popup_detected:
-            print("未检测到系统通知弹窗")
+            logger.debug('未检测到系统通知弹窗')
             return True
         
-        print("开始处理系统通知弹窗...")
+        logger.debug('开始处理系统通知弹窗...')
         
         # 使用Playwright点击操作
-        print("尝试Playwright点击操作...")
+        logger.debug('尝试Playwright点击操作...')
         try:
             # 勾选复选框
             checkbox_selectors = [
@@ -99,7 +110,7 @@ def handle_login_popup(page):
                 try:
                     if page.locator(selector).is_visible(timeout=1000):
                         page.locator(selector).click(force=True)
-                        print(f"✅ 已勾选 'Don't show this again' (选择器: {selector})")
+                        logger.info("✅ 已勾选 'Don't show this again' (选择器: %s)", selector)
                         break
                 except:
                     continue
@@ -117,7 +128,7 @@ def handle_login_popup(page):
                 try:
                     if page.locator(selector).is_visible(timeout=1000):
                         page.locator(selector).click(force=True)
-                        print(f"✅ 已点击OK按钮 (选择器: {selector})")
+                        logger.info('✅ 已点击OK按钮 (选择器: %s)', selector)
                         break
                 except:
                     continue
@@ -126,14 +137,14 @@ def handle_login_popup(page):
             
             # 验证弹窗是否关闭
             if not page.locator(".portal-popup-header__title").is_visible(timeout=2000):
-                print("✅ Playwright方法成功关闭弹窗")
+                logger.info('✅ Playwright方法成功关闭弹窗')
                 return True
                 
         except Exception as e:
-            print(f"Playwright方法失败: {e}")
+            logger.warning('Playwright方法失败: %s', e)
         
         # 方法3: 强制移除遮罩层和弹窗
-        print("尝试强制移除遮罩层...")
+        logger.debug('尝试强制移除遮罩层...')
         try:
             page.evaluate("""
                 // 移除所有遮罩层
@@ -155,44 +166,54 @@ def handle_login_popup(page):
             """)
             
             page.wait_for_timeout(500)
-            print("✅ 已强制移除遮罩层和弹窗")
+            logger.info('✅ 已强制移除遮罩层和弹窗')
             return True
             
         except Exception as e:
-            print(f"强制移除失败: {e}")
+            logger.warning('强制移除失败: %s', e)
         
         # 最后手段：按ESC键或Enter键
         try:
-            print("尝试按ESC键关闭弹窗...")
+            logger.debug('尝试按ESC键关闭弹窗...')
             page.keyboard.press("Escape")
             page.wait_for_timeout(1000)
             
             if not page.locator(".portal-popup-header__title").is_visible(timeout=2000):
-                print("✅ ESC键成功关闭弹窗")
+                logger.info('✅ ESC键成功关闭弹窗')
                 return True
         except:
             pass
         
         try:
-            print("尝试按Enter键关闭弹窗...")
+            logger.debug('尝试按Enter键关闭弹窗...')
             page.keyboard.press("Enter")
             page.wait_for_timeout(1000)
             
             if not page.locator(".portal-popup-header__title").is_visible(timeout=2000):
-                print("✅ Enter键成功关闭弹窗")
+                logger.info('✅ Enter键成功关闭弹窗')
                 return True
         except:
             pass
         
-        print("❌ 所有弹窗关闭方法都失败了")
+        logger.error('❌ 所有弹窗关闭方法都失败了')
         return False
         
     except Exception as e:
-        print(f"❌ 处理系统通知弹窗时出错: {e}")
+        logger.error('❌ 处理系统通知弹窗时出错: %s', e)
         return False
 
-def enhanced_product_search(page, part_number):
-    """增强的产品搜索方法，重点选择THP类型的结果"""
+@traced('search')
+def enhanced_product_search(page, part_number, search_info=None):
+    """增强的产品搜索方法，重点选择THP类型的结果
+
+    search_info 为可选字典，搜索结束后写入 'candidates'（找到的候选项数量）和
+    'not_found'（回车搜索后系统弹出了"Product Not Found"），供调用方区分
+    "产品不存在"（搜索已完成但没有结果）和"搜索建议没有加载出来"（可能只是系统慢）。
+    """
+    if search_info is None:
+        search_info = {}
+    search_info['candidates'] = 0
+    search_info['not_found'] = False
     search_box = page.locator("[id=\"Find_BP\\,_Products\\,_OE_Numbers\\,_THPs\"]").get_by_role("textbox", name="Search...")
 
     def _get_locator_text(locator):
@@ -217,27 +238,27 @@ def enhanced_product_search(page, part_number):
                 if part_number in text and "(THP_" in text:
                     matched_items.append((candidate, text))
             except Exception as e:
-                print(f"跳过无法读取的候选项: {e}")
+                logger.debug('跳过无法读取的候选项: %s', e)
 
         if not matched_items:
-            print(f"❌ {context_label}中未找到件号 {part_number} 的 THP 项")
+            logger.error('❌ %s中未找到件号 %s 的 THP 项', context_label, part_number)
             return False
 
-        print(f"{context_label}中匹配到 {len(matched_items)} 个 THP 候选项:")
+        logger.debug('%s中匹配到 %s 个 THP 候选项:', context_label, len(matched_items))
         for index, (_, text) in enumerate(matched_items, 1):
-            print(f"  {index}. {text}")
+            logger.debug('  %s. %s', index, text)
 
         target_locator, target_text = matched_items[0]
         target_locator.click()
-        print(f"✅ 选中正确的THP项: {target_text}")
+        logger.info('✅ 选中正确的THP项: %s', target_text)
         return True
     
-    print(f"开始增强搜索: {part_number}")
+    logger.debug('开始增强搜索: %s', part_number)
     
     # 步骤1: 确保搜索框获得焦点
     search_box.click()
     page.wait_for_timeout(500)
-    print("搜索框已获得焦点")
+    logger.debug('搜索框已获得焦点')
     
     # 步骤2: 强制清空输入框，避免 Last search 或旧值干扰当前输入
     search_box.press("Control+A")
@@ -247,81 +268,93 @@ def enhanced_product_search(page, part_number):
 
     current_value = search_box.input_value().strip()
     if current_value:
-        print(f"检测到搜索框仍有残留内容: {current_value}，使用 fill 强制清空")
+        logger.debug('检测到搜索框仍有残留内容: %s，使用 fill 强制清空', current_value)
         search_box.fill("")
         page.wait_for_timeout(300)
 
-    print("开始逐字符输入...")
+    logger.debug('开始逐字符输入...')
     for i, char in enumerate(part_number):
         search_box.type(char, delay=150)  # 每字符150ms延迟
         if (i + 1) % 3 == 0:  # 每3个字符打印一次进度
-            print(f"已输入: {part_number[:i+1]}")
+            logger.debug('已输入: %s', part_number[:i+1])
 
     final_input_value = search_box.input_value().strip()
     if final_input_value != part_number:
-        print(f"检测到搜索框最终值不一致: {final_input_value}，重新填入目标件号")
+        logger.debug('检测到搜索框最终值不一致: %s，重新填入目标件号', final_input_value)
         search_box.fill(part_number)
         page.wait_for_timeout(300)
         final_input_value = search_box.input_value().strip()
 
     if final_input_value != part_number:
-        print(f"❌ 搜索框未能稳定输入目标件号，当前值: {final_input_value}")
+        logger.error('❌ 搜索框未能稳定输入目标件号，当前值: %s', final_input_value)
         return False
     
-    print(f"输入完成: {part_number}")
+    logger.debug('输入完成: %s', part_number)
     
     # 步骤3: 触发搜索事件
     search_box.dispatch_event('input')
     search_box.dispatch_event('change')
     search_box.dispatch_event('keyup')
-    print("已触发搜索事件")
+    logger.debug('已触发搜索事件')
     
-    # 步骤4: 等待搜索建议出现
-    print(f"等待 {part_number} 的搜索建议...")
-    page.wait_for_timeout(3000)  # 等待3秒让建议加载
+    # 步骤4: 等待搜索建议出现（共等待3秒让建议加载；第一条建议出现的时间即服务器响应时间）
+    logger.debug('等待 %s 的搜索建议...', part_number)
+    started = time.monotonic()
+    with tracing.span('search_response') as response_span:
+        try:
+            page.locator(f'[title*="{part_number}"]').first.wait_for(state='attached', timeout=3000)
+        except Exception:
+            response_span.fail()  # 3秒内没有建议，不作为延迟样本
+    remaining = 3000 - (time.monotonic() - started) * 1000
+    if remaining > 0:
+        page.wait_for_timeout(remaining)
       # 步骤5: 获取所有建议项，用Python逻辑精确匹配
     # 正确格式: title="100169&nbsp;(THP_xxxxxxx)" —— 括号内直接以 THP_ 开头
     # 错误格式: title="100169&nbsp;(100169_THP_DOGA)" —— 括号内以件号开头
     # 直接用 title 属性选择器匹配，无需处理 &nbsp; 空格问题
-    print("开始查找搜索建议（直接匹配 title 属性）...")
+    logger.debug('开始查找搜索建议（直接匹配 title 属性）...')
     try:
         # 先打印所有候选项供调试
         all_suggestions = page.locator(f'[title*="{part_number}"]').all()
-        print(f"找到 {len(all_suggestions)} 个建议项:")
+        search_info['candidates'] = len(all_suggestions)
+        logger.debug('找到 %s 个建议项:', len(all_suggestions))
         for i, suggestion in enumerate(all_suggestions):
             try:
                 title = suggestion.get_attribute('title') or ''
-                print(f"  {i+1}. {title}")
+                logger.debug('  %s. %s', i+1, title)
             except Exception as e:
-                print(f"  {i+1}. 无法读取title: {e}")
+                logger.debug('  %s. 无法读取title: %s', i+1, e)
 
-        if _select_matching_thp(all_suggestions, "搜索建议"):
-            return True
+        if all_suggestions:
+            if _select_matching_thp(all_suggestions, "搜索建议"):
+                return True
 
-        print(f"❌ 未检测到件号 {part_number} 对应的 THP 项，搜索失败")
-        return False
+            logger.error('❌ 未检测到件号 %s 对应的 THP 项，搜索失败', part_number)
+            return False
     except Exception as e:
-        print(f"查找建议项失败: {e}")
+        logger.warning('查找建议项失败: %s', e)
     
-    # 步骤7: 最后的fallback - 直接按回车搜索
-    print("⚠️ 没有找到任何搜索建议，使用回车键直接搜索")
+    # 步骤7: 最后的fallback - 直接按回车搜索（没有结果时系统会弹出 Product Not Found）
+    logger.warning('⚠️ 没有找到任何搜索建议，使用回车键直接搜索')
     search_box.press('Enter')
     page.wait_for_timeout(2000)
       # 检查是否有搜索结果页面
     try:
         result_elements = page.locator(f'[title*="{part_number}"]').all()
+        search_info['candidates'] = len(result_elements)
         if result_elements:
-            print(f"搜索结果页面找到 {len(result_elements)} 个结果")
+            logger.debug('搜索结果页面找到 %s 个结果', len(result_elements))
             if _select_matching_thp(result_elements, "搜索结果页面"):
                 return True
 
-            print(f"❌ 搜索结果页面未找到件号 {part_number} 的 THP 项")
+            logger.error('❌ 搜索结果页面未找到件号 %s 的 THP 项', part_number)
     except Exception as e:
-        print(f"检查搜索结果失败: {e}")
+        logger.warning('检查搜索结果失败: %s', e)
     
     # 搜索失败，检测并处理可能的"Product Not Found"弹窗
-    print(f"⚠️ 产品 {part_number} 搜索失败，检测是否有弹窗...")
-    from .popup_handler import handle_product_not_found_popup
+    logger.warning('⚠️ 产品 %s 搜索失败，检测是否有弹窗...', part_number)
+    from .popup_handler import handle_product_not_found_popup, product_not_found_shown
+    search_info['not_found'] = product_not_found_shown(page)
     handle_product_not_found_popup(page)
     
     return False 
\ No newline at end of file
@@ -0,0 +1,399 @@
+"""
+轻量级步骤追踪（tracing）
+
+批处理期间记录嵌套的步骤区间（span）：登录、重置、搜索、审批检查、创建、填表、
+每个文件上传、保存、验证、Cover Sheet 和 PDF。每个区间带件号和结果，
+批次结束后导出为 JSONL 和 Chrome trace_event JSON（可在 chrome://tracing 或
+Perfetto 中打开），并汇总每个步骤的 p50/p95 耗时。
+
+没有安装追踪器时 span() 和 @traced 都是空操作，不影响单独调用各处理函数。
+"""
+
+import abc
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config.constants import TRACE_DIR
+from .cancellation import OperationCancelled
+
+OUTCOME_OK = 'ok'
+OUTCOME_FAILED = 'failed'
+OUTCOME_ERROR = 'error'
+OUTCOME_CANCELLED = 'cancelled'
+
+
+class Span:
+    """一个步骤区间"""
+
+    def __init__(self, name: str, span_id: int, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        self.start = time.time()
+        self._start_counter = time.perf_counter()
+        self.duration = 0.0
+        self.outcome = OUTCOME_OK
+
+    def set(self, **attrs):
+        """追加属性"""
+        self.attrs.update(attrs)
+
+    def fail(self, outcome: str = OUTCOME_FAILED, **attrs):
+        """标记区间失败（不抛异常的失败路径使用）"""
+        self.outcome = outcome
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start_counter
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'thread': self.thread_name,
+            'start': self.start,
+            'duration': round(self.duration, 6),
+            'outcome': self.outcome,
+            'attrs': self.attrs,
+        }
+
+
+class _NullSpan:
+    """未安装追踪器时使用的空区间"""
+
+    def set(self, **attrs):
+        pass
+
+    def fail(self, outcome: str = OUTCOME_FAILED, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """收集一个批次的区间（线程安全，每个线程各自维护嵌套栈）"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_id = 0
+        self._listeners: List[Callable[[Span], None]] = []
+
+    def add_listener(self, listener: Callable[[Span], None]):
+        """注册区间结束回调（如运行指标），回调异常不影响处理流程"""
+        self._listeners.append(listener)
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        # 子区间继承父区间的件号，便于按件号筛选
+        if parent is not None and 'part_number' not in attrs and 'part_number' in parent.attrs:
+            attrs['part_number'] = parent.attrs['part_number']
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        current = Span(name, span_id, parent.span_id if parent else None, attrs)
+        stack.append(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.outcome = OUTCOME_CANCELLED if isinstance(e, OperationCancelled) else OUTCOME_ERROR
+            current.attrs.setdefault('error', str(e)[:200])
+            raise
+        finally:
+            current.finish()
+            stack.pop()
+            with self._lock:
+                self.spans.append(current)
+            for listener in self._listeners:
+                try:
+                    listener(current)
+                except Exception:
+                    pass
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """每个步骤的次数、失败次数和 p50/p95/最大耗时（秒）"""
+        with self._lock:
+            spans = [(item.name, item.duration, item.outcome) for item in self.spans]
+        return summarize_spans(spans)
+
+    def export_jsonl(self, path: str):
+        """每行一个区间"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item.start)
+        with open(path, 'w', encoding='utf-8') as handle:
+            for item in spans:
+                handle.write(json.dumps(item.to_dict(), ensure_ascii=False, default=str) + '\n')
+
+    def export_chrome_trace(self, path: str):
+        """Chrome trace_event 格式（完整事件 ph='X'，时间单位微秒）"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item.start)
+        pid = os.getpid()
+        events = []
+        thread_names = {}
+        for item in spans:
+            thread_names[item.thread_id] = item.thread_name
+            args = dict(item.attrs, outcome=item.outcome)
+            events.append({
+                'name': item.name,
+                'cat': 'peda',
+                'ph': 'X',
+                'ts': int(item.start * 1_000_000),
+                'dur': int(item.duration * 1_000_000),
+                'pid': pid,
+                'tid': item.thread_id,
+                'args': args,
+            })
+        for thread_id, thread_name in thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                           'args': {'name': thread_name}})
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, handle, ensure_ascii=False, default=str)
+
+
+def summarize_spans(spans) -> Dict[str, Dict[str, float]]:
+    """
+    按步骤名汇总区间耗时
+
+    Args:
+        spans: (name, duration, outcome) 序列
+
+    Returns:
+        Dict: {步骤名: {'count', 'failed', 'p50', 'p95', 'max'}}
+    """
+    durations: Dict[str, List[float]] = {}
+    failures: Dict[str, int] = {}
+    for name, duration, outcome in spans:
+        durations.setdefault(name, []).append(duration)
+        if outcome != OUTCOME_OK:
+            failures[name] = failures.get(name, 0) + 1
+
+    result = {}
+    for name, values in durations.items():
+        values.sort()
+        result[name] = {
+            'count': len(values),
+            'failed': failures.get(name, 0),
+            'p50': _percentile(values, 50),
+            'p95': _percentile(values, 95),
+            'max': values[-1],
+        }
+    return result
+
+
+def load_trace_summary(jsonl_path: str) -> Dict[str, Dict[str, float]]:
+    """读取导出的 JSONL 追踪文件并按步骤汇总（供基准测试等离线分析使用）"""
+    spans = []
+    with open(jsonl_path, 'r', encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            spans.append((record.get('name'), float(record.get('duration') or 0), record.get('outcome')))
+    return summarize_spans(spans)
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class PartSpanListener(abc.ABC):
+    """
+    追踪器的区间结束回调基类：按件号汇总子区间，件号区间（part）结束时调用 part_finished
+
+    子区间继承件号属性。步骤耗时只累计件号区间的直接子区间（同名步骤多次出现时相加，
+    如每个文件的 upload），嵌套更深的区间已包含在父步骤的耗时中；上传文件数和字节数
+    统计所有成功的 upload 区间。并行处理时多个线程同时回调，用锁保护。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 件号 -> {(父区间ID, 步骤名): [次数, 累计耗时]}
+        self._steps: Dict[str, Dict[Any, List[float]]] = {}
+        # 件号 -> [成功上传文件数, 字节数]
+        self._uploads: Dict[str, List[int]] = {}
+
+    def __call__(self, span: Span):
+        part_number = span.attrs.get('part_number')
+        if part_number is None:
+            return
+        with self._lock:
+            pending = self._steps.setdefault(part_number, {})
+            uploads = self._uploads.setdefault(part_number, [0, 0])
+            if span.name != 'part':
+                entry = pending.setdefault((span.parent_id, span.name), [0, 0.0])
+                entry[0] += 1
+                entry[1] += span.duration
+                if span.name == 'upload' and span.outcome == OUTCOME_OK:
+                    uploads[0] += 1
+                    uploads[1] += int(span.attrs.get('bytes') or 0)
+                return
+            del self._steps[part_number]
+            del self._uploads[part_number]
+        steps = {name: (int(count), duration) for (parent_id, name), (count, duration) in pending.items()
+                 if parent_id == span.span_id}
+        self.part_finished(span, steps, uploads[0], uploads[1])
+
+    @abc.abstractmethod
+    def part_finished(self, span: Span, steps: Dict[str, Any], files: int, size: int):
+        """
+        件号区间结束（子类必须实现，缺少实现时实例化即报错）
+
+        Args:
+            span: 件号区间（attrs 中有 part_number，失败时另有 failed_step / reason）
+            steps: {步骤名: (次数, 累计耗时秒)}
+            files: 成功上传的文件数
+            size: 成功上传的字节数
+        """
+
+
+def combine_listeners(*listeners: Optional[Callable[[Span], None]]) -> Optional[Callable[[Span], None]]:
+    """把多个区间结束回调合并为一个（忽略 None，某个回调出错不影响其余回调）"""
+    active = [listener for listener in listeners if listener is not None]
+    if len(active) <= 1:
+        return active[0] if active else None
+
+    def listener(current: Span):
+        for item in active:
+            try:
+                item(current)
+            except Exception:
+                pass
+    return listener
+
+
+# ---------------------------------------------------------------
+# 全局追踪器（每次只运行一个批次）
+# ---------------------------------------------------------------
+
+_active_tracer: Optional[Tracer] = None
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """安装追踪器，返回之前的追踪器（便于批次结束后恢复）"""
+    global _active_tracer
+    previous = _active_tracer
+    _active_tracer = tracer
+    return previous
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _active_tracer
+
+
+def current_span() -> Optional[Span]:
+    """当前线程最内层的区间；没有追踪器或不在任何区间内时返回None"""
+    tracer = _active_tracer
+    if tracer is None:
+        return None
+    stack = tracer._stack()
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    记录一个步骤区间
+
+    用法:
+        with tracing.span('save') as current:
+            ...
+            if not ok:
+                current.fail()
+    """
+    tracer = _active_tracer
+    if tracer is None:
+        yield _NULL_SPAN
+        return
+    with tracer.span(name, **attrs) as current:
+        yield current
+
+
+def traced(name: str, attrs: Optional[Callable[..., Dict[str, Any]]] = None):
+    """
+    函数装饰器：整个调用记录为一个区间，返回值为假（False/None）时结果记为 failed
+
+    Args:
+        name: 区间名称
+        attrs: 可选，用调用参数生成区间属性的函数（如提取件号）
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_tracer is None:
+                return func(*args, **kwargs)
+            extra = {}
+            if attrs is not None:
+                try:
+                    extra = attrs(*args, **kwargs) or {}
+                except Exception:
+                    extra = {}
+            with span(name, **extra) as current:
+                result = func(*args, **kwargs)
+                if not result:
+                    current.fail()
+                return result
+        return wrapper
+    return decorator
+
+
+def default_trace_path(excel_path: str) -> str:
+    """按输入文件名和开始时间生成追踪文件路径（不含扩展名）"""
+    stem = os.path.splitext(os.path.basename(excel_path))[0] or 'batch'
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(os.getcwd(), TRACE_DIR, f"{stem}_{timestamp}")
+
+
+def export_trace(tracer: Tracer, trace_path: str, log: Callable[..., None]):
+    """
+    导出追踪文件并在日志中输出每个步骤的 p50/p95 耗时
+
+    Args:
+        tracer: 本批次的追踪器
+        trace_path: 追踪文件路径（不含扩展名），生成 .jsonl 和 .trace.json
+        log: 日志函数 log(message, level)
+    """
+    if not tracer.spans:
+        return
+    try:
+        directory = os.path.dirname(trace_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tracer.export_jsonl(f"{trace_path}.jsonl")
+        tracer.export_chrome_trace(f"{trace_path}.trace.json")
+    except OSError as e:
+        log(f"⚠️ 追踪文件导出失败: {e}", "WARNING")
+        return
+
+    log("=== 步骤耗时统计（秒）===")
+    for name, stats in sorted(tracer.summary().items(), key=lambda item: -item[1]['p50'] * item[1]['count']):
+        failed = f"，失败 {stats['failed']} 次" if stats['failed'] else ""
+        log(f"  {name}: {stats['count']} 次，p50 {stats['p50']:.1f}，p95 {stats['p95']:.1f}，"
+            f"最大 {stats['max']:.1f}{failed}")
+    log(f"追踪文件: {trace_path}.trace.json（可在 chrome://tracing 或 Perfetto 中打开）")
@@ -50,9 +50,16 @@ def main():
         print("✅ 完整下载功能")
         print("=" * 70)
         
+        # 启动性能分析（--profile-startup 或环境变量 PEDA_STARTUP_PROFILE=1）：必须在导入GUI之前开启
+        from gui import startup_profile
+        if startup_profile.requested():
+            startup_profile.enable()
+            print("⏱️ 已开启启动性能分析，窗口显示后输出报告")
+        
         # 导入并启动GUI
         print("⏳ 正在加载模块，首次启动可能需要几秒钟，请稍候...")
-        from gui.peda_gui_complete import main as gui_main
+        with startup_profile.phase('import gui.peda_gui_complete'):
+            from gui.peda_gui_complete import main as gui_main
         print("✅ 模块加载完成，启动GUI...")
         gui_main()
         
@@ -0,0 +1,41 @@
+"""
+常驻自动化服务测试：Playwright 无法启动时，排队的批次立即得到 AutomationServiceUnavailable
+"""
+
+import threading
+
+import playwright.sync_api
+import pytest
+
+from gui.automation_service import AutomationService, AutomationServiceUnavailable, STATE_FAILED
+
+
+def test_batch_fails_fast_when_playwright_cannot_start(monkeypatch):
+    def broken_playwright():
+        raise RuntimeError("driver missing")
+
+    monkeypatch.setattr(playwright.sync_api, 'sync_playwright', broken_playwright)
+    service = AutomationService(log_callback=lambda message, level="INFO": None)
+    outcome = {}
+
+    def run():
+        try:
+            service.run_batch(data_rows=[])
+        except Exception as e:
+            outcome['error'] = e
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert not worker.is_alive(), "批次在服务启动失败后仍在等待"
+    assert isinstance(outcome.get('error'), AutomationServiceUnavailable)
+    assert service.state == STATE_FAILED
+    assert not service.available()
+
+
+def test_batch_queued_after_failure_is_not_stranded(monkeypatch):
+    monkeypatch.setattr(playwright.sync_api, 'sync_playwright', lambda: 1 / 0)
+    service = AutomationService(log_callback=lambda message, level="INFO": None)
+    for _ in range(3):
+        with pytest.raises(AutomationServiceUnavailable):
+            service.run_batch(data_rows=[])
@@ -0,0 +1,62 @@
+"""
+可取消等待测试：长时间的 wait_for_function / wait_for_load_state 被拆成短等待，取消后立即停止
+"""
+
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from modules.cancellation import (
+    CANCEL_CHECK_INTERVAL_MS, CancellationToken, OperationCancelled,
+    cancellable_load_state, cancellable_wait_for_function
+)
+
+
+class Page:
+    """wait_for_* 总是超时；第 cancel_after 次调用后取消令牌"""
+
+    def __init__(self, token=None, cancel_after=None):
+        self.token = token
+        self.cancel_after = cancel_after
+        self.timeouts = []
+
+    def _wait(self, timeout):
+        self.timeouts.append(timeout)
+        if self.token is not None and len(self.timeouts) == self.cancel_after:
+            self.token.cancel()
+        raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded")
+
+    def wait_for_function(self, expression, timeout=None):
+        return self._wait(timeout)
+
+    def wait_for_load_state(self, state, timeout=None):
+        return self._wait(timeout)
+
+
+def test_cancel_interrupts_long_wait_for_function():
+    token = CancellationToken()
+    page = Page(token, cancel_after=2)
+    with pytest.raises(OperationCancelled):
+        cancellable_wait_for_function(page, "() => false", 30000, token)
+    assert page.timeouts == [CANCEL_CHECK_INTERVAL_MS, CANCEL_CHECK_INTERVAL_MS]
+
+
+def test_timeout_still_raised_when_not_cancelled(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('modules.cancellation.time.monotonic', lambda: now[0])
+
+    class Clocked(Page):
+        def _wait(self, timeout):
+            now[0] += timeout / 1000
+            return super()._wait(timeout)
+
+    page = Clocked()
+    with pytest.raises(PlaywrightTimeoutError):
+        cancellable_load_state(page, "networkidle", 1200, CancellationToken())
+    assert page.timeouts == pytest.approx([CANCEL_CHECK_INTERVAL_MS, CANCEL_CHECK_INTERVAL_MS, 200])
+
+
+def test_without_token_uses_single_wait():
+    page = Page()
+    with pytest.raises(PlaywrightTimeoutError):
+        cancellable_load_state(page, "networkidle", 10000)
+    assert page.timeouts == [10000]
@@ -0,0 +1,124 @@
+"""
+断点日志续跑测试
+
+PIM 只在 Save 之后保留上传的文件：上传后、保存前崩溃时续跑必须重新上传这些文件；
+已保存后又上传了新文件时，必须重新保存和验证。
+"""
+
+import os
+
+import pytest
+
+from config.constants import (
+    DOCUMENT_CATEGORIES, CHECKPOINT_STEP_PEDA_CREATED, CHECKPOINT_STEP_FORM_FILLED,
+    CHECKPOINT_STEP_FILE_UPLOADED, CHECKPOINT_STEP_SAVED, CHECKPOINT_STEP_VALIDATED, CHECKPOINT_STEP_PDF_EXPORTED
+)
+from core.checkpoint_journal import CheckpointJournal
+from modules import document_manager, form_handler
+from modules.document_manager import DocumentManager, process_document_upload, upload_file_key
+
+CATEGORY = DOCUMENT_CATEGORIES[0]
+PART = 'CP001'
+
+
+class Page:
+    def wait_for_timeout(self, milliseconds):
+        return None
+
+
+def write_journal(path, *records):
+    journal = CheckpointJournal(path)
+    journal.start_run(False, 1)
+    journal.record_step(PART, CHECKPOINT_STEP_PEDA_CREATED, peda_url='http://mock/peda/1')
+    journal.record_step(PART, CHECKPOINT_STEP_FORM_FILLED)
+    for step, info in records:
+        journal.record_step(PART, step, **info)
+    return journal.load()[PART]
+
+
+def uploaded(name):
+    return CHECKPOINT_STEP_FILE_UPLOADED, {'file': f"{CATEGORY}/{name}"}
+
+
+def saved():
+    return CHECKPOINT_STEP_SAVED, {}
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    """用断点进度重放一次文档上传，返回 (本次上传的文件名, 传给 save_and_validate_peda 的已完成步骤)"""
+    category_dir = tmp_path / 'docs' / PART / CATEGORY
+    category_dir.mkdir(parents=True)
+    for name in ('a.pdf', 'b.pdf'):
+        (category_dir / name).write_bytes(b'%PDF')
+
+    calls = {'uploads': [], 'save_steps': None}
+
+    def upload_single_file(page, category, file_path, cancel_token=None):
+        calls['uploads'].append(os.path.basename(file_path))
+        return True
+
+    def save_and_validate_peda(page, part_number, doc_manager, data_row, log_callback=None,
+                               step_callback=None, completed_steps=None, cancel_token=None):
+        calls['save_steps'] = set(completed_steps or ())
+        return True
+
+    monkeypatch.setattr(document_manager, 'click_document_maintenance_tab', lambda page: True)
+    monkeypatch.setattr(document_manager, 'upload_single_file', upload_single_file)
+    monkeypatch.setattr(form_handler, 'save_and_validate_peda', save_and_validate_peda)
+
+    def run(checkpoint):
+        process_document_upload(Page(), DocumentManager(str(tmp_path / 'docs'), PART), PART, {},
+                                completed_steps=set(checkpoint.steps),
+                                uploaded_files=set(checkpoint.uploaded_files))
+        return sorted(calls['uploads']), calls['save_steps']
+
+    return run
+
+
+def test_upload_without_save_is_not_trusted(tmp_path):
+    state = write_journal(str(tmp_path / 'j.jsonl'), uploaded('a.pdf'))
+    assert state.uploaded_files == set()
+    assert state.unsaved_files == {f"{CATEGORY}/a.pdf"}
+
+
+def test_save_confirms_earlier_uploads_only(tmp_path):
+    state = write_journal(str(tmp_path / 'j.jsonl'), uploaded('a.pdf'), saved(), uploaded('b.pdf'))
+    assert state.uploaded_files == {f"{CATEGORY}/a.pdf"}
+    assert state.unsaved_files == {f"{CATEGORY}/b.pdf"}
+    assert CHECKPOINT_STEP_SAVED in state.steps
+
+
+def test_crash_between_upload_and_save_reuploads_and_saves(tmp_path, replay):
+    state = write_journal(str(tmp_path / 'j.jsonl'), uploaded('a.pdf'), uploaded('b.pdf'))
+    uploads, save_steps = replay(state)
+    assert uploads == ['a.pdf', 'b.pdf']
+    assert CHECKPOINT_STEP_SAVED not in save_steps
+
+
+def test_retry_after_save_uploads_failed_file_and_saves_again(tmp_path, replay):
+    # 上次 b.pdf 上传失败，a.pdf 已保存并验证
+    state = write_journal(str(tmp_path / 'j.jsonl'), uploaded('a.pdf'), saved(), (CHECKPOINT_STEP_VALIDATED, {}))
+    uploads, save_steps = replay(state)
+    assert uploads == ['b.pdf']
+    assert CHECKPOINT_STEP_SAVED not in save_steps
+    assert CHECKPOINT_STEP_VALIDATED not in save_steps
+
+
+def test_crash_after_save_skips_uploads_and_save(tmp_path, replay):
+    state = write_journal(str(tmp_path / 'j.jsonl'), uploaded('a.pdf'), uploaded('b.pdf'), saved())
+    uploads, save_steps = replay(state)
+    assert uploads == []
+    assert CHECKPOINT_STEP_SAVED in save_steps
+
+
+def test_upload_file_key_matches_journal_records():
+    assert upload_file_key(CATEGORY, os.path.join('x', 'a.pdf')) == uploaded('a.pdf')[1]['file']
+
+
+def test_exported_pdf_is_not_exported_again(monkeypatch):
+    exports = []
+    monkeypatch.setattr(form_handler, 'print_coversheet_pdf_v12', lambda *args: exports.append(args) or True)
+    completed = {CHECKPOINT_STEP_SAVED, CHECKPOINT_STEP_VALIDATED, CHECKPOINT_STEP_PDF_EXPORTED}
+    assert form_handler.save_and_validate_peda(Page(), PART, None, {}, completed_steps=completed)
+    assert exports == []
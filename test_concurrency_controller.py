@@ -0,0 +1,111 @@
+"""
+自适应并发控制器（AIMD）测试
+"""
+
+from core.concurrency_controller import AdaptiveConcurrencyController
+from modules import tracing
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_controller(**kwargs):
+    clock = Clock()
+    options = dict(min_workers=1, max_workers=8, initial_workers=4, window_parts=1,
+                   smoothing=1.0, baseline_samples=10, baseline_percentile=10, min_baseline=0.2,
+                   clock=clock, log_callback=lambda message, level="INFO": None)
+    options.update(kwargs)
+    return AdaptiveConcurrencyController(**options), clock
+
+
+def finish_window(controller, clock, seconds=60.0):
+    """处理完一个评估窗口的件号"""
+    clock.now += seconds
+    for _ in range(controller.window_parts * controller.limit):
+        controller.observe_part_done()
+
+
+def span(name, duration, outcome=tracing.OUTCOME_OK):
+    item = tracing.Span(name, 1, None, {})
+    item.duration = duration
+    item.outcome = outcome
+    return item
+
+
+def test_normal_latency_increases_workers():
+    controller, clock = make_controller()
+    for _ in range(5):
+        controller.observe_step('save_roundtrip', 1.0)
+    finish_window(controller, clock)
+    assert controller.limit == 5
+
+
+def test_slow_server_halves_workers():
+    controller, clock = make_controller()
+    for _ in range(5):
+        controller.observe_step('save_roundtrip', 1.0)
+    controller.observe_step('save_roundtrip', 3.0)
+    assert controller.latency_ratio() == 3.0
+    finish_window(controller, clock)
+    assert controller.limit == 2
+
+
+def test_throughput_drop_after_increase_backs_off():
+    controller, clock = make_controller()
+    controller.observe_step('overlay_wait', 1.0)
+    finish_window(controller, clock, seconds=60)   # 4 -> 5
+    assert controller.limit == 5
+    finish_window(controller, clock, seconds=600)  # 吞吐量下降 -> 4
+    assert controller.limit == 4
+
+
+def test_baseline_follows_a_lasting_slowdown():
+    controller, clock = make_controller(baseline_samples=5)
+    controller.observe_step('search_response', 0.5)
+    for _ in range(4):
+        controller.observe_step('search_response', 2.0)
+    # 窗口内还有快速样本：判定为变慢
+    assert controller.latency_ratio() == 4.0
+    controller.observe_step('search_response', 2.0)
+    # 快速样本移出窗口后基线上移
+    assert controller.baseline('search_response') == 2.0
+    assert controller.latency_ratio() == 1.0
+
+
+def test_min_baseline_ignores_millisecond_noise():
+    controller, _ = make_controller()
+    controller.observe_step('overlay_wait', 0.005)
+    controller.observe_step('overlay_wait', 0.15)
+    assert controller.baseline('overlay_wait') == 0.2
+    assert controller.latency_ratio() < 1.0
+
+
+def test_only_successful_server_spans_are_samples():
+    controller, _ = make_controller()
+    controller.observe_span(span('save_roundtrip', 1.0))
+    controller.observe_span(span('save', 30.0))
+    controller.observe_span(span('overlay_wait', 30.0, tracing.OUTCOME_FAILED))
+    assert controller.baseline('save_roundtrip') == 1.0
+    assert controller.baseline('save') is None
+    assert controller.baseline('overlay_wait') is None
+
+
+def test_close_releases_waiting_workers():
+    controller, _ = make_controller(initial_workers=1)
+    assert controller.wait_for_slot(0)
+    controller.close()
+    assert not controller.wait_for_slot(3)
+
+
+def test_retired_worker_hands_its_slot_to_the_next_one():
+    controller, _ = make_controller(initial_workers=1)
+    assert controller.wait_for_slot(0)
+    controller.retire(0)
+    # 1 号线程原本超出并发数，0 号退出后递补
+    assert controller.wait_for_slot(1)
+    controller.close()
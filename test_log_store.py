@@ -0,0 +1,24 @@
+"""
+日志存储测试：视图按"一条日志一行"换算行号，多行消息必须折叠
+"""
+
+from gui.log_store import LINE_BREAK_MARK, LogStore
+
+
+def test_multiline_message_is_folded_into_one_row():
+    store = LogStore(capacity=10)
+    store.extend([('10:00:00', 'Traceback:\n  File "x.py"\r\nValueError', 'ERROR')])
+    entry = store.get(0)
+    assert '\n' not in entry.line and '\r' not in entry.line
+    assert entry.line == f'[10:00:00] ERROR: Traceback:{LINE_BREAK_MARK}  File "x.py"{LINE_BREAK_MARK}ValueError'
+    assert 'valueerror' in entry.folded
+
+
+def test_spill_file_keeps_original_line_breaks(tmp_path):
+    path = tmp_path / 'gui.log'
+    store = LogStore(capacity=1, spill_path=str(path))
+    store.extend([('10:00:00', 'a\nb', 'INFO'), ('10:00:01', 'c', 'INFO')])
+    store.close()
+    assert path.read_text(encoding='utf-8') == '[10:00:00] INFO: a\nb\n[10:00:01] INFO: c\n'
+    # 内存中只保留最近 1 条
+    assert len(store) == 1 and store.get(1).message == 'c'
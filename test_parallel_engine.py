@@ -0,0 +1,75 @@
+"""
+并行引擎测试：第一个工作线程的浏览器启动失败时，批次不能卡住
+"""
+
+import contextlib
+import threading
+
+import playwright.sync_api
+
+from core import parallel_engine
+from core.concurrency_controller import AdaptiveConcurrencyController
+from mock_pim.benchmark import build_workload
+
+
+class BrowserManager:
+    """第一个实例初始化失败，其余成功"""
+
+    created = []
+
+    def __init__(self):
+        self.failure_trace_dir = None
+        BrowserManager.created.append(self)
+
+    def set_log_callback(self, callback):
+        pass
+
+    def initialize(self, playwright, *args, **kwargs):
+        return len(BrowserManager.created) > 1
+
+    def get_page(self):
+        return object()
+
+    def reset_for_next_part(self):
+        return True
+
+    def begin_part_trace(self, part_number):
+        pass
+
+    def end_part_trace(self, failed=False):
+        pass
+
+    def is_healthy(self):
+        return True
+
+    def cleanup(self):
+        pass
+
+
+def test_first_worker_browser_failure_does_not_hang(tmp_path, monkeypatch):
+    BrowserManager.created = []
+    monkeypatch.setattr(parallel_engine, 'BrowserManager', BrowserManager)
+    monkeypatch.setattr(parallel_engine, 'process_single_peda', lambda *args, **kwargs: True)
+    monkeypatch.setattr(playwright.sync_api, 'sync_playwright', contextlib.nullcontext)
+
+    data_rows = build_workload(str(tmp_path), 3)
+    controller = AdaptiveConcurrencyController(min_workers=1, max_workers=3, initial_workers=1,
+                                               log_callback=lambda message, level="INFO": None)
+    result = {}
+
+    def run():
+        result.update(parallel_engine.run_batch_parallel(
+            data_rows, str(tmp_path), 'user', 'password', controller=controller,
+            log_callback=lambda message, level="INFO": None))
+
+    batch = threading.Thread(target=run, daemon=True)
+    batch.start()
+    batch.join(timeout=30)
+    stuck = batch.is_alive()
+    if stuck:
+        # 释放被限流等待的线程，让测试失败而不是卡住整个测试进程
+        controller.close()
+        batch.join(timeout=30)
+    assert not stuck, "第一个工作线程退出后批次卡住"
+    assert result['success'] == 3
+    assert result['failed'] == 0
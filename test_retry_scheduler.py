@@ -0,0 +1,93 @@
+"""
+失败分类和重试调度测试
+"""
+
+from config.constants import (
+    FAILURE_PRODUCT_NOT_FOUND, FAILURE_SEARCH_NO_SUGGESTIONS, FAILURE_NEVER_APPROVED,
+    FAILURE_SAVE_VALIDATE, FAILURE_EXCEPTION, FAILURE_CREATE_PEDA, FAILURE_CREATE_PEDA_UNCONFIRMED
+)
+from core.retry_scheduler import RetryScheduler, classify_failure
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_product_not_found_is_permanent():
+    assert not classify_failure({'step': 'resolved', 'reason': FAILURE_PRODUCT_NOT_FOUND})
+    assert not classify_failure({'reason': FAILURE_NEVER_APPROVED})
+
+
+def test_suggestions_not_loaded_is_transient():
+    assert classify_failure({'step': 'resolved', 'reason': FAILURE_SEARCH_NO_SUGGESTIONS})
+    assert classify_failure({'reason': FAILURE_SAVE_VALIDATE})
+
+
+def test_create_failure_after_click_is_not_retried():
+    # 点击创建之前失败可以重试；点击之后 PEDA 可能已创建，重试会重复创建
+    assert classify_failure({'step': 'peda_created', 'reason': FAILURE_CREATE_PEDA, 'error': 'Timeout 10000ms exceeded'})
+    assert not classify_failure({'step': 'peda_created', 'reason': FAILURE_CREATE_PEDA_UNCONFIRMED,
+                                 'error': 'Timeout 30000ms exceeded'})
+
+
+def test_error_text_classifies_exceptions():
+    assert not classify_failure({'reason': FAILURE_EXCEPTION, 'error': "did not find some options"})
+    assert classify_failure({'reason': FAILURE_EXCEPTION, 'error': "Timeout 30000ms exceeded"})
+    # 无法识别的失败按暂时性处理
+    assert classify_failure({'reason': FAILURE_EXCEPTION, 'error': 'boom'})
+    assert classify_failure(None)
+
+
+def test_scheduler_retries_transient_failures_at_the_end_with_backoff():
+    clock = Clock()
+    scheduler = RetryScheduler(['a', 'b'], max_retries=2, base_delay=10, max_delay=15,
+                               clock=clock, sleep=clock.sleep)
+    order = []
+    for index, item, attempt in scheduler:
+        order.append((item, attempt))
+        if item == 'a':
+            scheduler.schedule_retry(index, item, attempt, {'reason': FAILURE_SEARCH_NO_SUGGESTIONS})
+
+    assert order == [('a', 0), ('b', 0), ('a', 1), ('a', 2)]
+    assert clock.sleeps == [10, 15]
+    assert scheduler.retried_count == 2
+    assert scheduler.exhausted
+
+
+def test_scheduler_does_not_retry_permanent_failures():
+    clock = Clock()
+    scheduler = RetryScheduler(['a'], clock=clock, sleep=clock.sleep)
+    for index, item, attempt in scheduler:
+        assert scheduler.schedule_retry(index, item, attempt, {'reason': FAILURE_PRODUCT_NOT_FOUND}) is None
+    assert scheduler.retried_count == 0
+    assert clock.sleeps == []
+
+
+def test_retry_now_does_not_use_an_attempt():
+    clock = Clock()
+    scheduler = RetryScheduler(['a', 'b'], clock=clock, sleep=clock.sleep)
+    seen = []
+    for index, item, attempt in scheduler:
+        seen.append((item, attempt))
+        if len(seen) == 1:
+            scheduler.retry_now(index, item, attempt)
+    assert seen == [('a', 0), ('a', 0), ('b', 0)]
+
+
+def test_cancelled_sleep_stops_scheduling():
+    scheduler = RetryScheduler(['a'], base_delay=5, clock=lambda: 0.0, sleep=lambda seconds: True)
+    attempts = []
+    for index, item, attempt in scheduler:
+        attempts.append(attempt)
+        scheduler.schedule_retry(index, item, attempt, {'reason': FAILURE_SAVE_VALIDATE})
+    assert attempts == [0]
+    assert scheduler.pending_retries == 1
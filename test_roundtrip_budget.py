@@ -0,0 +1,138 @@
+"""
+Playwright 往返次数预算测试
+
+对本地模拟 PIM 服务运行单个件号的完整流程，用计数代理统计每个步骤的 Playwright 调用，
+单个步骤超过预算时失败，防止改动悄悄给热点路径增加往返。
+没有安装 Playwright 浏览器（也没有用 PEDA_BROWSER_PATH 指定浏览器）时跳过端到端测试。
+"""
+
+import os
+import tempfile
+
+import pytest
+
+from modules import tracing
+from modules.call_counter import CallCounter, counting_page, UNTRACED_STEP
+
+# 单次步骤允许的最多往返次数（不含 wait_for_timeout 固定等待）
+# 取自对模拟服务（instant 预设）的实测计数：改动增加热点路径的往返时测试失败，减少往返后同步下调
+# 搜索按字符输入，件号越长往返越多，预算按 BUDGET_PART_NUMBER 的长度设定
+BUDGET_PART_NUMBER = 'RT001'
+STEP_BUDGETS = {
+    'search': 22,
+    'search_response': 1,
+    'approval_check': 5,
+    'create': 5,
+    'fill': 20,
+    'document_tab': 4,
+    'upload': 9,
+    'overlay_wait': 1,
+    'save': 4,
+    'save_roundtrip': 2,
+    'validate': 4,
+    'cover_sheet': 3,
+    'pdf': 3,
+    'part': 0,
+}
+
+
+class Locator:
+    """测试用的假定位器（类名与 Playwright 一致，代理据此继续包装）"""
+
+    def locator(self, selector):
+        return Locator()
+
+    @property
+    def first(self):
+        return Locator()
+
+    def is_visible(self, timeout=None):
+        return True
+
+    def click(self):
+        return None
+
+
+class Page(Locator):
+    url = 'http://mock/webui'
+
+    def wait_for_timeout(self, milliseconds):
+        return None
+
+
+def test_counter_attributes_calls_to_steps():
+    proxy, counter = counting_page(Page())
+    previous = tracing.set_tracer(tracing.Tracer())
+    try:
+        proxy.is_visible()
+        with tracing.span('search'):
+            box = proxy.locator('#box').first
+            box.is_visible()
+            box.click()
+            proxy.wait_for_timeout(100)
+        with tracing.span('search'):
+            proxy.locator('#box').click()
+        assert proxy.url == 'http://mock/webui'
+    finally:
+        tracing.set_tracer(previous)
+
+    summary = counter.summary()
+    assert summary[UNTRACED_STEP]['total'] == 1
+    assert summary['search']['occurrences'] == 2
+    assert summary['search']['total'] == 3
+    assert summary['search']['max'] == 2
+    assert summary['search']['waits'] == 1
+    assert summary['search']['methods'] == {'is_visible': 1, 'click': 2}
+
+
+def _chromium_path():
+    """PEDA_BROWSER_PATH 指定的 Chromium 内核浏览器，否则用 Playwright 自带的 Chromium"""
+    env_path = os.environ.get('PEDA_BROWSER_PATH')
+    if env_path:
+        return env_path if os.path.exists(env_path) else None
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as playwright:
+            path = playwright.chromium.executable_path
+        return path if path and os.path.exists(path) else None
+    except Exception:
+        return None
+
+
+def test_part_roundtrip_budget():
+    browser_path = _chromium_path()
+    if not browser_path:
+        pytest.skip("没有可用的 Playwright Chromium 浏览器")
+
+    from playwright.sync_api import sync_playwright
+    from mock_pim import MockPimConfig, MockPimServer
+    from mock_pim.benchmark import build_workload
+    from modules.browser_manager import BrowserManager
+    from modules.peda_processor import process_single_peda, prepare_data_row
+
+    document_path = tempfile.mkdtemp(prefix='peda_budget_')
+    data_row = prepare_data_row(build_workload(document_path, 1)[0])
+    data_row['part_number'] = BUDGET_PART_NUMBER
+    os.rename(os.path.join(document_path, 'MOCK00001'), os.path.join(document_path, BUDGET_PART_NUMBER))
+
+    with MockPimServer(MockPimConfig('instant')) as server, sync_playwright() as playwright:
+        browser_manager = BrowserManager()
+        assert browser_manager.initialize(playwright, 'budget', 'budget', login_url=server.login_url,
+                                          browser_path=browser_path, headless=True)
+        try:
+            page, counter = counting_page(browser_manager.page, CallCounter())
+            previous = tracing.set_tracer(tracing.Tracer())
+            try:
+                assert process_single_peda(page, data_row, document_path)
+            finally:
+                tracing.set_tracer(previous)
+        finally:
+            browser_manager.cleanup()
+
+    print(counter.format_summary())
+    over_budget = {
+        name: (stats['max'], STEP_BUDGETS[name])
+        for name, stats in counter.summary().items()
+        if name in STEP_BUDGETS and stats['max'] > STEP_BUDGETS[name]
+    }
+    assert not over_budget, f"步骤往返次数超出预算 (实际, 预算): {over_budget}\n{counter.format_summary()}"
@@ -0,0 +1,37 @@
+"""
+单浏览器批处理测试：浏览器启动失败或批次异常中止时，返回的统计字段与正常结束一致
+"""
+
+import pytest
+
+from core import workflow_engine
+
+RESULT_KEYS = {'total', 'success', 'failed', 'skipped', 'resumed', 'retried', 'failures', 'cancelled'}
+
+
+class BrowserManager:
+    """测试用的假浏览器管理器：initialize 按参数返回失败或抛出异常"""
+    outcome = False
+
+    def set_log_callback(self, callback):
+        pass
+
+    def initialize(self, *args, **kwargs):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+    def cleanup(self):
+        pass
+
+
+@pytest.mark.parametrize('outcome', [False, RuntimeError('boom')])
+def test_aborted_batch_reports_all_result_fields(monkeypatch, tmp_path, outcome):
+    monkeypatch.setattr(BrowserManager, 'outcome', outcome)
+    monkeypatch.setattr(workflow_engine, 'BrowserManager', BrowserManager)
+    rows = [{'part_number': 'WF001'}, {'part_number': 'WF002'}]
+    result = workflow_engine.run_batch_with_reuse(None, rows, str(tmp_path), 'user', 'secret',
+                                                  log_callback=lambda message, level="INFO": None)
+    assert set(result) == RESULT_KEYS
+    assert result['failed'] == 2
+    assert result['retried'] == 0 and result['failures'] == {} and not result['cancelled']